@@ -0,0 +1,85 @@
+import socket
+import asyncio
+from multiprocessing import Process
+from argparse import ArgumentParser
+from ebbe import Timer
+
+from minet.executors import HTTPThreadPoolExecutor
+from minet.async_executors import AsyncHTTPExecutor
+
+parser = ArgumentParser()
+parser.add_argument("--count", type=int, default=2000)
+parser.add_argument("--hosts", type=int, default=50)
+parser.add_argument("--latency", type=float, default=0.5)
+parser.add_argument("--threads", type=int, default=25)
+parser.add_argument("--max-concurrency", type=int, default=512)
+
+cli_args = parser.parse_args()
+
+BODY = b"<html><body>" + b"hello " * 1000 + b"</body></html>"
+RESPONSE = (
+    b"HTTP/1.1 200 OK\r\nContent-Type: text/html\r\nContent-Length: %i\r\n\r\n"
+    % len(BODY)
+) + BODY
+
+
+# NOTE: a keep-alive server simulating network latency, standing in for
+# a large pool of slow remote hosts.
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            await reader.readuntil(b"\r\n\r\n")
+            await asyncio.sleep(cli_args.latency)
+            writer.write(RESPONSE)
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+
+    writer.close()
+
+
+async def serve(sock: socket.socket):
+    server = await asyncio.start_server(handle, sock=sock)
+
+    async with server:
+        await server.serve_forever()
+
+
+def run_server(sock: socket.socket):
+    asyncio.run(serve(sock))
+
+
+sock = socket.create_server(("0.0.0.0", 0), backlog=4096)
+port = sock.getsockname()[1]
+
+# NOTE: the server runs in its own process so it does not compete with the
+# benchmarked executors for the GIL
+Process(target=run_server, args=(sock,), daemon=True).start()
+
+# NOTE: distinct loopback ips so that requests are spread over several hosts,
+# like when fetching urls from many different websites
+URLS = [
+    "http://127.0.0.%i:%i/page-%i.html" % (1 + i % cli_args.hosts, port, i)
+    for i in range(cli_args.count)
+]
+
+print(
+    "%i urls, %i hosts, %.3fs latency"
+    % (cli_args.count, cli_args.hosts, cli_args.latency)
+)
+
+
+def consume(executor, title: str):
+    with Timer(title):
+        for result in executor.request(URLS, throttle=0):
+            assert result.error is None, result.error
+
+
+with HTTPThreadPoolExecutor(max_workers=cli_args.threads) as executor:
+    consume(executor, "HTTPThreadPoolExecutor (%i threads)" % cli_args.threads)
+
+with AsyncHTTPExecutor(max_concurrency=cli_args.max_concurrency) as executor:
+    consume(
+        executor,
+        "AsyncHTTPExecutor (%i max concurrency)" % cli_args.max_concurrency,
+    )
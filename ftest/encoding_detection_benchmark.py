@@ -0,0 +1,53 @@
+from random import Random
+from argparse import ArgumentParser
+from ebbe import Timer
+
+from minet.encodings import infer_encoding, detect_encoding
+
+parser = ArgumentParser()
+parser.add_argument("--count", type=int, default=20)
+parser.add_argument("--size", type=int, default=2_000_000)
+
+cli_args = parser.parse_args()
+
+rng = Random(42)
+
+WORDS = ["été", "cœur", "naïf", "raison", "point", "lorem", "ipsum", "dolor"]
+
+
+def make_page(encoding: str, declaration: str = "") -> bytes:
+    words = []
+    size = 0
+
+    while size < cli_args.size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+
+    return (
+        "<html><head>%s<title>Test</title></head><body>%s</body></html>"
+        % (declaration, " ".join(words))
+    ).encode(encoding)
+
+
+PAGES = {
+    "undeclared utf-8": make_page("utf-8"),
+    "declared cp1252": make_page("cp1252", '<meta charset="windows-1252">'),
+    "undeclared cp1252": make_page("cp1252"),
+}
+
+# NOTE: warming up lazy imports
+detect_encoding(b"")
+
+for name, page in PAGES.items():
+    print("%s (%.1fMB)" % (name, len(page) / 1_000_000))
+
+    with Timer("  infer_encoding (full body)"):
+        for _ in range(cli_args.count):
+            infer_encoding(page)
+
+    with Timer("  detect_encoding (tiered)"):
+        for _ in range(cli_args.count):
+            detect_encoding(page)
+
+    print("  ", infer_encoding(page), detect_encoding(page))
@@ -0,0 +1,65 @@
+from random import Random
+from argparse import ArgumentParser
+from ebbe import Timer
+from ural import links_from_html
+
+from minet.scrape.regex import extract_links
+from minet.crawl.url_cache import URLCache
+from minet.crawl.types import CrawlJob
+
+parser = ArgumentParser()
+parser.add_argument("--count", type=int, default=10)
+parser.add_argument("--links", type=int, default=20_000)
+parser.add_argument("--distinct", type=int, default=2_000)
+
+cli_args = parser.parse_args()
+
+rng = Random(42)
+
+BASE_URL = "https://www.test.com/section/index.html"
+
+# NOTE: link-heavy pages usually repeat the same navigation links a lot
+HREFS = [
+    "/article/%i.html" % i if i % 3 else "https://other-%i.com/page?id=%i" % (i, i)
+    for i in range(cli_args.distinct)
+]
+
+PAGE = (
+    "<html><body>%s</body></html>"
+    % "\n".join(
+        '<div class="item"><a href="%s">Link</a><a href="#comments">Comments</a></div>'
+        % rng.choice(HREFS)
+        for _ in range(cli_args.links)
+    )
+).encode()
+
+KWARGS = {"canonicalize": True, "unique": True, "strip_fragment": True}
+
+print(
+    "%i links (%i distinct) in a %.1fMB page"
+    % (cli_args.links, cli_args.distinct, len(PAGE) / 1_000_000)
+)
+
+assert list(extract_links(BASE_URL, PAGE, **KWARGS)) == list(
+    links_from_html(BASE_URL, PAGE, **KWARGS)
+)
+
+with Timer("ural.links_from_html"):
+    for _ in range(cli_args.count):
+        list(links_from_html(BASE_URL, PAGE, **KWARGS))
+
+with Timer("extract_links"):
+    for _ in range(cli_args.count):
+        list(extract_links(BASE_URL, PAGE, **KWARGS))
+
+urls = list(extract_links(BASE_URL, PAGE, **KWARGS))
+
+with Timer("url cache filtering after building jobs"):
+    for _ in range(cli_args.count):
+        cache = URLCache()
+        cache.register(CrawlJob(url) for url in urls * 2)
+
+with Timer("url cache filtering before building jobs"):
+    for _ in range(cli_args.count):
+        cache = URLCache()
+        [CrawlJob(url) for url in cache.register_many(urls * 2, key=str)]
@@ -0,0 +1,113 @@
+from argparse import ArgumentParser
+from ebbe import Timer
+
+from minet.scrape.soup import WonderfulSoup
+from minet.scrape.lxml_soup import LxmlSoup
+from minet.scrape.utils import ensure_soup
+from minet.scrape.interpreter import interpret_scraper, precompile_scraper
+from minet.scrape.compiler import compile_scraper
+
+parser = ArgumentParser()
+parser.add_argument("--pages", type=int, default=100)
+parser.add_argument("--comments", type=int, default=200)
+
+cli_args = parser.parse_args()
+
+# NOTE: adapted from ftest/scrapers/hackernews_comments.yml, without the
+# quadratic parent lookup and date parsing that would dwarf everything else
+DEFINITION = {
+    "set_context": {
+        "title": {"sel": ".fatitem .storylink", "extract": "text"},
+        "id": {"sel": ".fatitem .athing", "attr": "id"},
+    },
+    "iterator": ".athing.comtr",
+    "filter_eval": "value['author'] is not None",
+    "fields": {
+        "article_id": {"get_context": "id"},
+        "article_title": {"get_context": "title"},
+        "comment_id": {"attr": "id", "eval": "int(value)"},
+        "author": {"sel": ".hnuser"},
+        "profile": {"sel": "a.hnuser", "attr": "href", "eval": "value.split('=')[-1]"},
+        "text": {"sel": ".commtext", "extract": "display_text"},
+        "when": {"sel": ".age"},
+        "level": {"sel": ".ind > img", "attr": "width", "eval": "int(value) // 40"},
+        "links": {
+            "sel_eval": "element.select_one('.commtext')",
+            "eval": "links = element.select('a[href]')\nreturn len(links)",
+        },
+    },
+}
+
+COMMENT = """
+<tr class="athing comtr" id="%(id)i">
+  <td>
+    <table><tr>
+      <td class="ind"><img src="s.gif" height="1" width="%(width)i"></td>
+      <td class="default">
+        <div><a href="user?id=user%(id)i" class="hnuser">user%(id)i</a>
+        <span class="age">2023-05-0%(day)i 10:00</span></div>
+        <div class="comment"><span class="commtext c00">
+          Comment number %(id)i, <i>with</i> some <a href="https://example.com">markup</a>.
+          <p>And a second paragraph.</p>
+        </span></div>
+      </td>
+    </tr></table>
+  </td>
+</tr>
+"""
+
+# NOTE: a thread of nested comments, like a real hackernews item page
+HTML = (
+    '<html><body><table class="fatitem"><tr class="athing" id="1">'
+    '<td><a class="storylink" href="https://example.com">Story</a></td></tr></table>'
+    '<table class="comment-tree">%s</table></body></html>'
+    % "".join(
+        COMMENT % {"id": 2 + i, "width": 40 * (i % 4), "day": 1 + i % 9}
+        for i in range(cli_args.comments)
+    )
+)
+
+soup = ensure_soup(HTML)
+
+print("%i pages of %i comments" % (cli_args.pages, cli_args.comments))
+
+
+def run(fn, title: str):
+    with Timer(title):
+        for _ in range(cli_args.pages):
+            fn()
+
+
+compiled_definition = precompile_scraper(DEFINITION)
+compiled_scraper = compile_scraper(DEFINITION)
+
+expected = interpret_scraper(DEFINITION, soup, root=soup)
+
+assert interpret_scraper(compiled_definition, soup, root=soup) == expected
+assert compiled_scraper(soup) == expected
+
+run(lambda: interpret_scraper(DEFINITION, soup, root=soup), "raw definition")
+run(
+    lambda: interpret_scraper(compiled_definition, soup, root=soup),
+    "precompiled definition",
+)
+run(lambda: compiled_scraper(soup), "compiled scraper")
+
+# NOTE: parsing usually dominates, hence the lxml backend
+lxml_soup = LxmlSoup(HTML)
+lxml_compiled_scraper = compile_scraper(DEFINITION, backend="lxml")
+
+assert lxml_compiled_scraper(lxml_soup) == expected
+
+run(lambda: lxml_compiled_scraper(lxml_soup), "compiled scraper (lxml backend)")
+run(lambda: WonderfulSoup(HTML), "parsing with WonderfulSoup (html.parser)")
+run(lambda: WonderfulSoup(HTML, "lxml"), "parsing with WonderfulSoup (lxml)")
+run(lambda: LxmlSoup(HTML), "parsing with LxmlSoup")
+run(
+    lambda: compiled_scraper(WonderfulSoup(HTML)),
+    "parsing & scraping (bs4 backend, html.parser)",
+)
+run(
+    lambda: lxml_compiled_scraper(LxmlSoup(HTML)),
+    "parsing & scraping (lxml backend)",
+)
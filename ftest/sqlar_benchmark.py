@@ -0,0 +1,49 @@
+from random import Random
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+from concurrent.futures import ThreadPoolExecutor
+from os.path import join
+from ebbe import Timer
+
+from minet.sqlar import SQLiteArchive
+
+parser = ArgumentParser()
+parser.add_argument("--count", type=int, default=10_000)
+parser.add_argument("--threads", type=int, default=100)
+parser.add_argument("--size", type=int, default=50_000)
+parser.add_argument("--batch-size", type=int, default=256)
+
+cli_args = parser.parse_args()
+
+rng = Random(42)
+
+# NOTE: html-like payloads so that zlib has some actual work to do
+WORDS = [b"<div>", b"</div>", b"<p>", b"</p>", b"lorem", b"ipsum", b"dolor", b"sit"]
+PAGES = [
+    b" ".join(rng.choices(WORDS, k=cli_args.size // 5)) + b"%i" % i for i in range(100)
+]
+
+print(
+    "%i files of ~%iKB using %i threads"
+    % (cli_args.count, cli_args.size // 1000, cli_args.threads)
+)
+
+with TemporaryDirectory() as tmp:
+
+    def run(batch_size: int, title: str):
+        archive = SQLiteArchive(
+            join(tmp, "%s.sqlar" % batch_size), batch_size=batch_size
+        )
+
+        def work(i):
+            archive.write("%i.html" % i, PAGES[i % len(PAGES)])
+
+        with Timer(title):
+            with ThreadPoolExecutor(max_workers=cli_args.threads) as executor:
+                for _ in executor.map(work, range(cli_args.count)):
+                    pass
+
+            archive.close()
+
+    run(1, "one transaction per file")
+    run(cli_args.batch_size, "group commit (batch_size=%i)" % cli_args.batch_size)
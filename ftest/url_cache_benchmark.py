@@ -0,0 +1,64 @@
+import os
+from random import Random
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+from os.path import join
+from ebbe import Timer
+
+from minet.crawl.url_cache import (
+    SQLiteStringSet,
+    SQLiteFingerprintSet,
+    fingerprint,
+)
+
+parser = ArgumentParser()
+parser.add_argument("--count", type=int, default=1_000_000)
+parser.add_argument("--batch-size", type=int, default=100)
+parser.add_argument("--duplicate-ratio", type=float, default=0.5)
+
+cli_args = parser.parse_args()
+
+# NOTE: links found on a page are often already known, hence the duplicates
+unique_count = int(cli_args.count * (1 - cli_args.duplicate_ratio))
+rng = Random(42)
+UNIQUE_URLS = [
+    "https://www.site-%i.fr/section-%i/%x.html"
+    % (rng.randrange(1000), rng.randrange(37), rng.getrandbits(48))
+    for _ in range(unique_count)
+]
+URLS = UNIQUE_URLS + rng.choices(UNIQUE_URLS, k=cli_args.count - unique_count)
+rng.shuffle(URLS)
+BATCHES = [
+    URLS[i : i + cli_args.batch_size] for i in range(0, len(URLS), cli_args.batch_size)
+]
+
+
+def db_size(path: str) -> int:
+    return sum(os.path.getsize(join(path, name)) for name in os.listdir(path))
+
+
+with TemporaryDirectory() as tmp:
+    path = join(tmp, "strings")
+    s = SQLiteStringSet(path)
+
+    with Timer("SQLiteStringSet.add_many_and_keep_new"):
+        for batch in BATCHES:
+            s.add_many_and_keep_new(batch)
+
+    print("size: %i bytes, %i items" % (db_size(path), len(s)))
+    s.close()
+
+    path = join(tmp, "fingerprints")
+    s = SQLiteFingerprintSet(path, capacity=unique_count)
+
+    with Timer("SQLiteFingerprintSet.add_many_and_keep_new"):
+        for batch in BATCHES:
+            s.add_many_and_keep_new(batch, key=fingerprint)
+
+    print("size: %i bytes, %i items" % (db_size(path), len(s)))
+    s.close()
+
+    with Timer("SQLiteFingerprintSet.__init__ (rebuilding bloom filter)"):
+        s = SQLiteFingerprintSet(path, capacity=unique_count)
+
+    s.close()
@@ -0,0 +1,105 @@
+import os
+import gzip
+from random import Random
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+from os.path import join
+from ebbe import Timer
+
+from minet.sqlar import SQLiteArchive
+
+parser = ArgumentParser()
+parser.add_argument(
+    "directory",
+    nargs="?",
+    help="Folder of html files to use instead of a synthetic corpus.",
+)
+parser.add_argument("--count", type=int, default=5_000)
+parser.add_argument("--sites", type=int, default=10)
+
+cli_args = parser.parse_args()
+
+if cli_args.directory is not None:
+    PAGES = []
+
+    for root, _, files in os.walk(cli_args.directory):
+        for name in files:
+            with open(join(root, name), "rb") as f:
+                data = f.read()
+
+            if name.endswith(".gz"):
+                data = gzip.decompress(data)
+
+            PAGES.append(
+                ("%s/%s" % (os.path.relpath(root, cli_args.directory), name), data)
+            )
+else:
+    rng = Random(42)
+
+    WORDS = [b"lorem", b"ipsum", b"dolor", b"sit", b"amet", b"consectetur", b"elit"]
+
+    # NOTE: pages of a same website share a lot of boilerplate, which is what
+    # trained dictionaries are good at
+    TEMPLATES = [
+        (
+            b"<html><head><title>%s</title>"
+            + b"".join(
+                b'<link rel="stylesheet" href="/static/%i/%i.css">' % (s, j)
+                for j in range(20)
+            )
+            + b'</head><body><nav class="site-%i-nav">' % s
+            + b"".join(
+                b'<a href="/section/%i">Section %i</a>' % (j, j) for j in range(40)
+            )
+            + b'</nav><article class="site-%i-content">%%s</article>' % s
+            + b'<footer class="site-%i-footer">' % s
+            + b" ".join(rng.choices(WORDS, k=200))
+            + b"</footer></body></html>"
+        )
+        for s in range(cli_args.sites)
+    ]
+
+    PAGES = [
+        (
+            "site-%i.com/%i.html" % (i % cli_args.sites, i),
+            TEMPLATES[i % cli_args.sites]
+            % (b"Page %i" % i, b" ".join(rng.choices(WORDS, k=rng.randint(50, 500)))),
+        )
+        for i in range(cli_args.count)
+    ]
+
+total = sum(len(data) for _, data in PAGES)
+
+print("%i files, %.1fMB in total" % (len(PAGES), total / 1_000_000))
+
+
+def report(path):
+    size = os.stat(path).st_size
+    print("  ratio: %.2f (%.1fMB)" % (total / size, size / 1_000_000))
+
+
+with TemporaryDirectory() as tmp:
+    for compression in ("zlib", "zstd"):
+        path = join(tmp, "%s.sqlar" % compression)
+        title = "sqlar archive using %s" % compression
+
+        if compression == "zstd":
+            title += " (dictionaries trained per site)"
+
+        archive = SQLiteArchive(path, compression=compression)
+
+        with Timer(title):
+            for name, data in PAGES:
+                archive.write(name, data)
+
+            archive.close()
+
+        report(path)
+
+        archive = SQLiteArchive(path)
+
+        with Timer("  reading back"):
+            for record in archive:
+                record.uncompressed_data
+
+        archive.close()
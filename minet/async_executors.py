@@ -0,0 +1,775 @@
+# =============================================================================
+# Minet HTTP Asynchronous Executors
+# =============================================================================
+#
+# Exposing an asyncio-based alternative to minet.executors.HTTPThreadPoolExecutor
+# able to perform thousands of concurrent requests from a single thread, while
+# keeping the same interface, results and scheduling semantics.
+#
+from typing import (
+    Optional,
+    Iterator,
+    Iterable,
+    Callable,
+    Dict,
+    Any,
+    Tuple,
+    Union,
+    Generic,
+    Container,
+    cast,
+)
+
+import asyncio
+import threading
+from ural import get_hostname
+from queue import Queue
+from threading import Event
+from tenacity import RetryCallState
+
+from minet.exceptions import (
+    CancelledRequestError,
+    HTTPCallbackError,
+    HttpxNotInstalledError,
+)
+from minet.executors import (
+    HTTPWorkerPayload,
+    HTTPWorkerPayloadBase,
+    ArgsCallbackType,
+    ItemType,
+    CallbackResultType,
+    PassthroughRequestResult,
+    SuccessfulRequestResult,
+    ErroredRequestResult,
+    PassthroughResolveResult,
+    SuccessfulResolveResult,
+    ErroredResolveResult,
+    AnyRequestResult,
+    AnyResolveResult,
+    RequestCoalescerBase,
+    key_by_domain_name,
+    payloads_iter,
+)
+from minet.resolve_cache import ResolveCache, is_cached_stack
+from minet.web import (
+    create_request_retryer,
+    Response,
+    RedirectionStack,
+    AnyTimeout,
+    EXPECTED_WEB_ERRORS,
+)
+from minet.constants import (
+    DEFAULT_ASYNC_MAX_CONCURRENCY,
+    DEFAULT_DOMAIN_PARALLELISM,
+    DEFAULT_IMAP_BUFFER_SIZE,
+    DEFAULT_THROTTLE,
+    DEFAULT_COALESCING_CACHE_SIZE,
+    DEFAULT_COALESCING_CACHE_MAX_BYTES,
+    DEFAULT_URLLIB3_TIMEOUT,
+    DEFAULT_FETCH_MAX_REDIRECTS,
+    DEFAULT_RESOLVE_MAX_REDIRECTS,
+)
+
+HTTPX_SUPPORT = False
+
+try:
+    from minet.async_web import (
+        create_async_client,
+        create_async_ssl_context,
+        async_request,
+        async_resolve,
+    )
+
+    HTTPX_SUPPORT = True
+except ImportError:
+    pass
+
+# NOTE: sentinel signaling the end of the results queue
+THE_END = object()
+
+
+class AsyncRequestCoalescer(RequestCoalescerBase):
+    """
+    Asynchronous counterpart of minet.executors.RequestCoalescer, whose
+    in-flight requests are tracked using futures of the event loop.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.inflight: Dict[str, asyncio.Future] = {}
+
+    async def __call__(
+        self, payload: HTTPWorkerPayloadBase, fn: Callable[..., Any], *args, **kwargs
+    ) -> Any:
+        key = cast(str, payload.url)
+        outcome = self._get(key)
+
+        # Waiting for the task performing the same request
+        if outcome is None and key in self.inflight:
+            # NOTE: shielding so that a cancelled waiter does not cancel the future
+            outcome = await asyncio.shield(self.inflight[key])
+
+            # NOTE: if the outcome cannot be shared, we perform our own request
+            if outcome is None or not self._is_shareable(outcome):
+                return await fn(*args, **kwargs)
+
+            self.coalesced += 1
+
+        if outcome is not None:
+            payload.cached = True
+            output, error = outcome
+
+            if error is not None:
+                raise error
+
+            return output
+
+        inflight = asyncio.get_running_loop().create_future()
+        self.inflight[key] = inflight
+
+        try:
+            output = await fn(*args, **kwargs)
+            outcome = (output, None)
+        except Exception as error:
+            outcome = (None, error)
+            raise
+        finally:
+            del self.inflight[key]
+
+            if outcome is not None and self._is_shareable(outcome):
+                self._set(key, outcome)
+
+            inflight.set_result(outcome)
+
+        return output
+
+
+class AsyncHTTPWorker(Generic[ItemType, CallbackResultType]):
+    def __init__(
+        self,
+        cancel_event: Event,
+        retryer=None,
+        *,
+        resolving: bool = False,
+        get_args: Optional[ArgsCallbackType[ItemType]] = None,
+        timeout: Optional[AnyTimeout] = None,
+        compressed: bool = False,
+        max_redirects: int = DEFAULT_FETCH_MAX_REDIRECTS,
+        follow_refresh_header: bool = True,
+        follow_meta_refresh: bool = False,
+        follow_js_relocation: bool = False,
+        infer_redirection: bool = False,
+        canonicalize: bool = False,
+        known_encoding: Optional[str] = None,
+        max_body_size: Optional[int] = None,
+        spool_body_over: Optional[int] = None,
+        raise_on_statuses: Optional[Container[int]] = None,
+        resolve_cache: Optional[ResolveCache] = None,
+        coalescer: Optional[AsyncRequestCoalescer] = None,
+        callback: Optional[Callable[[ItemType, str, Any], CallbackResultType]] = None,
+    ):
+        self.cancel_event = cancel_event
+        self.retryer = retryer
+        self.get_args = get_args
+        self.coalescer = coalescer
+        self.callback = callback
+
+        self.resolving = resolving
+        self.fn = async_request if not resolving else async_resolve
+        self.PassthroughResult = (
+            PassthroughRequestResult if not resolving else PassthroughResolveResult
+        )
+        self.SuccessfulResult = (
+            SuccessfulRequestResult if not resolving else SuccessfulResolveResult
+        )
+        self.ErroredResult = (
+            ErroredRequestResult if not resolving else ErroredResolveResult
+        )
+
+        self.default_kwargs = {
+            "max_redirects": max_redirects,
+            "cancel_event": cancel_event,
+            "timeout": timeout,
+            "follow_refresh_header": follow_refresh_header,
+            "follow_meta_refresh": follow_meta_refresh,
+            "follow_js_relocation": follow_js_relocation,
+            "infer_redirection": infer_redirection,
+            "canonicalize": canonicalize,
+            "raise_on_statuses": raise_on_statuses,
+        }
+
+        if compressed:
+            self.default_kwargs["compressed"] = True
+
+        if known_encoding is not None:
+            self.default_kwargs["known_encoding"] = known_encoding
+
+        if max_body_size is not None:
+            self.default_kwargs["max_body_size"] = max_body_size
+
+        if spool_body_over is not None:
+            self.default_kwargs["spool_body_over"] = spool_body_over
+
+        if resolve_cache is not None:
+            self.default_kwargs["cache"] = resolve_cache
+
+    async def __retry(self, fn, *args, **kwargs):
+        if self.retryer is None:
+            return await fn(*args, **kwargs)
+
+        # NOTE: retryers hold per-call statistics we don't want to share
+        # between concurrent tasks
+        return await self.retryer.copy()(fn, *args, **kwargs)
+
+    async def __call_callback(self, item: ItemType, url: str, output):
+        assert self.callback is not None
+
+        # NOTE: callbacks are synchronous and often do IO (e.g. writing
+        # files), so we run them in a thread not to block the event loop
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.callback, item, url, output
+        )
+
+    async def __call__(
+        self, payload: HTTPWorkerPayloadBase[ItemType], client
+    ) -> Optional[
+        Tuple[
+            Union[AnyRequestResult[ItemType], AnyResolveResult[ItemType]],
+            Optional[CallbackResultType],
+        ]
+    ]:
+        item, url = payload.item, payload.url
+
+        # Noop
+        if url is None:
+            return self.PassthroughResult(item), None  # type: ignore
+
+        kwargs = self.default_kwargs.copy()
+        kwargs["client"] = client
+
+        if self.cancel_event.is_set():
+            return
+
+        if self.get_args is not None:
+            # NOTE: given callback must be threadsafe
+            kwargs.update(self.get_args(cast(HTTPWorkerPayload, payload)))
+
+        try:
+            if self.coalescer is not None:
+                output = await self.coalescer(
+                    payload, self.__retry, self.fn, url, **kwargs
+                )
+            else:
+                output = await self.__retry(self.fn, url, **kwargs)
+
+        except CancelledRequestError:
+            return
+
+        except EXPECTED_WEB_ERRORS as error:
+            return self.ErroredResult(item, url, error), None
+
+        if is_cached_stack(output):
+            payload.cached = True
+
+        callback_result = None
+
+        if self.callback is not None:
+            if self.cancel_event.is_set():
+                return
+
+            try:
+                callback_result = await self.__retry(
+                    self.__call_callback, item, url, output
+                )
+            except Exception as reason:
+                return self.ErroredResult(item, url, HTTPCallbackError(reason)), None
+
+        return self.SuccessfulResult(item, url, output), callback_result  # type: ignore
+
+
+class DomainSlot(object):
+    __slots__ = ("semaphore", "free_at", "tasks")
+
+    def __init__(self, parallelism: int):
+        self.semaphore = asyncio.Semaphore(parallelism)
+        self.free_at = 0.0
+
+        # NOTE: number of tasks running or waiting on the domain
+        self.tasks = 0
+
+
+class AsyncClientRegistry(object):
+    """
+    Registry lazily creating one httpx client per domain (or per host when
+    the url has no domain name, e.g. an ip), closing it as soon as no
+    scheduled task needs it anymore.
+
+    NOTE: this is done because a single httpx connection pool degrades
+    quadratically with the number of connections it holds, which is not a
+    concern for urllib3 pool managers since they already pool by host.
+    """
+
+    def __init__(self, **client_kwargs):
+        self.client_kwargs = client_kwargs
+        self.clients: Dict[str, Any] = {}
+        self.pending: Dict[str, int] = {}
+
+    def acquire(self, key: str) -> None:
+        self.pending[key] = self.pending.get(key, 0) + 1
+
+    def get(self, key: str):
+        client = self.clients.get(key)
+
+        if client is None:
+            client = create_async_client(**self.client_kwargs)
+            self.clients[key] = client
+
+        return client
+
+    async def release(self, key: str) -> None:
+        count = self.pending[key] - 1
+
+        if count > 0:
+            self.pending[key] = count
+            return
+
+        del self.pending[key]
+        client = self.clients.pop(key, None)
+
+        if client is not None:
+            await client.aclose()
+
+    async def aclose(self) -> None:
+        clients = list(self.clients.values())
+        self.clients.clear()
+        self.pending.clear()
+
+        await asyncio.gather(
+            *(client.aclose() for client in clients), return_exceptions=True
+        )
+
+
+class AsyncHTTPExecutor(object):
+    """
+    Executor performing HTTP requests concurrently using an asyncio event loop
+    running in a dedicated thread, rather than a pool of threads.
+
+    Its request & resolve methods mirror those of
+    minet.executors.HTTPThreadPoolExecutor and yield the same results,
+    respecting the same domain parallelism, throttle & retry semantics.
+
+    Requires the httpx library to be installed.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_ASYNC_MAX_CONCURRENCY,
+        insecure: bool = False,
+        timeout: AnyTimeout = DEFAULT_URLLIB3_TIMEOUT,
+        spoof_tls_ciphers: bool = False,
+        proxy: Optional[str] = None,
+        retry: bool = False,
+        retryer_kwargs: Optional[Dict[str, Any]] = None,
+    ):
+        if not HTTPX_SUPPORT:
+            raise HttpxNotInstalledError
+
+        if max_concurrency < 1:
+            raise TypeError("max_concurrency should be at least 1")
+
+        self.max_concurrency = max_concurrency
+        self.cancel_event = Event()
+        self.retryer = None
+        self.retry_on_statuses = None
+
+        self.timeout = timeout
+        self.client_kwargs = {"timeout": timeout, "proxy": proxy}
+        self.insecure = insecure
+        self.spoof_tls_ciphers = spoof_tls_ciphers
+        self.ssl_context = None
+
+        if retry:
+
+            def epilog(retry_state: RetryCallState) -> str:
+                return retry_state.args[0]
+
+            default_retryer_kwargs = {
+                "retry_on_timeout": False,
+                "cancel_event": self.cancel_event,
+                "max_attempts": 3,
+                "epilog": epilog,
+            }
+
+            default_retryer_kwargs.update(retryer_kwargs or {})
+
+            self.retry_on_statuses = default_retryer_kwargs.get("retry_on_statuses")
+            self.retryer = create_request_retryer(
+                asynchronous=True, **default_retryer_kwargs
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+
+    def shutdown(self, wait=True) -> None:
+        self.cancel()
+
+    async def __schedule(
+        self,
+        payloads: Iterator[HTTPWorkerPayloadBase[ItemType]],
+        worker: AsyncHTTPWorker,
+        queue: Queue,
+        context: Dict[str, Any],
+        parallelism: int,
+        throttle: float,
+        buffer_size: int,
+    ) -> None:
+        loop = asyncio.get_running_loop()
+
+        # NOTE: this bounds the number of items held in memory, including
+        # the results that were not yet consumed, and the results buffered
+        # to be yielded in order, since slots are only released when their
+        # result is yielded
+        slots = asyncio.Semaphore(self.max_concurrency + buffer_size)
+        concurrency = asyncio.Semaphore(self.max_concurrency)
+        domains: Dict[str, DomainSlot] = {}
+        tasks = set()
+
+        context["release"] = slots.release
+
+        # NOTE: loading certificates is costly, so the ssl context is shared
+        # by every client
+        if self.ssl_context is None:
+            self.ssl_context = create_async_ssl_context(
+                self.insecure, self.spoof_tls_ciphers
+            )
+
+        clients = AsyncClientRegistry(
+            parallelism=self.max_concurrency,
+            ssl_context=self.ssl_context,
+            **self.client_kwargs,
+        )
+
+        def drop_domain(domain: str, slot: DomainSlot) -> None:
+            if slot.tasks == 0 and domains.get(domain) is slot:
+                del domains[domain]
+
+        def release_domain(domain: str, slot: DomainSlot) -> None:
+            slot.tasks -= 1
+
+            if slot.tasks > 0:
+                return
+
+            # NOTE: an idle slot is kept until its throttle has elapsed, so
+            # that the next task hitting the domain still waits for it
+            delay = slot.free_at - loop.time()
+
+            if delay > 0:
+                loop.call_later(delay, drop_domain, domain, slot)
+            else:
+                drop_domain(domain, slot)
+
+        async def work(
+            index: int,
+            payload: HTTPWorkerPayloadBase[ItemType],
+            client_key: Optional[str],
+        ):
+            try:
+                client = clients.get(client_key) if client_key is not None else None
+                domain = key_by_domain_name(payload) if payload.url else None
+
+                if domain is None:
+                    async with concurrency:
+                        output = await worker(payload, client)
+
+                else:
+                    slot = domains.get(domain)
+
+                    if slot is None:
+                        slot = DomainSlot(parallelism)
+                        domains[domain] = slot
+
+                    slot.tasks += 1
+
+                    try:
+                        # NOTE: like quenouille, we wait for the domain to be
+                        # free before taking one of the global concurrency slots
+                        async with slot.semaphore:
+                            delay = slot.free_at - loop.time()
+
+                            if delay > 0:
+                                await asyncio.sleep(delay)
+
+                            try:
+                                async with concurrency:
+                                    output = await worker(payload, client)
+                            finally:
+                                # NOTE: cached payloads did not hit the domain
+                                slot.free_at = loop.time() + (
+                                    0 if payload.cached else throttle
+                                )
+                    finally:
+                        release_domain(domain, slot)
+
+                queue.put((index, output, None))
+
+            except asyncio.CancelledError:
+                raise
+
+            except BaseException as error:
+                queue.put((index, None, error))
+
+            finally:
+                if client_key is not None:
+                    await clients.release(client_key)
+
+        try:
+            for index, payload in enumerate(payloads):
+                await slots.acquire()
+
+                if self.cancel_event.is_set():
+                    break
+
+                client_key = None
+
+                if payload.url:
+                    client_key = key_by_domain_name(payload) or get_hostname(
+                        payload.url
+                    )
+
+                    if client_key is not None:
+                        clients.acquire(client_key)
+
+                task = asyncio.ensure_future(work(index, payload, client_key))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.gather(*tasks)
+
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        except BaseException as error:
+            queue.put((None, None, error))
+
+        finally:
+            await clients.aclose()
+            queue.put(THE_END)
+
+    def __imap(
+        self,
+        payloads: Iterator[HTTPWorkerPayloadBase[ItemType]],
+        worker: AsyncHTTPWorker,
+        *,
+        ordered: bool,
+        parallelism: int,
+        throttle: float,
+        buffer_size: int,
+    ) -> Iterator[Any]:
+        queue: Queue = Queue()
+        context: Dict[str, Any] = {}
+        loop = asyncio.new_event_loop()
+        main_task = loop.create_task(
+            self.__schedule(
+                payloads,
+                worker,
+                queue,
+                context,
+                parallelism=parallelism,
+                throttle=throttle,
+                buffer_size=buffer_size,
+            )
+        )
+
+        def run():
+            try:
+                loop.run_until_complete(main_task)
+            except asyncio.CancelledError:
+                pass
+            finally:
+                loop.close()
+
+        def call_soon_threadsafe(callback) -> None:
+            try:
+                loop.call_soon_threadsafe(callback)
+            except RuntimeError:
+                # NOTE: the loop was already closed, which means it does not
+                # need anything from us anymore
+                pass
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+
+        finished = False
+        next_index = 0
+        pending: Dict[int, Any] = {}
+
+        try:
+            while True:
+                message = queue.get()
+
+                if message is THE_END:
+                    finished = True
+                    break
+
+                index, output, error = message
+
+                if error is not None:
+                    raise error
+
+                if not ordered:
+                    if output is not None:
+                        yield output
+
+                    # NOTE: the slot is released only once the result was
+                    # consumed, so that results cannot pile up in memory
+                    call_soon_threadsafe(context["release"])
+                    continue
+
+                # NOTE: buffering results to be able to yield them in order.
+                # Buffered results keep their slot, which caps the buffer.
+                pending[index] = output
+
+                while next_index in pending:
+                    output = pending.pop(next_index)
+                    next_index += 1
+
+                    if output is not None:
+                        yield output
+
+                    call_soon_threadsafe(context["release"])
+
+        finally:
+            if not finished:
+                self.cancel()
+
+                call_soon_threadsafe(main_task.cancel)
+
+            thread.join()
+
+    def request(
+        self,
+        iterator: Iterable[ItemType],
+        *,
+        ordered: bool = False,
+        key: Optional[Callable[[ItemType], Optional[str]]] = None,
+        throttle: float = DEFAULT_THROTTLE,
+        request_args: Optional[ArgsCallbackType[ItemType]] = None,
+        compressed: bool = False,
+        buffer_size: int = DEFAULT_IMAP_BUFFER_SIZE,
+        domain_parallelism: int = DEFAULT_DOMAIN_PARALLELISM,
+        max_redirects: int = DEFAULT_FETCH_MAX_REDIRECTS,
+        known_encoding: Optional[str] = None,
+        max_body_size: Optional[int] = None,
+        spool_body_over: Optional[int] = None,
+        coalesce: bool = False,
+        coalescing_cache_size: int = DEFAULT_COALESCING_CACHE_SIZE,
+        coalescing_cache_max_bytes: Optional[int] = DEFAULT_COALESCING_CACHE_MAX_BYTES,
+        callback: Optional[
+            Callable[[ItemType, str, Response], Optional[CallbackResultType]]
+        ] = None,
+        passthrough: bool = False,
+    ) -> Iterator[Any]:
+        worker = AsyncHTTPWorker(
+            self.cancel_event,
+            self.retryer,
+            get_args=request_args,
+            timeout=self.timeout,
+            max_redirects=max_redirects,
+            compressed=compressed,
+            known_encoding=known_encoding,
+            max_body_size=max_body_size,
+            spool_body_over=spool_body_over,
+            raise_on_statuses=self.retry_on_statuses,
+            coalescer=(
+                AsyncRequestCoalescer(
+                    coalescing_cache_size,
+                    should_cache=lambda response: not response.is_spooled,
+                    max_cache_bytes=coalescing_cache_max_bytes,
+                    get_size=len,
+                )
+                if coalesce
+                else None
+            ),
+            callback=callback,
+        )
+
+        for item in self.__imap(
+            payloads_iter(iterator, key=key, passthrough=passthrough),
+            worker,
+            ordered=ordered,
+            parallelism=domain_parallelism,
+            throttle=throttle,
+            buffer_size=buffer_size,
+        ):
+            if callback is not None:
+                yield item
+            else:
+                yield item[0]
+
+    def resolve(
+        self,
+        iterator: Iterable[ItemType],
+        *,
+        ordered: bool = False,
+        key: Optional[Callable[[ItemType], Optional[str]]] = None,
+        throttle: float = DEFAULT_THROTTLE,
+        resolve_args: Optional[ArgsCallbackType[ItemType]] = None,
+        buffer_size: int = DEFAULT_IMAP_BUFFER_SIZE,
+        domain_parallelism: int = DEFAULT_DOMAIN_PARALLELISM,
+        max_redirects: int = DEFAULT_RESOLVE_MAX_REDIRECTS,
+        follow_refresh_header: bool = True,
+        follow_meta_refresh: bool = False,
+        follow_js_relocation: bool = False,
+        infer_redirection: bool = False,
+        canonicalize: bool = False,
+        cache: Optional[ResolveCache] = None,
+        coalesce: bool = False,
+        coalescing_cache_size: int = DEFAULT_COALESCING_CACHE_SIZE,
+        callback: Optional[
+            Callable[[ItemType, str, RedirectionStack], Optional[CallbackResultType]]
+        ] = None,
+        passthrough: bool = False,
+    ) -> Iterator[Any]:
+        worker = AsyncHTTPWorker(
+            self.cancel_event,
+            self.retryer,
+            resolving=True,
+            get_args=resolve_args,
+            timeout=self.timeout,
+            max_redirects=max_redirects,
+            follow_refresh_header=follow_refresh_header,
+            follow_meta_refresh=follow_meta_refresh,
+            follow_js_relocation=follow_js_relocation,
+            infer_redirection=infer_redirection,
+            canonicalize=canonicalize,
+            raise_on_statuses=self.retry_on_statuses,
+            resolve_cache=cache,
+            coalescer=(
+                AsyncRequestCoalescer(coalescing_cache_size) if coalesce else None
+            ),
+            callback=callback,
+        )
+
+        for item in self.__imap(
+            payloads_iter(iterator, key=key, passthrough=passthrough),
+            worker,
+            ordered=ordered,
+            parallelism=domain_parallelism,
+            throttle=throttle,
+            buffer_size=buffer_size,
+        ):
+            if callback is not None:
+                yield item
+            else:
+                yield item[0]
@@ -0,0 +1,675 @@
+# =============================================================================
+# Minet Async Web Utilities
+# =============================================================================
+#
+# Asynchronous counterparts of minet.web request & resolve functions, relying
+# on httpx and asyncio so that a lot of requests can be performed concurrently
+# without needing one thread per request.
+#
+from typing import (
+    Optional,
+    Tuple,
+    Union,
+    OrderedDict,
+    Mapping,
+    Any,
+    Dict,
+    Container,
+    BinaryIO,
+)
+from minet.types import AnyTimeout, Redirection, RedirectionStack
+from minet.resolve_cache import ResolveCache, get_resolve_flags
+
+import ssl
+import httpx
+import ural
+import asyncio
+import certifi
+import urllib3
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+from threading import Event
+from urllib3._collections import HTTPHeaderDict
+
+from minet.web import (
+    Response,
+    build_request_headers,
+    prepare_request_body,
+    coerce_timeout_to_seconds,
+    find_next_location,
+    find_canonical_url,
+    resolve_next_url,
+    METHODS_WITHOUT_BODY,
+    STREAMING_CHUNK_SIZE,
+    LARGE_CONTENT_PREBUFFER_UP_TO,
+)
+from minet.exceptions import (
+    InvalidURLError,
+    InvalidStatusError,
+    InfiniteRedirectsError,
+    MaxRedirectsError,
+    SelfRedirectError,
+    CancelledRequestError,
+    FinalTimeoutError,
+    ResponseTooLargeError,
+    HttpxError,
+    HttpxTimeoutError,
+    HttpxSSLError,
+    HttpxProtocolError,
+    HttpxHostResolutionError,
+    HttpxConnectionRefusedError,
+    HttpxReceiveError,
+    HttpxSendError,
+)
+from minet.constants import (
+    DEFAULT_SPOOFED_TLS_CIPHERS,
+    DEFAULT_URLLIB3_TIMEOUT,
+    REDIRECT_STATUSES,
+)
+
+
+def coerce_timeout_to_httpx(timeout: AnyTimeout) -> httpx.Timeout:
+    if isinstance(timeout, urllib3.Timeout):
+        connect = timeout.connect_timeout
+        read = timeout.read_timeout
+
+        return httpx.Timeout(
+            read if isinstance(read, (int, float)) else None,
+            connect=connect if isinstance(connect, (int, float)) else None,
+        )
+
+    return httpx.Timeout(timeout)
+
+
+def get_root_cause(error: BaseException) -> BaseException:
+    # NOTE: httpx wraps httpcore errors, themselves wrapping anyio ones
+    while True:
+        cause = error.__cause__ or error.__context__
+
+        if cause is None:
+            return error
+
+        error = cause
+
+
+def coerce_error(error: httpx.HTTPError) -> HttpxError:
+    msg = str(error).lower()
+
+    if isinstance(error, httpx.TimeoutException):
+        return HttpxTimeoutError(error)
+
+    if isinstance(error, httpx.ConnectError):
+        if "ssl" in msg or "certificate" in msg:
+            return HttpxSSLError(error)
+
+        if (
+            "name or service not known" in msg
+            or "nodename nor servname" in msg
+            or "temporary failure in name resolution" in msg
+            or "getaddrinfo" in msg
+        ):
+            return HttpxHostResolutionError(error)
+
+        if "connection refused" in msg or isinstance(
+            get_root_cause(error), ConnectionRefusedError
+        ):
+            return HttpxConnectionRefusedError(error)
+
+        return HttpxProtocolError(error)
+
+    if isinstance(error, (httpx.ReadError, httpx.RemoteProtocolError)):
+        return HttpxReceiveError(error)
+
+    if isinstance(error, httpx.WriteError):
+        return HttpxSendError(error)
+
+    if isinstance(error, (httpx.NetworkError, httpx.ProtocolError)):
+        return HttpxProtocolError(error)
+
+    return HttpxError(error)
+
+
+def create_async_ssl_context(
+    insecure: bool = False, spoof_tls_ciphers: bool = False
+) -> Union[bool, ssl.SSLContext]:
+    if insecure:
+        return False
+
+    context = ssl.create_default_context(cafile=certifi.where())
+
+    if spoof_tls_ciphers:
+        context.set_ciphers(DEFAULT_SPOOFED_TLS_CIPHERS)
+
+    return context
+
+
+def create_async_client(
+    proxy: Optional[str] = None,
+    parallelism: int = 1,
+    insecure: bool = False,
+    spoof_tls_ciphers: bool = False,
+    timeout: AnyTimeout = DEFAULT_URLLIB3_TIMEOUT,
+    ssl_context: Optional[Union[bool, ssl.SSLContext]] = None,
+) -> httpx.AsyncClient:
+    """
+    Helper function returning a httpx async client with sane defaults,
+    mimicking the pool managers created by minet.web.create_pool_manager.
+
+    NOTE: loading the certificates is costly, so a ssl context created by
+    create_async_ssl_context can be shared by multiple clients.
+    """
+
+    verify = ssl_context
+
+    if verify is None:
+        verify = create_async_ssl_context(insecure, spoof_tls_ciphers)
+
+    if proxy is not None:
+        proxy = ural.ensure_protocol(proxy)
+
+    client = httpx.AsyncClient(
+        verify=verify,
+        proxy=proxy,
+        timeout=coerce_timeout_to_httpx(timeout),
+        limits=httpx.Limits(
+            max_connections=parallelism, max_keepalive_connections=parallelism
+        ),
+        follow_redirects=False,
+        trust_env=False,
+    )
+
+    # NOTE: like urllib3, we only ask for compressed responses when told to
+    del client.headers["Accept-Encoding"]
+
+    return client
+
+
+class AsyncBufferedResponse(object):
+    """
+    Asynchronous counterpart of minet.web.BufferedResponse, wrapping a
+    streamed httpx.Response whose body has not been yet fully read.
+
+    NOTE: this is the user's responsibility to close or unwrap the response
+    after use.
+    """
+
+    __slots__ = (
+        "__inner",
+        "__chunks",
+        "__body",
+        "__cancel_event",
+        "__max_size",
+        "__spooled",
+        "__finished",
+        "__closed",
+    )
+
+    def __init__(
+        self,
+        response: httpx.Response,
+        cancel_event: Optional[Event] = None,
+        max_size: Optional[int] = None,
+        spool_over: Optional[int] = None,
+    ):
+        self.__inner = response
+        self.__chunks = None
+        self.__cancel_event = cancel_event
+        self.__max_size = max_size
+        self.__spooled = spool_over is not None
+        self.__body = (
+            BytesIO()
+            if spool_over is None
+            else SpooledTemporaryFile(max_size=spool_over, mode="w+b")
+        )
+        self.__finished = False
+        self.__closed = False
+
+    def __len__(self) -> int:
+        return self.__body.tell()
+
+    @property
+    def status(self) -> int:
+        return self.__inner.status_code
+
+    @property
+    def headers(self) -> HTTPHeaderDict:
+        return HTTPHeaderDict(self.__inner.headers.multi_items())
+
+    def getheader(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.__inner.headers.get(name, default)
+
+    @property
+    def content_length(self) -> Optional[int]:
+        content_length = self.__inner.headers.get("content-length")
+
+        if content_length is None:
+            return None
+
+        try:
+            return int(content_length)
+        except ValueError:
+            return None
+
+    @property
+    def body(self) -> bytes:
+        if not self.__spooled:
+            return self.__body.getvalue()  # type: ignore
+
+        position = self.__body.tell()
+        self.__body.seek(0)
+
+        try:
+            return self.__body.read()
+        finally:
+            self.__body.seek(position)
+
+    async def __stream(self, up_to: Optional[int] = None) -> None:
+        if self.__closed:
+            raise TypeError("buffered response was already closed")
+
+        if self.__finished:
+            return
+
+        if up_to is not None and self.__body.tell() >= up_to:
+            return
+
+        if self.__chunks is None:
+            self.__chunks = self.__inner.aiter_bytes(STREAMING_CHUNK_SIZE)
+
+        async for data in self.__chunks:
+            self.__body.write(data)
+
+            if self.__max_size is not None and self.__body.tell() > self.__max_size:
+                raise ResponseTooLargeError(self.__max_size)
+
+            if self.__cancel_event is not None and self.__cancel_event.is_set():
+                raise CancelledRequestError
+
+            if up_to is not None and self.__body.tell() >= up_to:
+                return
+
+        self.__finished = True
+
+    async def prebuffer_up_to(self, amount: int) -> None:
+        await self.__stream(up_to=amount)
+
+    async def read(self) -> None:
+        await self.__stream()
+
+    async def aclose(self) -> None:
+        if self.__closed:
+            return
+
+        self.__closed = True
+
+        # NOTE: httpx will discard the connection if the body was not
+        # fully read, which is what we want
+        await self.__inner.aclose()
+
+    async def read_and_unwrap(
+        self,
+    ) -> Tuple[httpx.Response, Union[bytes, BinaryIO]]:
+        await self.read()
+        await self.aclose()
+
+        if self.__spooled:
+            return self.__inner, self.__body  # type: ignore
+
+        return self.__inner, self.__body.getvalue()  # type: ignore
+
+
+async def async_atomic_request(
+    client: httpx.AsyncClient,
+    url: str,
+    method: str = "GET",
+    headers=None,
+    body=None,
+    cancel_event: Optional[Event] = None,
+    max_body_size: Optional[int] = None,
+    spool_body_over: Optional[int] = None,
+) -> AsyncBufferedResponse:
+    # Validating URL
+    if not ural.is_url(
+        url, require_protocol=True, tld_aware=True, allow_spaces_in_path=True
+    ):
+        raise InvalidURLError(url)
+
+    # We check for cancellation
+    if cancel_event is not None and cancel_event.is_set():
+        raise CancelledRequestError
+
+    try:
+        request = client.build_request(method, url, headers=headers, content=body)
+    except httpx.InvalidURL:
+        raise InvalidURLError(url)
+
+    response = await client.send(request, stream=True)
+
+    buffered_response = AsyncBufferedResponse(
+        response,
+        cancel_event=cancel_event,
+        max_size=max_body_size,
+        spool_over=spool_body_over,
+    )
+
+    if max_body_size is not None and method not in METHODS_WITHOUT_BODY:
+        content_length = buffered_response.content_length
+
+        if content_length is not None and content_length > max_body_size:
+            await buffered_response.aclose()
+            raise ResponseTooLargeError(max_body_size)
+
+    return buffered_response
+
+
+async def async_atomic_resolve(
+    client: httpx.AsyncClient,
+    url: str,
+    method: str = "GET",
+    headers=None,
+    body=None,
+    max_redirects: int = 5,
+    follow_refresh_header: bool = True,
+    follow_meta_refresh: bool = False,
+    follow_js_relocation: bool = False,
+    infer_redirection: bool = False,
+    canonicalize: bool = False,
+    cancel_event: Optional[Event] = None,
+    max_body_size: Optional[int] = None,
+    spool_body_over: Optional[int] = None,
+) -> Tuple[RedirectionStack, AsyncBufferedResponse]:
+    """
+    Asynchronous counterpart of minet.web.atomic_resolve. Note that it does
+    not support stateful redirections.
+    """
+
+    url_stack: OrderedDict[str, Redirection] = OrderedDict()
+    buffered_response: Optional[AsyncBufferedResponse] = None
+
+    try:
+        for _ in range(max_redirects):
+            # NOTE: this should always happen at the beginning of the loop
+            if buffered_response is not None:
+                await buffered_response.aclose()
+                buffered_response = None
+
+            # Detecting cycles
+            if url in url_stack:
+                raise InfiniteRedirectsError("Infinite redirects")
+
+            if infer_redirection:
+                target = ural.infer_redirection(url, recursive=False)
+
+                if target != url:
+                    url_stack[url] = Redirection(url, "infer")
+                    url = target
+                    continue
+
+            redirection = Redirection(url)
+
+            buffered_response = await async_atomic_request(
+                client,
+                url,
+                method=method,
+                headers=headers,
+                body=body,
+                cancel_event=cancel_event,
+                max_body_size=max_body_size,
+                spool_body_over=spool_body_over,
+            )
+
+            redirection.status = buffered_response.status
+            url_stack[url] = redirection
+
+            # NOTE: since body inspection cannot be awaited by minet.web
+            # helpers, we prebuffer everything they could need beforehand
+            if (
+                (follow_meta_refresh or follow_js_relocation or canonicalize)
+                and buffered_response.status < 400
+                and buffered_response.status not in REDIRECT_STATUSES
+            ):
+                await buffered_response.prebuffer_up_to(LARGE_CONTENT_PREBUFFER_UP_TO)
+
+            prebuffered_body = buffered_response.body
+
+            def prebuffer(amount: int) -> bytes:
+                return prebuffered_body
+
+            location = find_next_location(
+                redirection,
+                buffered_response.status,
+                buffered_response.getheader,
+                prebuffer,
+                follow_refresh_header=follow_refresh_header,
+                follow_meta_refresh=follow_meta_refresh,
+                follow_js_relocation=follow_js_relocation,
+            )
+
+            if redirection.type == "hit":
+                # Canonical url
+                if canonicalize:
+                    canonical = find_canonical_url(url, prebuffer)
+
+                    if canonical is not None:
+                        redirection = Redirection(canonical, "canonical")
+                        url_stack[canonical] = redirection
+
+                # Breaking free of the retry loop because we have a hit
+                break
+
+            # Resolving next url
+            next_url = resolve_next_url(url, location)
+
+            # Self loop?
+            if next_url == url:
+                raise SelfRedirectError("Self redirection")
+
+            # Go to next
+            url = next_url
+
+        # We reached max redirects
+        else:
+            raise MaxRedirectsError("Maximum number of redirects exceeded")
+
+    # NOTE: using BaseException here to avoid leaks on e.g. task cancellation
+    except BaseException:
+        if buffered_response is not None:
+            await buffered_response.aclose()
+
+        raise
+
+    assert buffered_response is not None
+
+    return list(url_stack.values()), buffered_response
+
+
+async def with_final_timeout(coroutine, timeout: Optional[AnyTimeout]):
+    try:
+        if timeout is None:
+            return await coroutine
+
+        task = asyncio.ensure_future(coroutine)
+
+        # NOTE: the task may fail while being cancelled by wait_for, in which
+        # case nobody would retrieve its exception otherwise
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+        # NOTE: same epsilon as minet.web.timeout_to_final_time
+        return await asyncio.wait_for(task, coerce_timeout_to_seconds(timeout) + 0.01)
+    except asyncio.TimeoutError:
+        raise FinalTimeoutError
+    except httpx.HTTPError as error:
+        raise coerce_error(error)
+
+
+async def async_request(
+    url: str,
+    client: httpx.AsyncClient,
+    method: str = "GET",
+    headers: Optional[Dict[str, str]] = None,
+    cookie: Optional[Union[str, Dict[str, str]]] = None,
+    spoof_ua: bool = False,
+    follow_redirects: bool = True,
+    max_redirects: int = 5,
+    follow_refresh_header: bool = True,
+    follow_meta_refresh: bool = False,
+    follow_js_relocation: bool = False,
+    infer_redirection: bool = False,
+    canonicalize: bool = False,
+    known_encoding: Optional[str] = "utf-8",
+    timeout: Optional[AnyTimeout] = None,
+    body: Optional[Union[str, bytes]] = None,
+    json_body: Optional[Any] = None,
+    urlencoded_body: Optional[Mapping[str, Union[str, int, float]]] = None,
+    cancel_event: Optional[Event] = None,
+    raise_on_statuses: Optional[Container[int]] = None,
+    compressed: bool = False,
+    max_body_size: Optional[int] = None,
+    spool_body_over: Optional[int] = None,
+) -> Response:
+    final_headers = build_request_headers(
+        headers=headers,
+        cookie=cookie,
+        spoof_ua=spoof_ua,
+        json_body=json_body is not None,
+        compressed=compressed,
+    )
+
+    body = prepare_request_body(body, json_body, urlencoded_body)
+
+    async def perform() -> Response:
+        stack: Optional[RedirectionStack] = None
+
+        if not follow_redirects:
+            buffered_response = await async_atomic_request(
+                client,
+                url,
+                method,
+                headers=final_headers,
+                body=body,
+                cancel_event=cancel_event,
+                max_body_size=max_body_size,
+                spool_body_over=spool_body_over,
+            )
+        else:
+            stack, buffered_response = await async_atomic_resolve(
+                client,
+                url,
+                method,
+                headers=final_headers,
+                body=body,
+                max_redirects=max_redirects,
+                follow_refresh_header=follow_refresh_header,
+                follow_meta_refresh=follow_meta_refresh,
+                follow_js_relocation=follow_js_relocation,
+                infer_redirection=infer_redirection,
+                canonicalize=canonicalize,
+                cancel_event=cancel_event,
+                max_body_size=max_body_size,
+                spool_body_over=spool_body_over,
+            )
+
+        try:
+            if (
+                raise_on_statuses is not None
+                and buffered_response.status in raise_on_statuses
+            ):
+                raise InvalidStatusError(buffered_response.status)
+
+            response_headers = buffered_response.headers
+            response, response_body = await buffered_response.read_and_unwrap()
+        finally:
+            await buffered_response.aclose()
+
+        return Response(
+            url,
+            stack=stack,
+            headers=response_headers,
+            status=response.status_code,
+            body=response_body,
+            known_encoding=known_encoding,
+        )
+
+    return await with_final_timeout(perform(), timeout)
+
+
+async def async_resolve(
+    url: str,
+    client: httpx.AsyncClient,
+    method: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+    cookie: Optional[Union[str, Dict[str, str]]] = None,
+    spoof_ua: bool = False,
+    max_redirects: int = 5,
+    follow_refresh_header: bool = True,
+    follow_meta_refresh: bool = False,
+    follow_js_relocation: bool = False,
+    infer_redirection: bool = False,
+    timeout: Optional[AnyTimeout] = None,
+    canonicalize: bool = False,
+    cancel_event: Optional[Event] = None,
+    raise_on_statuses: Optional[Container[int]] = None,
+    cache: Optional[ResolveCache] = None,
+) -> RedirectionStack:
+    if method is None:
+        method = "HEAD"
+
+        if follow_meta_refresh or follow_js_relocation or canonicalize:
+            method = "GET"
+
+    final_headers = build_request_headers(
+        headers=headers, cookie=cookie, spoof_ua=spoof_ua
+    )
+
+    # NOTE: the cache is consulted before hitting the network
+    cache_flags = 0
+    stack = None
+
+    if cache is not None:
+        cache_flags = get_resolve_flags(
+            follow_refresh_header=follow_refresh_header,
+            follow_meta_refresh=follow_meta_refresh,
+            follow_js_relocation=follow_js_relocation,
+            infer_redirection=infer_redirection,
+            canonicalize=canonicalize,
+        )
+
+        # NOTE: the cache relies on sqlite, which would block the event loop
+        stack = await asyncio.get_running_loop().run_in_executor(
+            None, cache.get, url, cache_flags
+        )
+
+    async def perform() -> RedirectionStack:
+        resolved_stack, buffered_response = await async_atomic_resolve(
+            client,
+            url,
+            method,  # type: ignore
+            headers=final_headers,
+            max_redirects=max_redirects,
+            follow_refresh_header=follow_refresh_header,
+            follow_meta_refresh=follow_meta_refresh,
+            follow_js_relocation=follow_js_relocation,
+            infer_redirection=infer_redirection,
+            canonicalize=canonicalize,
+            cancel_event=cancel_event,
+        )
+
+        await buffered_response.aclose()
+
+        return resolved_stack
+
+    if stack is None:
+        stack = await with_final_timeout(perform(), timeout)
+
+        if cache is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, cache.set, url, stack, cache_flags
+            )
+
+    if raise_on_statuses is not None and stack:
+        last = stack[-1]
+
+        if last.status is not None and last.status in raise_on_statuses:
+            raise InvalidStatusError(last.status)
+
+    return stack
@@ -1,3 +1,42 @@
 BLUESKY_HTTP_API_BASE_URL = "https://bsky.social/xrpc"
 BLUESKY_HTTP_API_ALTERNATE_URL = "https://earthstar.us-east.host.bsky.network/xrpc"
 BLUESKY_FIREHOSE_BASE_URL = "wss://bsky.network/xrpc/"
+
+# NOTE: maximum number of uris or actors accepted by getPosts & getProfiles
+BLUESKY_HTTP_API_MAX_CHUNK_SIZE = 25
+DEFAULT_BLUESKY_HTTP_API_THREADS = 4
+BLUESKY_FIREHOSE_MAX_FRAME_SIZE = 8 * 1024**2
+
+# NOTE: the closing handshake cannot complete while received messages are
+# waiting to be read, which is always the case on the firehose
+BLUESKY_FIREHOSE_CLOSE_TIMEOUT = 1.0
+
+BLUESKY_FIREHOSE_COLLECTIONS = {
+    "posts": "app.bsky.feed.post",
+    "likes": "app.bsky.feed.like",
+    "reposts": "app.bsky.feed.repost",
+    "follows": "app.bsky.graph.follow",
+}
+
+BLUESKY_FIREHOSE_RECORD_FIELDS = [
+    "seq",
+    "time",
+    "action",
+    "collection",
+    "repo",
+    "rkey",
+    "uri",
+    "cid",
+    "created_at",
+    "text",
+    "langs",
+    "subject",
+    "reply_parent",
+    "reply_root",
+]
+
+DEFAULT_FIREHOSE_QUEUE_SIZE = 4096
+DEFAULT_FIREHOSE_BATCH_SIZE = 64
+DEFAULT_FIREHOSE_MAX_FILE_SIZE = 256 * 1024**2
+DEFAULT_FIREHOSE_RECONNECT_DELAY = 1.0
+DEFAULT_FIREHOSE_MAX_RECONNECT_DELAY = 60.0
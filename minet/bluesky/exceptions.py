@@ -1,3 +1,5 @@
+from typing import Optional
+
 from minet.exceptions import MinetError
 
 
@@ -27,3 +29,14 @@ class BlueskyHandleNotFound(BlueskyError):
 
 class BlueskyExpiredToken(BlueskyError):
     pass
+
+
+class BlueskyFirehoseError(BlueskyError):
+    def __init__(self, error: str, reason: Optional[str] = None):
+        super().__init__("%s: %s" % (error, reason) if reason else error)
+        self.error = error
+        self.reason = reason
+
+
+class BlueskyRateLimitExceededError(BlueskyError):
+    pass
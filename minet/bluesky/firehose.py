@@ -0,0 +1,509 @@
+# =============================================================================
+# Minet Bluesky Firehose
+# =============================================================================
+#
+# A consumer of the Bluesky firehose, i.e. the `com.atproto.sync.subscribeRepos`
+# event stream, decoding the records created, updated or deleted by the
+# commits of the network's repositories.
+#
+# Frames are read from the socket by a dedicated thread into a bounded queue,
+# then decoded by batches, possibly using a pool of processes. Since decoded
+# events are yielded in order, the sequence number of the last one can be
+# persisted as a cursor to resume consumption later on without gaps.
+#
+# References:
+#  - https://atproto.com/specs/event-stream
+#  - https://atproto.com/specs/sync
+#
+from typing import Optional, Iterable, Iterator, List, Dict, Any
+
+import os
+import json
+import calendar
+import casanova
+from time import strptime
+from base64 import b64encode
+from datetime import datetime
+from dataclasses import dataclass, field
+from os.path import join, exists
+from queue import Queue, Empty, Full
+from threading import Thread, Event
+from websockets.exceptions import WebSocketException
+
+import libipld
+
+from minet.multiprocessing import LazyPool
+from minet.bluesky.websocket_client import BlueskyWebSocketClient
+from minet.bluesky.exceptions import BlueskyFirehoseError
+from minet.bluesky.constants import (
+    BLUESKY_FIREHOSE_COLLECTIONS,
+    BLUESKY_FIREHOSE_RECORD_FIELDS,
+    DEFAULT_FIREHOSE_QUEUE_SIZE,
+    DEFAULT_FIREHOSE_BATCH_SIZE,
+    DEFAULT_FIREHOSE_MAX_FILE_SIZE,
+    DEFAULT_FIREHOSE_RECONNECT_DELAY,
+    DEFAULT_FIREHOSE_MAX_RECONNECT_DELAY,
+)
+
+POST_COLLECTION = BLUESKY_FIREHOSE_COLLECTIONS["posts"]
+
+# NOTE: errors that will happen again if we reconnect
+FATAL_FIREHOSE_ERRORS = {"FutureCursor"}
+
+
+@dataclass
+class FirehoseEvent:
+    type: str
+    seq: Optional[int] = None
+    time: Optional[str] = None
+    timestamp: Optional[float] = None
+    records: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+    message: Optional[str] = None
+
+
+def parse_event_time(time: Optional[str]) -> Optional[float]:
+    if not time:
+        return None
+
+    # NOTE: sub-second precision is irrelevant to measure the lag
+    try:
+        return calendar.timegm(strptime(time[:19], "%Y-%m-%dT%H:%M:%S"))
+    except ValueError:
+        return None
+
+
+def jsonify_ipld(value: Any) -> Any:
+    """
+    Function turning a decoded DAG-CBOR value into something that can be
+    serialized as JSON, following the atproto JSON conventions, i.e. links
+    become {"$link": cid} and bytes become {"$bytes": base64}.
+    """
+    if isinstance(value, dict):
+        return {k: jsonify_ipld(v) for k, v in value.items()}
+
+    if isinstance(value, list):
+        return [jsonify_ipld(v) for v in value]
+
+    if isinstance(value, bytes):
+        try:
+            return {"$link": libipld.encode_cid(value)}
+        except ValueError:
+            return {"$bytes": b64encode(value).decode()}
+
+    return value
+
+
+def normalize_firehose_record(
+    seq: Optional[int],
+    time: Optional[str],
+    repo: str,
+    action: str,
+    path: str,
+    cid: Optional[bytes],
+    record: Any,
+) -> Dict[str, Any]:
+    collection, _, rkey = path.partition("/")
+
+    item = {
+        "seq": seq,
+        "time": time,
+        "action": action,
+        "collection": collection,
+        "repo": repo,
+        "rkey": rkey,
+        "uri": "at://%s/%s" % (repo, path),
+        "cid": libipld.encode_cid(cid) if cid else None,
+        "created_at": None,
+        "text": None,
+        "langs": None,
+        "subject": None,
+        "reply_parent": None,
+        "reply_root": None,
+        "record": None,
+    }
+
+    # NOTE: deletions have no record, and commits that are too big may not
+    # ship their blocks
+    if not isinstance(record, dict):
+        return item
+
+    item["created_at"] = record.get("createdAt")
+    item["record"] = jsonify_ipld(record)
+
+    # NOTE: likes & reposts target a post ref, follows a did
+    subject = record.get("subject")
+
+    if isinstance(subject, dict):
+        item["subject"] = subject.get("uri")
+    elif isinstance(subject, str):
+        item["subject"] = subject
+
+    if collection == POST_COLLECTION:
+        item["text"] = record.get("text")
+        item["langs"] = record.get("langs")
+
+        reply = record.get("reply")
+
+        if isinstance(reply, dict):
+            item["reply_parent"] = (reply.get("parent") or {}).get("uri")
+            item["reply_root"] = (reply.get("root") or {}).get("uri")
+
+    return item
+
+
+def format_firehose_record_as_csv_row(item: Dict[str, Any]) -> List[Any]:
+    row = [item[f] for f in BLUESKY_FIREHOSE_RECORD_FIELDS]
+
+    langs_index = BLUESKY_FIREHOSE_RECORD_FIELDS.index("langs")
+
+    if row[langs_index] is not None:
+        row[langs_index] = "|".join(row[langs_index])
+
+    return row
+
+
+def decode_frame(
+    payload: bytes, collections: Optional[Iterable[str]] = None
+) -> FirehoseEvent:
+    """
+    Function decoding a frame of the firehose. Only the records belonging to
+    the given collections will be decoded, all of them being decoded if no
+    collections are given.
+    """
+    header, body = libipld.decode_dag_cbor_multi(payload)  # type: ignore
+
+    if header.get("op") == -1:
+        return FirehoseEvent(
+            type="#error", error=body.get("error"), message=body.get("message")
+        )
+
+    event = FirehoseEvent(
+        type=header.get("t", ""),
+        seq=body.get("seq"),
+        time=body.get("time"),
+    )
+
+    event.timestamp = parse_event_time(event.time)
+
+    if event.type == "#info":
+        event.error = body.get("name")
+        event.message = body.get("message")
+        return event
+
+    if event.type != "#commit":
+        return event
+
+    ops = body.get("ops") or []
+
+    if collections is not None:
+        ops = [op for op in ops if op["path"].split("/", 1)[0] in collections]
+
+    # NOTE: we don't decode the CAR file at all if no op is relevant, which is
+    # what makes filtering by collection cheap
+    if not ops:
+        return event
+
+    blocks = {}
+
+    if body.get("blocks"):
+        _, blocks = libipld.decode_car(body["blocks"])
+
+    for op in ops:
+        cid = op.get("cid")
+
+        event.records.append(
+            normalize_firehose_record(
+                event.seq,
+                event.time,
+                body["repo"],
+                op["action"],
+                op["path"],
+                cid,
+                blocks.get(cid) if cid else None,
+            )
+        )
+
+    return event
+
+
+# NOTE: this is a class and not a closure so it can be pickled
+class FirehoseBatchDecoder(object):
+    __slots__ = ("collections",)
+
+    def __init__(self, collections: Optional[Iterable[str]] = None):
+        self.collections = frozenset(collections) if collections is not None else None
+
+    def __call__(self, batch: List[bytes]) -> List[FirehoseEvent]:
+        events = []
+
+        for payload in batch:
+            # NOTE: a single malformed frame should not bring the whole
+            # consumer down
+            try:
+                event = decode_frame(payload, self.collections)
+            except (ValueError, TypeError, KeyError) as e:
+                event = FirehoseEvent(
+                    type="#invalid", error=e.__class__.__name__, message=str(e)
+                )
+
+            events.append(event)
+
+        return events
+
+
+def read_cursor(path: str) -> Optional[int]:
+    if not exists(path):
+        return None
+
+    with open(path) as f:
+        data = f.read().strip()
+
+    return int(data) if data else None
+
+
+def write_cursor(path: str, seq: int) -> None:
+    # NOTE: writing then renaming so that a crash cannot leave a truncated
+    # cursor file behind
+    tmp_path = path + ".tmp"
+
+    with open(tmp_path, "w") as f:
+        f.write("%i\n" % seq)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+
+
+class FirehoseRecordWriter(object):
+    """
+    Writer appending normalized firehose records to ndjson or CSV files
+    rotated by size.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        format: str = "ndjson",
+        max_size: int = DEFAULT_FIREHOSE_MAX_FILE_SIZE,
+        prefix: str = "firehose",
+    ):
+        if format not in ("ndjson", "csv"):
+            raise TypeError('format should be either "ndjson" or "csv"')
+
+        self.directory = directory
+        self.format = format
+        self.max_size = max_size
+        self.prefix = prefix
+
+        self.serial = 0
+        self.timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+        self.filename: Optional[str] = None
+        self.file = None
+        self.csv_writer = None
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __rotate(self) -> None:
+        self.close()
+
+        while True:
+            self.filename = "%s-%s-%05i.%s" % (
+                self.prefix,
+                self.timestamp,
+                self.serial,
+                self.format,
+            )
+            self.serial += 1
+
+            if not exists(join(self.directory, self.filename)):
+                break
+
+        self.file = open(
+            join(self.directory, self.filename), "w", encoding="utf-8", newline=""
+        )
+
+        if self.format == "csv":
+            self.csv_writer = casanova.writer(
+                self.file, fieldnames=BLUESKY_FIREHOSE_RECORD_FIELDS
+            )
+
+    def writerow(self, item: Dict[str, Any]) -> None:
+        if self.file is None or self.file.tell() >= self.max_size:
+            self.__rotate()
+
+        assert self.file is not None
+
+        if self.csv_writer is not None:
+            self.csv_writer.writerow(format_firehose_record_as_csv_row(item))
+        else:
+            self.file.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    def flush(self) -> None:
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.csv_writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# NOTE: sentinel telling the decoders the reader is done
+END_OF_STREAM = object()
+
+
+class BlueskyFirehoseConsumer(object):
+    """
+    Consumer of the Bluesky firehose, yielding decoded events in order when
+    iterated over, while reconnecting when the connection is lost.
+
+    Its `cursor` attribute is the sequence number of the last yielded event,
+    which is used when reconnecting, events already yielded being skipped.
+    """
+
+    def __init__(
+        self,
+        collections: Optional[Iterable[str]] = None,
+        cursor: Optional[int] = None,
+        processes: int = 1,
+        queue_size: int = DEFAULT_FIREHOSE_QUEUE_SIZE,
+        batch_size: int = DEFAULT_FIREHOSE_BATCH_SIZE,
+        reconnect_delay: float = DEFAULT_FIREHOSE_RECONNECT_DELAY,
+        max_reconnect_delay: float = DEFAULT_FIREHOSE_MAX_RECONNECT_DELAY,
+        client: Optional[BlueskyWebSocketClient] = None,
+    ):
+        if processes < 1:
+            raise TypeError("processes should be at least 1")
+
+        self.collections = collections
+        self.cursor = cursor
+        self.processes = processes
+        self.batch_size = batch_size
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.client = client if client is not None else BlueskyWebSocketClient()
+
+        self.queue: "Queue[Any]" = Queue(maxsize=queue_size)
+        self.stopped = Event()
+        self.reader: Optional[Thread] = None
+
+        self.reconnections = 0
+
+    def queue_size(self) -> int:
+        return self.queue.qsize()
+
+    def __put(self, item: Any) -> bool:
+        # NOTE: blocking when decoders lag behind is the whole point, but we
+        # still need to notice when we are stopped
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.5)
+                return True
+            except Full:
+                continue
+
+        return False
+
+    def __read(self) -> None:
+        delay = self.reconnect_delay
+
+        try:
+            while not self.stopped.is_set():
+                try:
+                    with self.client.subscribe_repos(cursor=self.cursor) as socket:
+                        delay = self.reconnect_delay
+
+                        while not self.stopped.is_set():
+                            try:
+                                payload = socket.recv(timeout=1)
+                            except TimeoutError:
+                                continue
+
+                            if not isinstance(payload, bytes):
+                                continue
+
+                            if not self.__put(payload):
+                                return
+
+                except (WebSocketException, OSError):
+                    pass
+
+                if self.stopped.wait(delay):
+                    return
+
+                self.reconnections += 1
+                delay = min(delay * 2, self.max_reconnect_delay)
+        finally:
+            self.__put(END_OF_STREAM)
+
+    def __batches(self) -> Iterator[List[bytes]]:
+        while True:
+            item = self.queue.get()
+
+            if item is END_OF_STREAM:
+                return
+
+            batch = [item]
+
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get_nowait()
+                except Empty:
+                    break
+
+                if item is END_OF_STREAM:
+                    yield batch
+                    return
+
+                batch.append(item)
+
+            yield batch
+
+    def stop(self) -> None:
+        # NOTE: the reader notices by itself, since it never blocks for long
+        self.stopped.set()
+
+        if self.reader is not None:
+            self.reader.join()
+
+    def __iter__(self) -> Iterator[FirehoseEvent]:
+        decoder = FirehoseBatchDecoder(self.collections)
+
+        # NOTE: the pool is created before the reader thread starts, in case
+        # its processes are forked
+        with LazyPool(self.processes) as pool:
+            self.reader = Thread(
+                target=self.__read, name="Thread-minet-firehose-reader", daemon=True
+            )
+            self.reader.start()
+
+            try:
+                for events in pool.imap(
+                    decoder, self.__batches(), buffer_size=self.processes * 2
+                ):
+                    for event in events:
+                        if (
+                            event.type == "#error"
+                            and event.error in FATAL_FIREHOSE_ERRORS
+                        ):
+                            raise BlueskyFirehoseError(event.error, event.message)
+
+                        if event.seq is not None:
+                            # NOTE: events received again after reconnecting
+                            if self.cursor is not None and event.seq <= self.cursor:
+                                continue
+
+                            self.cursor = event.seq
+
+                        yield event
+            finally:
+                self.stop()
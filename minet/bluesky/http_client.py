@@ -1,8 +1,19 @@
-from typing import Iterator, Iterable, Optional, Any, List, Dict, Union
+from typing import (
+    Iterator,
+    Iterable,
+    Optional,
+    Any,
+    List,
+    Dict,
+    Union,
+    Callable,
+    Tuple,
+    TypeVar,
+)
 
-from time import time, sleep
+from time import time
+from threading import Lock
 from datetime import datetime, timezone
-from ebbe import as_reconciled_chunks
 
 from twitwi.utils import get_dates
 from twitwi.bluesky import normalize_profile, normalize_post, normalize_partial_profile
@@ -10,13 +21,14 @@ from twitwi.bluesky.types import BlueskyPost, BlueskyProfile, BlueskyPartialProf
 from twitwi.constants import SOURCE_DATETIME_FORMAT_V2
 
 from minet.web import (
-    create_request_retryer,
     create_pool_manager,
-    retrying_method,
+    threadsafe_retrying_method,
     request,
     Response,
+    ThreadsafeRequestRetryers,
 )
-
+from minet.rate_limiting import AdaptiveConcurrencyLimiter
+from minet.multiprocessing import imap_chunks_in_threads
 
 from minet.bluesky.urls import (
     BlueskyHTTPAPIUrlFormatter,
@@ -31,23 +43,65 @@ from minet.bluesky.exceptions import (
     BlueskyBadRequestError,
     BlueskyUpstreamFailureError,
     BlueskyHandleNotFound,
+    BlueskyRateLimitExceededError,
 )
+from minet.bluesky.constants import (
+    BLUESKY_HTTP_API_MAX_CHUNK_SIZE,
+    DEFAULT_BLUESKY_HTTP_API_THREADS,
+)
+
+T = TypeVar("T")
+W = TypeVar("W")
+
+
+def parse_rate_limit_headers(
+    response: Response,
+) -> Tuple[Optional[int], Optional[int]]:
+    try:
+        remaining = int(response.headers["RateLimit-Remaining"])
+        reset = int(response.headers["RateLimit-Reset"])
+    except (KeyError, TypeError, ValueError):
+        return None, None
+
+    return remaining, reset
 
 
 class BlueskyHTTPClient:
-    def __init__(self, identifier: str, password: str):
+    """
+    Client of the Bluesky HTTP API. Its methods can be called from multiple
+    threads, which share the client's session & the adaptive concurrency
+    limiter respecting the rate limit advertised by the server. The `threads`
+    argument is the maximum number of chunks of uris or identifiers the
+    `posts` & `profiles` methods will hydrate concurrently.
+    """
+
+    def __init__(
+        self,
+        identifier: str,
+        password: str,
+        threads: int = DEFAULT_BLUESKY_HTTP_API_THREADS,
+    ):
+        if threads < 1:
+            raise TypeError("threads should be at least 1")
+
         self.urls = BlueskyHTTPAPIUrlFormatter()
-        self.pool_manager = create_pool_manager()
-        self.retryer = create_request_retryer(
-            additional_exceptions=[BlueskyUpstreamFailureError, BlueskyExpiredToken],
+        self.threads = threads
+        self.pool_manager = create_pool_manager(parallelism=threads)
+        self.retryers = ThreadsafeRequestRetryers(
+            additional_exceptions=[
+                BlueskyUpstreamFailureError,
+                BlueskyExpiredToken,
+                BlueskyRateLimitExceededError,
+            ],
             retry_on_statuses=[502],
         )
-        self.rate_limit_reset: Optional[int] = None
+        self.limiter = AdaptiveConcurrencyLimiter(threads)
+        self.session_lock = Lock()
 
         # First auth
         self.create_session(identifier, password)
 
-    @retrying_method()
+    @threadsafe_retrying_method()
     def create_session(self, identifier: str, password: str):
         response = request(
             self.urls.create_session(),
@@ -69,7 +123,7 @@ class BlueskyHTTPClient:
         # If the token has 10 seconds left, we consider it expired to avoid network-related issues
         return self.access_jwt_expiration - time() < 10
 
-    @retrying_method()
+    @threadsafe_retrying_method()
     def refresh_session(self):
         response = request(
             self.urls.refresh_session(),
@@ -87,31 +141,54 @@ class BlueskyHTTPClient:
         self.refresh_jwt = data["refreshJwt"]
         self.access_jwt_expiration = parse_jwt_for_expiration(self.access_jwt)
 
-    @retrying_method()
+    def ensure_fresh_session(self) -> None:
+        if not self.is_access_jwt_expired():
+            return
+
+        # NOTE: only one thread must refresh the session, since refresh tokens
+        # can only be used once
+        with self.session_lock:
+            if self.is_access_jwt_expired():
+                self.refresh_session()
+
+    @threadsafe_retrying_method()
     def request(
         self,
         url: str,
         method: str = "GET",
         json_body=None,
     ) -> Response:
-        if self.rate_limit_reset is not None:
-            sleep(self.rate_limit_reset - time() + 0.1)
-            self.rate_limit_reset = None
-
-        if self.is_access_jwt_expired():
-            self.refresh_session()
+        self.ensure_fresh_session()
 
         headers = {"Authorization": "Bearer {}".format(self.access_jwt)}
 
-        response = request(
-            url,
-            pool_manager=self.pool_manager,
-            method=method,
-            json_body=json_body,
-            known_encoding="utf-8",
-            headers=headers,
-            raise_on_statuses=[502],
-        )
+        remaining = None
+        reset = None
+
+        self.limiter.acquire()
+
+        try:
+            response = request(
+                url,
+                pool_manager=self.pool_manager,
+                method=method,
+                json_body=json_body,
+                known_encoding="utf-8",
+                headers=headers,
+                raise_on_statuses=[502],
+            )
+
+            remaining, reset = parse_rate_limit_headers(response)
+
+            if response.status == 429:
+                remaining = 0
+        finally:
+            self.limiter.release(remaining, reset)
+
+        if response.status == 429:
+            raise BlueskyRateLimitExceededError(
+                f"Rate limit exceeded. On url: {url} (HTTP {response.status})"
+            )
 
         if response.status >= 400:
             data = response.json()
@@ -132,13 +209,25 @@ class BlueskyHTTPClient:
                 )
             raise BlueskyBadRequestError(f"HTTP {response.status}")
 
-        remaining = int(response.headers["RateLimit-Remaining"])
-
-        if remaining <= 0:
-            self.rate_limit_reset = int(response.headers["RateLimit-Reset"])
-
         return response
 
+    def reconciled_chunks(
+        self,
+        items: Iterable[T],
+        work: Callable[[List[T]], W],
+        reconcile: Callable[[W, T], Any],
+    ) -> Iterator[Tuple[T, Any]]:
+        """
+        Method working like `ebbe.as_reconciled_chunks`, except that chunks
+        are dispatched on a thread pool, while items are still yielded in
+        the order they were given.
+        """
+        for chunk, data in imap_chunks_in_threads(
+            self.threads, work, items, BLUESKY_HTTP_API_MAX_CHUNK_SIZE
+        ):
+            for item in chunk:
+                yield item, reconcile(data, item)
+
     def post_quotes(self, post_uri: str) -> Iterator[BlueskyPost]:
         cursor = None
 
@@ -435,7 +524,7 @@ class BlueskyHTTPClient:
         def reconcile(data: Dict[str, Any], uri: str) -> Any:
             return data.get(uri)
 
-        for _, post_data in as_reconciled_chunks(25, did_at_uris, work, reconcile):
+        for _, post_data in self.reconciled_chunks(did_at_uris, work, reconcile):
             if not post_data:
                 # in case the post was not found (e.g. non-existing post)
                 yield None
@@ -482,7 +571,7 @@ class BlueskyHTTPClient:
         def reconcile(data: Dict[str, Any], identifier: str) -> Any:
             return data.get(identifier)
 
-        for _, profile_data in as_reconciled_chunks(25, identifiers, work, reconcile):
+        for _, profile_data in self.reconciled_chunks(identifiers, work, reconcile):
             if not profile_data:
                 # In case the profile was not found (e.g. non-existing user)
                 yield None
@@ -1,13 +1,27 @@
+from typing import Optional
+
 from urllib.parse import urljoin
 from websockets.sync.client import connect, ClientConnection
 
-from minet.bluesky.constants import BLUESKY_FIREHOSE_BASE_URL
-
-# TODO: investigate libipld
+from minet.bluesky.constants import (
+    BLUESKY_FIREHOSE_BASE_URL,
+    BLUESKY_FIREHOSE_MAX_FRAME_SIZE,
+    BLUESKY_FIREHOSE_CLOSE_TIMEOUT,
+)
 
 
 class BlueskyWebSocketClient:
-    def subscribe_repos(self) -> ClientConnection:
+    def __init__(self, base_url: str = BLUESKY_FIREHOSE_BASE_URL):
+        self.base_url = base_url
+
+    def subscribe_repos(self, cursor: Optional[int] = None) -> ClientConnection:
+        url = urljoin(self.base_url, "com.atproto.sync.subscribeRepos")
+
+        if cursor is not None:
+            url += "?cursor=%i" % cursor
+
         return connect(
-            urljoin(BLUESKY_FIREHOSE_BASE_URL, "com.atproto.sync.subscribeRepos")
+            url,
+            max_size=BLUESKY_FIREHOSE_MAX_FRAME_SIZE,
+            close_timeout=BLUESKY_FIREHOSE_CLOSE_TIMEOUT,
         )
@@ -31,10 +31,13 @@ from pytz.exceptions import UnknownTimeZoneError
 from minet.dates import datetime_from_partial_iso_format
 
 from minet.cli.console import MINET_COLORS
+from minet.cli.constants import DEFAULT_URL_PROCESSING_CHUNK_SIZE
 from minet.cli.exceptions import NotResumableError, InvalidArgumentsError
 from minet.cli.utils import acquire_cross_platform_stdout
 
 TEMPLATE_RE = re.compile(r"<%\s+([A-Za-z/\-]+)\s+%>")
+FILE_SIZE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*$", re.I)
+FILE_SIZE_UNITS = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
 
 ARGUMENT_PREFIXES_TO_NORMALIZE = ["--dont-", "--no-", "--", "-"]
 FLAG_SORTING_PRIORITIES = {
@@ -382,6 +385,18 @@ class PartialISODatetimeType:
         return d
 
 
+class FileSizeType:
+    def __call__(self, string):
+        match = FILE_SIZE_RE.match(string)
+
+        if match is None:
+            raise ArgumentTypeError(
+                'Invalid file size. Should be a number of bytes, optionally followed by a unit such as "KB", "MB" or "GB".'
+            )
+
+        return int(float(match.group(1)) * FILE_SIZE_UNITS[match.group(2).lower()])
+
+
 class CSVFileType:
     def __init__(self, mode="r"):
         self.mode = mode
@@ -878,6 +893,23 @@ def resolve_typical_arguments(
     return args, epilog_addendum
 
 
+# NOTE: arguments of the commands running pure CPU work on urls, e.g. using
+# ural, that can be spread over multiple processes
+URL_PROCESSING_PROCESSES_ARGUMENT = {
+    "flags": ["-p", "--processes"],
+    "help": "Number of processes to use. Output order is kept whatever the number of processes.",
+    "type": int,
+    "default": 1,
+}
+
+URL_PROCESSING_CHUNK_SIZE_ARGUMENT = {
+    "flag": "--chunk-size",
+    "help": "Number of lines sent at once to the processes.",
+    "type": int,
+    "default": DEFAULT_URL_PROCESSING_CHUNK_SIZE,
+}
+
+
 def command(
     name: str,
     package: str,
@@ -1,4 +1,15 @@
-from minet.cli.argparse import command, ConfigAction, PartialISODatetimeType
+from minet.cli.argparse import (
+    command,
+    ConfigAction,
+    PartialISODatetimeType,
+    SplitterType,
+    FileSizeType,
+)
+from minet.cli.exceptions import InvalidArgumentsError
+from minet.bluesky.constants import (
+    BLUESKY_FIREHOSE_COLLECTIONS,
+    DEFAULT_BLUESKY_HTTP_API_THREADS,
+)
 
 BLUESKY_HTTP_API_COMMON_ARGUMENTS = [
     {
@@ -15,13 +26,111 @@ BLUESKY_HTTP_API_COMMON_ARGUMENTS = [
     },
 ]
 
+BLUESKY_HTTP_API_THREADS_ARGUMENT = {
+    "flags": ["-t", "--threads"],
+    "help": "Maximum number of batches of 25 items to fetch concurrently. Concurrency will be lowered automatically when running low on the rate limit budget advertised by the API.",
+    "type": int,
+    "default": DEFAULT_BLUESKY_HTTP_API_THREADS,
+}
+
+
+def check_firehose_arguments(cli_args):
+    for collection in cli_args.collections:
+        if collection not in BLUESKY_FIREHOSE_COLLECTIONS:
+            raise InvalidArgumentsError(
+                'Unknown collection "%s". Should be one of: %s.'
+                % (collection, ", ".join(BLUESKY_FIREHOSE_COLLECTIONS))
+            )
+
+    if cli_args.processes < 1:
+        raise InvalidArgumentsError("-p/--processes should be at least 1.")
+
+
 BLUESKY_FIREHOSE_COMMAND = command(
     "firehose",
     "minet.cli.bluesky.firehose",
     title="Minet Bluesky Firehose command",
     description="""
-        Plug into the Bluesky Firehose.
+        Plug into the Bluesky Firehose and write the records
+        created, updated or deleted by the commits of the
+        network's repositories, for the given collections, into
+        ndjson or CSV files rotated by size.
+
+        The sequence number of the last written event is
+        persisted in a cursor file so that the command resumes
+        where it stopped, without gaps, when run again. The
+        command also reconnects by itself when the connection
+        is lost.
+
+        Frames are read from the socket into a bounded queue
+        and their CAR blocks are decoded by batches using a pool
+        of processes. Decoding is skipped altogether for commits
+        irrelevant to the selected collections.
     """,
+    epilog="""
+        Examples:
+
+        . Consuming posts, likes & follows in the "firehose" folder:
+            $ minet bsky firehose
+
+        . Consuming only posts, as CSV:
+            $ minet bsky firehose -c posts --format csv
+
+        . Stopping after 100k events:
+            $ minet bsky firehose -l 100000
+    """,
+    resolve=check_firehose_arguments,
+    arguments=[
+        {
+            "flags": ["-c", "--collections"],
+            "help": 'Collections to consume, separated by comma, among "posts", "likes", "reposts" & "follows".',
+            "type": SplitterType(),
+            "default": ["posts", "likes", "follows"],
+        },
+        {
+            "flags": ["-O", "--output-dir"],
+            "help": "Directory where the record files & the cursor file will be written.",
+            "default": "firehose",
+        },
+        {
+            "flag": "--format",
+            "help": "Format of the record files.",
+            "choices": ["ndjson", "csv"],
+            "default": "ndjson",
+        },
+        {
+            "flag": "--max-file-size",
+            "help": 'Size, e.g. "100MB", after which a new record file will be started.',
+            "type": FileSizeType(),
+            "default": "256MB",
+        },
+        {
+            "flag": "--cursor",
+            "help": "Sequence number from which to start consuming. Will default to the one found in the cursor file, or to the live stream if there is none.",
+            "type": int,
+        },
+        {
+            "flag": "--cursor-file",
+            "help": 'Path to the file where the cursor will be persisted. Will default to "cursor.txt" in the output directory.',
+        },
+        {
+            "flag": "--cursor-interval",
+            "help": "Number of seconds between two persistences of the cursor.",
+            "type": float,
+            "default": 5.0,
+        },
+        {
+            "flags": ["-p", "--processes"],
+            "help": "Number of processes used to decode the frames.",
+            "type": int,
+            "default": 2,
+        },
+        {
+            "flags": ["-l", "--limit"],
+            "help": "Maximum number of events to consume before stopping.",
+            "type": int,
+        },
+    ],
 )
 
 BLUESKY_PROFILE_FOLLOWS_COMMAND = command(
@@ -113,6 +222,7 @@ BLUESKY_POSTS_COMMAND = command(
             "action": "store_true",
             "help": "Return the raw post data in JSON as received from the Bluesky API instead of a normalized version.",
         },
+        BLUESKY_HTTP_API_THREADS_ARGUMENT,
         *BLUESKY_HTTP_API_COMMON_ARGUMENTS,
     ],
     variadic_input={"dummy_column": "post"},
@@ -147,6 +257,7 @@ BLUESKY_PROFILES_COMMAND = command(
             "action": "store_true",
             "help": "Return the raw profile data in JSON as received from the Bluesky API instead of a normalized version.",
         },
+        BLUESKY_HTTP_API_THREADS_ARGUMENT,
         *BLUESKY_HTTP_API_COMMON_ARGUMENTS,
     ],
     variadic_input={"dummy_column": "profile"},
@@ -1,15 +1,106 @@
-import libipld
+from os.path import join
+from time import time, perf_counter
 
-from minet.cli.console import console
+from minet.cli.utils import with_loading_bar
+from minet.cli.loading_bar import LoadingBar
+from minet.cli.bluesky.utils import with_bluesky_fatal_errors
 
-from minet.bluesky.websocket_client import BlueskyWebSocketClient
+from minet.bluesky.constants import BLUESKY_FIREHOSE_COLLECTIONS
+from minet.bluesky.firehose import (
+    BlueskyFirehoseConsumer,
+    FirehoseRecordWriter,
+    read_cursor,
+    write_cursor,
+)
 
 
-def action(_):
-    client = BlueskyWebSocketClient()
+@with_bluesky_fatal_errors
+@with_loading_bar(
+    title="Consuming the Bluesky firehose",
+    unit="events",
+    stats=[{"name": "lag (s)", "style": "warning"}],
+)
+def action(cli_args, loading_bar: LoadingBar):
+    collections = {
+        BLUESKY_FIREHOSE_COLLECTIONS[name]: name for name in cli_args.collections
+    }
 
-    with client.subscribe_repos() as socket:
-        while True:
-            payload = socket.recv()
-            header, _ = libipld.decode_dag_cbor_multi(payload)  # type: ignore
-            console.print(header, highlight=True)
+    cursor_path = cli_args.cursor_file or join(cli_args.output_dir, "cursor.txt")
+    cursor = cli_args.cursor
+
+    writer = FirehoseRecordWriter(
+        cli_args.output_dir,
+        format=cli_args.format,
+        max_size=cli_args.max_file_size,
+    )
+
+    if cursor is None:
+        cursor = read_cursor(cursor_path)
+
+    if cursor is not None:
+        loading_bar.append_to_title(" (from seq %i)" % cursor)
+
+    consumer = BlueskyFirehoseConsumer(
+        collections=collections.keys(),
+        cursor=cursor,
+        processes=cli_args.processes,
+    )
+
+    # NOTE: the cursor is only persisted once the records of the related
+    # event have been written and flushed
+    written_seq = None
+    events = 0
+    last_persistence = perf_counter()
+
+    def persist_cursor() -> None:
+        nonlocal last_persistence
+
+        if written_seq is None:
+            return
+
+        writer.flush()
+        write_cursor(cursor_path, written_seq)
+        last_persistence = perf_counter()
+
+    try:
+        for event in consumer:
+            with loading_bar.step():
+                if event.type == "#info" and event.error == "OutdatedCursor":
+                    loading_bar.warning(
+                        "Cursor is too old, some events were lost in between!"
+                    )
+
+                elif event.type in ("#error", "#invalid"):
+                    loading_bar.warning(
+                        "Received %s frame: %s (%s)"
+                        % (event.type, event.error, event.message)
+                    )
+                    loading_bar.inc_stat("errors", style="error")
+
+                for record in event.records:
+                    writer.writerow(record)
+                    loading_bar.inc_stat(
+                        collections[record["collection"]], style="success"
+                    )
+
+                if event.seq is not None:
+                    written_seq = event.seq
+
+                if event.timestamp is not None:
+                    loading_bar.set_stat(
+                        "lag (s)", max(0, int(time() - event.timestamp))
+                    )
+
+                loading_bar.set_stat("queue", consumer.queue_size())
+
+                if perf_counter() - last_persistence >= cli_args.cursor_interval:
+                    persist_cursor()
+
+            events += 1
+
+            if cli_args.limit is not None and events >= cli_args.limit:
+                break
+
+    finally:
+        persist_cursor()
+        writer.close()
@@ -26,7 +26,9 @@ from minet.bluesky import BlueskyHTTPClient
     nested=False,
 )
 def action_normalize(cli_args, enricher: Enricher, loading_bar: LoadingBar):
-    client = BlueskyHTTPClient(cli_args.identifier, cli_args.password)
+    client = BlueskyHTTPClient(
+        cli_args.identifier, cli_args.password, threads=cli_args.threads
+    )
 
     def mixed_urls_and_uris_to_uris(params: Iterable[str]) -> Iterator[str]:
         for param in params:
@@ -59,7 +61,9 @@ def action_normalize(cli_args, enricher: Enricher, loading_bar: LoadingBar):
     nested=False,
 )
 def action_raw(cli_args, loading_bar: LoadingBar):
-    client = BlueskyHTTPClient(cli_args.identifier, cli_args.password)
+    client = BlueskyHTTPClient(
+        cli_args.identifier, cli_args.password, threads=cli_args.threads
+    )
 
     reader = casanova.reader(cli_args.input, total=cli_args.total)
     writer = ndjson.writer(cli_args.output)
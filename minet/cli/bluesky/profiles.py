@@ -27,7 +27,9 @@ from minet.bluesky.exceptions import BlueskyHandleNotFound
     unit="profiles",
 )
 def action_normalize(cli_args, enricher: Enricher, loading_bar: LoadingBar):
-    client = BlueskyHTTPClient(cli_args.identifier, cli_args.password)
+    client = BlueskyHTTPClient(
+        cli_args.identifier, cli_args.password, threads=cli_args.threads
+    )
 
     def mixed_handles_and_dids_to_dids(
         profiles: Iterable[str],
@@ -64,7 +66,9 @@ def action_normalize(cli_args, enricher: Enricher, loading_bar: LoadingBar):
     unit="profiles",
 )
 def action_raw(cli_args, loading_bar: LoadingBar):
-    client = BlueskyHTTPClient(cli_args.identifier, cli_args.password)
+    client = BlueskyHTTPClient(
+        cli_args.identifier, cli_args.password, threads=cli_args.threads
+    )
 
     reader = casanova.reader(cli_args.input, total=cli_args.total)
     writer = ndjson.writer(cli_args.output)
@@ -7,3 +7,4 @@
 DEFAULT_CONTENT_FOLDER = "downloaded"
 DEFAULT_SCREENSHOT_FOLDER = "screenshots"
 DEFAULT_PREBUFFER_BYTES = 3_000_000  # 3mb
+DEFAULT_URL_PROCESSING_CHUNK_SIZE = 1024
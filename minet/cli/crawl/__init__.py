@@ -4,6 +4,7 @@ from urllib3 import Timeout
 
 from minet.cli.argparse import (
     command,
+    FileSizeType,
     FolderStrategyType,
     BooleanAction,
     ExtractionSelectionAction,
@@ -43,6 +44,17 @@ CRAWL_ARGUMENTS = {
         "type": int,
         "default": 1,
     },
+    "in_memory_scheduler": {
+        "flag": "--in-memory-scheduler",
+        "help": "Whether to schedule jobs using in-memory heaps rather than querying the sqlite queue each time. Faster when a lot of domains are queued, at the cost of some memory. Throttling info will not be persisted when resuming.",
+        "action": "store_true",
+    },
+    "queue_batch_size": {
+        "flag": "--queue-batch-size",
+        "help": "Number of jobs to lease from, and acknowledge to, the crawler queue in a single transaction. Increasing it reduces the number of sqlite commits but means that up to this number of already processed jobs may be done again when resuming.",
+        "type": int,
+        "default": 1,
+    },
     "threads": {
         "flags": ["-t", "--threads"],
         "help": "Number of threads to use. Will default to a conservative number, based on the number of available cores. Feel free to increase.",
@@ -96,6 +108,11 @@ CRAWL_ARGUMENTS = {
         "help": "Whether to normalize url cache used to assess if some url was already visited.",
         "action": "store_true",
     },
+    "compact_url_cache": {
+        "flag": "--compact-url-cache",
+        "help": "Whether to only store 64 bits fingerprints of the urls in the url cache used to assess if some url was already visited. This is faster and lighter on disk, at the cost of a very small probability of false positives, but means the urls cannot be dumped afterwards.",
+        "action": "store_true",
+    },
     "insecure": {
         "flags": ["-k", "--insecure"],
         "help": "Whether to allow ssl errors when performing requests or not.",
@@ -111,6 +128,11 @@ CRAWL_ARGUMENTS = {
         "help": "Number of processes for the crawler process pool.",
         "type": int,
     },
+    "worker_processes": {
+        "flag": "--worker-processes",
+        "help": "Number of worker processes to shard the crawl across, each one running its own threads (as given by -t/--threads) & spiders, while the main process handles the queue and the outputs. Useful when spiders are CPU-intensive. Cannot be used with -p/--processes, nor on platforms where processes cannot be forked, e.g. Windows.",
+        "type": int,
+    },
     "connect_timeout": {
         "flag": "--connect-timeout",
         "help": "Maximum socket connection time to host.",
@@ -144,6 +166,41 @@ CRAWL_ARGUMENTS = {
         "help": "Whether to write files into a single-file sqlite archive rather than as individual files on the disk.",
         "action": "store_true",
     },
+    "warc": {
+        "flag": "--warc",
+        "help": 'Whether to write the responses as request/response records in gzipped WARC files, rotated by size, rather than as individual files. A CDXJ index is written alongside each WARC file. The "path" column of the jobs report will then read as "file.warc.gz#offset", which the scrape & extract commands understand. Only relevant with -w/--write-files.',
+        "action": "store_true",
+    },
+    "warc_max_size": {
+        "flag": "--warc-max-size",
+        "help": 'Size, e.g. "500MB", after which a new WARC file will be started when using --warc.',
+        "type": FileSizeType(),
+        "default": "1GB",
+    },
+    "zstd": {
+        "flag": "--zstd",
+        "help": 'Whether to compress files using zstd, with dictionaries trained on the first files of each folder (e.g. per hostname when using --folder-strategy), rather than gzip. Only relevant with -z/--compress-on-disk or --sqlar, in which case the archive will not be readable by the sqlite3 command line anymore. Requires the "zstandard" package.',
+        "action": "store_true",
+    },
+    "content_addressed": {
+        "flag": "--content-addressed",
+        "help": 'Whether to write downloaded files under a path derived from the sha256 hash of their contents, so that identical contents (e.g. soft 404 pages, consent walls etc.) are only written once. Adds a "body_hash" column to the jobs report. Only relevant with -w/--write-files.',
+        "action": "store_true",
+    },
+    "dns_cache": {
+        "flag": "--dns-cache",
+        "help": "Whether to keep hostname resolutions in an in-memory cache shared by all threads, instead of resolving hostnames each time a new connection is opened. Resolutions are kept for 5 minutes, and failed ones for 30 seconds.",
+        "action": "store_true",
+    },
+    "dns_prefetch": {
+        "flag": "--dns-prefetch",
+        "help": "Whether to resolve the hostnames of enqueued urls in the background, ahead of the requests needing them. Implies --dns-cache. Cannot be used with --worker-processes.",
+        "action": "store_true",
+    },
+    "http_cache": {
+        "flag": "--http-cache",
+        "help": 'Path to a sqlite file that will be used to cache responses, so that recurring crawls can revalidate them using conditional requests (i.e. "If-None-Match" & "If-Modified-Since" headers) instead of downloading them again. Cannot be used with --pycurl.',
+    },
 }
 
 CRAWL_MODULE_ARGUMENTS = [
@@ -211,6 +268,7 @@ def crawl_command(
     if not url_cache:
         delete(arguments_dict, "visit_urls_only_once")
         delete(arguments_dict, "normalized_url_cache")
+        delete(arguments_dict, "compact_url_cache")
 
     if not max_depth:
         del arguments_dict["max_depth"]
@@ -339,6 +397,45 @@ def crawl_command(
         if force_stateful_redirects is not None:
             cli_args.stateful_redirects = force_stateful_redirects
 
+        if cli_args.worker_processes:
+            from minet.multiprocessing import FORK_SUPPORT
+
+            if not FORK_SUPPORT:
+                raise InvalidArgumentsError(
+                    "--worker-processes is not available on this platform"
+                )
+
+            if cli_args.processes:
+                raise InvalidArgumentsError(
+                    "--worker-processes cannot be used with -p/--processes"
+                )
+
+        if cli_args.http_cache is not None and cli_args.pycurl:
+            raise InvalidArgumentsError("Cannot use --http-cache with --pycurl!")
+
+        if cli_args.dns_prefetch:
+            cli_args.dns_cache = True
+
+            if cli_args.worker_processes:
+                raise InvalidArgumentsError(
+                    "--dns-prefetch cannot be used with --worker-processes"
+                )
+
+        if cli_args.dns_cache and cli_args.pycurl:
+            raise InvalidArgumentsError("Cannot use --dns-cache with --pycurl!")
+
+        if cli_args.warc and (
+            cli_args.sqlar or cli_args.compress_on_disk or cli_args.content_addressed
+        ):
+            raise InvalidArgumentsError(
+                "Cannot use --warc with --sqlar, -z/--compress-on-disk nor --content-addressed!"
+            )
+
+        if cli_args.zstd and not cli_args.compress_on_disk and not cli_args.sqlar:
+            raise InvalidArgumentsError(
+                "--zstd can only be used with -z/--compress-on-disk or --sqlar!"
+            )
+
         if resolve is not None:
             resolve(cli_args)
 
@@ -4,7 +4,7 @@
 #
 # Logic of the crawl action.
 #
-from typing import Optional, List, Callable, Any, Mapping, Union, cast
+from typing import Optional, List, Callable, Any, Mapping, Union, Tuple, cast
 
 import os
 import casanova
@@ -20,6 +20,7 @@ from minet.exceptions import (
     TargetInGenericModuleNotFoundError,
 )
 from minet.cli.exceptions import FatalError
+from minet.exceptions import HTTPCacheInvalidError, ZstdNotInstalledError
 from minet.crawl import (
     Crawler,
     CrawlResult,
@@ -31,6 +32,7 @@ from minet.crawl import (
 from minet.crawl.exceptions import (
     CrawlerAlreadyFinishedError,
     CrawlerSpiderProcessError,
+    CrawlerURLCacheModeMismatchError,
 )
 from minet.cli.console import console
 from minet.cli.loading_bar import LoadingBar
@@ -177,13 +179,30 @@ def crawl_action(
     persistent_storage_path = join(cli_args.output_dir, "store")
     writer_root_directory = join(cli_args.output_dir, "pages")
 
-    filename_builder = FilenameBuilder(cli_args.folder_strategy)
+    filename_builder = FilenameBuilder(
+        cli_args.folder_strategy, compression="zstd" if cli_args.zstd else "gzip"
+    )
+
+    content_addressed = getattr(cli_args, "content_addressed", False)
 
-    def callback(self: Crawler, result: SuccessfulCrawlResult) -> Optional[str]:
+    def callback(
+        self: Crawler, result: SuccessfulCrawlResult
+    ) -> Optional[Tuple[str, Optional[str]]]:
         if not cli_args.write_files:
             return
 
         response = result.response
+
+        if cli_args.warc:
+            return self.write_warc_record(response).path, None
+
+        if content_addressed:
+            blob = self.write_blob(
+                response.body, ext=response.ext, compress=cli_args.compress_on_disk
+            )
+
+            return blob.path, blob.hash
+
         filename = result.job.id
 
         path = filename_builder(
@@ -193,9 +212,15 @@ def crawl_action(
             ext=response.ext,
         )
 
+        # NOTE: no need to write again a file that did not change
+        if response.cache_status in ("hit", "revalidated") and self.file_writer.exists(
+            path, compress=cli_args.compress_on_disk
+        ):
+            return path, None
+
         self.write(path, response.body, compress=cli_args.compress_on_disk)
 
-        return path
+        return path, None
 
     # Scaffolding output directory
     os.makedirs(cli_args.output_dir, exist_ok=True)
@@ -215,16 +240,26 @@ def crawl_action(
         "max_depth",
         "visit_urls_only_once",
         "normalized_url_cache",
+        "compact_url_cache",
         ("threads", "max_workers"),
         ("spoof_user_agent", "spoof_ua"),
         "insecure",
         "domain_parallelism",
+        "in_memory_scheduler",
+        "queue_batch_size",
         ("processes", "process_pool_workers"),
+        "worker_processes",
         "timeout",
         "stateful_redirects",
         ("pycurl", "use_pycurl"),
         ("compress_transfer", "compressed"),
         "sqlar",
+        "zstd",
+        "warc",
+        "warc_max_size",
+        "http_cache",
+        "dns_cache",
+        "dns_prefetch",
     ]
 
     for arg in cli_args_to_forward_to_crawler:
@@ -325,6 +360,36 @@ def crawl_action(
         loading_bar.erase()
         raise FatalError("[error]Crawler has already finished!")
 
+    except CrawlerURLCacheModeMismatchError as error:
+        loading_bar.erase()
+        raise FatalError(
+            [
+                "Cannot resume a crawl %s --compact-url-cache since it was started %s it!"
+                % (
+                    "without" if error.compact else "with",
+                    "with" if error.compact else "without",
+                ),
+            ]
+        )
+
+    except HTTPCacheInvalidError:
+        loading_bar.erase()
+        raise FatalError(
+            [
+                "Given --http-cache file is not a valid http cache!",
+                "Are you sure this file was created by minet?",
+            ]
+        )
+
+    except ZstdNotInstalledError:
+        loading_bar.erase()
+        raise FatalError(
+            [
+                'The --zstd flag requires the "zstandard" package!',
+                "You can install it with: [info]pip install zstandard[/info]",
+            ]
+        )
+
     # Jobs output
     jobs_output_path = join(cli_args.output_dir, "jobs.csv")
     jobs_output = (
@@ -337,6 +402,9 @@ def crawl_action(
     if cli_args.write_files:
         jobs_fieldnames += ["path"]
 
+        if content_addressed:
+            jobs_fieldnames += ["body_hash"]
+
     if additional_job_fieldnames is not None:
         jobs_fieldnames += additional_job_fieldnames
 
@@ -377,7 +445,7 @@ def crawl_action(
 
         # Running crawler
         try:
-            for result, result_path in crawler.crawl(callback=callback):
+            for result, written_file in crawler.crawl(callback=callback):
                 with loading_bar.step():
                     if cli_args.verbose:
                         console.print(result, highlight=True)
@@ -388,7 +456,12 @@ def crawl_action(
                     job_row = result.as_csv_row()
 
                     if cli_args.write_files:
-                        job_row += [result_path]
+                        path, body_hash = written_file or (None, None)
+
+                        job_row += [path]
+
+                        if content_addressed:
+                            job_row += [body_hash]
 
                     if format_job_row_addendum is not None:
                         job_row += format_job_row_addendum(result)
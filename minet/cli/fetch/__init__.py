@@ -2,6 +2,7 @@ from casanova import IndexedResumer
 
 from minet.cli.argparse import (
     command,
+    FileSizeType,
     FolderStrategyType,
     FOLDER_STRATEGY_DOCUMENTATION,
 )
@@ -14,6 +15,9 @@ from minet.constants import (
     DEFAULT_THROTTLE,
     DEFAULT_FETCH_MAX_REDIRECTS,
     DEFAULT_RESOLVE_MAX_REDIRECTS,
+    DEFAULT_ASYNC_MAX_CONCURRENCY,
+    DEFAULT_COALESCING_CACHE_SIZE,
+    DEFAULT_RESOLVE_CACHE_TTL_IN_DAYS,
 )
 
 COMMON_ARGUMENTS = [
@@ -81,6 +85,50 @@ FETCH_RESOLVE_COMMON_ARGUMENTS = [
         "type": int,
         "default": 0,
     },
+    {
+        "flag": "--engine",
+        "help": 'Engine used to perform the requests. "threads" uses a pool of threads while "asyncio" relies on an event loop and is able to perform a lot more concurrent requests. Note that "asyncio" requires the httpx library to be installed.',
+        "choices": ["threads", "asyncio"],
+        "default": "threads",
+    },
+    {
+        "flag": "--max-concurrency",
+        "help": 'Maximum number of concurrent requests when using the "asyncio" engine.',
+        "type": int,
+        "default": DEFAULT_ASYNC_MAX_CONCURRENCY,
+    },
+    {
+        "flag": "--coalesce-urls",
+        "help": "Whether to perform a single request for urls found multiple times in the input (after applying --url-template), every matching row being reported with the same result. Note that request results are kept in memory in a LRU cache whose size can be set with --coalescing-cache-size and --coalescing-cache-max-bytes.",
+        "action": "store_true",
+    },
+    {
+        "flag": "--coalescing-cache-size",
+        "help": "Maximum number of request results to keep in memory when using --coalesce-urls.",
+        "type": int,
+        "default": DEFAULT_COALESCING_CACHE_SIZE,
+    },
+    {
+        "flag": "--coalescing-cache-max-bytes",
+        "help": 'Maximum total size of the response bodies to keep in memory when using --coalesce-urls, e.g. "500MB". Larger responses are never kept. Does not apply to the "resolve" command.',
+        "type": FileSizeType(),
+        "default": "256MB",
+    },
+    {
+        "flag": "--connection-stats",
+        "help": "Whether to print statistics about connection reuse, new connections, TLS handshakes and evicted connection pools at the end of the run.",
+        "action": "store_true",
+    },
+    {
+        "flag": "--dns-cache",
+        "help": "Whether to keep hostname resolutions in an in-memory cache shared by all threads, instead of resolving hostnames each time a new connection is opened. Resolutions are kept for 5 minutes, and failed ones for 30 seconds.",
+        "action": "store_true",
+    },
+    {
+        "flag": "--dns-prefetch",
+        "help": "Whether to resolve the hostnames of upcoming urls in the background, ahead of the requests needing them. Implies --dns-cache.",
+        "action": "store_true",
+    },
 ]
 
 COMMON_IO_ARGUMENTS = [
@@ -101,7 +149,38 @@ COMMON_IO_ARGUMENTS = [
 ]
 
 
+def resolve_engine_arguments(cli_args):
+    if cli_args.dns_prefetch:
+        cli_args.dns_cache = True
+
+    if cli_args.dns_cache and getattr(cli_args, "pycurl", False):
+        raise InvalidArgumentsError("Cannot use --dns-cache with --pycurl!")
+
+    if cli_args.engine != "asyncio":
+        return
+
+    if getattr(cli_args, "pycurl", False):
+        raise InvalidArgumentsError("Cannot use --pycurl with the asyncio engine!")
+
+    if cli_args.connection_stats:
+        raise InvalidArgumentsError(
+            "--connection-stats is only available with the threads engine!"
+        )
+
+    if getattr(cli_args, "http_cache", None) is not None:
+        raise InvalidArgumentsError(
+            "--http-cache is only available with the threads engine!"
+        )
+
+    if cli_args.dns_cache or cli_args.dns_prefetch:
+        raise InvalidArgumentsError(
+            "--dns-cache and --dns-prefetch are only available with the threads engine!"
+        )
+
+
 def resolve_fetch_arguments(cli_args):
+    resolve_engine_arguments(cli_args)
+
     if cli_args.dont_save:
         cli_args.contents_in_report = False
 
@@ -110,6 +189,41 @@ def resolve_fetch_arguments(cli_args):
             "Cannot both --compress-on-disk and get --contents-in-report!"
         )
 
+    if cli_args.content_addressed:
+        if cli_args.filename_column is not None or cli_args.filename_template:
+            raise InvalidArgumentsError(
+                "Cannot use --content-addressed with -f/--filename-column nor --filename-template!"
+            )
+
+        if cli_args.dont_save or cli_args.contents_in_report:
+            raise InvalidArgumentsError(
+                "Cannot use --content-addressed if files are not written on disk!"
+            )
+
+    if cli_args.http_cache is not None and cli_args.pycurl:
+        raise InvalidArgumentsError("Cannot use --http-cache with --pycurl!")
+
+    if cli_args.warc:
+        if cli_args.sqlar or cli_args.compress_on_disk or cli_args.content_addressed:
+            raise InvalidArgumentsError(
+                "Cannot use --warc with --sqlar, -z/--compress-on-disk nor --content-addressed!"
+            )
+
+        if cli_args.filename_column is not None or cli_args.filename_template:
+            raise InvalidArgumentsError(
+                "Cannot use --warc with -f/--filename-column nor --filename-template!"
+            )
+
+        if cli_args.dont_save or cli_args.contents_in_report:
+            raise InvalidArgumentsError(
+                "Cannot use --warc if files are not written on disk!"
+            )
+
+    if cli_args.zstd and not cli_args.compress_on_disk and not cli_args.sqlar:
+        raise InvalidArgumentsError(
+            "--zstd can only be used with -z/--compress-on-disk or --sqlar!"
+        )
+
     # --sqlar disables --compress-on-disk
     if cli_args.sqlar:
         cli_args.compress_on_disk = False
@@ -141,6 +255,8 @@ FETCH_COMMAND = command(
         . "body_size": size of the downloaded document in bytes.
         . "body": if -c/--contents-in-report is set, will contain the
             downloaded text and the files won't be written to disk.
+        . "body_hash": if --content-addressed is set, will contain the sha256
+            hash of the downloaded file.
 
         --folder-strategy options:
 
@@ -185,6 +301,16 @@ FETCH_COMMAND = command(
             "help": "Whether to compress the contents.",
             "action": "store_true",
         },
+        {
+            "flag": "--max-body-size",
+            "help": 'Maximum size of a response body, e.g. "500KB" or "2GB". Larger responses will be aborted and reported with a "response-too-large" error.',
+            "type": FileSizeType(),
+        },
+        {
+            "flag": "--spool-bodies-over",
+            "help": 'Response bodies larger than this size, e.g. "10MB", will be spilled to a temporary file and streamed to their destination instead of being kept in memory.',
+            "type": FileSizeType(),
+        },
         {
             "flag": "--compress-transfer",
             "help": 'Whether to send a "Accept-Encoding" header asking for a compressed response. Usually better for bandwidth but at the cost of more CPU work.',
@@ -229,6 +355,31 @@ FETCH_COMMAND = command(
             "help": "Whether to write files into a single-file sqlite archive rather than as individual files on the disk.",
             "action": "store_true",
         },
+        {
+            "flag": "--warc",
+            "help": 'Whether to write the responses as request/response records in gzipped WARC files, rotated by size, rather than as individual files. A CDXJ index is written alongside each WARC file. The "path" column of the report will then read as "file.warc.gz#offset", which the scrape & extract commands understand.',
+            "action": "store_true",
+        },
+        {
+            "flag": "--warc-max-size",
+            "help": 'Size, e.g. "500MB", after which a new WARC file will be started when using --warc.',
+            "type": FileSizeType(),
+            "default": "1GB",
+        },
+        {
+            "flag": "--zstd",
+            "help": 'Whether to compress files using zstd, with dictionaries trained on the first files of each folder (e.g. per hostname when using --folder-strategy), rather than gzip. Only relevant with -z/--compress-on-disk or --sqlar, in which case the archive will not be readable by the sqlite3 command line anymore. Requires the "zstandard" package.',
+            "action": "store_true",
+        },
+        {
+            "flag": "--content-addressed",
+            "help": 'Whether to write downloaded files under a path derived from the sha256 hash of their contents, so that identical contents (e.g. soft 404 pages, consent walls etc.) are only written once. Adds a "body_hash" column to the report. Cannot be used with -f/--filename-column nor --filename-template.',
+            "action": "store_true",
+        },
+        {
+            "flag": "--http-cache",
+            "help": 'Path to a sqlite file that will be used to cache responses, so that subsequent runs can revalidate them using conditional requests (i.e. "If-None-Match" & "If-Modified-Since" headers) instead of downloading them again. Files that were not modified since the last run will not be written again if they already exist. Only available with the threads engine.',
+        },
     ],
 )
 
@@ -263,6 +414,7 @@ RESOLVE_COMMAND = command(
         . Resolving a single url:
             $ minet resolve https://lemonde.fr
     """,
+    resolve=resolve_engine_arguments,
     resumer=IndexedResumer,
     variadic_input={"dummy_column": "url"},
     arguments=[
@@ -298,6 +450,16 @@ RESOLVE_COMMAND = command(
             "help": "Whether to only attempt to resolve urls that are probably shortened.",
             "action": "store_true",
         },
+        {
+            "flag": "--resolve-cache",
+            "help": "Path to a SQLite file used to persist resolutions from one run to the other, so that urls already resolved recently are not resolved again. The file will be created if it does not exist.",
+        },
+        {
+            "flag": "--resolve-cache-ttl",
+            "help": "Number of days after which resolutions kept in --resolve-cache are considered stale and resolved again.",
+            "type": float,
+            "default": DEFAULT_RESOLVE_CACHE_TTL_IN_DAYS,
+        },
     ],
 )
 
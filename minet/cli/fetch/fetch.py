@@ -6,12 +6,13 @@
 # in the given column. This is done in a respectful multithreaded fashion to
 # optimize both running time & memory.
 #
-from typing import Optional, List, Union, TYPE_CHECKING
+from typing import Optional, List, Union, BinaryIO, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from minet.browser.threadsafe_browser import BrowserOrBrowserContext
 
 import casanova
+from ebbe import omit
 from casanova import TabularRecord
 from dataclasses import dataclass
 from datetime import datetime
@@ -33,11 +34,27 @@ from minet.headers import parse_http_header
 from minet.web import (
     Response,
     RedirectionStack,
+    ONE_DAY,
 )
-from minet.exceptions import InvalidURLError, FilenameFormattingError, HTTPCallbackError
+from minet.exceptions import (
+    InvalidURLError,
+    FilenameFormattingError,
+    HTTPCallbackError,
+    ResolveCacheInvalidError,
+    HTTPCacheInvalidError,
+    ZstdNotInstalledError,
+)
+from minet.resolve_cache import ResolveCache
+from minet.http_cache import HTTPCache
+from minet.warc import WARCWriter
 from minet.heuristics import should_spoof_ua_when_resolving
-from minet.cli.exceptions import InvalidArgumentsError
-from minet.cli.reporters import report_filename_formatting_error
+from minet.cli.exceptions import InvalidArgumentsError, FatalError
+from minet.cli.reporters import (
+    report_filename_formatting_error,
+    report_connection_stats,
+    report_resolve_cache_stats,
+    report_http_cache_stats,
+)
 from minet.cli.loading_bar import LoadingBar
 from minet.cli.utils import with_enricher_and_loading_bar, with_ctrl_c_warning
 
@@ -46,6 +63,8 @@ from minet.cli.utils import with_enricher_and_loading_bar, with_ctrl_c_warning
 class WorkerCallbackResult:
     path: Optional[str] = None
     decoded_contents: Optional[str] = None
+    body_hash: Optional[str] = None
+    deduplicated: bool = False
 
 
 @dataclass
@@ -82,6 +101,17 @@ class FetchAddendumWithBody(FetchAddendum):
         self.body = callback_result.decoded_contents if callback_result else None
 
 
+@dataclass
+class FetchAddendumWithHash(FetchAddendum):
+    body_hash: Optional[str] = None
+
+    def infos_from_response(
+        self, response: Response, callback_result: Optional[WorkerCallbackResult]
+    ) -> None:
+        super().infos_from_response(response, callback_result)
+        self.body_hash = callback_result.body_hash if callback_result else None
+
+
 @dataclass
 class ResolveAddendum(TabularRecord):
     resolved_url: Optional[str] = None
@@ -137,6 +167,9 @@ def get_headers(cli_args):
     if cli_args.contents_in_report:
         headers = FetchAddendumWithBody
 
+    elif cli_args.content_addressed:
+        headers = FetchAddendumWithHash
+
     return headers
 
 
@@ -250,16 +283,34 @@ def action(cli_args, enricher: casanova.IndexedEnricher, loading_bar: LoadingBar
     # Worker callback internals
     filename_builder = None
     file_writer = None
+    warc_writer = None
 
-    if not resolve:
+    # NOTE: the screenshot command does not have those flags
+    zstd = getattr(cli_args, "zstd", False)
+
+    if not resolve and getattr(cli_args, "warc", False):
+        warc_writer = WARCWriter(cli_args.output_dir, max_size=cli_args.warc_max_size)
+
+    elif not resolve:
         filename_builder = FilenameBuilder(
             folder_strategy=cli_args.folder_strategy,
             template=cli_args.filename_template,
+            compression="zstd" if zstd else "gzip",
         )
 
-        file_writer = ThreadSafeFileWriter(
-            cli_args.output_dir, sqlar=getattr(cli_args, "sqlar", False)
-        )
+        try:
+            file_writer = ThreadSafeFileWriter(
+                cli_args.output_dir,
+                sqlar=getattr(cli_args, "sqlar", False),
+                compression="zstd" if zstd else "gzip",
+            )
+        except ZstdNotInstalledError:
+            raise FatalError(
+                [
+                    'The --zstd flag requires the "zstandard" package!',
+                    "You can install it with: [info]pip install zstandard[/info]",
+                ]
+            )
 
     def worker_callback(
         item, url: str, response: Response
@@ -277,6 +328,44 @@ def action(cli_args, enricher: casanova.IndexedEnricher, loading_bar: LoadingBar
 
         addendum = WorkerCallbackResult()
 
+        # WARC output?
+        if warc_writer is not None:
+            location = warc_writer.write_response(response, method=http_method or "GET")
+            addendum.path = location.path
+
+            return addendum
+
+        # Decoding the response data?
+        # NOTE: spooled bodies are streamed to disk without being read in memory
+        data: Union[str, bytes, BinaryIO] = (
+            response.open_body() if response.is_spooled else response.body
+        )
+
+        if response.is_text and (
+            cli_args.standardize_encoding or cli_args.contents_in_report
+        ):
+            data = response.body.decode(response.likely_encoding, errors="replace")
+
+            if cli_args.contents_in_report:
+                addendum.decoded_contents = data
+
+        # Content-addressed storage?
+        if cli_args.content_addressed:
+            if len(response) == 0:
+                return addendum
+
+            assert file_writer is not None
+
+            blob = file_writer.write_blob(
+                data, ext=response.ext, compress=cli_args.compress_on_disk
+            )
+
+            addendum.path = blob.path
+            addendum.body_hash = blob.hash
+            addendum.deduplicated = blob.deduplicated
+
+            return addendum
+
         # First we need to build a filename
         filename_cell = row[filename_pos] if filename_pos is not None else None
 
@@ -297,22 +386,18 @@ def action(cli_args, enricher: casanova.IndexedEnricher, loading_bar: LoadingBar
 
         addendum.path = filename
 
-        # Decoding the response data?
-        data: Union[str, bytes] = response.body
-
-        if response.is_text and (
-            cli_args.standardize_encoding or cli_args.contents_in_report
-        ):
-            data = response.body.decode(response.likely_encoding, errors="replace")
-
-            if cli_args.contents_in_report:
-                addendum.decoded_contents = data
-
         # Writing the file?
         # TODO: specify what should happen when contents are empty (e.g. POST queries)
-        if data and not cli_args.contents_in_report:
+        if len(response) > 0 and not cli_args.contents_in_report:
             assert file_writer is not None
 
+            # NOTE: no need to write again a file that did not change
+            if response.cache_status in (
+                "hit",
+                "revalidated",
+            ) and file_writer.exists(filename, compress=cli_args.compress_on_disk):
+                return addendum
+
             file_writer.write(filename, data, compress=cli_args.compress_on_disk)
 
         return addendum
@@ -347,25 +432,82 @@ def action(cli_args, enricher: casanova.IndexedEnricher, loading_bar: LoadingBar
         "max_redirects": getattr(cli_args, "max_redirects", None),
     }
 
+    if getattr(cli_args, "coalesce_urls", False):
+        common_http_imap_kwargs["coalesce"] = True
+        common_http_imap_kwargs["coalescing_cache_size"] = (
+            cli_args.coalescing_cache_size
+        )
+
+    if getattr(cli_args, "dns_cache", False):
+        common_http_executor_kwargs["dns_cache"] = True
+
+        if cli_args.dns_prefetch:
+            common_http_imap_kwargs["dns_prefetch"] = True
+
     if cli_args.timeout is not None:
         common_http_executor_kwargs["timeout"] = cli_args.timeout
 
+    def create_http_executor():
+        if cli_args.engine != "asyncio":
+            return HTTPThreadPoolExecutor(**common_http_executor_kwargs)
+
+        from minet.async_executors import AsyncHTTPExecutor
+
+        async_executor_kwargs = omit(
+            common_http_executor_kwargs, ["max_workers", "wait", "daemonic"]
+        )
+
+        return AsyncHTTPExecutor(
+            max_concurrency=cli_args.max_concurrency, **async_executor_kwargs
+        )
+
+    def executor_title(executor) -> str:
+        if cli_args.engine == "asyncio":
+            return "(c=%i)" % executor.max_concurrency
+
+        return "(t=%i)" % executor.max_workers
+
     # Normal fetch
     if cli_args.action == "fetch":
-        Addendum = (
-            FetchAddendum if not cli_args.contents_in_report else FetchAddendumWithBody
-        )
+        Addendum = get_headers(cli_args)
 
-        with HTTPThreadPoolExecutor(**common_http_executor_kwargs) as executor:
-            loading_bar.append_to_title(" (t=%i)" % executor.max_workers)
+        request_kwargs = {}
+
+        if cli_args.pycurl:
+            request_kwargs["use_pycurl"] = True
+
+        if cli_args.coalesce_urls:
+            request_kwargs["coalescing_cache_max_bytes"] = (
+                cli_args.coalescing_cache_max_bytes
+            )
+
+        http_cache = None
+
+        if cli_args.http_cache is not None:
+            try:
+                http_cache = HTTPCache(cli_args.http_cache)
+            except HTTPCacheInvalidError:
+                raise FatalError(
+                    [
+                        "Given --http-cache file is not a valid http cache!",
+                        "Are you sure this file was created by minet fetch or minet crawl?",
+                    ]
+                )
+
+            request_kwargs["cache"] = http_cache
+
+        with create_http_executor() as executor:
+            loading_bar.append_to_title(" " + executor_title(executor))
 
             for result, callback_result in executor.request(
                 enricher,
                 request_args=request_args,
                 callback=worker_callback,
                 passthrough=True,
-                use_pycurl=cli_args.pycurl,
                 compressed=cli_args.compress_transfer,
+                max_body_size=cli_args.max_body_size,
+                spool_body_over=cli_args.spool_bodies_over,
+                **request_kwargs,
                 **common_http_imap_kwargs,
             ):
                 with loading_bar.step():
@@ -387,6 +529,14 @@ def action(cli_args, enricher: casanova.IndexedEnricher, loading_bar: LoadingBar
                             str(status), style=get_style_for_status(status)
                         )
 
+                        if response.cache_status is not None:
+                            loading_bar.inc_stat(
+                                "cache-" + response.cache_status, style="info"
+                            )
+
+                        if callback_result is not None and callback_result.deduplicated:
+                            loading_bar.inc_stat("deduplicated", style="info")
+
                         addendum.infos_from_response(response, callback_result)
                         enricher.writerow(index, row, addendum)
 
@@ -412,10 +562,38 @@ def action(cli_args, enricher: casanova.IndexedEnricher, loading_bar: LoadingBar
 
                         enricher.writerow(index, row, addendum)
 
+            if cli_args.connection_stats:
+                loading_bar.print(report_connection_stats(executor.connection_stats()))
+
+        if http_cache is not None:
+            loading_bar.print(report_http_cache_stats(http_cache))
+            http_cache.close()
+
+        if file_writer is not None:
+            file_writer.close()
+
+        if warc_writer is not None:
+            warc_writer.close()
+
     # Resolve
     elif cli_args.action == "resolve":
-        with HTTPThreadPoolExecutor(**common_http_executor_kwargs) as executor:
-            loading_bar.append_to_title("(t=%i)" % executor.max_workers)
+        resolve_cache = None
+
+        if cli_args.resolve_cache is not None:
+            try:
+                resolve_cache = ResolveCache(
+                    cli_args.resolve_cache, ttl=cli_args.resolve_cache_ttl * ONE_DAY
+                )
+            except ResolveCacheInvalidError:
+                raise FatalError(
+                    [
+                        "Given --resolve-cache file is not a valid resolve cache!",
+                        "Are you sure this file was created by minet resolve?",
+                    ]
+                )
+
+        with create_http_executor() as executor:
+            loading_bar.append_to_title(executor_title(executor))
 
             for result in executor.resolve(
                 enricher,
@@ -424,6 +602,7 @@ def action(cli_args, enricher: casanova.IndexedEnricher, loading_bar: LoadingBar
                 follow_js_relocation=cli_args.follow_js_relocation,
                 infer_redirection=cli_args.infer_redirection,
                 canonicalize=cli_args.canonicalize,
+                cache=resolve_cache,
                 passthrough=True,
                 **common_http_imap_kwargs,
             ):
@@ -459,6 +638,13 @@ def action(cli_args, enricher: casanova.IndexedEnricher, loading_bar: LoadingBar
                         addendum.resolution_error = result.error_code
                         enricher.writerow(index, row, addendum)
 
+            if cli_args.connection_stats:
+                loading_bar.print(report_connection_stats(executor.connection_stats()))
+
+        if resolve_cache is not None:
+            loading_bar.print(report_resolve_cache_stats(resolve_cache))
+            resolve_cache.close()
+
     # Screenshot
     elif cli_args.action == "screenshot":
         from playwright.async_api import (
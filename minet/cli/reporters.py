@@ -131,3 +131,28 @@ def report_filename_formatting_error(error):
     return "> error when formatting filename using: [cyan]{template}[/cyan]".format(
         template=error.template
     )
+
+
+def report_resolve_cache_stats(cache):
+    return "> resolve cache: [green]{hits}[/green] hits, [yellow]{misses}[/yellow] misses".format(
+        hits=cache.hits, misses=cache.misses
+    )
+
+
+def report_http_cache_stats(cache):
+    return "> http cache: [green]{hit}[/green] hits, [cyan]{revalidated}[/cyan] revalidated, [yellow]{miss}[/yellow] misses".format(
+        **cache.stats
+    )
+
+
+def report_connection_stats(stats):
+    report = "> connections: [cyan]{requests}[/cyan] requests, [green]{reused_connections}[/green] reused, [yellow]{new_connections}[/yellow] new ({handshakes} TLS handshakes), {evictions} evicted pools, {coalesced} coalesced requests".format(
+        **stats
+    )
+
+    if stats.get("dns_hits") or stats.get("dns_misses"):
+        report += "\n> dns: [green]{dns_hits}[/green] cached, [yellow]{dns_misses}[/yellow] resolved ({dns_prefetched} prefetched), {dns_time:.2f}s spent resolving".format(
+            **stats
+        )
+
+    return report
@@ -92,6 +92,10 @@ SCRAPE_COMMAND = command(
         . Working on a fetch report from stdin (mind the `-`):
             $ minet fetch url file.csv | minet scrape scraper.yml -i - -I downloaded > scraped.csv
 
+        . Scraping pages stored in WARC files (e.g. written by `minet fetch --warc`)
+          using their CDXJ indices to find them by url:
+            $ minet scrape scraper.yml -i urls.csv --url-column url -I downloaded > scraped.csv
+
         . Yielding items as newline-delimited JSON (jsonl):
             $ minet scrape scraper.yml -i report.csv --format jsonl > scraped.jsonl
 
@@ -184,6 +188,12 @@ SCRAPE_COMMAND = command(
             "help": "Separator use to join lists of values when serializing to CSV.",
             "default": "|",
         },
+        {
+            "flag": "--backend",
+            "help": 'Backend used to parse the html files. "lxml" is a lot faster but elements only expose minet\'s own Tag API to python scrapers and it requires the "cssselect" package. Does not apply to builtin scrapers.',
+            "choices": ["bs4", "lxml"],
+            "default": "bs4",
+        },
         {
             "flag": "--strain",
             "help": "Optional CSS selector used to strain, i.e. only parse matched tags in the parsed html files in order to optimize performance.",
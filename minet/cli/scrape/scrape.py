@@ -29,6 +29,7 @@ from minet.exceptions import (
 from minet.scrape.exceptions import (
     InvalidScraperError,
     CSSSelectorTooComplex,
+    CssselectNotInstalledError,
     ScraperEvalError,
     ScraperEvalTypeError,
     ScraperEvalNoneError,
@@ -123,13 +124,19 @@ def action(cli_args):
     try:
         if cli_args.module:
             fn = import_target(cli_args.scraper, default="scrape")
-            scraper = FunctionScraper(fn, strain=cli_args.strain)
+            scraper = FunctionScraper(
+                fn, strain=cli_args.strain, backend=cli_args.backend
+            )
         elif cli_args.eval:
-            scraper = FunctionScraper(cli_args.scraper, strain=cli_args.strain)
+            scraper = FunctionScraper(
+                cli_args.scraper, strain=cli_args.strain, backend=cli_args.backend
+            )
         elif cli_args.scraper in NAMED_SCRAPERS:
             scraper = NAMED_SCRAPERS[cli_args.scraper]()
         else:
-            scraper = DefinitionScraper(cli_args.scraper, strain=cli_args.strain)
+            scraper = DefinitionScraper(
+                cli_args.scraper, strain=cli_args.strain, backend=cli_args.backend
+            )
 
     except GenericModuleNotFoundError:
         raise FatalError(
@@ -159,6 +166,14 @@ def action(cli_args):
     except FileNotFoundError:
         raise FatalError("Could not find scraper file!")
 
+    except CssselectNotInstalledError:
+        raise FatalError(
+            [
+                'The lxml backend requires the "cssselect" package!',
+                "You can install it with: [info]pip install cssselect[/info]",
+            ]
+        )
+
     except InvalidScraperError as error:
         raise FatalError(
             [
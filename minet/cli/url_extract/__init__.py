@@ -1,4 +1,9 @@
-from minet.cli.argparse import command, InputAction
+from minet.cli.argparse import (
+    command,
+    InputAction,
+    URL_PROCESSING_PROCESSES_ARGUMENT,
+    URL_PROCESSING_CHUNK_SIZE_ARGUMENT,
+)
 
 URL_EXTRACT_COMMAND = command(
     "url-extract",
@@ -29,5 +34,7 @@ URL_EXTRACT_COMMAND = command(
             "choices": ["text", "html"],
             "default": "text",
         },
+        URL_PROCESSING_PROCESSES_ARGUMENT,
+        URL_PROCESSING_CHUNK_SIZE_ARGUMENT,
     ],
 )
@@ -6,7 +6,10 @@
 #
 from ural import urls_from_text, urls_from_html
 from urllib.parse import urljoin
+from functools import partial
+from operator import itemgetter
 
+from minet.multiprocessing import LazyPool, imap_chunks
 from minet.cli.utils import with_enricher_and_loading_bar
 
 REPORT_HEADERS = ["extracted_url"]
@@ -14,21 +17,42 @@ REPORT_HEADERS = ["extracted_url"]
 EXTRACTORS = {"html": urls_from_html, "text": urls_from_text}
 
 
-@with_enricher_and_loading_bar(
-    headers=REPORT_HEADERS, title="Extracting urls", unit="docs"
-)
-def action(cli_args, enricher, loading_bar):
-    extract = EXTRACTORS[getattr(cli_args, "from")]
+def extract_urls(options, content):
+    content = content.strip()
+
+    if not content:
+        return []
+
+    urls = []
 
-    for row, content in enricher.cells(cli_args.column, with_rows=True):
-        with loading_bar.step():
-            content = content.strip()
+    for url in EXTRACTORS[options["from"]](content):
+        if options["base_url"] is not None:
+            url = urljoin(options["base_url"], url)
 
-            if not content:
-                continue
+        urls.append(url)
 
-            for url in extract(content):
-                if cli_args.base_url is not None:
-                    url = urljoin(cli_args.base_url, url)
+    return urls
 
-                enricher.writerow(row, [url])
+
+@with_enricher_and_loading_bar(
+    headers=REPORT_HEADERS, title="Extracting urls", unit="docs"
+)
+def action(cli_args, enricher, loading_bar):
+    options = {"from": getattr(cli_args, "from"), "base_url": cli_args.base_url}
+
+    pool = LazyPool(cli_args.processes)
+
+    if pool.actually_multiprocessed:
+        loading_bar.append_to_title(" (p=%i)" % pool.processes)
+
+    with pool:
+        for (row, _), urls in imap_chunks(
+            pool,
+            partial(extract_urls, options),
+            enricher.cells(cli_args.column, with_rows=True),
+            chunk_size=cli_args.chunk_size,
+            key=itemgetter(1),
+        ):
+            with loading_bar.step():
+                for url in urls:
+                    enricher.writerow(row, [url])
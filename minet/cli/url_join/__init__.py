@@ -1,4 +1,9 @@
-from minet.cli.argparse import command, InputAction
+from minet.cli.argparse import (
+    command,
+    InputAction,
+    URL_PROCESSING_PROCESSES_ARGUMENT,
+    URL_PROCESSING_CHUNK_SIZE_ARGUMENT,
+)
 
 URL_JOIN_COMMAND = command(
     "url-join",
@@ -52,5 +57,12 @@ URL_JOIN_COMMAND = command(
             "default": "",
         },
         {"flag": "--separator", "help": "Split indexed url column by a separator?"},
+        # NOTE: -p is already taken by --match-column-prefix
+        {
+            **URL_PROCESSING_PROCESSES_ARGUMENT,
+            "flags": ["--processes"],
+            "help": "Number of processes to use when matching the second file's urls. Output order is kept whatever the number of processes.",
+        },
+        URL_PROCESSING_CHUNK_SIZE_ARGUMENT,
     ],
 )
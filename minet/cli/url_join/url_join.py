@@ -4,15 +4,48 @@
 #
 # Logic of the `url-join` action.
 #
+from typing import Optional, List, Tuple
+
 import casanova
+from operator import itemgetter
 from ural.lru import NormalizedLRUTrie
 from ebbe import format_int
 
+from minet.multiprocessing import LazyPool, imap_chunks
 from minet.cli.console import console
 from minet.cli.loading_bar import LoadingBar
 
 
+TRIE: Optional[NormalizedLRUTrie] = None
+
+
+# NOTE: tries cannot be pickled faithfully, so processes index the urls again
+def init_process(entries: List[Tuple[str, List[str]]]):
+    global TRIE
+
+    TRIE = NormalizedLRUTrie()
+
+    for url, row in entries:
+        TRIE.set(url, row)
+
+
+def match_url(url: str) -> Tuple[Optional[List[str]], bool]:
+    assert TRIE is not None
+
+    url = url.strip()
+
+    if not url:
+        return None, False
+
+    try:
+        return TRIE.match(url), False
+    except Exception:
+        return None, True
+
+
 def action(cli_args):
+    global TRIE
+
     left_reader = casanova.reader(cli_args.input1)
     left_headers = left_reader.fieldnames
     left_idx = None
@@ -34,6 +67,8 @@ def action(cli_args):
 
     # First step is to index left file
     trie = NormalizedLRUTrie()
+    entries = []
+    multiprocessed = cli_args.processes > 1
 
     with LoadingBar(
         title="Indexing first file", unit="lines", total=left_reader.total
@@ -60,25 +95,41 @@ def action(cli_args):
                         loading_bar.inc_stat("invalid-url", style="error")
                         continue
 
+                    if multiprocessed:
+                        entries.append((url, row))
+
     console.print("Indexed [cyan]{}[/cyan] prefixes.\n".format(format_int(len(trie))))
 
-    with LoadingBar(
-        title="Matching lines in second file", unit="lines", total=right_enricher.total
-    ) as loading_bar:
-        for row, url in right_enricher.cells(cli_args.column2, with_rows=True):
-            with loading_bar.step():
-                url = url.strip()
+    TRIE = trie
 
-                match = None
+    pool = LazyPool(
+        cli_args.processes,
+        initializer=init_process if multiprocessed else None,
+        initargs=(entries,),
+    )
 
-                if url:
-                    try:
-                        match = trie.match(url)
-                    except Exception:
+    with pool:
+        with LoadingBar(
+            title="Matching lines in second file",
+            unit="lines",
+            total=right_enricher.total,
+        ) as loading_bar:
+            if multiprocessed:
+                loading_bar.append_to_title(" (p=%i)" % pool.processes)
+
+            for (row, _), (match, invalid) in imap_chunks(
+                pool,
+                match_url,
+                right_enricher.cells(cli_args.column2, with_rows=True),
+                chunk_size=cli_args.chunk_size,
+                key=itemgetter(1),
+            ):
+                with loading_bar.step():
+                    if invalid:
                         loading_bar.inc_stat("invalid-url", style="error")
 
-                if match is None:
-                    right_enricher.writerow(row)
-                    continue
+                    if match is None:
+                        right_enricher.writerow(row)
+                        continue
 
-                right_enricher.writerow(row, match)
+                    right_enricher.writerow(row, match)
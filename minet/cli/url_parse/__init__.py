@@ -1,6 +1,11 @@
 from argparse import Action
 
-from minet.cli.argparse import command, BooleanAction
+from minet.cli.argparse import (
+    command,
+    BooleanAction,
+    URL_PROCESSING_PROCESSES_ARGUMENT,
+    URL_PROCESSING_CHUNK_SIZE_ARGUMENT,
+)
 
 
 class UrlFragmentAction(Action):
@@ -98,6 +103,9 @@ URL_PARSE_COMMAND = command(
 
         . Parsing Twitter urls:
             $ minet url-parse url -i tweets.csv --twitter > report.csv
+
+        . Parsing urls using 8 processes:
+            $ minet url-parse url -i posts.csv -p 8 > report.csv
     """,
     variadic_input={"dummy_column": "url", "item_label": "url"},
     arguments=[
@@ -229,5 +237,7 @@ URL_PARSE_COMMAND = command(
             "help": "Whether url parsing should know about some specific platform such as Facebook, YouTube etc. into account when normalizing urls. Note that this is different than activating --facebook or --youtube.",
             "action": "store_true",
         },
+        URL_PROCESSING_PROCESSES_ARGUMENT,
+        URL_PROCESSING_CHUNK_SIZE_ARGUMENT,
     ],
 )
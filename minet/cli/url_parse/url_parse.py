@@ -4,6 +4,10 @@
 #
 # Logic of the `url-parse` action.
 #
+from argparse import Namespace
+from functools import partial
+from operator import itemgetter
+
 from ural import (
     is_url,
     is_shortened_url,
@@ -40,6 +44,7 @@ from ural.youtube import (
 )
 from ural.twitter import parse_twitter_url, TwitterTweet, TwitterUser
 
+from minet.multiprocessing import LazyPool, imap_chunks
 from minet.cli.utils import with_enricher_and_loading_bar
 
 REPORT_HEADERS = [
@@ -195,27 +200,60 @@ def get_headers(cli_args):
     return REPORT_HEADERS
 
 
+# NOTE: cli_args cannot be pickled, so we only send the relevant options to
+# the processes
+OPTION_NAMES = [
+    "facebook",
+    "youtube",
+    "twitter",
+    "infer_redirection",
+    "fix_common_mistakes",
+    "normalize_amp",
+    "quoted",
+    "sort_query",
+    "strip_authentication",
+    "strip_fragment",
+    "strip_index",
+    "strip_irrelevant_subdomains",
+    "strip_protocol",
+    "strip_trailing_slash",
+    "strip_suffix",
+    "platform_aware",
+]
+
+
+def parse_url(options, url):
+    url = url.strip()
+
+    if not is_url(url, allow_spaces_in_path=True, require_protocol=False):
+        return None
+
+    if options.facebook:
+        return extract_facebook_addendum(url)
+    elif options.youtube:
+        return extract_youtube_addendum(url)
+    elif options.twitter:
+        return extract_twitter_addendum(url)
+
+    return extract_standard_addendum(options, url)
+
+
 @with_enricher_and_loading_bar(headers=get_headers, title="Parsing", unit="urls")
 def action(cli_args, enricher, loading_bar):
-    for row, url in enricher.cells(cli_args.column, with_rows=True):
-        with loading_bar.step():
-            url = url.strip()
-
-            if not is_url(url, allow_spaces_in_path=True, require_protocol=False):
-                enricher.writerow(row)
-                continue
-
-            if cli_args.facebook:
-                addendum = extract_facebook_addendum(url)
-            elif cli_args.youtube:
-                addendum = extract_youtube_addendum(url)
-            elif cli_args.twitter:
-                addendum = extract_twitter_addendum(url)
-            else:
-                addendum = extract_standard_addendum(cli_args, url)
-
-            if addendum is None:
-                enricher.writerow(row)
-                continue
-
-            enricher.writerow(row, addendum)
+    options = Namespace(**{name: getattr(cli_args, name) for name in OPTION_NAMES})
+
+    pool = LazyPool(cli_args.processes)
+
+    if pool.actually_multiprocessed:
+        loading_bar.append_to_title(" (p=%i)" % pool.processes)
+
+    with pool:
+        for (row, _), addendum in imap_chunks(
+            pool,
+            partial(parse_url, options),
+            enricher.cells(cli_args.column, with_rows=True),
+            chunk_size=cli_args.chunk_size,
+            key=itemgetter(1),
+        ):
+            with loading_bar.step():
+                enricher.writerow(row, addendum)
@@ -26,6 +26,7 @@ from types import SimpleNamespace
 
 from minet.crawl import CrawlerState
 from minet.encodings import is_supported_encoding
+from minet.warc import WARCIndex
 from minet.cli.console import console
 from minet.cli.loading_bar import LoadingBar, StatsItem
 from minet.cli.exceptions import FatalError
@@ -204,16 +205,20 @@ def create_fetch_like_report_iterator(
     body_pos = headers.get(cli_args.body_column)
     url_pos = headers.get(url_column) if url_column is not None else None
 
+    # NOTE: lazily loaded, if the input dir contains WARC files indices
+    warc_index = None
+
     for i, row in reader.enumerate():
         item = FetchReportLikeItem(index=i, row=row)
 
         item.url = getattr(cli_args, "base_url", None)
+        row_url = None
 
         if url_pos is not None:
-            url = get(row, url_pos, "").strip()
+            row_url = get(row, url_pos, "").strip()
 
-            if url:
-                item.url = url
+            if row_url:
+                item.url = row_url
 
         if error_pos is not None:
             error = get(row, error_pos, "").strip()
@@ -254,6 +259,19 @@ def create_fetch_like_report_iterator(
             if body is not None:
                 item.text = body
 
+        # Random access to WARC records by url
+        if item.path is None and item.text is None and row_url:
+            if warc_index is None:
+                warc_index = (
+                    WARCIndex(input_dir) if WARCIndex.exists(input_dir) else False
+                )
+
+            if warc_index:
+                entry = warc_index.get(row_url)
+
+                if entry is not None:
+                    item.path = join(input_dir, entry.path)
+
         if item.path is None and item.text is None:
             item.error = "no-path-nor-body"
             yield item
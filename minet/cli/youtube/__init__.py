@@ -15,6 +15,9 @@ from minet.cli.argparse import (
 from minet.youtube.constants import (
     YOUTUBE_API_DEFAULT_SEARCH_ORDER,
     YOUTUBE_API_SEARCH_ORDERS,
+    YOUTUBE_API_DEFAULT_DAILY_QUOTA,
+    YOUTUBE_API_DEFAULT_PER_KEY_PARALLELISM,
+    YOUTUBE_API_DEFAULT_QUOTA_FILE,
 )
 
 KEY_ARGUMENT = {
@@ -26,9 +29,42 @@ KEY_ARGUMENT = {
     "required": True,
 }
 
+QUOTA_ARGUMENTS = [
+    {
+        "flag": "--quota-file",
+        "help": "Path of the JSON file where the quota consumed by each key is persisted, every few calls & on exit, until the quotas are reset at midnight Pacific time, so that it is not lost between runs. Give an empty string to disable persistence.",
+        "rc_key": ["youtube", "quota_file"],
+        "action": ConfigAction,
+        "default": YOUTUBE_API_DEFAULT_QUOTA_FILE,
+    },
+    {
+        "flag": "--daily-quota",
+        "help": "Number of quota units each key is expected to be granted per day. This is only used to spread calls across keys, since the quota consumption is estimated locally: a key is only considered exhausted when the API reports it as such, so keys granted a quota extension are not throttled.",
+        "rc_key": ["youtube", "daily_quota"],
+        "action": ConfigAction,
+        "type": int,
+        "default": YOUTUBE_API_DEFAULT_DAILY_QUOTA,
+    },
+    {
+        "flag": "--per-key-parallelism",
+        "help": "Maximum number of concurrent calls using the same key.",
+        "type": int,
+        "default": YOUTUBE_API_DEFAULT_PER_KEY_PARALLELISM,
+    },
+]
+
+THREADS_ARGUMENT = {
+    "flags": ["-t", "--threads"],
+    "help": "Maximum number of API calls to perform concurrently. Calls are spread across the given keys, without exceeding --per-key-parallelism concurrent calls per key.",
+    "type": int,
+    "default": 1,
+}
+
 
 def youtube_api_subcommand(*args, arguments=[], **kwargs):
-    return command(*args, arguments=arguments + [KEY_ARGUMENT], **kwargs)
+    return command(
+        *args, arguments=arguments + [KEY_ARGUMENT] + QUOTA_ARGUMENTS, **kwargs
+    )
 
 
 YOUTUBE_CAPTIONS_SUBCOMMAND = command(
@@ -140,20 +176,33 @@ YOUTUBE_CHANNELS_SUBCOMMAND = youtube_api_subcommand(
             $ minet youtube channels channel_url -i channels_url.csv -k my-api-key > channels.csv
     """,
     variadic_input={"dummy_column": "channel"},
+    arguments=[THREADS_ARGUMENT],
 )
 
 YOUTUBE_COMMENTS_SUBCOMMAND = youtube_api_subcommand(
     "comments",
     "minet.cli.youtube.comments",
     title="YouTube comments",
-    description="Retrieve metadata about YouTube comments using the API.",
+    description="""
+        Retrieve metadata about YouTube comments using the API.
+
+        The comment threads & reply pages of several videos are fetched
+        concurrently when using more than one thread, in which case the
+        comments of different videos may be interleaved in the output.
+        The comments of a given video are always complete, including all
+        the replies of its comment threads.
+    """,
     epilog="""
         Examples:
 
         . Fetching a video's comments:
             $ minet yt comments https://www.youtube.com/watch?v=7JTb2vf1OQQ -k my-api-key > comments.csv
+
+        . Fetching the comments of many videos concurrently, using two keys:
+            $ minet yt comments video_id -i videos.csv -k key1 -k key2 -t 8 > comments.csv
     """,
     variadic_input={"dummy_column": "video"},
+    arguments=[THREADS_ARGUMENT],
 )
 
 YOUTUBE_SEARCH_SUBCOMMAND = youtube_api_subcommand(
@@ -193,7 +242,14 @@ YOUTUBE_VIDEOS_SUBCOMMAND = youtube_api_subcommand(
     "minet.cli.youtube.videos",
     title="YouTube videos",
     description="Retrieve metadata about YouTube videos using the API.",
+    epilog="""
+        Examples:
+
+        . Fetching videos metadata using two keys and 8 threads:
+            $ minet yt videos video_id -i videos.csv -k key1 -k key2 -t 8 > metadata.csv
+    """,
     variadic_input={"dummy_column": "video"},
+    arguments=[THREADS_ARGUMENT],
 )
 
 YOUTUBE_COMMAND = command(
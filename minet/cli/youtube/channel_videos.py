@@ -6,7 +6,7 @@
 # the given Youtube channels using Google's APIs.
 #
 from minet.cli.utils import with_enricher_and_loading_bar
-from minet.youtube import YouTubeAPIClient
+from minet.cli.youtube.utils import get_api_client
 from minet.youtube.types import YouTubePlaylistVideoSnippet
 from minet.youtube.exceptions import YouTubeNotFoundError
 
@@ -19,7 +19,7 @@ from minet.youtube.exceptions import YouTubeNotFoundError
     nested=True,
 )
 def action(cli_args, enricher, loading_bar):
-    client = YouTubeAPIClient(cli_args.key)
+    client = get_api_client(cli_args)
 
     for row, channel_id in enricher.cells(cli_args.column, with_rows=True):
         with loading_bar.step(channel_id):
@@ -4,50 +4,58 @@
 #
 # Action retrieving the comments of YouTube videos using the API.
 #
+from operator import itemgetter
+
 from minet.cli.utils import with_enricher_and_loading_bar
-from minet.youtube import YouTubeAPIClient
+from minet.cli.youtube.utils import get_api_client
 from minet.youtube.types import YouTubeComment
 from minet.youtube.exceptions import (
     YouTubeDisabledCommentsError,
     YouTubeNotFoundError,
     YouTubeExclusiveMemberError,
     YouTubeUnknown403Error,
+    YouTubeInvalidVideoTargetError,
 )
 
+ERROR_STATS = {
+    YouTubeDisabledCommentsError: "disabled",
+    YouTubeNotFoundError: "not-found",
+    YouTubeExclusiveMemberError: "exclusive-member",
+    YouTubeUnknown403Error: "403",
+    YouTubeInvalidVideoTargetError: "invalid-video",
+}
+
 
 @with_enricher_and_loading_bar(
     headers=YouTubeComment,
     title="Collecting video comments",
     unit="videos",
-    sub_unit="comments",
-    nested=True,
     stats=[
+        {"name": "comments", "style": "success"},
         {"name": "disabled", "style": "warning"},
         {"name": "not-found", "style": "error"},
         {"name": "exclusive-member", "style": "warning"},
         {"name": "403", "style": "error"},
+        {"name": "invalid-video", "style": "error"},
     ],
 )
 def action(cli_args, enricher, loading_bar):
-    client = YouTubeAPIClient(cli_args.key)
+    client = get_api_client(cli_args, threads=cli_args.threads)
 
-    for row, video in enricher.cells(cli_args.column, with_rows=True):
-        with loading_bar.step(video):
-            generator = client.comments(video)
+    iterator = enricher.cells(cli_args.column, with_rows=True)
 
-            try:
-                for comment in generator:
-                    enricher.writerow(row, comment)
-                    loading_bar.nested_advance()
+    # NOTE: comments of different videos are written as they arrive, and
+    # will therefore be interleaved when using more than one thread
+    for batch in client.comments_from_videos(iterator, key=itemgetter(1)):
+        row, _ = batch.item
 
-            except YouTubeDisabledCommentsError:
-                loading_bar.inc_stat("disabled")
+        for comment in batch.comments:
+            enricher.writerow(row, comment)
 
-            except YouTubeNotFoundError:
-                loading_bar.inc_stat("not-found")
+        loading_bar.inc_stat("comments", count=len(batch.comments))
 
-            except YouTubeExclusiveMemberError:
-                loading_bar.inc_stat("exclusive-member")
+        if batch.error is not None:
+            loading_bar.inc_stat(ERROR_STATS[type(batch.error)])
 
-            except YouTubeUnknown403Error:
-                loading_bar.inc_stat("403")
+        if batch.done:
+            loading_bar.advance()
@@ -7,7 +7,7 @@
 from itertools import islice
 
 from minet.cli.utils import with_enricher_and_loading_bar
-from minet.youtube import YouTubeAPIClient
+from minet.cli.youtube.utils import get_api_client
 from minet.youtube.types import YouTubeVideoSnippet
 
 
@@ -19,7 +19,7 @@ from minet.youtube.types import YouTubeVideoSnippet
     nested=True,
 )
 def action(cli_args, enricher, loading_bar):
-    client = YouTubeAPIClient(cli_args.key)
+    client = get_api_client(cli_args)
 
     for row, query in enricher.cells(cli_args.column, with_rows=True):
         with loading_bar.step(query):
@@ -0,0 +1,15 @@
+from os.path import expanduser
+
+from minet.youtube import YouTubeAPIClient
+
+
+def get_api_client(cli_args, **kwargs) -> YouTubeAPIClient:
+    quota_path = expanduser(cli_args.quota_file) if cli_args.quota_file else None
+
+    return YouTubeAPIClient(
+        cli_args.key,
+        per_key_parallelism=cli_args.per_key_parallelism,
+        daily_quota=cli_args.daily_quota,
+        quota_path=quota_path,
+        **kwargs,
+    )
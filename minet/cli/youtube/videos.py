@@ -8,7 +8,7 @@
 from operator import itemgetter
 
 from minet.cli.utils import with_enricher_and_loading_bar
-from minet.youtube import YouTubeAPIClient
+from minet.cli.youtube.utils import get_api_client
 from minet.youtube.types import YouTubeVideo
 
 
@@ -16,7 +16,7 @@ from minet.youtube.types import YouTubeVideo
     headers=YouTubeVideo, title="Retrieving videos", unit="videos"
 )
 def action(cli_args, enricher, loading_bar):
-    client = YouTubeAPIClient(cli_args.key)
+    client = get_api_client(cli_args, threads=cli_args.threads)
 
     iterator = enricher.cells(cli_args.column, with_rows=True)
 
@@ -13,7 +13,31 @@ REDIRECT_STATUSES = set(HTTPResponse.REDIRECT_STATUSES)
 # Fetch-related
 DEFAULT_DOMAIN_PARALLELISM = 1
 DEFAULT_IMAP_BUFFER_SIZE = 1024
+DEFAULT_POOL_MANAGER_NUM_POOLS = 256
+DEFAULT_ASYNC_MAX_CONCURRENCY = 512
 DEFAULT_THROTTLE = 0.2
+DEFAULT_COALESCING_CACHE_SIZE = 4096
+DEFAULT_COALESCING_CACHE_MAX_BYTES = 256 * 1024**2
+DEFAULT_RESOLVE_CACHE_TTL_IN_DAYS = 30
+DEFAULT_RESOLVE_CACHE_TTL = DEFAULT_RESOLVE_CACHE_TTL_IN_DAYS * 24 * 60 * 60
+DEFAULT_SQLAR_BATCH_SIZE = 256
+DEFAULT_SQLAR_QUEUE_SIZE = 1024
+DEFAULT_ZSTD_LEVEL = 3
+DEFAULT_ZSTD_DICTIONARY_SIZE = 64 * 1024
+DEFAULT_ZSTD_TRAINING_SAMPLES = 100
+DEFAULT_ZSTD_TRAINING_SAMPLE_SIZE = 16 * 1024
+DEFAULT_ZSTD_MAX_TRAINING_GROUPS = 128
+DEFAULT_ZSTD_MAX_TRAINING_BYTES = 64 * 1024**2
+DEFAULT_WARC_MAX_SIZE = 1024**3
+DEFAULT_WARC_PREFIX = "minet"
+
+DEFAULT_ENCODING_SNIFF_SIZE = 4096
+DEFAULT_ENCODING_SAMPLE_SIZE = 64 * 1024
+DEFAULT_DNS_CACHE_TTL = 5 * 60
+DEFAULT_DNS_CACHE_ERROR_TTL = 30
+DEFAULT_DNS_CACHE_MAX_SIZE = 10_000
+DEFAULT_DNS_PREFETCH_WORKERS = 4
+DEFAULT_DNS_PREFETCH_QUEUE_SIZE = 1024
 DEFAULT_CONNECT_TIMEOUT = 5
 DEFAULT_FETCH_MAX_REDIRECTS = 10
 DEFAULT_RESOLVE_MAX_REDIRECTS = 20
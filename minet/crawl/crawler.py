@@ -17,6 +17,7 @@ from typing import (
     Mapping,
     Iterable,
     Iterator,
+    List,
     Union,
     Awaitable,
     TYPE_CHECKING,
@@ -30,10 +31,14 @@ if TYPE_CHECKING:
 
 from os import makedirs
 from os.path import join
-from threading import Lock
+from threading import Lock, Event
 from urllib.parse import urljoin
 from ural import ensure_protocol, get_domain_name
+from functools import partial
+from operator import itemgetter
 from multiprocessing import Pool
+from multiprocessing.util import Finalize
+from quenouille.utils import get_default_maxworkers
 
 from minet.crawl.types import (
     CrawlJob,
@@ -57,8 +62,15 @@ from minet.crawl.exceptions import (
 from minet.crawl.queue import CrawlerQueue, AnyParallelism, AnyThrottle
 from minet.crawl.state import CrawlerState
 from minet.crawl.url_cache import URLCache
-from minet.web import request, EXPECTED_WEB_ERRORS, AnyTimeout
-from minet.fs import ThreadSafeFileWriter
+from minet.web import request, Response, EXPECTED_WEB_ERRORS, AnyTimeout
+from minet.http_cache import HTTPCache
+from minet.fs import ThreadSafeFileWriter, WrittenBlob
+from minet.warc import WARCWriter, WARCRecordLocation
+from minet.multiprocessing import (
+    ThreadedWorkerProcessPool,
+    is_picklable,
+    FORK_SUPPORT,
+)
 from minet.executors import HTTPThreadPoolExecutor, CallbackResultType
 from minet.exceptions import UnknownSpiderError, CancelledRequestError
 from minet.constants import (
@@ -66,6 +78,7 @@ from minet.constants import (
     DEFAULT_THROTTLE,
     DEFAULT_FETCH_MAX_REDIRECTS,
     DEFAULT_URLLIB3_TIMEOUT,
+    DEFAULT_WARC_MAX_SIZE,
 )
 
 P = ParamSpec("P")
@@ -106,6 +119,103 @@ def spider_start_iter(spider: Spider) -> Iterable[UrlOrCrawlTarget]:
 RequestArgsType = Callable[[CrawlJob[CrawlJobDataType]], Dict]
 
 
+def build_request_kwargs(
+    executor: HTTPThreadPoolExecutor,
+    use_pycurl: bool = False,
+    compressed: bool = False,
+    max_redirects: int = DEFAULT_FETCH_MAX_REDIRECTS,
+    stateful_redirects: bool = False,
+    spoof_ua: bool = False,
+    known_encoding: Optional[str] = None,
+    cache: Optional[HTTPCache] = None,
+) -> Dict[str, Any]:
+    kwargs = {
+        "pool_manager": executor.pool_manager,
+        "max_redirects": max_redirects,
+        "stateful": stateful_redirects,
+        "spoof_ua": spoof_ua,
+        "cancel_event": executor.cancel_event,
+    }
+
+    if executor.retry_on_statuses is not None:
+        kwargs["raise_on_statuses"] = executor.retry_on_statuses
+
+    if use_pycurl:
+        del kwargs["pool_manager"]
+        kwargs["use_pycurl"] = True
+
+    if compressed:
+        kwargs["compressed"] = True
+
+    if known_encoding is not None:
+        kwargs["known_encoding"] = known_encoding
+
+    if cache is not None:
+        kwargs["cache"] = cache
+
+    return kwargs
+
+
+def request_and_process(
+    spider: Spider,
+    job: CrawlJob,
+    request_fn: Callable[..., "Response"],
+    kwargs: Dict[str, Any],
+    cancel_event: Event,
+    retryer=None,
+) -> Optional[Tuple["Response", Any, Any]]:
+    # NOTE: crawl job must have a url at that point
+    assert job.url is not None
+
+    # NOTE: we create an atomic unit of work that will retry both the request
+    # and the subsequent spider processing
+    response = None
+
+    # NOTE: the function takes "url" so that the executor may format the warning's epilog
+    def retryable_work(url: str) -> Optional[Tuple["Response", Any, Any]]:
+        nonlocal response
+
+        try:
+            response = request_fn(url, **kwargs)
+
+        except CancelledRequestError:
+            return
+
+        if cancel_event.is_set():
+            return
+
+        spider_result = spider.process(job, response)
+
+        if spider_result is not None:
+            try:
+                data, next_jobs = spider_result
+            except (ValueError, TypeError):
+                raise TypeError(
+                    'Spider.process is expected to return either None or a 2-tuple containing data and next targets to enqueue. Got a "%s" instead.'
+                    % spider_result.__class__.__name__
+                )
+        else:
+            data = None
+            next_jobs = None
+
+        return response, data, next_jobs
+
+    try:
+        if retryer is None:
+            return retryable_work(job.url)
+
+        return retryer(retryable_work, job.url)
+
+    except EXPECTED_WEB_ERRORS:
+        raise
+
+    except Exception as reason:
+        if response is None:
+            raise
+
+        raise CrawlerSpiderProcessError(reason=reason, job=job, response=response)
+
+
 class CrawlWorker(Generic[CrawlJobDataType, CrawlResultDataType, CallbackResultType]):
     def __init__(
         self,
@@ -138,29 +248,17 @@ class CrawlWorker(Generic[CrawlJobDataType, CrawlResultDataType, CallbackResultT
         self.default_kwargs = {}
 
         if self.crawler.browser is None:
-            self.default_kwargs = {
-                "pool_manager": crawler.executor.pool_manager,
-                "max_redirects": max_redirects,
-                "stateful": stateful_redirects,
-                "spoof_ua": spoof_ua,
-                "cancel_event": crawler.executor.cancel_event,
-            }
-
-        if self.crawler.executor.retry_on_statuses is not None:
-            self.default_kwargs["raise_on_statuses"] = (
-                self.crawler.executor.retry_on_statuses
+            self.default_kwargs = build_request_kwargs(
+                crawler.executor,
+                use_pycurl=use_pycurl,
+                compressed=compressed,
+                max_redirects=max_redirects,
+                stateful_redirects=stateful_redirects,
+                spoof_ua=spoof_ua,
+                known_encoding=known_encoding,
+                cache=crawler.http_cache,
             )
 
-        if use_pycurl:
-            del self.default_kwargs["pool_manager"]
-            self.default_kwargs["use_pycurl"] = True
-
-        if compressed:
-            self.default_kwargs["compressed"] = True
-
-        if known_encoding is not None:
-            self.default_kwargs["known_encoding"] = known_encoding
-
     def __call__(
         self, job: CrawlJob[CrawlJobDataType]
     ) -> Optional[
@@ -183,7 +281,12 @@ class CrawlWorker(Generic[CrawlJobDataType, CrawlResultDataType, CallbackResultT
             assert job.url is not None
             assert job.depth is not None
 
-            kwargs = self.default_kwargs.copy()
+            # NOTE: worker processes have their own default kwargs
+            kwargs = (
+                self.default_kwargs.copy()
+                if self.crawler.worker_processes is None
+                else {}
+            )
 
             if cancel_event.is_set():
                 return
@@ -195,64 +298,31 @@ class CrawlWorker(Generic[CrawlJobDataType, CrawlResultDataType, CallbackResultT
             if cancel_event.is_set():
                 return
 
-            request_fn = (
-                request
-                if self.crawler.browser is None
-                else self.crawler.browser.request
-            )
-
-            # NOTE: we create an atomic unit of work that will retry both the request
-            # and the subsequent spider processing
-            response = None
-
-            # NOTE: the function takes "url" so that the executor may format the warning's epilog
-            def retryable_work(url: str) -> Optional[Tuple["Response", Any, Any]]:
-                nonlocal response
-
-                try:
-                    response = request_fn(url, **kwargs)
-
-                except CancelledRequestError:
-                    return
-
-                if cancel_event.is_set():
-                    return
-
-                spider_result = spider.process(job, response)
-
-                if spider_result is not None:
-                    try:
-                        data, next_jobs = spider_result
-                    except (ValueError, TypeError):
-                        raise TypeError(
-                            'Spider.process is expected to return either None or a 2-tuple containing data and next targets to enqueue. Got a "%s" instead.'
-                            % spider_result.__class__.__name__
-                        )
-                else:
-                    data = None
-                    next_jobs = None
-
-                return response, data, next_jobs
-
-            retryer = getattr(self.local_context, "retryer", None)
-
             try:
-                if retryer is None:
-                    output = retryable_work(job.url)
+                if self.crawler.worker_processes is not None:
+                    output = self.crawler.worker_processes.submit(
+                        (job, kwargs)
+                    ).result()
                 else:
-                    output = retryer(retryable_work, job.url)
+                    output = request_and_process(
+                        spider,
+                        job,
+                        request_fn=(
+                            request
+                            if self.crawler.browser is None
+                            else self.crawler.browser.request
+                        ),
+                        kwargs=kwargs,
+                        cancel_event=cancel_event,
+                        retryer=getattr(self.local_context, "retryer", None),
+                    )
+
+            except CancelledRequestError:
+                return
 
             except EXPECTED_WEB_ERRORS as error:
                 return ErroredCrawlResult(job, error), None
 
-            except Exception as reason:
-                if response is None:
-                    raise
-
-                raise CrawlerSpiderProcessError(
-                    reason=reason, job=job, response=response
-                )
-
             # Was cancelled?
             if output is None:
                 return
@@ -311,6 +381,7 @@ class Crawler(Generic[CrawlJobDataTypes, CrawlResultDataTypes]):
 
     queue: CrawlerQueue
     persistent: bool
+    queue_batch_size: int
 
     state: CrawlerState
 
@@ -326,15 +397,22 @@ class Crawler(Generic[CrawlJobDataTypes, CrawlResultDataTypes]):
         spider_or_spiders: SpiderDeclaration[CrawlJobDataTypes, CrawlResultDataTypes],
         persistent_storage_path: Optional[str] = None,
         sqlar: bool = False,
+        zstd: bool = False,
+        warc: bool = False,
+        warc_max_size: int = DEFAULT_WARC_MAX_SIZE,
         visit_urls_only_once: bool = False,
         normalized_url_cache: bool = False,
+        compact_url_cache: bool = False,
         max_depth: Optional[int] = None,
         resume: bool = False,
         lifo: bool = False,
+        in_memory_scheduler: bool = False,
+        queue_batch_size: int = 1,
         writer_root_directory: Optional[str] = None,
         domain_parallelism: AnyParallelism = DEFAULT_DOMAIN_PARALLELISM,
         throttle: AnyThrottle = DEFAULT_THROTTLE,
         process_pool_workers: Optional[int] = None,
+        worker_processes: Optional[int] = None,
         max_workers: Optional[int] = None,
         wait: bool = True,
         daemonic: bool = False,
@@ -351,6 +429,9 @@ class Crawler(Generic[CrawlJobDataTypes, CrawlResultDataTypes]):
         max_redirects: int = DEFAULT_FETCH_MAX_REDIRECTS,
         stateful_redirects: bool = False,
         spoof_ua: bool = False,
+        http_cache: Optional[str] = None,
+        dns_cache: bool = False,
+        dns_prefetch: bool = False,
         browser_emulation: bool = False,
         browser_kwargs: Dict[str, Any] = {},
         browser_context_init: Optional[
@@ -361,6 +442,36 @@ class Crawler(Generic[CrawlJobDataTypes, CrawlResultDataTypes]):
         if resume and persistent_storage_path is None:
             raise TypeError("cannot resume a non-persistent crawler")
 
+        if worker_processes:
+            if not FORK_SUPPORT:
+                raise TypeError("worker_processes require a platform supporting fork")
+
+            if browser_emulation:
+                raise TypeError(
+                    "worker_processes cannot be used with browser emulation"
+                )
+
+            if process_pool_workers:
+                raise TypeError(
+                    "worker_processes cannot be used with process_pool_workers"
+                )
+
+        if http_cache is not None:
+            if browser_emulation:
+                raise TypeError("http_cache cannot be used with browser emulation")
+
+            if use_pycurl:
+                raise TypeError("http_cache cannot be used with use_pycurl")
+
+        if dns_prefetch:
+            if not dns_cache:
+                raise TypeError("dns_prefetch requires dns_cache")
+
+            # NOTE: requests are performed by the worker processes, which
+            # cannot benefit from resolutions prefetched by the parent
+            if worker_processes:
+                raise TypeError("dns_prefetch cannot be used with worker_processes")
+
         # Browser emulation?
         self.browser = None
 
@@ -373,8 +484,25 @@ class Crawler(Generic[CrawlJobDataTypes, CrawlResultDataTypes]):
                 self.browser.run_in_default_context(browser_context_init)
 
         # Utilities
-        self.file_writer = ThreadSafeFileWriter(writer_root_directory, sqlar=sqlar)
+        self.writer_kwargs = {
+            "root_directory": writer_root_directory,
+            "sqlar": sqlar,
+            "compression": "zstd" if zstd else "gzip",
+        }
+        self.file_writer = ThreadSafeFileWriter(**self.writer_kwargs)
+        self.warc_writer_kwargs = None
+        self.warc_writer = None
+
+        if warc:
+            self.warc_writer_kwargs = {
+                "directory": writer_root_directory or "",
+                "max_size": warc_max_size,
+            }
+            self.warc_writer = WARCWriter(**self.warc_writer_kwargs)
+
         self.process_pool = None
+        self.worker_processes = None
+        self.in_worker_process = False
 
         # NOTE: if not None and not 0 basically
         if process_pool_workers:
@@ -408,7 +536,10 @@ class Crawler(Generic[CrawlJobDataTypes, CrawlResultDataTypes]):
             group_parallelism=domain_parallelism,
             throttle=throttle,
             lifo=lifo,
+            in_memory_scheduler=in_memory_scheduler,
+            prefetch=queue_batch_size,
         )
+        self.queue_batch_size = queue_batch_size
         self.persistent = self.queue.persistent
         self.resuming = (
             self.queue.resuming
@@ -417,10 +548,28 @@ class Crawler(Generic[CrawlJobDataTypes, CrawlResultDataTypes]):
         if self.resuming and self.queue.qsize() == 0:
             raise CrawlerAlreadyFinishedError
 
+        # HTTP cache
+        self.http_cache_path = http_cache
+        self.http_cache = None
+
+        if http_cache is not None:
+            self.http_cache = HTTPCache(http_cache)
+
+            # NOTE: worker processes must open their own connection to the
+            # cache, and we don't want them to inherit ours when forking
+            if worker_processes:
+                self.http_cache.close()
+                self.http_cache = None
+
         # Url cache
         self.unique = visit_urls_only_once
         self.url_cache = (
-            URLCache(self.url_cache_path, normalized=normalized_url_cache)
+            URLCache(
+                self.url_cache_path,
+                normalized=normalized_url_cache,
+                compact=compact_url_cache,
+                resume=self.resuming,
+            )
             if self.unique
             else None
         )
@@ -445,21 +594,56 @@ class Crawler(Generic[CrawlJobDataTypes, CrawlResultDataTypes]):
         for spider in self.__spiders.values():
             spider.attach(self)
 
+        executor_kwargs = {
+            "max_workers": max_workers,
+            "insecure": insecure,
+            "timeout": timeout,
+            "wait": wait,
+            "daemonic": daemonic,
+            "spoof_tls_ciphers": spoof_tls_ciphers,
+            "proxy": proxy,
+            "retry": retry,
+            "retryer_kwargs": retryer_kwargs,
+            "dns_cache": dns_cache,
+        }
+
+        worker_kwargs = {
+            "max_redirects": max_redirects,
+            "stateful_redirects": stateful_redirects,
+            "spoof_ua": spoof_ua,
+            "use_pycurl": use_pycurl,
+            "compressed": compressed,
+            "known_encoding": known_encoding,
+        }
+
+        # Worker processes
+        # NOTE: like the process pool, worker processes must be forked before
+        # the HTTPThreadPoolExecutor is created, so that they don't inherit
+        # running threads nor a non fork-safe urllib3.PoolManager.
+        if worker_processes:
+            self.worker_processes = ThreadedWorkerProcessPool(
+                worker_processes,
+                partial(
+                    self.__init_worker_process,
+                    executor_kwargs=executor_kwargs,
+                    worker_kwargs=worker_kwargs,
+                ),
+            )
+
+            # NOTE: in this mode, the threads of the parent process only wait
+            # for the worker processes, so we need as many of them as the
+            # total number of threads running in the worker processes.
+            executor_kwargs = executor_kwargs.copy()
+            executor_kwargs["max_workers"] = worker_processes * (
+                max_workers if max_workers is not None else get_default_maxworkers()
+            )
+
         # Own executor and imap params
         # NOTE: the process pool is initialized before the HTTPThreadPoolExecutor
         # so that we don't have potential issues related to urllib3.PoolManager
         # not being fork-safe.
-        self.executor = HTTPThreadPoolExecutor(
-            max_workers=max_workers,
-            insecure=insecure,
-            timeout=timeout,
-            wait=wait,
-            daemonic=daemonic,
-            spoof_tls_ciphers=spoof_tls_ciphers,
-            proxy=proxy,
-            retry=retry,
-            retryer_kwargs=retryer_kwargs,
-        )
+        self.executor = HTTPThreadPoolExecutor(**executor_kwargs)
+        self.dns_prefetch = dns_prefetch
 
         # NOTE: buffer_size=0 is very important to avoid quenouille's optimistic
         # buffer. Remember also that this cannot work if quenouille must handle
@@ -467,15 +651,80 @@ class Crawler(Generic[CrawlJobDataTypes, CrawlResultDataTypes]):
         # job now.
         self.imap_kwargs = {"buffer_size": 0, "panic": self.queue.unblock}
 
-        self.worker_kwargs = {
-            "request_args": request_args,
-            "max_redirects": max_redirects,
-            "stateful_redirects": stateful_redirects,
-            "spoof_ua": spoof_ua,
-            "use_pycurl": use_pycurl,
-            "compressed": compressed,
-            "known_encoding": known_encoding,
-        }
+        self.worker_kwargs = {"request_args": request_args, **worker_kwargs}
+
+    def __init_worker_process(
+        self, executor_kwargs: Dict[str, Any], worker_kwargs: Dict[str, Any]
+    ) -> Tuple[HTTPThreadPoolExecutor, Callable]:
+        # NOTE: this runs in a forked worker process, where the crawler is
+        # only a copy used to access its spiders & settings. Its queue, url
+        # cache & outputs all belong to the parent process.
+        self.in_worker_process = True
+        self.file_writer = ThreadSafeFileWriter(**self.writer_kwargs)
+
+        # NOTE: worker processes don't run atexit hooks, but they do run
+        # multiprocessing finalizers, which lets us flush pending writes
+        Finalize(self, self.file_writer.close, exitpriority=10)
+
+        # NOTE: each worker process appends to its own WARC files
+        if self.warc_writer_kwargs is not None:
+            self.warc_writer = WARCWriter(**self.warc_writer_kwargs)
+            Finalize(self, self.warc_writer.close, exitpriority=10)
+
+        executor = HTTPThreadPoolExecutor(**executor_kwargs)
+
+        if self.http_cache_path is not None:
+            self.http_cache = HTTPCache(self.http_cache_path)
+
+        default_kwargs = build_request_kwargs(
+            executor, cache=self.http_cache, **worker_kwargs
+        )
+
+        def work(
+            payload: Tuple[CrawlJob, Dict[str, Any]],
+        ) -> Optional[Tuple["Response", Any, Any]]:
+            job, kwargs = payload
+            kwargs = {**default_kwargs, **kwargs}
+
+            spider = self.get_spider(job.spider)
+
+            output = request_and_process(
+                spider,
+                job,
+                request_fn=request,
+                kwargs=kwargs,
+                cancel_event=executor.cancel_event,
+                retryer=getattr(executor.local_context, "retryer", None),
+            )
+
+            if output is None:
+                return
+
+            response, data, next_jobs = output
+
+            # NOTE: the output is sent back to the parent process, so the
+            # body must be loaded in memory & lazy iterables consumed
+            response.body
+
+            if next_jobs is not None and not isinstance(
+                next_jobs, (str, CrawlTarget, list)
+            ):
+                next_jobs = list(next_jobs)
+
+            output = response, data, next_jobs
+
+            if not is_picklable(output):
+                raise CrawlerSpiderProcessError(
+                    reason=TypeError(
+                        "Spider.process output must be picklable when using worker processes."
+                    ),
+                    job=job,
+                    response=response,
+                )
+
+            return output
+
+        return executor, work
 
     def __repr__(self):
         class_name = self.__class__.__name__
@@ -548,6 +797,11 @@ class Crawler(Generic[CrawlJobDataTypes, CrawlResultDataTypes]):
         if self.process_pool is not None:
             self.process_pool.terminate()
 
+        # NOTE: worker processes must be shut down before the executor, whose
+        # threads might be waiting on them
+        if self.worker_processes is not None:
+            self.worker_processes.shutdown(wait=self.executor.wait)
+
         self.executor.shutdown(wait=self.executor.wait)
 
         self.queue.close()
@@ -555,6 +809,14 @@ class Crawler(Generic[CrawlJobDataTypes, CrawlResultDataTypes]):
         if self.url_cache:
             self.url_cache.close()
 
+        if self.http_cache is not None:
+            self.http_cache.close()
+
+        self.file_writer.close()
+
+        if self.warc_writer is not None:
+            self.warc_writer.close()
+
         if self.browser is not None:
             self.browser.stop()
 
@@ -617,6 +879,11 @@ class Crawler(Generic[CrawlJobDataTypes, CrawlResultDataTypes]):
             self.queue, worker, key=key, **self.imap_kwargs
         )
 
+        # NOTE: acknowledging jobs by batch means that, if the crawl is
+        # interrupted, up to `queue_batch_size - 1` jobs whose results were
+        # already yielded will be done again when resuming.
+        done_jobs = []
+
         for item in imap_unordered:
             if item is None:
                 continue
@@ -628,7 +895,14 @@ class Crawler(Generic[CrawlJobDataTypes, CrawlResultDataTypes]):
             else:
                 yield result
 
-            self.queue.task_done(result.job)
+            done_jobs.append(result.job)
+
+            if len(done_jobs) >= self.queue_batch_size:
+                self.queue.task_done_many(done_jobs)
+                done_jobs.clear()
+
+        if done_jobs:
+            self.queue.task_done_many(done_jobs)
 
         # If iterator ended properly we cleanup the queue
         self.queue.cleanup()
@@ -649,48 +923,73 @@ class Crawler(Generic[CrawlJobDataTypes, CrawlResultDataTypes]):
         base_url: Optional[str] = None,
         parent: Optional[CrawlJob[CrawlJobDataTypes]] = None,
     ) -> int:
-        with self.enqueue_lock:
-            if isinstance(target_or_targets, (str, CrawlTarget)):
-                targets = [target_or_targets]
+        if self.in_worker_process:
+            raise RuntimeError(
+                "cannot enqueue from a worker process, Spider.process should return the next targets instead"
+            )
+
+        if isinstance(target_or_targets, (str, CrawlTarget)):
+            targets = [target_or_targets]
+        else:
+            targets = target_or_targets
+
+        # NOTE: we consume targets early and before actually enqueuing to
+        # catch errors early. Their urls are resolved & validated outside of
+        # the lock and jobs are only built for urls that were not already
+        # visited, since spiders can return a lot of them.
+        # NOTE: this means that enqueue is basically the only place allowed
+        # to build CrawlJob instances and validate them.
+        resolved_targets: List[Tuple[str, UrlOrCrawlTarget[CrawlJobDataTypes]]] = []
+
+        for target in targets:
+            if isinstance(target, str):
+                url = target
+                target_spider = spider
+            elif isinstance(target, CrawlTarget):
+                url = target.url
+                target_spider = target.spider if target.spider is not None else spider
             else:
-                targets = target_or_targets
+                raise TypeError(
+                    "attempted to enqueue a target with an invalid type %s, while expecting str or CrawlTarget"
+                    % target.__class__.__name__
+                )
+
+            url = ensure_protocol(url.strip(), "https")
+
+            if base_url is not None:
+                url = urljoin(base_url, url)
+
+            if target_spider is not None and target_spider not in self.__spiders:
+                raise UnknownSpiderError(target_spider)
+
+            resolved_targets.append((url, target))
+
+        with self.enqueue_lock:
+            # Filtering urls we already visited
+            if self.url_cache is not None:
+                resolved_targets = self.url_cache.register_many(
+                    resolved_targets, key=itemgetter(0)
+                )
 
-            # NOTE: we consume jobs early and before actually enqueuing to
-            # catch errors early.
-            # NOTE: this means that enqueue is basically the only place allowed
-            # to build CrawlJob instances and validate them.
             jobs = []
 
-            for target in targets:
-                if isinstance(target, str):
-                    job = CrawlJob(url=target)
-                elif isinstance(target, CrawlTarget):
+            for url, target in resolved_targets:
+                if isinstance(target, CrawlTarget):
                     job = CrawlJob(
-                        url=target.url,
+                        url=url,
                         depth=target.depth,
                         spider=target.spider,
                         priority=target.priority,
                         data=target.data,
                     )
                 else:
-                    raise TypeError(
-                        "attempted to enqueue a target with an invalid type %s, while expecting str or CrawlTarget"
-                        % target.__class__.__name__
-                    )
+                    job = CrawlJob(url=url)
 
-                job.url = ensure_protocol(job.url.strip(), "https")
-
-                if base_url is not None:
-                    job.url = urljoin(base_url, job.url)
-
-                job.group = get_domain_name(job.url)
+                job.group = get_domain_name(url)
 
                 if spider is not None and job.spider is None:
                     job.spider = spider
 
-                if job.spider is not None and job.spider not in self.__spiders:
-                    raise UnknownSpiderError(job.spider)
-
                 if depth is not None:
                     job.depth = depth
 
@@ -699,12 +998,14 @@ class Crawler(Generic[CrawlJobDataTypes, CrawlResultDataTypes]):
 
                 jobs.append(job)
 
-            # Filtering urls we already visited
-            if self.url_cache is not None:
-                jobs = self.url_cache.register(jobs)
-
             count = len(jobs)
 
+            # NOTE: jobs can wait a long time in the queue, so their hostname
+            # has plenty of time to be resolved in the background
+            if self.dns_prefetch and self.executor.dns_cache is not None:
+                for job in jobs:
+                    self.executor.dns_cache.prefetch(job.url)
+
             self.queue.put_many(jobs)
             self.state.inc_queued(count)
 
@@ -721,6 +1022,20 @@ class Crawler(Generic[CrawlJobDataTypes, CrawlResultDataTypes]):
             filename, contents, compress=compress, relative=relative
         )
 
+    def write_blob(
+        self,
+        contents: Union[str, bytes],
+        ext: Optional[str] = None,
+        compress: bool = False,
+    ) -> WrittenBlob:
+        return self.file_writer.write_blob(contents, ext=ext, compress=compress)
+
+    def write_warc_record(self, response: Response) -> WARCRecordLocation:
+        if self.warc_writer is None:
+            raise TypeError("crawler was not created with warc=True")
+
+        return self.warc_writer.write_response(response)
+
     def submit(self, fn: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
         # NOTE: this might be a footgun!
         if self.process_pool is None:
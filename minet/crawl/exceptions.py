@@ -15,6 +15,14 @@ class CrawlerAlreadyFinishedError(CrawlerError):
     pass
 
 
+class CrawlerURLCacheModeMismatchError(CrawlerError):
+    def __init__(self, compact: bool):
+        self.compact = compact
+        super().__init__(
+            "url cache was created %s compact mode" % ("in" if compact else "without")
+        )
+
+
 class CrawlerSpiderProcessError(CrawlerError):
     def __init__(self, reason: Exception, job: "CrawlJob", response: "Response"):
         self.reason = reason
@@ -1,5 +1,6 @@
 from typing import (
     Dict,
+    Deque,
     List,
     Tuple,
     Iterable,
@@ -15,12 +16,14 @@ import pickle
 from os import makedirs
 from os.path import join, isfile
 from shutil import rmtree
+from collections import deque
 from queue import Empty
 from threading import Lock, Condition
 from contextlib import contextmanager
 from datetime import datetime
 from random import randint
 from dataclasses import dataclass
+from heapq import heappush, heappop
 from quenouille.constants import TIMER_EPSILON
 
 from minet.crawl.types import CrawlJob
@@ -121,6 +124,21 @@ ORDER BY "priority" ASC, "index" %s
 LIMIT 1;
 """
 
+SQL_GET_JOB_BY_INDEX = """
+SELECT
+    "index",
+    "id",
+    "url",
+    "group",
+    "depth",
+    "spider",
+    "priority",
+    "data",
+    "parent"
+FROM "queue"
+WHERE "index" = ?;
+"""
+
 SQL_DUMP = """
 SELECT
     "index",
@@ -178,6 +196,168 @@ class BrokenCrawlerQueue(Exception):
     pass
 
 
+# NOTE: this scheduler is an alternative to SQL_GET_JOB that keeps every
+# pending job's index, grouped by domain, in memory heaps so that finding
+# the next suitable job does not require to join the "queue" table with the
+# "throttle" and "parallelism" ones. The database is then only used as a
+# durable log of the jobs and a way to retrieve their full rows by primary key.
+# NOTE: groups that currently have pending jobs can be in one of three states:
+#   1. ready: the group's best job is referenced in the `ready` heap
+#   2. throttled: the group is referenced in the `throttled` heap
+#   3. saturated: the group is not referenced anywhere until a job is released
+# NOTE: the heaps are lazily invalidated, which means an entry is only
+# considered valid if it matches the group's current state.
+class CrawlerQueueScheduler:
+    lifo: bool
+    pending: Dict[Optional[str], List[Tuple[int, int, int]]]
+    pending_count: int
+    ready: List[Tuple[int, int, Optional[str]]]
+    ready_keys: Dict[Optional[str], Tuple[int, int]]
+    throttled: List[Tuple[float, str]]
+    throttled_until: Dict[str, float]
+    counts: Dict[str, int]
+    allowed: Dict[str, int]
+
+    def __init__(self, lifo: bool = False):
+        self.lifo = lifo
+        self.clear()
+
+    def clear(self) -> None:
+        self.pending = {}
+        self.pending_count = 0
+        self.ready = []
+        self.ready_keys = {}
+        self.throttled = []
+        self.throttled_until = {}
+        self.counts = {}
+        self.allowed = {}
+
+    def __len__(self) -> int:
+        return self.pending_count
+
+    def __is_available(self, group: Optional[str]) -> bool:
+        # NOTE: null group is neither throttled nor constrained, the same as `quenouille`
+        if group is None:
+            return True
+
+        if group in self.throttled_until:
+            return False
+
+        allowed = self.allowed.get(group)
+
+        return allowed is None or self.counts.get(group, 0) < allowed
+
+    def __schedule(self, group: Optional[str]) -> None:
+        heap = self.pending.get(group)
+
+        if not heap or not self.__is_available(group):
+            self.ready_keys.pop(group, None)
+            return
+
+        priority, order, _ = heap[0]
+        key = (priority, order)
+
+        if self.ready_keys.get(group) == key:
+            return
+
+        self.ready_keys[group] = key
+        heappush(self.ready, (priority, order, group))
+
+    def __wake_up_throttled_groups(self, timestamp: float) -> None:
+        while self.throttled and self.throttled[0][0] <= timestamp:
+            until, group = heappop(self.throttled)
+
+            if self.throttled_until.get(group) != until:
+                continue
+
+            del self.throttled_until[group]
+            self.__schedule(group)
+
+    def push(self, index: int, group: Optional[str], priority: int) -> None:
+        heap = self.pending.get(group)
+
+        if heap is None:
+            heap = []
+            self.pending[group] = heap
+
+        heappush(heap, (priority, -index if self.lifo else index, index))
+        self.pending_count += 1
+
+        self.__schedule(group)
+
+    def pop(self, timestamp: float) -> Optional[int]:
+        self.__wake_up_throttled_groups(timestamp)
+
+        while self.ready:
+            priority, order, group = heappop(self.ready)
+
+            if self.ready_keys.get(group) != (priority, order):
+                continue
+
+            del self.ready_keys[group]
+
+            heap = self.pending[group]
+            index = heappop(heap)[2]
+
+            if not heap:
+                del self.pending[group]
+
+            self.pending_count -= 1
+
+            # NOTE: the group will be rescheduled when calling #.acquire
+            return index
+
+        return None
+
+    def acquire(self, group: Optional[str], allowed: Optional[int] = None) -> None:
+        if group is not None:
+            assert allowed is not None
+
+            self.counts[group] = self.counts.get(group, 0) + 1
+            self.allowed[group] = allowed
+
+        self.__schedule(group)
+
+    def throttle(self, group: str, until: float) -> None:
+        self.throttled_until[group] = until
+        heappush(self.throttled, (until, group))
+
+        self.__schedule(group)
+
+    def release(self, group: Optional[str], until: Optional[float] = None) -> None:
+        if group is None:
+            return
+
+        count = self.counts.get(group, 0) - 1
+
+        if count > 0:
+            self.counts[group] = count
+        else:
+            self.counts.pop(group, None)
+            self.allowed.pop(group, None)
+
+        if until is not None:
+            self.throttle(group, until)
+        else:
+            self.__schedule(group)
+
+    def next_wake_up(self) -> Optional[float]:
+        while self.throttled:
+            until, group = self.throttled[0]
+
+            if self.throttled_until.get(group) == until:
+                return until
+
+            heappop(self.throttled)
+
+        return None
+
+    def worked_groups(self) -> Dict[str, Tuple[int, int]]:
+        return {
+            group: (count, self.allowed[group]) for group, count in self.counts.items()
+        }
+
+
 # TODO: tests with null group
 
 
@@ -195,6 +375,9 @@ class BrokenCrawlerQueue(Exception):
 # useful in our case to allow for concurrent access to the queue because most
 # of its operations need to update the database somehow. This also means we
 # can rely on a single lock to make multithreaded transactions safe.
+# NOTE: when using the in-memory scheduler, throttling and parallelism info
+# is only kept in memory and the "throttle" and "parallelism" tables are not
+# written anymore. Only the jobs themselves are persisted.
 class CrawlerQueue:
     # Params
     persistent: bool
@@ -202,8 +385,11 @@ class CrawlerQueue:
     is_lifo: bool
     group_parallelism: AnyParallelism
     throttle: AnyThrottle
+    prefetch: int
 
     # State
+    scheduler: Optional[CrawlerQueueScheduler]
+    prefetched: Deque[CrawlJob]
     tasks: Dict[str, int]
     connection: sqlite3.Connection
     counter: int
@@ -225,6 +411,8 @@ class CrawlerQueue:
         throttle: AnyThrottle = 0,
         cleanup_interval: int = 1000,
         vacuum_interval: int = 10_000,
+        in_memory_scheduler: bool = False,
+        prefetch: int = 1,
     ):
         self.persistent = True
         self.resuming = False
@@ -258,6 +446,17 @@ class CrawlerQueue:
 
         self.is_lifo = lifo
 
+        if prefetch < 1:
+            raise TypeError("prefetch should be > 0")
+
+        self.prefetch = prefetch
+        self.prefetched = deque()
+
+        self.scheduler = None
+
+        if in_memory_scheduler:
+            self.scheduler = CrawlerQueueScheduler(lifo=lifo)
+
         self.group_parallelism = group_parallelism
         self.throttle = throttle
 
@@ -305,6 +504,24 @@ class CrawlerQueue:
                 cursor.connection.commit()
                 cursor.execute("VACUUM;")
 
+                if self.scheduler is not None:
+                    self.__load_scheduler(cursor)
+
+    def __load_scheduler(self, cursor: sqlite3.Cursor) -> None:
+        assert self.scheduler is not None
+
+        cursor.execute(
+            'SELECT "index", "group", "priority" FROM "queue" WHERE "status" = 0;'
+        )
+
+        for index, group, priority in iterate_over_sqlite_cursor(cursor):
+            self.scheduler.push(index, group, priority)
+
+        cursor.execute('SELECT "group", "timestamp" FROM "throttle";')
+
+        for group, timestamp in iterate_over_sqlite_cursor(cursor):
+            self.scheduler.throttle(group, timestamp)
+
     @contextmanager
     def transaction(self):
         cursor = None
@@ -328,10 +545,17 @@ class CrawlerQueue:
             return "\n".join(row[3] for row in iterate_over_sqlite_cursor(cursor))
 
     def __count(self, cursor: sqlite3.Cursor) -> int:
+        if self.scheduler is not None:
+            return len(self.scheduler)
+
         cursor.execute('SELECT count(*) FROM "queue" WHERE "status" = 0;')
         return cursor.fetchone()[0]
 
     def qsize(self) -> int:
+        if self.scheduler is not None:
+            with self.transaction_lock:
+                return len(self.scheduler)
+
         with self.transaction() as cursor:
             return self.__count(cursor)
 
@@ -362,6 +586,10 @@ class CrawlerQueue:
             cursor.executemany(SQL_INSERT_JOB, rows)
             count = cursor.rowcount
 
+            if self.scheduler is not None:
+                for row in rows:
+                    self.scheduler.push(row[0], row[3], row[6])
+
         # NOTE: we notify the waiter because adding jobs to the queue means
         # there might be one we can do right now
         with self.waiter:
@@ -381,6 +609,19 @@ class CrawlerQueue:
         if block:
             raise NotImplementedError
 
+        # NOTE: only one thread (e.g. `quenouille`'s enqueuer) is expected to
+        # consume the queue, so the prefetched jobs don't need their own lock.
+        if not self.prefetched:
+            self.prefetched.extend(self.get_many(self.prefetch))
+
+        return self.prefetched.popleft()
+
+    # NOTE: this method will block until at least one job can be leased, then
+    # lease as many suitable jobs as possible, up to n, in a single transaction.
+    def get_many(self, n: int) -> List[CrawlJob]:
+        if n < 1:
+            raise TypeError("n should be > 0")
+
         need_to_wait = False
         need_to_wait_for_at_least = None
 
@@ -405,65 +646,109 @@ class CrawlerQueue:
                     raise BrokenCrawlerQueue
 
             with self.transaction() as cursor:
-                cursor.execute(
-                    SQL_GET_JOB % ("ASC" if not self.is_lifo else "DESC"),
-                    (now(),),
-                )
-                row = cursor.fetchone()
+                jobs = []
+
+                while len(jobs) < n:
+                    row = self.__get_row(cursor)
+
+                    if row is None:
+                        break
+
+                    jobs.append(self.__lease(cursor, row))
 
-                if row is None:
-                    # Queue really is drained
-                    if self.__count(cursor) == 0:
-                        raise Empty
+                if jobs:
+                    return jobs
 
-                    # We may need to wait for a suitable job
-                    # NOTE: here we may wait either for one slot to become
-                    # open wrt parallelism or enough time wrt throttling
-                    need_to_wait = True
+                # Queue really is drained
+                if self.__count(cursor) == 0:
+                    raise Empty
 
-                    cursor.execute('SELECT min("timestamp") FROM "throttle" LIMIT 1;')
-                    throttle_row = cursor.fetchone()
+                # We may need to wait for a suitable job
+                # NOTE: here we may wait either for one slot to become
+                # open wrt parallelism or enough time wrt throttling
+                need_to_wait = True
 
-                    if throttle_row is not None and throttle_row[0] is not None:
-                        need_to_wait_for_at_least = (
-                            max(0, throttle_row[0] - now()) + TIMER_EPSILON
-                        )
+                next_wake_up = self.__next_wake_up(cursor)
 
-                    continue
+                if next_wake_up is not None:
+                    need_to_wait_for_at_least = (
+                        max(0, next_wake_up - now()) + TIMER_EPSILON
+                    )
+
+    def __get_row(self, cursor: sqlite3.Cursor):
+        if self.scheduler is not None:
+            return self.__get_scheduled_row(cursor)
+
+        cursor.execute(
+            SQL_GET_JOB % ("ASC" if not self.is_lifo else "DESC"),
+            (now(),),
+        )
 
-                index = row[0]
+        return cursor.fetchone()
 
-                # NOTE: sqlite does not always support LIMIT on UPDATE
+    def __lease(self, cursor: sqlite3.Cursor, row) -> CrawlJob:
+        index = row[0]
+
+        # NOTE: sqlite does not always support LIMIT on UPDATE
+        cursor.execute(
+            'UPDATE "queue" SET "status" = 1 WHERE "index" = ?;',
+            (index,),
+        )
+
+        job = CrawlJob(
+            row[2],
+            id=row[1],
+            group=row[3],
+            depth=row[4],
+            spider=row[5],
+            priority=row[6],
+            data=pickle.loads(row[7]) if row[7] is not None else None,
+            parent=row[8],
+        )
+
+        allowed = None
+
+        if job.group is not None:
+            allowed = self.group_parallelism
+
+            if callable(allowed):
+                allowed = allowed(job)
+
+            if self.scheduler is None:
                 cursor.execute(
-                    'UPDATE "queue" SET "status" = 1 WHERE "index" = ?;',
-                    (index,),
+                    SQL_INCREMENT_PARALLELISM,
+                    (job.group, job.group, allowed),
                 )
 
-                job = CrawlJob(
-                    row[2],
-                    id=row[1],
-                    group=row[3],
-                    depth=row[4],
-                    spider=row[5],
-                    priority=row[6],
-                    data=pickle.loads(row[7]) if row[7] is not None else None,
-                    parent=row[8],
-                )
+        if self.scheduler is not None:
+            self.scheduler.acquire(job.group, allowed)
 
-                if job.group is not None:
-                    allowed = self.group_parallelism
+        self.tasks[job.id] = index
 
-                    if callable(allowed):
-                        allowed = allowed(job)
+        return job
 
-                    cursor.execute(
-                        SQL_INCREMENT_PARALLELISM,
-                        (job.group, job.group, allowed),
-                    )
+    def __get_scheduled_row(self, cursor: sqlite3.Cursor):
+        assert self.scheduler is not None
+
+        index = self.scheduler.pop(now())
+
+        if index is None:
+            return None
+
+        cursor.execute(SQL_GET_JOB_BY_INDEX, (index,))
+        return cursor.fetchone()
+
+    def __next_wake_up(self, cursor: sqlite3.Cursor) -> Optional[float]:
+        if self.scheduler is not None:
+            return self.scheduler.next_wake_up()
 
-                self.tasks[job.id] = index
+        cursor.execute('SELECT min("timestamp") FROM "throttle" LIMIT 1;')
+        throttle_row = cursor.fetchone()
 
-                return job
+        if throttle_row is None:
+            return None
+
+        return throttle_row[0]
 
     def get_nowait(self) -> CrawlJob:
         return self.get(False)
@@ -477,6 +762,10 @@ class CrawlerQueue:
             self.waiter.notify_all()
 
     def worked_groups(self) -> Dict[str, Tuple[int, int]]:
+        if self.scheduler is not None:
+            with self.transaction_lock:
+                return self.scheduler.worked_groups()
+
         g = {}
 
         with self.transaction() as cursor:
@@ -528,6 +817,9 @@ class CrawlerQueue:
         cursor.execute('DELETE FROM "parallelism";')
         cursor.execute('DELETE FROM "throttle";')
 
+        if self.scheduler is not None:
+            self.scheduler.clear()
+
     def __vacuum_and_analyze(self, cursor: sqlite3.Cursor) -> None:
         cursor.execute("PRAGMA analysis_limit=1000;")
         cursor.execute("PRAGMA optimize;")
@@ -552,6 +844,40 @@ class CrawlerQueue:
     # task. This is important to ensure atomicity as well as possible.
     # Without creating backpressure on the queue's constraints.
     def release_group(self, job: CrawlJob) -> None:
+        if self.scheduler is not None:
+            self.__release_scheduled_group(job)
+        else:
+            self.__release_group(job)
+
+        # We notify one waiter that parallelism was updated
+        with self.waiter:
+            self.waiter.notify()
+
+    def __throttle_until(self, job: CrawlJob) -> Optional[float]:
+        # NOTE: null group is not throttled, the same as `quenouille`
+        if job.group is None:
+            return None
+
+        throttle = self.throttle
+
+        if callable(throttle):
+            throttle = throttle(job)
+
+        if throttle <= 0:
+            return None
+
+        return now() + throttle
+
+    def __release_scheduled_group(self, job: CrawlJob) -> None:
+        assert self.scheduler is not None
+
+        with self.transaction_lock:
+            if job.id not in self.tasks:
+                raise RuntimeError("job is not being worked")
+
+            self.scheduler.release(job.group, self.__throttle_until(job))
+
+    def __release_group(self, job: CrawlJob) -> None:
         with self.transaction() as cursor:
             if job.id not in self.tasks:
                 raise RuntimeError("job is not being worked")
@@ -561,19 +887,10 @@ class CrawlerQueue:
                 (job.group,),
             )
 
-            # NOTE: null group is not throttled, the same as `quenouille`
-            if job.group is not None:
-                throttle = self.throttle
+            until = self.__throttle_until(job)
 
-                if callable(throttle):
-                    throttle = throttle(job)
-
-                if throttle > 0:
-                    cursor.execute(SQL_UPDATE_THROTTLE, (job.group, now() + throttle))
-
-        # We notify one waiter that parallelism was updated
-        with self.waiter:
-            self.waiter.notify()
+            if until is not None:
+                cursor.execute(SQL_UPDATE_THROTTLE, (job.group, until))
 
     @contextmanager
     def group_releaser(self, job: CrawlJob):
@@ -582,25 +899,45 @@ class CrawlerQueue:
         finally:
             self.release_group(job)
 
-    def task_done(self, job: CrawlJob) -> None:
+    def task_done_many(self, jobs: Iterable[CrawlJob]) -> None:
+        jobs = list(jobs)
+
         with self.transaction() as cursor:
-            index = self.tasks.pop(job.id, None)
+            rows = []
 
-            if index is None:
-                raise RuntimeError("job is not being worked")
+            for job in jobs:
+                index = self.tasks.get(job.id)
 
-            cursor.execute(
-                'UPDATE "queue" SET "status" = 2 WHERE "index" = ?;', (index,)
+                if index is None:
+                    raise RuntimeError("job is not being worked")
+
+                rows.append((index,))
+
+            for job in jobs:
+                del self.tasks[job.id]
+
+            cursor.executemany(
+                'UPDATE "queue" SET "status" = 2 WHERE "index" = ?;', rows
             )
 
-            self.current_task_done_count += 1
+            previous_task_done_count = self.current_task_done_count
+            self.current_task_done_count += len(rows)
 
-            if self.current_task_done_count % self.cleanup_interval == 0:
+            def interval_was_crossed(interval: int) -> bool:
+                return (
+                    previous_task_done_count // interval
+                    != self.current_task_done_count // interval
+                )
+
+            if interval_was_crossed(self.cleanup_interval):
                 self.__cleanup(cursor)
 
-            if self.current_task_done_count % self.vacuum_interval == 0:
+            if interval_was_crossed(self.vacuum_interval):
                 self.__vacuum_and_analyze(cursor)
 
+    def task_done(self, job: CrawlJob) -> None:
+        self.task_done_many((job,))
+
     def close(self) -> None:
         self.connection.close()
 
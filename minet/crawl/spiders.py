@@ -33,6 +33,8 @@ from minet.crawl.types import (
     SuccessfulCrawlResult,
 )
 from minet.web import Response
+from minet.fs import WrittenBlob
+from minet.warc import WARCRecordLocation
 from minet.utils import PseudoFStringFormatter
 
 P = ParamSpec("P")
@@ -107,6 +109,17 @@ class Spider(Generic[CrawlJobDataType, CrawlResultDataType]):
             filename, contents, compress=compress, relative=relative
         )
 
+    def write_blob(
+        self,
+        contents: Union[str, bytes],
+        ext: Optional[str] = None,
+        compress: bool = False,
+    ) -> WrittenBlob:
+        return self.crawler.write_blob(contents, ext=ext, compress=compress)
+
+    def write_warc_record(self, response: Response) -> WARCRecordLocation:
+        return self.crawler.write_warc_record(response)
+
     def submit(self, fn: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
         return self.crawler.submit(fn, *args, **kwargs)
 
@@ -152,7 +165,7 @@ class BasicSpiderLink(TabularRecord):
     to_url: str
 
 
-BasicSpiderLinks = List[BasicSpiderLink]
+BasicSpiderLinks = List[str]
 
 
 class BasicSpider(Spider[CrawlJobDataType, BasicSpiderLinks]):
@@ -165,11 +178,12 @@ class BasicSpider(Spider[CrawlJobDataType, BasicSpiderLinks]):
         if not response.is_html:
             return
 
-        next_urls = response.links(strip_fragment=True)
-
-        links = [BasicSpiderLink(response.end_url, url) for url in next_urls]
+        # NOTE: the same list of urls is used as data and as next targets,
+        # which the crawler filters through its url cache before building
+        # any job. Links are only turned into records when tabulated.
+        next_urls = list(response.iter_links(strip_fragment=True))
 
-        return links, next_urls
+        return next_urls, next_urls
 
     def tabulate(
         self, result: SuccessfulCrawlResult[CrawlJobDataType, BasicSpiderLinks]
@@ -177,4 +191,7 @@ class BasicSpider(Spider[CrawlJobDataType, BasicSpiderLinks]):
         if result.data is None:
             return
 
-        yield from result.data
+        from_url = result.response.end_url
+
+        for url in result.data:
+            yield BasicSpiderLink(from_url, url)
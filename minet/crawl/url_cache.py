@@ -10,15 +10,20 @@ from typing import (
     overload,
 )
 
+import json
 import sqlite3
+from math import ceil, log
+from hashlib import blake2b
 from os import makedirs
-from os.path import join
+from os.path import join, isfile
 from threading import Lock
 from contextlib import contextmanager
+from operator import itemgetter
 from ebbe import distinct
 from ural import canonicalize_url, normalize_url
 
 from minet.crawl.types import CrawlJob, CrawlJobDataType
+from minet.crawl.exceptions import CrawlerURLCacheModeMismatchError
 from minet.utils import iterate_over_sqlite_cursor
 
 T = TypeVar("T")
@@ -203,37 +208,396 @@ class SQLiteStringSet:
         self.close()
 
 
+def fingerprint(string: str) -> int:
+    """
+    Function returning a signed 64 bits fingerprint of the given string, that
+    can be stored as is in a sqlite INTEGER column.
+    """
+    return int.from_bytes(
+        blake2b(string.encode("utf-8"), digest_size=8).digest(), "big", signed=True
+    )
+
+
+class BloomFilter:
+    """
+    A simple bloom filter over 64 bits fingerprints, used as a fast negative
+    check before hitting the disk. Its bit positions are derived from the
+    fingerprint itself using double hashing.
+    """
+
+    __bits: bytearray
+    size: int
+    hashes: int
+
+    def __init__(self, capacity: int, error_rate: float = 0.05):
+        capacity = max(1, capacity)
+
+        optimal_size = ceil(-capacity * log(error_rate) / (log(2) ** 2))
+
+        # NOTE: size is rounded to the next power of 2 so we can mask rather
+        # than compute a modulo, which also slightly lowers the error rate.
+        self.size = 1 << max(3, (optimal_size - 1).bit_length())
+        self.hashes = max(1, round(optimal_size / capacity * log(2)))
+        self.__bits = bytearray(self.size >> 3)
+
+    # NOTE: the following methods are purposely inlined for performance
+    def add(self, item: int) -> bool:
+        """
+        Add the given item to the filter and return whether it was
+        possibly already present.
+        """
+        bits = self.__bits
+        size_mask = self.size - 1
+
+        position = item & 0xFFFFFFFF
+        step = ((item >> 32) & 0xFFFFFFFF) | 1
+
+        present = True
+
+        for _ in range(self.hashes):
+            position = (position + step) & size_mask
+            byte = position >> 3
+            mask = 1 << (position & 7)
+            current = bits[byte]
+
+            if not current & mask:
+                present = False
+                bits[byte] = current | mask
+
+        return present
+
+    def __contains__(self, item: int) -> bool:
+        bits = self.__bits
+        size_mask = self.size - 1
+
+        position = item & 0xFFFFFFFF
+        step = ((item >> 32) & 0xFFFFFFFF) | 1
+
+        for _ in range(self.hashes):
+            position = (position + step) & size_mask
+
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+
+        return True
+
+
+class ScalableBloomFilter:
+    """
+    A bloom filter growing with the number of items it holds, by stacking
+    bloom filters of increasing capacity and decreasing error rate, so that
+    the overall error rate stays under the given one however many items
+    are added.
+    """
+
+    filters: List[BloomFilter]
+    initial_capacity: int
+    error_rate: float
+    capacity: int
+    count: int
+
+    GROWTH = 2
+    TIGHTENING = 0.5
+
+    def __init__(self, capacity: int, error_rate: float = 0.05):
+        self.initial_capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.filters = []
+        self.__grow()
+
+    def __grow(self) -> None:
+        n = len(self.filters)
+
+        # NOTE: the error rates of the filters form a geometric series whose
+        # sum is the target error rate
+        self.capacity = self.initial_capacity * self.GROWTH**n
+        self.count = 0
+        self.filters.append(
+            BloomFilter(
+                self.capacity,
+                error_rate=self.error_rate * (1 - self.TIGHTENING) * self.TIGHTENING**n,
+            )
+        )
+
+    def add(self, item: int) -> bool:
+        """
+        Add the given item to the filter and return whether it was
+        possibly already present.
+        """
+        for i in range(len(self.filters) - 1):
+            if item in self.filters[i]:
+                return True
+
+        if self.filters[-1].add(item):
+            return True
+
+        self.count += 1
+
+        if self.count >= self.capacity:
+            self.__grow()
+
+        return False
+
+    def __contains__(self, item: int) -> bool:
+        return any(item in f for f in self.filters)
+
+
+SQL_CREATE_FINGERPRINTS = """
+PRAGMA journal_mode=wal;
+PRAGMA synchronous=normal;
+CREATE TABLE IF NOT EXISTS "set" (
+    "key" INTEGER PRIMARY KEY
+);
+"""
+
+# NOTE: this is under the default SQLITE_MAX_VARIABLE_NUMBER of older
+# sqlite versions.
+SQL_IN_CHUNK_SIZE = 500
+
+
+# NOTE: this set stores fixed-width integer fingerprints as the table's rowid,
+# which means there is no separate index to maintain on disk. An in-memory
+# bloom filter, rebuilt when opening the set, is used to avoid querying
+# the database for items that were never seen. The filter grows with the
+# set, so that the given capacity is merely a starting point.
+class SQLiteFingerprintSet:
+    def __init__(
+        self,
+        path: str,
+        db_name: str = "fingerprints.db",
+        capacity: int = 1_000_000,
+        error_rate: float = 0.05,
+    ):
+        makedirs(path, exist_ok=True)
+
+        self.path = path
+
+        self.connection = sqlite3.connect(
+            join(self.path, db_name), check_same_thread=False
+        )
+        self.lock = Lock()
+
+        # Setup
+        # NOTE: this is reexecuted on resume and this is fine
+        self.connection.executescript(SQL_CREATE_FINGERPRINTS)
+        self.connection.commit()
+
+        with self.transaction() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM "set";')
+            count = cursor.fetchone()[0]
+
+            self.bloom = ScalableBloomFilter(
+                max(capacity, count * 2), error_rate=error_rate
+            )
+
+            cursor.execute('SELECT "key" FROM "set";')
+
+            for row in iterate_over_sqlite_cursor(cursor):
+                self.bloom.add(row[0])
+
+    @contextmanager
+    def transaction(self):
+        cursor = None
+        try:
+            with self.lock, self.connection:
+                cursor = self.connection.cursor()
+                yield cursor
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def __existing(self, cursor: sqlite3.Cursor, items: List[int]) -> Set[int]:
+        existing = set()
+
+        for i in range(0, len(items), SQL_IN_CHUNK_SIZE):
+            chunk = items[i : i + SQL_IN_CHUNK_SIZE]
+
+            cursor.execute(
+                'SELECT "key" FROM "set" WHERE "key" IN (%s);'
+                % ", ".join("?" for _ in chunk),
+                chunk,
+            )
+
+            existing.update(row[0] for row in cursor.fetchall())
+
+        return existing
+
+    def __add_many(self, cursor: sqlite3.Cursor, items, key=None) -> List:
+        candidates = []
+        seen = set()
+
+        for item in items:
+            k = item if key is None else key(item)
+
+            if k in seen:
+                continue
+
+            seen.add(k)
+            candidates.append((item, k))
+
+        # NOTE: bloom filter is updated beforehand, which is fine since it can
+        # only cause false positives if the insertion were to fail.
+        bloom = self.bloom
+        existing = self.__existing(cursor, [k for _, k in candidates if bloom.add(k)])
+
+        new = []
+        rows = []
+
+        for item, k in candidates:
+            if k in existing:
+                continue
+
+            new.append(item)
+            rows.append((k,))
+
+        cursor.executemany('INSERT INTO "set" ("key") VALUES (?);', rows)
+
+        return new
+
+    def add(self, item: int) -> bool:
+        with self.transaction() as cursor:
+            return len(self.__add_many(cursor, (item,))) > 0
+
+    def add_many(self, items: Iterable[int]) -> int:
+        with self.transaction() as cursor:
+            return len(self.__add_many(cursor, items))
+
+    @overload
+    def add_many_and_keep_new(
+        self, items: Iterable[I], key: Callable[[I], int] = ...
+    ) -> List[I]: ...
+
+    @overload
+    def add_many_and_keep_new(
+        self, items: Iterable[int], key: None = ...
+    ) -> List[int]: ...
+
+    def add_many_and_keep_new(self, items, key=None):
+        with self.transaction() as cursor:
+            return self.__add_many(cursor, items, key=key)
+
+    def __contains__(self, item: int) -> bool:
+        if item not in self.bloom:
+            return False
+
+        with self.transaction() as cursor:
+            cursor.execute('SELECT 1 FROM "set" WHERE "key" = ?;', (item,))
+            return cursor.fetchone() is not None
+
+    def __len__(self) -> int:
+        with self.transaction() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM "set";')
+            return cursor.fetchone()[0]
+
+    def __iter__(self) -> Iterator[int]:
+        with self.transaction() as cursor:
+            cursor.execute('SELECT "key" FROM "set";')
+
+            for row in iterate_over_sqlite_cursor(cursor):
+                yield row[0]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __del__(self) -> None:
+        self.close()
+
+
+def check_url_cache_mode(path: str, compact: bool, resume: bool = False) -> None:
+    """
+    Function recording whether the persistent url cache found at the given
+    path is compact, and raising when resuming a cache created in another
+    mode, since it would otherwise silently start from an empty cache.
+    """
+    settings_path = join(path, "settings.json")
+
+    if resume:
+        try:
+            with open(settings_path) as f:
+                recorded = json.load(f)["compact"]
+
+        except FileNotFoundError:
+            # NOTE: caches created before their mode was recorded
+            recorded = None
+
+            if isfile(join(path, "fingerprints.db")):
+                recorded = True
+            elif isfile(join(path, "urls.db")):
+                recorded = False
+
+        if recorded is not None and recorded != compact:
+            raise CrawlerURLCacheModeMismatchError(compact=recorded)
+
+    with open(settings_path, "w") as f:
+        json.dump({"compact": compact}, f)
+
+
+# NOTE: a compact cache only stores 64 bits fingerprints of the urls, which
+# is faster and lighter but means the urls cannot be listed afterwards and
+# that there is a very small probability of false positives.
 class URLCache:
-    def __init__(self, path: Optional[str] = None, normalized: bool = False):
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        normalized: bool = False,
+        compact: bool = False,
+        resume: bool = False,
+    ):
         self.path = path
         self.persistent = path is not None
-        self.preprocessing = normalize_url if normalized else canonicalize_url
         self.normalized = normalized
+        self.compact = compact
 
-        self.__cache = (
-            SQLiteStringSet(path, "urls.db") if path is not None else AtomicSet()
-        )
+        preprocessing = normalize_url if normalized else canonicalize_url
+
+        if compact:
+            self.preprocessing = lambda url: fingerprint(preprocessing(url))
+        else:
+            self.preprocessing = preprocessing
+
+        if path is not None:
+            makedirs(path, exist_ok=True)
+            check_url_cache_mode(path, compact, resume=resume)
+
+        if path is None:
+            self.__cache = AtomicSet()
+        elif compact:
+            self.__cache = SQLiteFingerprintSet(path, "fingerprints.db")
+        else:
+            self.__cache = SQLiteStringSet(path, "urls.db")
 
     def add(self, url: str) -> bool:
         url = self.preprocessing(url)
         return self.__cache.add(url)
 
-    def register(
-        self, jobs: Iterable[CrawlJob[CrawlJobDataType]]
-    ) -> List[CrawlJob[CrawlJobDataType]]:
-        def url_key(job: CrawlJob[CrawlJobDataType]):
-            return self.preprocessing(job.url)
+    def register_many(self, items: Iterable[I], key: Callable[[I], str]) -> List[I]:
+        """
+        Method registering the urls of the given items and returning the items
+        whose url was not registered yet. This means urls can be filtered
+        before the crawl jobs are built.
+        """
+
+        # NOTE: urls are preprocessed once, since it can be costly
+        keyed_items = [(self.preprocessing(key(item)), item) for item in items]
 
         # We deduplicate beforehand
-        jobs = distinct(jobs, key=url_key)
-        new = self.__cache.add_many_and_keep_new(jobs, key=url_key)
+        keyed_items = distinct(keyed_items, key=itemgetter(0))
+        new = self.__cache.add_many_and_keep_new(keyed_items, key=itemgetter(0))
 
-        return new
+        return [item for _, item in new]
+
+    def register(
+        self, jobs: Iterable[CrawlJob[CrawlJobDataType]]
+    ) -> List[CrawlJob[CrawlJobDataType]]:
+        return self.register_many(jobs, key=lambda job: job.url)
 
     def __len__(self) -> int:
         return len(self.__cache)
 
     def __iter__(self) -> Iterator[str]:
+        if self.compact:
+            raise TypeError("cannot iterate over a compact url cache")
+
         return self.__cache.__iter__()
 
     def __contains__(self, url: str) -> bool:
@@ -244,4 +608,6 @@ class URLCache:
         self.__cache.close()
 
     def __del__(self) -> None:
-        self.close()
+        # NOTE: the cache might not have been fully initialized
+        if hasattr(self, "_URLCache__cache"):
+            self.close()
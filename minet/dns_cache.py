@@ -0,0 +1,246 @@
+# =============================================================================
+# Minet DNS Cache
+# =============================================================================
+#
+# An in-process cache of hostname resolutions, shared by the connections of
+# urllib3 pools, so that opening new connections to known hosts does not go
+# through a blocking `getaddrinfo` call each time. Its hostnames can also be
+# prefetched in the background, ahead of the requests needing them.
+#
+# NOTE: `getaddrinfo` does not give access to the TTL of the records, which
+# is why entries are kept for a fixed time, that should remain lower than
+# typical TTLs.
+#
+from typing import Optional, List, Dict, Tuple, Union
+
+import socket
+from ipaddress import ip_address
+from collections import OrderedDict
+from queue import Queue, Full
+from threading import Lock, Thread, local
+from time import monotonic, perf_counter
+from ural import get_hostname
+from quenouille import NamedLocks
+from urllib3.util.connection import allowed_gai_family
+
+from minet.constants import (
+    DEFAULT_DNS_CACHE_TTL,
+    DEFAULT_DNS_CACHE_ERROR_TTL,
+    DEFAULT_DNS_CACHE_MAX_SIZE,
+    DEFAULT_DNS_PREFETCH_WORKERS,
+    DEFAULT_DNS_PREFETCH_QUEUE_SIZE,
+)
+
+DNSCacheEntry = Tuple[float, Union[List[str], socket.gaierror]]
+
+# NOTE: time spent resolving hostnames by the current thread, so that
+# it can be attributed to the request being performed
+THREAD_LOCAL = local()
+
+
+def reset_dns_timing() -> None:
+    THREAD_LOCAL.time = 0.0
+
+
+def get_dns_timing() -> float:
+    return getattr(THREAD_LOCAL, "time", 0.0)
+
+
+def is_ip_address(host: str) -> bool:
+    try:
+        ip_address(host.strip("[]"))
+    except ValueError:
+        return False
+
+    return True
+
+
+class DNSCache(object):
+    """
+    Threadsafe cache of hostname resolutions. Concurrent resolutions of a same
+    hostname are performed only once, and failed resolutions are also cached,
+    for a shorter time.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_DNS_CACHE_TTL,
+        error_ttl: float = DEFAULT_DNS_CACHE_ERROR_TTL,
+        max_size: int = DEFAULT_DNS_CACHE_MAX_SIZE,
+        prefetch_workers: int = DEFAULT_DNS_PREFETCH_WORKERS,
+        prefetch_queue_size: int = DEFAULT_DNS_PREFETCH_QUEUE_SIZE,
+    ):
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.max_size = max_size
+        self.prefetch_workers = prefetch_workers
+
+        self.lock = Lock()
+        self.host_locks = NamedLocks()
+        self.entries: "OrderedDict[str, DNSCacheEntry]" = OrderedDict()
+
+        self.prefetch_queue: "Queue[str]" = Queue(maxsize=prefetch_queue_size)
+        self.prefetching = set()
+        self.prefetch_threads: List[Thread] = []
+
+        self.stats = {"hits": 0, "misses": 0, "errors": 0, "prefetched": 0}
+        self.time = 0.0
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.entries)
+
+    def __get(self, host: str) -> Optional[DNSCacheEntry]:
+        entry = self.entries.get(host)
+
+        if entry is None:
+            return None
+
+        if entry[0] < monotonic():
+            del self.entries[host]
+            return None
+
+        self.entries.move_to_end(host)
+
+        return entry
+
+    def __set(self, host: str, result: Union[List[str], socket.gaierror]) -> None:
+        ttl = self.error_ttl if isinstance(result, socket.gaierror) else self.ttl
+
+        self.entries[host] = (monotonic() + ttl, result)
+        self.entries.move_to_end(host)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def __getaddrinfo(self, host: str) -> List[str]:
+        addresses = []
+
+        for _, _, _, _, sa in socket.getaddrinfo(
+            host, None, allowed_gai_family(), socket.SOCK_STREAM
+        ):
+            if sa[0] not in addresses:
+                addresses.append(sa[0])
+
+        return addresses
+
+    def resolve(self, host: str, prefetching: bool = False) -> List[str]:
+        """
+        Method returning the ip addresses of the given hostname, or raising
+        the `socket.gaierror` that occurred when resolving it.
+        """
+        if is_ip_address(host):
+            return [host.strip("[]")]
+
+        start = perf_counter()
+
+        try:
+            with self.lock:
+                entry = self.__get(host)
+
+            if entry is None:
+                # NOTE: only one thread resolves a given hostname at once,
+                # the other ones will wait and hit the cache
+                with self.host_locks[host]:
+                    with self.lock:
+                        entry = self.__get(host)
+
+                    if entry is None:
+                        try:
+                            result = self.__getaddrinfo(host)
+                        except socket.gaierror as e:
+                            result = e
+
+                        with self.lock:
+                            self.__set(host, result)
+                            self.stats["misses"] += 1
+                            self.stats["prefetched"] += int(prefetching)
+
+                            if isinstance(result, socket.gaierror):
+                                self.stats["errors"] += 1
+
+                        entry = (0, result)
+
+                    elif not prefetching:
+                        with self.lock:
+                            self.stats["hits"] += 1
+
+            elif not prefetching:
+                with self.lock:
+                    self.stats["hits"] += 1
+
+        finally:
+            if not prefetching:
+                elapsed = perf_counter() - start
+
+                THREAD_LOCAL.time = get_dns_timing() + elapsed
+
+                with self.lock:
+                    self.time += elapsed
+
+        result = entry[1]
+
+        if isinstance(result, socket.gaierror):
+            raise result
+
+        return result
+
+    def __ensure_prefetch_threads(self) -> None:
+        if self.prefetch_threads:
+            return
+
+        with self.lock:
+            if self.prefetch_threads:
+                return
+
+            # NOTE: threads are daemonic so that a hanging resolver cannot
+            # prevent the process from exiting
+            for i in range(self.prefetch_workers):
+                thread = Thread(
+                    target=self.__prefetch_loop,
+                    name="DNSCachePrefetcher-%i" % i,
+                    daemon=True,
+                )
+                thread.start()
+                self.prefetch_threads.append(thread)
+
+    def __prefetch_loop(self) -> None:
+        while True:
+            host = self.prefetch_queue.get()
+
+            try:
+                self.resolve(host, prefetching=True)
+            except OSError:
+                pass
+            finally:
+                with self.lock:
+                    self.prefetching.discard(host)
+
+    def prefetch(self, url: str) -> None:
+        """
+        Method scheduling the resolution of the given url's hostname in the
+        background, if it is not already known. Prefetches are dropped if too
+        many of them are already pending, so this never blocks.
+        """
+        host = get_hostname(url)
+
+        if not host or is_ip_address(host):
+            return
+
+        with self.lock:
+            if host in self.prefetching or self.__get(host) is not None:
+                return
+
+            self.prefetching.add(host)
+
+        self.__ensure_prefetch_threads()
+
+        try:
+            self.prefetch_queue.put_nowait(host)
+        except Full:
+            with self.lock:
+                self.prefetching.discard(host)
+
+    def get_stats(self) -> Dict[str, Union[int, float]]:
+        with self.lock:
+            return {**self.stats, "time": self.time}
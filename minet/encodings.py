@@ -3,13 +3,16 @@
 # =============================================================================
 #
 # List of python-supported encodings so we can ensure we will be able to
-# correctly handle them.
+# correctly handle them, and tiered encoding detection.
 #
 from typing import Optional
 
 import re
+import codecs
 import charset_normalizer
 
+from minet.constants import DEFAULT_ENCODING_SNIFF_SIZE, DEFAULT_ENCODING_SAMPLE_SIZE
+
 ENCODINGS = set(
     [
         "1125",
@@ -289,6 +292,81 @@ UTF16_BE_BOM = b"\xfe\xff"
 UTF32_LE_BOM = b"\xff\xfe\x00\x00"
 UTF32_BE_BOM = b"\x00\x00\xfe\xff"
 
+# NOTE: order matters since the UTF-32 LE BOM starts with the UTF-16 LE one
+BOMS = [
+    (UTF8_BOM, "utf-8-sig"),
+    (UTF32_LE_BOM, "utf-32"),
+    (UTF32_BE_BOM, "utf-32"),
+    (UTF16_LE_BOM, "utf-16"),
+    (UTF16_BE_BOM, "utf-16"),
+]
+
+
+def encoding_from_bom(data: bytes) -> Optional[str]:
+    for bom, encoding in BOMS:
+        if data.startswith(bom):
+            return encoding
+
+    return None
+
+
+def is_valid_utf8(data: bytes) -> bool:
+    # NOTE: a multibyte character truncated at the end of the data is
+    # tolerated, since we might be looking at a sample
+    try:
+        codecs.utf_8_decode(data, "strict", False)
+    except UnicodeDecodeError:
+        return False
+
+    return True
+
+
+def detect_encoding(
+    data: bytes,
+    declared_encoding: Optional[str] = None,
+    sniff_size: int = DEFAULT_ENCODING_SNIFF_SIZE,
+    sample_size: int = DEFAULT_ENCODING_SAMPLE_SIZE,
+) -> Optional[str]:
+    """
+    Function detecting the encoding of the given data, by order of
+    decreasing reliability & increasing cost:
+
+    1. byte order mark
+    2. declared encoding, e.g. a Content-Type header's charset
+    3. <meta> tags & xml declaration found in the first `sniff_size` bytes
+    4. utf-8 validity
+    5. statistical detection on the first `sample_size` bytes
+    """
+    # NOTE: lazy import to avoid an import cycle
+    from minet.scrape.regex import extract_encodings_from_xml
+
+    encoding = encoding_from_bom(data)
+
+    if encoding is not None:
+        return encoding
+
+    if declared_encoding is not None and is_supported_encoding(declared_encoding):
+        return declared_encoding
+
+    sniffed_encodings = extract_encodings_from_xml(data, chunk_size=sniff_size)
+
+    for encoding, _ in sorted(
+        sniffed_encodings.items(), key=lambda item: item[1], reverse=True
+    ):
+        if is_supported_encoding(encoding):
+            # NOTE: if we could read the declaration, this is not UTF-16/32
+            if normalize_encoding(encoding).startswith(("utf16", "utf32")):
+                return "utf-8"
+
+            return encoding
+
+    # NOTE: ascii data is reported as utf-8, its superset, since we might
+    # only be looking at the head of a larger body
+    if data.isascii() or is_valid_utf8(data):
+        return "utf-8"
+
+    return infer_encoding(data[:sample_size])
+
 
 def fix_surrogates(string: str) -> str:
     try:
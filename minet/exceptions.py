@@ -77,6 +77,12 @@ class CookieGrabbingError(MinetError):
         self.reason = reason
 
 
+# Multiprocessing errors
+class BrokenWorkerProcessPoolError(MinetError):
+    def __init__(self):
+        super().__init__("A worker process died unexpectedly")
+
+
 # Miscellaneous HTTP errors
 class InvalidURLError(MinetError):
     def __init__(self, url: str):
@@ -110,6 +116,12 @@ class FinalTimeoutError(MinetError):
     pass
 
 
+class ResponseTooLargeError(MinetError):
+    def __init__(self, max_size: int):
+        super().__init__("Response body exceeds %i bytes" % max_size)
+        self.max_size = max_size
+
+
 # Redirection errors
 class RedirectError(MinetError):
     pass
@@ -231,6 +243,45 @@ class PycurlSendError(PycurlProtocolError):
     pass
 
 
+# Httpx errors
+class HttpxNotInstalledError(MinetError):
+    pass
+
+
+class HttpxError(MinetError):
+    def __init__(self, reason: Exception):
+        self.reason = reason
+        super().__init__("%s: %s" % (reason.__class__.__name__, str(reason)))
+
+
+class HttpxTimeoutError(HttpxError):
+    pass
+
+
+class HttpxSSLError(HttpxError):
+    pass
+
+
+class HttpxProtocolError(HttpxError):
+    pass
+
+
+class HttpxHostResolutionError(HttpxProtocolError):
+    pass
+
+
+class HttpxConnectionRefusedError(HttpxProtocolError):
+    pass
+
+
+class HttpxReceiveError(HttpxProtocolError):
+    pass
+
+
+class HttpxSendError(HttpxProtocolError):
+    pass
+
+
 # sqlar
 class SQLArchiveError(MinetError):
     pass
@@ -240,6 +291,44 @@ class SQLArchiveInvalidError(SQLArchiveError):
     pass
 
 
+# Zstd
+class ZstdNotInstalledError(MinetError):
+    pass
+
+
+class ZstdDictionaryNotFoundError(MinetError):
+    def __init__(self, dict_id: int):
+        self.dict_id = dict_id
+        super().__init__("could not find zstd dictionary with id %i" % dict_id)
+
+
+# WARC
+class WARCError(MinetError):
+    pass
+
+
+class WARCInvalidRecordError(WARCError):
+    pass
+
+
+# Resolve cache
+class ResolveCacheError(MinetError):
+    pass
+
+
+class ResolveCacheInvalidError(ResolveCacheError):
+    pass
+
+
+# HTTP cache
+class HTTPCacheError(MinetError):
+    pass
+
+
+class HTTPCacheInvalidError(HTTPCacheError):
+    pass
+
+
 # Browser emulation
 class BrowserError(MinetError):
     pass
@@ -30,15 +30,20 @@ if TYPE_CHECKING:
 
 import urllib3
 import threading
-from threading import Event
+from collections import OrderedDict
+from threading import Event, Lock
 from quenouille import ThreadPoolExecutor
 from ural import get_domain_name, ensure_protocol
 from tenacity import RetryCallState
 
 from minet.serialization import serialize_error_as_slug
+from minet.resolve_cache import ResolveCache, is_cached_stack
+from minet.http_cache import HTTPCache
+from minet.dns_cache import DNSCache
 from minet.exceptions import CancelledRequestError, HTTPCallbackError
 from minet.web import (
     create_pool_manager,
+    AnyInstrumentedPoolManager,
     create_request_retryer,
     request,
     resolve,
@@ -50,7 +55,10 @@ from minet.web import (
 from minet.constants import (
     DEFAULT_DOMAIN_PARALLELISM,
     DEFAULT_IMAP_BUFFER_SIZE,
+    DEFAULT_POOL_MANAGER_NUM_POOLS,
     DEFAULT_THROTTLE,
+    DEFAULT_COALESCING_CACHE_SIZE,
+    DEFAULT_COALESCING_CACHE_MAX_BYTES,
     DEFAULT_URLLIB3_TIMEOUT,
     DEFAULT_FETCH_MAX_REDIRECTS,
     DEFAULT_RESOLVE_MAX_REDIRECTS,
@@ -62,10 +70,11 @@ CallbackResultType = TypeVar("CallbackResultType")
 
 
 class HTTPWorkerPayloadBase(Generic[ItemType]):
-    __slots__ = ("item", "url", "__has_cached_domain", "__domain")
+    __slots__ = ("item", "url", "cached", "__has_cached_domain", "__domain")
 
     item: ItemType
     url: Optional[str]
+    cached: bool
 
     __has_cached_domain: bool
     __domain: Optional[str]
@@ -73,6 +82,7 @@ class HTTPWorkerPayloadBase(Generic[ItemType]):
     def __init__(self, item: ItemType, url: Optional[str]):
         self.item = item
         self.url = url
+        self.cached = False
         self.__has_cached_domain = False
         self.__domain = None
 
@@ -108,6 +118,13 @@ class ExecutorRequestKwargs(TypedDict, Generic[ItemType]):
     domain_parallelism: NotRequired[int]
     max_redirects: NotRequired[int]
     known_encoding: NotRequired[Optional[str]]
+    max_body_size: NotRequired[Optional[int]]
+    spool_body_over: NotRequired[Optional[int]]
+    cache: NotRequired[Optional[HTTPCache]]
+    coalesce: NotRequired[bool]
+    coalescing_cache_size: NotRequired[int]
+    coalescing_cache_max_bytes: NotRequired[Optional[int]]
+    dns_prefetch: NotRequired[bool]
 
 
 class ExecutorResolveKwargs(TypedDict, Generic[ItemType]):
@@ -123,6 +140,10 @@ class ExecutorResolveKwargs(TypedDict, Generic[ItemType]):
     follow_js_relocation: NotRequired[bool]
     infer_redirection: NotRequired[bool]
     canonicalize: NotRequired[bool]
+    cache: NotRequired[Optional[ResolveCache]]
+    coalesce: NotRequired[bool]
+    coalescing_cache_size: NotRequired[int]
+    dns_prefetch: NotRequired[bool]
 
 
 class RequestResult(Generic[ItemType]):
@@ -323,15 +344,199 @@ AnyResolveResult = Union[
 ]
 
 
+# NOTE: outcomes are stored as (output, error) tuples
+CoalescedOutcome = Tuple[Any, Optional[Exception]]
+
+
+class RequestCoalescerBase(object):
+    """
+    Base class of the single-flight layers deduplicating requests made to
+    the same url during a single run: the first occurrence of a url
+    performs the request and later ones are handed the same outcome.
+
+    Completed outcomes are kept in a LRU cache, bounded both by a number of
+    entries and, when `get_size` is given, by the total size in bytes of
+    their outputs. Outputs larger than `max_cache_bytes` are never cached.
+    Only expected web errors are cached, so that cancellation or unexpected
+    errors are not replayed.
+    """
+
+    def __init__(
+        self,
+        cache_size: int = DEFAULT_COALESCING_CACHE_SIZE,
+        should_cache: Optional[Callable[[Any], bool]] = None,
+        max_cache_bytes: Optional[int] = None,
+        get_size: Optional[Callable[[Any], int]] = None,
+    ):
+        if cache_size < 0:
+            raise TypeError("cache_size should be >= 0")
+
+        if max_cache_bytes is not None and max_cache_bytes < 0:
+            raise TypeError("max_cache_bytes should be >= 0")
+
+        self.cache_size = cache_size
+        self.should_cache = should_cache
+        self.max_cache_bytes = max_cache_bytes
+        self.get_size = get_size
+        self.cache: OrderedDict[str, Tuple[CoalescedOutcome, int]] = OrderedDict()
+        self.cache_bytes = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def _get(self, key: str) -> Optional[CoalescedOutcome]:
+        entry = self.cache.get(key)
+
+        if entry is None:
+            return None
+
+        self.cache.move_to_end(key)
+        self.coalesced += 1
+
+        return entry[0]
+
+    def _is_shareable(self, outcome: CoalescedOutcome) -> bool:
+        output, error = outcome
+
+        if error is not None:
+            return isinstance(error, EXPECTED_WEB_ERRORS)
+
+        return self.should_cache is None or self.should_cache(output)
+
+    def _set(self, key: str, outcome: CoalescedOutcome) -> None:
+        if self.cache_size == 0:
+            return
+
+        output, error = outcome
+        size = 0
+
+        if error is None and self.get_size is not None:
+            size = self.get_size(output)
+
+        if self.max_cache_bytes is not None and size > self.max_cache_bytes:
+            return
+
+        previous = self.cache.pop(key, None)
+
+        if previous is not None:
+            self.cache_bytes -= previous[1]
+
+        self.cache[key] = (outcome, size)
+        self.cache_bytes += size
+
+        while len(self.cache) > self.cache_size or (
+            self.max_cache_bytes is not None and self.cache_bytes > self.max_cache_bytes
+        ):
+            _, (_, evicted_size) = self.cache.popitem(last=False)
+            self.cache_bytes -= evicted_size
+
+
+class InflightRequest(object):
+    __slots__ = ("event", "outcome")
+
+    def __init__(self):
+        self.event = Event()
+        self.outcome: Optional[CoalescedOutcome] = None
+
+
+class RequestCoalescer(RequestCoalescerBase):
+    """
+    Threadsafe single-flight layer used by HTTPThreadPoolExecutor. Threads
+    requesting a url already being requested by another thread will wait
+    for its outcome instead of performing the same request.
+
+    Note that coalesced payloads are flagged as cached so that they are not
+    throttled.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.lock = Lock()
+        self.inflight: Dict[str, InflightRequest] = {}
+
+    def __call__(
+        self,
+        payload: HTTPWorkerPayloadBase,
+        fn: Callable[..., Any],
+        *args,
+        **kwargs,
+    ) -> Any:
+        key = cast(str, payload.url)
+
+        with self.lock:
+            outcome = self._get(key)
+            inflight = self.inflight.get(key)
+            leader = outcome is None and inflight is None
+
+            if leader:
+                inflight = InflightRequest()
+                self.inflight[key] = inflight
+
+        assert outcome is not None or inflight is not None
+
+        # Waiting for the thread performing the same request
+        if outcome is None and not leader:
+            inflight.event.wait()
+            outcome = inflight.outcome
+
+            # NOTE: if the outcome cannot be shared, we perform our own request
+            if outcome is None or not self._is_shareable(outcome):
+                return fn(*args, **kwargs)
+
+            with self.lock:
+                self.coalesced += 1
+
+        if outcome is not None:
+            payload.cached = True
+            output, error = outcome
+
+            if error is not None:
+                raise error
+
+            return output
+
+        try:
+            output = fn(*args, **kwargs)
+            outcome = (output, None)
+        except Exception as error:
+            outcome = (None, error)
+            raise
+        finally:
+            inflight.outcome = outcome
+
+            with self.lock:
+                del self.inflight[key]
+
+                if outcome is not None and self._is_shareable(outcome):
+                    self._set(key, outcome)
+
+            inflight.event.set()
+
+        return output
+
+
 def key_by_domain_name(payload: HTTPWorkerPayloadBase) -> Optional[str]:
     return payload.domain
 
 
+def skip_throttle_when_cached(throttle: float):
+    def get_throttle(group, payload: HTTPWorkerPayloadBase, result) -> float:
+        return 0 if payload.cached else throttle
+
+    return get_throttle
+
+
 def payloads_iter(
     iterable: Iterable[ItemType],
     key: Optional[Callable[[ItemType], Optional[str]]] = None,
     passthrough: bool = False,
+    dns_cache: Optional[DNSCache] = None,
 ) -> Iterator[HTTPWorkerPayloadBase[ItemType]]:
+    # NOTE: the executor buffers items ahead of their execution, so
+    # prefetching their hostname when they are pulled from here gives
+    # resolutions a head start on the requests needing them
     for item in iterable:
         url = item if key is None else key(item)
 
@@ -345,6 +550,9 @@ def payloads_iter(
         # Url cleanup
         url = ensure_protocol(url.strip())  # type: ignore
 
+        if dns_cache is not None:
+            dns_cache.prefetch(url)
+
         yield HTTPWorkerPayloadBase(item=item, url=url)
 
 
@@ -366,7 +574,11 @@ class HTTPWorker(Generic[ItemType, CallbackResultType]):
         infer_redirection: bool = False,
         canonicalize: bool = False,
         known_encoding: Optional[str] = None,
+        max_body_size: Optional[int] = None,
+        spool_body_over: Optional[int] = None,
         raise_on_statuses: Optional[Container[int]] = None,
+        cache: Optional[Union[ResolveCache, HTTPCache]] = None,
+        coalescer: Optional[RequestCoalescer] = None,
         callback: Optional[
             Union[
                 Callable[[ItemType, str, Response], CallbackResultType],
@@ -377,6 +589,7 @@ class HTTPWorker(Generic[ItemType, CallbackResultType]):
         self.cancel_event = cancel_event
         self.local_context = local_context
         self.get_args = get_args
+        self.coalescer = coalescer
         self.callback = callback
 
         self.resolving = resolving
@@ -413,6 +626,21 @@ class HTTPWorker(Generic[ItemType, CallbackResultType]):
         if known_encoding is not None:
             self.default_kwargs["known_encoding"] = known_encoding
 
+        if max_body_size is not None:
+            self.default_kwargs["max_body_size"] = max_body_size
+
+        if spool_body_over is not None:
+            self.default_kwargs["spool_body_over"] = spool_body_over
+
+        if cache is not None:
+            self.default_kwargs["cache"] = cache
+
+    def __perform(self, retryer, url: str, kwargs: Dict[str, Any]):
+        if retryer is not None:
+            return retryer(self.fn, url, **kwargs)
+
+        return self.fn(url, **kwargs)
+
     def __call__(
         self, payload: HTTPWorkerPayloadBase[ItemType]
     ) -> Optional[
@@ -445,10 +673,10 @@ class HTTPWorker(Generic[ItemType, CallbackResultType]):
         try:
             retryer = getattr(self.local_context, "retryer", None)
 
-            if retryer is not None:
-                output = retryer(self.fn, url, **kwargs)
+            if self.coalescer is not None:
+                output = self.coalescer(payload, self.__perform, retryer, url, kwargs)
             else:
-                output = self.fn(url, **kwargs)
+                output = self.__perform(retryer, url, kwargs)
 
         except CancelledRequestError:
             return
@@ -457,6 +685,11 @@ class HTTPWorker(Generic[ItemType, CallbackResultType]):
             return self.ErroredResult(item, url, error), None
 
         else:
+            if is_cached_stack(output) or (
+                isinstance(output, Response) and output.cache_status == "hit"
+            ):
+                payload.cached = True
+
             callback_result = None
 
             if self.callback is not None:
@@ -478,6 +711,8 @@ class HTTPWorker(Generic[ItemType, CallbackResultType]):
 
 
 class HTTPThreadPoolExecutor(ThreadPoolExecutor):
+    pool_manager: AnyInstrumentedPoolManager
+
     def __init__(
         self,
         max_workers: Optional[int] = None,
@@ -489,11 +724,20 @@ class HTTPThreadPoolExecutor(ThreadPoolExecutor):
         proxy: Optional[str] = None,
         retry: bool = False,
         retryer_kwargs: Optional[Dict[str, Any]] = None,
+        num_pools: Optional[int] = None,
+        dns_cache: Union[bool, DNSCache] = False,
         **kwargs,
     ):
         self.cancel_event = Event()
         self.local_context = threading.local()
         self.retry_on_statuses = None
+        self.coalescer: Optional[RequestCoalescer] = None
+        self.dns_cache: Optional[DNSCache] = None
+
+        if dns_cache is True:
+            self.dns_cache = DNSCache()
+        elif isinstance(dns_cache, DNSCache):
+            self.dns_cache = dns_cache
 
         if retry:
 
@@ -527,15 +771,52 @@ class HTTPThreadPoolExecutor(ThreadPoolExecutor):
 
         # NOTE: 0 workers means a synchronous pool in quenouille,
         # so we reserve at least one connection for the pool.
-        self.pool_manager = create_pool_manager(
+        # Each host pool can hold as many connections as there are workers,
+        # since redirections can funnel every worker onto the same host.
+        # urllib3 opens connections lazily, so we can afford to keep a lot
+        # of pools to avoid redoing handshakes with hosts that were evicted
+        # from the LRU cache.
+        if num_pools is None:
+            num_pools = max(DEFAULT_POOL_MANAGER_NUM_POOLS, 4 * self.max_workers)
+
+        self.pool_manager = create_pool_manager(  # type: ignore
             parallelism=max(1, self.max_workers),
-            num_pools=max(64, self.max_workers),
+            num_pools=num_pools,
             insecure=insecure,
             timeout=timeout,
             spoof_tls_ciphers=spoof_tls_ciphers,
             proxy=proxy,
+            instrumented=True,
+            dns_cache=self.dns_cache,
         )
 
+    def connection_stats(self) -> Dict[str, Union[int, float]]:
+        stats = self.pool_manager.stats
+        dns_stats = self.dns_cache.get_stats() if self.dns_cache else {}
+
+        return {
+            "requests": stats.requests,
+            "reused_connections": stats.reused_connections,
+            "new_connections": stats.new_connections,
+            "handshakes": stats.handshakes,
+            "pools": stats.pools,
+            "evictions": self.pool_manager.evictions,
+            "coalesced": self.coalescer.coalesced if self.coalescer else 0,
+            "dns_hits": dns_stats.get("hits", 0),
+            "dns_misses": dns_stats.get("misses", 0),
+            "dns_prefetched": dns_stats.get("prefetched", 0),
+            "dns_time": dns_stats.get("time", 0.0),
+        }
+
+    def __get_prefetching_dns_cache(self, dns_prefetch: bool) -> Optional[DNSCache]:
+        if not dns_prefetch:
+            return None
+
+        if self.dns_cache is None:
+            raise TypeError("dns_prefetch requires the executor to have a dns_cache")
+
+        return self.dns_cache
+
     def cancel(self) -> None:
         self.cancel_event.set()
 
@@ -601,6 +882,13 @@ class HTTPThreadPoolExecutor(ThreadPoolExecutor):
         domain_parallelism: int = DEFAULT_DOMAIN_PARALLELISM,
         max_redirects: int = DEFAULT_FETCH_MAX_REDIRECTS,
         known_encoding: Optional[str] = None,
+        max_body_size: Optional[int] = None,
+        spool_body_over: Optional[int] = None,
+        cache: Optional[HTTPCache] = None,
+        coalesce: bool = False,
+        coalescing_cache_size: int = DEFAULT_COALESCING_CACHE_SIZE,
+        coalescing_cache_max_bytes: Optional[int] = DEFAULT_COALESCING_CACHE_MAX_BYTES,
+        dns_prefetch: bool = False,
         callback: Optional[
             Callable[[ItemType, str, Response], Optional[CallbackResultType]]
         ] = None,
@@ -612,6 +900,20 @@ class HTTPThreadPoolExecutor(ThreadPoolExecutor):
         Iterator[Tuple[AnyActualRequestResult[ItemType], Optional[CallbackResultType]]],
     ]:
         # TODO: validate
+        prefetching_dns_cache = self.__get_prefetching_dns_cache(dns_prefetch)
+
+        if coalesce:
+            # NOTE: spooled bodies are read through a shared file handle
+            self.coalescer = RequestCoalescer(
+                coalescing_cache_size,
+                should_cache=lambda response: not response.is_spooled,
+                max_cache_bytes=coalescing_cache_max_bytes,
+                get_size=len,
+            )
+
+        if coalesce or cache is not None:
+            throttle = skip_throttle_when_cached(throttle)  # type: ignore
+
         worker = HTTPWorker(
             self.pool_manager,
             self.cancel_event,
@@ -621,14 +923,23 @@ class HTTPThreadPoolExecutor(ThreadPoolExecutor):
             use_pycurl=use_pycurl,
             compressed=compressed,
             known_encoding=known_encoding,
+            max_body_size=max_body_size,
+            spool_body_over=spool_body_over,
             raise_on_statuses=self.retry_on_statuses,
+            cache=cache,
+            coalescer=self.coalescer if coalesce else None,
             callback=callback,
         )
 
         method = super().imap if ordered else super().imap_unordered
 
         imap = method(
-            payloads_iter(iterator, key=key, passthrough=passthrough),
+            payloads_iter(
+                iterator,
+                key=key,
+                passthrough=passthrough,
+                dns_cache=prefetching_dns_cache,
+            ),
             worker,
             key=key_by_domain_name,
             parallelism=domain_parallelism,
@@ -707,6 +1018,10 @@ class HTTPThreadPoolExecutor(ThreadPoolExecutor):
         follow_js_relocation: bool = False,
         infer_redirection: bool = False,
         canonicalize: bool = False,
+        cache: Optional[ResolveCache] = None,
+        coalesce: bool = False,
+        coalescing_cache_size: int = DEFAULT_COALESCING_CACHE_SIZE,
+        dns_prefetch: bool = False,
         callback: Optional[
             Callable[[ItemType, str, RedirectionStack], Optional[CallbackResultType]]
         ] = None,
@@ -718,6 +1033,14 @@ class HTTPThreadPoolExecutor(ThreadPoolExecutor):
         Iterator[Tuple[AnyActualResolveResult[ItemType], Optional[CallbackResultType]]],
     ]:
         # TODO: validate
+        prefetching_dns_cache = self.__get_prefetching_dns_cache(dns_prefetch)
+
+        if coalesce:
+            self.coalescer = RequestCoalescer(coalescing_cache_size)
+
+        if coalesce or cache is not None:
+            throttle = skip_throttle_when_cached(throttle)  # type: ignore
+
         worker = HTTPWorker(
             self.pool_manager,
             self.cancel_event,
@@ -731,13 +1054,20 @@ class HTTPThreadPoolExecutor(ThreadPoolExecutor):
             infer_redirection=infer_redirection,
             canonicalize=canonicalize,
             raise_on_statuses=self.retry_on_statuses,
+            cache=cache,
+            coalescer=self.coalescer if coalesce else None,
             callback=callback,
         )
 
         method = super().imap if ordered else super().imap_unordered
 
         imap = method(
-            payloads_iter(iterator, key=key, passthrough=passthrough),
+            payloads_iter(
+                iterator,
+                key=key,
+                passthrough=passthrough,
+                dns_cache=prefetching_dns_cache,
+            ),
             worker,
             key=key_by_domain_name,
             parallelism=domain_parallelism,
@@ -4,15 +4,19 @@
 #
 # Multiple helper functions related to reading and writing files.
 #
-from typing import Union, Optional, cast, Dict
+from typing import Union, Optional, cast, Dict, BinaryIO, Set, Literal
 
 import os
 import gzip
 import json
+import shutil
 import yaml
+from hashlib import sha256
+from dataclasses import dataclass
+from threading import Lock
 from ebbe.decorators import with_defer
 from os import makedirs, PathLike
-from os.path import basename, join, splitext, abspath, normpath, dirname
+from os.path import basename, join, splitext, abspath, normpath, dirname, isfile
 from ural import (
     get_hostname,
     get_normalized_hostname,
@@ -28,8 +32,21 @@ from minet.exceptions import (
     CouldNotInferEncodingError,
 )
 from minet.utils import md5, PseudoFStringFormatter
-from minet.encodings import infer_encoding
+from minet.encodings import detect_encoding
 from minet.sqlar import SQLiteArchive
+from minet.warc import read_warc_record, split_warc_path
+from minet.zstd import (
+    GroupedZstdCompressor,
+    ensure_zstd_support,
+    get_zstd_group,
+    load_zstd_dictionaries_for_path,
+    write_zstd_dictionary,
+    zstd_uncompress,
+)
+
+FileCompression = Literal["gzip", "zstd"]
+
+COMPRESSION_EXTENSIONS: Dict[str, str] = {"gzip": ".gz", "zstd": ".zst"}
 
 
 def read_potentially_gzipped_path(
@@ -40,6 +57,34 @@ def read_potentially_gzipped_path(
 ) -> str:
     open_fn = open
     flag = "r" if encoding is not None else "rb"
+    binary = None
+
+    warc_location = split_warc_path(path)
+
+    if warc_location is not None:
+        # NOTE: "file.warc.gz#offset" paths point to a single WARC record
+        binary = read_warc_record(*warc_location).body
+
+    elif path.endswith(".zst"):
+        # NOTE: dictionaries are stored alongside the compressed files
+        load_zstd_dictionaries_for_path(path)
+
+        with open(path, "rb") as f:
+            binary = zstd_uncompress(f.read())
+
+    if binary is not None:
+        if encoding is not None:
+            return binary.decode(encoding, errors=errors)
+
+        encoding = detect_encoding(binary)
+
+        if encoding is None:
+            if fallback_encoding is not None:
+                encoding = fallback_encoding
+            else:
+                raise CouldNotInferEncodingError
+
+        return binary.decode(encoding, errors=errors)
 
     if path.endswith(".gz"):
         open_fn = gzip.open
@@ -48,7 +93,7 @@ def read_potentially_gzipped_path(
     if encoding is None:
         with open_fn(path, flag) as f:
             binary = f.read()
-            encoding = infer_encoding(binary)
+            encoding = detect_encoding(binary)
 
             if encoding is None:
                 if fallback_encoding is not None:
@@ -202,8 +247,10 @@ class FilenameBuilder(object):
         self,
         folder_strategy: Optional[Union[str, FolderStrategy]] = None,
         template=None,
+        compression: FileCompression = "gzip",
     ):
         self.folder_strategy = None
+        self.compression_ext = COMPRESSION_EXTENSIONS[compression]
 
         if folder_strategy is not None and isinstance(folder_strategy, str):
             self.folder_strategy = FolderStrategy.from_name(folder_strategy)
@@ -245,33 +292,92 @@ class FilenameBuilder(object):
             filename = self.folder_strategy(filename, url=url)
 
         if compressed:
-            filename += ".gz"
+            filename += self.compression_ext
 
         return filename
 
 
+CHUNK_SIZE = 2**16
+
+
+def hash_contents(contents: Union[bytes, BinaryIO]) -> str:
+    h = sha256()
+
+    if isinstance(contents, bytes):
+        h.update(contents)
+        return h.hexdigest()
+
+    # NOTE: file-like contents are hashed by chunks and rewound afterwards
+    position = contents.tell()
+
+    for chunk in iter(lambda: contents.read(CHUNK_SIZE), b""):
+        h.update(chunk)
+
+    contents.seek(position)
+
+    return h.hexdigest()
+
+
+@dataclass
+class WrittenBlob:
+    path: str
+    hash: str
+    deduplicated: bool
+
+
 class ThreadSafeFileWriter(object):
-    def __init__(self, root_directory: Optional[str] = None, sqlar: bool = False):
+    def __init__(
+        self,
+        root_directory: Optional[str] = None,
+        sqlar: bool = False,
+        compression: FileCompression = "gzip",
+    ):
         self.root_directory = root_directory or ""
         self.file_locks = NamedLocks()
         self.sqlar = sqlar
         self.archive = None
+        self.blobs: Set[str] = set()
+        self.blobs_lock = Lock()
+        self.compression = compression
+        self.compression_ext = COMPRESSION_EXTENSIONS[compression]
+        self.zstd_compressor = None
+
+        if compression == "zstd":
+            ensure_zstd_support()
 
         if self.sqlar:
             self.root_directory += ".sqlar"
-            self.archive = SQLiteArchive(self.root_directory)
+            self.archive = SQLiteArchive(
+                self.root_directory,
+                compression="zstd" if compression == "zstd" else "zlib",
+            )
+
+        elif compression == "zstd":
+            self.zstd_compressor = GroupedZstdCompressor(
+                on_dictionary=self.__write_zstd_dictionary
+            )
+
+    def __write_zstd_dictionary(self, group: str, dictionary) -> None:
+        write_zstd_dictionary(self.root_directory, dictionary)
 
     def resolve(self, filename: str, relative: bool = False, compress: bool = False):
         full_path = join(self.root_directory, filename)
 
-        if compress and not full_path.endswith(".gz"):
-            full_path += ".gz"
+        if compress and not full_path.endswith(self.compression_ext):
+            full_path += self.compression_ext
 
         if relative:
             return normpath(full_path)
 
         return normpath(abspath(full_path))
 
+    def exists(self, filename: str, compress: bool = False) -> bool:
+        if self.sqlar:
+            assert self.archive is not None
+            return filename in self.archive
+
+        return isfile(self.resolve(filename, compress=compress))
+
     def makedirs(self, directory: str) -> None:
         if not directory:
             return
@@ -282,21 +388,38 @@ class ThreadSafeFileWriter(object):
     def write(
         self,
         filename: str,
-        contents: Union[str, bytes],
+        contents: Union[str, bytes, BinaryIO],
         compress: bool = False,
         relative: bool = False,
+        group: Optional[str] = None,
     ) -> str:
         if self.sqlar:
             assert self.archive is not None
 
-            if not isinstance(contents, bytes):
+            if isinstance(contents, str):
                 contents = contents.encode("utf-8")
+            elif not isinstance(contents, bytes):
+                contents = contents.read()
 
-            self.archive.write(filename, contents)
+            self.archive.write(filename, contents, group=group)
 
             return filename
 
-        binary = isinstance(contents, bytes)
+        gzipped = compress and self.zstd_compressor is None
+
+        if compress and self.zstd_compressor is not None:
+            if isinstance(contents, str):
+                contents = contents.encode("utf-8")
+            elif not isinstance(contents, bytes):
+                contents = contents.read()
+
+            # NOTE: files sharing a top-level folder, usually given by the
+            # folder strategy, share a dictionary
+            contents = self.zstd_compressor.compress(
+                contents, group=get_zstd_group(filename) if group is None else group
+            )
+
+        binary = not isinstance(contents, str)
         filename = self.resolve(filename, relative=relative, compress=compress)
         directory = dirname(filename)
 
@@ -308,7 +431,7 @@ class ThreadSafeFileWriter(object):
         if not binary:
             open_kwargs["encoding"] = "utf-8"
 
-        if compress:
+        if gzipped:
             open_fn = gzip.open
 
             if not binary:
@@ -318,6 +441,62 @@ class ThreadSafeFileWriter(object):
 
         with self.file_locks[filename]:
             with open_fn(filename, **open_kwargs) as f:
-                f.write(contents)  # type: ignore
+                # NOTE: file-like contents, e.g. spooled response bodies, are
+                # streamed to disk instead of being loaded in memory
+                if binary and not isinstance(contents, bytes):
+                    shutil.copyfileobj(contents, f)
+                else:
+                    f.write(contents)  # type: ignore
 
         return filename
+
+    def close(self) -> None:
+        if self.archive is not None:
+            self.archive.close()
+
+    def write_blob(
+        self,
+        contents: Union[str, bytes, BinaryIO],
+        ext: Optional[str] = None,
+        compress: bool = False,
+    ) -> WrittenBlob:
+        """
+        Method writing the given contents under a path derived from their
+        sha256 hash, so that identical contents are only written once.
+        """
+        if isinstance(contents, str):
+            contents = contents.encode("utf-8")
+
+        digest = hash_contents(contents)
+
+        filename = join(digest[:2], digest)
+
+        if ext:
+            filename += "." + ext.lstrip(".")
+
+        if compress:
+            filename += self.compression_ext
+
+        with self.blobs_lock:
+            known = filename in self.blobs
+
+        if known:
+            return WrittenBlob(filename, digest, deduplicated=True)
+
+        # NOTE: locking on the digest so that concurrent writes of the same
+        # contents are not performed twice
+        with self.file_locks[digest]:
+            # NOTE: blobs may also have been written by a previous run
+            deduplicated = filename in self.blobs or self.exists(
+                filename, compress=compress
+            )
+
+            if not deduplicated:
+                # NOTE: blobs are spread across folders by hash prefix,
+                # which is meaningless as a zstd group
+                self.write(filename, contents, compress=compress, group="")
+
+            with self.blobs_lock:
+                self.blobs.add(filename)
+
+        return WrittenBlob(filename, digest, deduplicated=deduplicated)
@@ -0,0 +1,339 @@
+# =============================================================================
+# Minet HTTP Cache
+# =============================================================================
+#
+# A persistent SQLite cache of HTTP responses, storing their validators
+# (i.e. ETag & Last-Modified headers) so that recurring fetches can be
+# revalidated using conditional requests instead of downloading the same
+# bodies again and again.
+#
+# References:
+#  - https://httpwg.org/specs/rfc9111.html
+#  - https://httpwg.org/specs/rfc9110.html#conditional.requests
+#
+from typing import Optional, List, Tuple, Dict, Literal
+
+import json
+import sqlite3
+from os.path import isfile
+from threading import Lock
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from time import time
+from urllib3._collections import HTTPHeaderDict
+
+from minet.types import RedirectionStack
+from minet.sqlar import sqlar_compress, sqlar_uncompress
+from minet.resolve_cache import serialize_stack, deserialize_stack
+from minet.exceptions import HTTPCacheInvalidError
+
+HTTP_CACHE_TABLE_EXPECTED_RESULT = [
+    (0, "url", "TEXT", 0, None, 1),
+    (1, "mtime", "INT", 1, None, 0),
+    (2, "expires", "INT", 0, None, 0),
+    (3, "status", "INT", 1, None, 0),
+    (4, "headers", "TEXT", 1, None, 0),
+    (5, "stack", "TEXT", 0, None, 0),
+    (6, "sz", "INT", 1, None, 0),
+    (7, "data", "BLOB", 1, None, 0),
+]
+
+SQL_PRAGMAS = """
+PRAGMA journal_mode=wal;
+PRAGMA synchronous=normal;
+PRAGMA page_size=16384;
+"""
+
+SQL_CREATE = """
+CREATE TABLE http_cache (
+  url TEXT PRIMARY KEY,   -- requested url
+  mtime INT NOT NULL,     -- time the response was stored or revalidated
+  expires INT,            -- time after which the response must be revalidated
+  status INT NOT NULL,    -- status of the response
+  headers TEXT NOT NULL,  -- json serialized response headers
+  stack TEXT,             -- json serialized redirection stack
+  sz INT NOT NULL,        -- original body size
+  data BLOB NOT NULL      -- compressed body
+);
+"""
+
+SQL_INSERT = """
+INSERT OR REPLACE INTO http_cache (url, mtime, expires, status, headers, stack, sz, data)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+"""
+
+SQL_SELECT = """
+SELECT * FROM http_cache WHERE url = ? LIMIT 1;
+"""
+
+SQL_TOUCH = """
+UPDATE http_cache SET mtime = ?, expires = ?, headers = ? WHERE url = ?;
+"""
+
+CacheStatus = Literal["hit", "revalidated", "miss"]
+CACHE_STATUSES: List[CacheStatus] = ["hit", "revalidated", "miss"]
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives = {}
+
+    if not value:
+        return directives
+
+    for directive in value.split(","):
+        name, _, argument = directive.strip().partition("=")
+
+        if not name:
+            continue
+
+        directives[name.lower()] = argument.strip('"') if argument else None
+
+    return directives
+
+
+def get_expiration_time(headers: HTTPHeaderDict, now: float) -> Optional[int]:
+    """
+    Function returning the time until which a response can be served from
+    the cache without being revalidated, or None if it must always be
+    revalidated.
+    """
+    directives = parse_cache_control(headers.get("Cache-Control"))
+
+    if "no-cache" in directives:
+        return None
+
+    max_age = directives.get("max-age")
+
+    if max_age is not None:
+        try:
+            max_age = int(max_age)
+        except ValueError:
+            return None
+
+        return int(now) + max_age if max_age > 0 else None
+
+    expires = headers.get("Expires")
+
+    if expires is not None:
+        try:
+            expires_time = int(parsedate_to_datetime(expires).timestamp())
+        except (TypeError, ValueError):
+            return None
+
+        return expires_time if expires_time > now else None
+
+    return None
+
+
+def is_storable(status: int, headers: HTTPHeaderDict) -> bool:
+    if status != 200:
+        return False
+
+    if "no-store" in parse_cache_control(headers.get("Cache-Control")):
+        return False
+
+    return (
+        "ETag" in headers
+        or "Last-Modified" in headers
+        or get_expiration_time(headers, time()) is not None
+    )
+
+
+@dataclass
+class HTTPCacheEntry:
+    __slots__ = ("url", "mtime", "expires", "status", "headers", "stack", "body")
+
+    url: str
+    mtime: int
+    expires: Optional[int]
+    status: int
+    headers: HTTPHeaderDict
+    stack: Optional[RedirectionStack]
+    body: bytes
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.expires is not None and time() < self.expires
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+
+        etag = self.headers.get("ETag")
+
+        if etag is not None:
+            headers["If-None-Match"] = etag
+
+        last_modified = self.headers.get("Last-Modified")
+
+        if last_modified is not None:
+            headers["If-Modified-Since"] = last_modified
+
+        return headers
+
+
+def serialize_headers(headers: HTTPHeaderDict) -> str:
+    return json.dumps(list(headers.iteritems()), ensure_ascii=False)
+
+
+def deserialize_headers(data: str) -> HTTPHeaderDict:
+    headers = HTTPHeaderDict()
+
+    for k, v in json.loads(data):
+        headers.add(k, v)
+
+    return headers
+
+
+def is_http_cache(cursor: sqlite3.Cursor) -> bool:
+    cursor.execute('PRAGMA table_info("http_cache")')
+
+    return cursor.fetchall() == HTTP_CACHE_TABLE_EXPECTED_RESULT
+
+
+# NOTE: this class is threadsafe but does not allow for any concurrent access
+class HTTPCache:
+    lock: Lock
+    connection: sqlite3.Connection
+    stats: Dict[str, int]
+
+    def __init__(self, filename: Optional[str] = None):
+        self.stats = {status: 0 for status in CACHE_STATUSES}
+
+        already_exists = False
+
+        if filename is None:
+            filename = ":memory:"
+        else:
+            already_exists = isfile(filename)
+
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.lock = Lock()
+
+        if not already_exists:
+            self.connection.executescript(SQL_PRAGMAS)
+            self.connection.execute(SQL_CREATE)
+            self.connection.commit()
+        else:
+            try:
+                with self.transaction() as cursor:
+                    is_valid = is_http_cache(cursor)
+            except sqlite3.DatabaseError:
+                is_valid = False
+
+            if not is_valid:
+                raise HTTPCacheInvalidError
+
+    @contextmanager
+    def transaction(self):
+        cursor = None
+
+        try:
+            with self.lock, self.connection:
+                cursor = self.connection.cursor()
+                yield cursor
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def __len__(self) -> int:
+        with self.transaction() as cursor:
+            cursor.execute("SELECT count(*) FROM http_cache;")
+            return cursor.fetchone()[0]
+
+    def record(self, status: CacheStatus) -> None:
+        with self.lock:
+            self.stats[status] += 1
+
+    def get(self, url: str) -> Optional[HTTPCacheEntry]:
+        with self.transaction() as cursor:
+            cursor.execute(SQL_SELECT, (url,))
+            row: Optional[Tuple] = cursor.fetchone()
+
+        if row is None:
+            return None
+
+        _, mtime, expires, status, headers, stack, size, data = row
+
+        return HTTPCacheEntry(
+            url=url,
+            mtime=mtime,
+            expires=expires,
+            status=status,
+            headers=deserialize_headers(headers),
+            stack=deserialize_stack(stack) if stack is not None else None,
+            body=sqlar_uncompress(data, size),
+        )
+
+    def set(
+        self,
+        url: str,
+        status: int,
+        headers: HTTPHeaderDict,
+        body: bytes,
+        stack: Optional[RedirectionStack] = None,
+    ) -> bool:
+        if not is_storable(status, headers):
+            return False
+
+        now = time()
+
+        # NOTE: compressing outside of the lock
+        row = (
+            url,
+            int(now),
+            get_expiration_time(headers, now),
+            status,
+            serialize_headers(headers),
+            serialize_stack(stack) if stack is not None else None,
+            len(body),
+            sqlar_compress(body),
+        )
+
+        with self.transaction() as cursor:
+            cursor.execute(SQL_INSERT, row)
+
+        return True
+
+    def touch(self, url: str, headers: HTTPHeaderDict) -> None:
+        """
+        Method called when a cached response was revalidated, with its
+        headers updated by the ones of the 304 response.
+        """
+        now = time()
+        row = (
+            int(now),
+            get_expiration_time(headers, now),
+            serialize_headers(headers),
+            url,
+        )
+
+        with self.transaction() as cursor:
+            cursor.execute(SQL_TOUCH, row)
+
+    def close(self):
+        self.connection.close()
+
+    def __del__(self):
+        self.close()
+
+
+def merge_revalidated_headers(
+    stored: HTTPHeaderDict, revalidated: HTTPHeaderDict
+) -> HTTPHeaderDict:
+    """
+    Function returning the stored headers updated by the ones found in the
+    304 response, as recommended by RFC 9111.
+    """
+    headers = stored.copy()
+
+    for name in ("Cache-Control", "Date", "ETag", "Expires", "Last-Modified"):
+        values: List[str] = revalidated.getlist(name)
+
+        if values:
+            headers.discard(name)
+
+            for value in values:
+                headers.add(name, value)
+
+    return headers
@@ -4,8 +4,34 @@
 #
 # Multiple helper functions related to multiprocessing execution.
 #
+from typing import (
+    Callable,
+    Dict,
+    Tuple,
+    Any,
+    Iterator,
+    Iterable,
+    Optional,
+    Deque,
+    List,
+)
+
 import sys
+import pickle
+import signal
 import multiprocessing
+from queue import Empty
+from collections import deque
+from multiprocessing.pool import AsyncResult
+from threading import Thread, Lock
+from concurrent.futures import Future
+from ebbe import as_chunks
+from quenouille import ThreadPoolExecutor
+
+from minet.exceptions import BrokenWorkerProcessPoolError, CancelledRequestError
+
+# NOTE: e.g. fork is not available on Windows
+FORK_SUPPORT = "fork" in multiprocessing.get_all_start_methods()
 
 
 def half_cpus(override=None):
@@ -61,10 +87,29 @@ class LazyPool(object):
             if initializer is not None:
                 initializer(*initargs)
 
-    def imap(self, worker, tasks, chunksize: int = 1, unordered: bool = False):
+    def imap(
+        self,
+        worker,
+        tasks,
+        chunksize: int = 1,
+        unordered: bool = False,
+        buffer_size: Optional[int] = None,
+    ):
+        """
+        Method yielding the results of the worker applied to the given tasks.
+
+        If `buffer_size` is given, results are yielded in order and at most
+        this number of tasks will be pulled from the iterable in advance,
+        whereas the underlying pool would otherwise consume it eagerly. This
+        is useful when tasks are produced lazily, e.g. from a bounded queue.
+        """
         if self.actually_multiprocessed:
             assert self.inner_pool is not None
 
+            if buffer_size is not None:
+                yield from self.__bounded_imap(worker, tasks, buffer_size)
+                return
+
             fn = self.inner_pool.imap_unordered if unordered else self.inner_pool.imap
 
             yield from fn(WorkerWrapper(worker), tasks, chunksize=chunksize)
@@ -72,6 +117,26 @@ class LazyPool(object):
             for task in tasks:
                 yield worker(task)
 
+    def __bounded_imap(self, worker, tasks, buffer_size: int):
+        assert self.inner_pool is not None
+
+        if buffer_size < 1:
+            raise TypeError("buffer_size should be at least 1")
+
+        wrapped_worker = WorkerWrapper(worker)
+        pending: Deque[AsyncResult] = deque()
+
+        for task in tasks:
+            # NOTE: we yield whatever is already done before pulling the next
+            # task, since pulling may block for some time
+            while pending and (len(pending) >= buffer_size or pending[0].ready()):
+                yield pending.popleft().get()
+
+            pending.append(self.inner_pool.apply_async(wrapped_worker, (task,)))
+
+        while pending:
+            yield pending.popleft().get()
+
     def imap_unordered(self, worker, tasks, chunksize: int = 1):
         return self.imap(worker, tasks, chunksize=chunksize, unordered=False)
 
@@ -88,3 +153,333 @@ class LazyPool(object):
             assert self.inner_pool is not None
 
             self.inner_pool.__exit__(*args)
+
+
+# NOTE: this is a class and not a closure so it can be pickled
+class ChunkWorker(object):
+    __slots__ = ("fn",)
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def __call__(self, chunk: List[Any]) -> List[Any]:
+        return [self.fn(item) for item in chunk]
+
+
+def imap_chunks(
+    pool: LazyPool,
+    worker: Callable[[Any], Any],
+    items: Iterable[Any],
+    chunk_size: int,
+    key: Optional[Callable[[Any], Any]] = None,
+    buffer_size: Optional[int] = None,
+) -> Iterator[Tuple[Any, Any]]:
+    """
+    Function yielding the given items along with the result of the worker
+    applied to them, in order. Items are sent to the pool's processes in
+    chunks, to amortize the cost of inter-process communication, and at most
+    `buffer_size` chunks are in flight at any time, so that memory remains
+    flat however large the input is.
+
+    Only what the `key` function returns is sent to the processes, e.g. the
+    relevant cell of a CSV row, while the items themselves stay in the
+    current process.
+
+    The worker must be picklable, e.g. a module-level function or a partial
+    application of one.
+    """
+    if chunk_size < 1:
+        raise TypeError("chunk_size should be at least 1")
+
+    if buffer_size is None:
+        buffer_size = pool.processes * 4
+
+    pending: Deque[List[Any]] = deque()
+
+    def tasks() -> Iterator[List[Any]]:
+        for chunk in as_chunks(chunk_size, items):
+            pending.append(chunk)
+            yield chunk if key is None else [key(item) for item in chunk]
+
+    for results in pool.imap(ChunkWorker(worker), tasks(), buffer_size=buffer_size):
+        yield from zip(pending.popleft(), results)
+
+
+def imap_chunks_in_threads(
+    threads: int,
+    work: Callable[[List[Any]], Any],
+    items: Iterable[Any],
+    chunk_size: int,
+    buffer_size: Optional[int] = None,
+) -> Iterator[Tuple[List[Any], Any]]:
+    """
+    Function yielding chunks of the given items along with the result of
+    the work function applied to them, in order. Chunks are dispatched on
+    a thread pool when `threads` is more than 1, e.g. to perform batched
+    API calls concurrently.
+
+    The buffer defaults to the number of threads, so that we don't buffer
+    more chunks than the threads can handle, since concurrency might well
+    be further restricted by rate limiting.
+    """
+    if chunk_size < 1:
+        raise TypeError("chunk_size should be at least 1")
+
+    if buffer_size is None:
+        buffer_size = threads
+
+    def work_on_chunk(chunk: List[Any]) -> Tuple[List[Any], Any]:
+        return chunk, work(chunk)
+
+    chunks = as_chunks(chunk_size, items)
+
+    if threads <= 1:
+        yield from map(work_on_chunk, chunks)
+        return
+
+    with ThreadPoolExecutor(threads) as executor:
+        yield from executor.imap(chunks, work_on_chunk, buffer_size=buffer_size)
+
+
+# NOTE: a worker function and the executor whose threads must run it
+WorkerProcessInitializer = Callable[[], Tuple[ThreadPoolExecutor, Callable[[Any], Any]]]
+PackedError = Tuple[type, Tuple[Any, ...], Dict[str, Any]]
+
+
+def is_picklable(value: Any) -> bool:
+    try:
+        pickle.dumps(value)
+    except Exception:
+        return False
+
+    return True
+
+
+class PackedErrorAttribute(object):
+    __slots__ = ("packed",)
+
+    def __init__(self, packed: PackedError):
+        self.packed = packed
+
+
+def pack_error(error: BaseException) -> PackedError:
+    """
+    Function returning a picklable representation of the given error.
+
+    NOTE: errors cannot always be pickled as is, e.g. when they keep a
+    reference to some connection, or when their constructor does not
+    accept their own args, which is the case of many minet errors.
+    """
+    cls = error.__class__
+
+    if not is_picklable(cls):
+        return (
+            RuntimeError,
+            ("%s: %s" % (cls.__name__, error),),
+            {},
+        )
+
+    args = tuple(arg if is_picklable(arg) else str(arg) for arg in error.args)
+    state = {}
+
+    for k, v in getattr(error, "__dict__", {}).items():
+        if isinstance(v, BaseException):
+            state[k] = PackedErrorAttribute(pack_error(v))
+        elif is_picklable(v):
+            state[k] = v
+
+    return cls, args, state
+
+
+def unpack_error(packed: PackedError) -> BaseException:
+    cls, args, state = packed
+
+    error = cls.__new__(cls)
+    error.args = args
+
+    for k, v in state.items():
+        if isinstance(v, PackedErrorAttribute):
+            v = unpack_error(v.packed)
+
+        setattr(error, k, v)
+
+    return error
+
+
+def worker_process_main(
+    initializer: WorkerProcessInitializer,
+    inbox: multiprocessing.Queue,
+    outbox: multiprocessing.Queue,
+) -> None:
+    # NOTE: the parent process is responsible for shutting us down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    executor, fn = initializer()
+
+    def work(task: Tuple[int, Any]) -> None:
+        task_id, payload = task
+
+        try:
+            result = fn(payload)
+
+            # NOTE: we pickle ourselves because the queue would pickle the
+            # result in a feeder thread, silently losing it on failure
+            message = (task_id, pickle.dumps(result), None)
+
+        except BaseException as error:
+            message = (task_id, None, pack_error(error))
+
+        outbox.put(message)
+
+    tasks: Iterator[Tuple[int, Any]] = iter(inbox.get, None)
+
+    with executor:
+        # NOTE: buffer_size=0 so that a process does not pull more tasks
+        # than it can handle, starving its siblings
+        for _ in executor.imap_unordered(tasks, work, buffer_size=0):
+            pass
+
+
+class ThreadedWorkerProcessPool(object):
+    """
+    Pool of worker processes pulling tasks from a shared queue and processing
+    them concurrently using their own thread pool. Tasks are submitted by the
+    parent process, which gets futures in return.
+
+    Processes are forked, so that they inherit the state of the parent as it
+    was when the pool was created and so that the initializer, which must
+    return the executor and the function that will run the tasks in each
+    process, does not need to be picklable. Tasks and their results must be
+    picklable though.
+    """
+
+    def __init__(self, processes: int, initializer: WorkerProcessInitializer):
+        if processes < 1:
+            raise TypeError("processes should be at least 1")
+
+        if not FORK_SUPPORT:
+            raise TypeError("worker processes require a platform supporting fork")
+
+        context = multiprocessing.get_context("fork")
+
+        self.inbox = context.Queue()
+        self.outbox = context.Queue()
+
+        self.processes = [
+            context.Process(
+                target=worker_process_main,
+                args=(initializer, self.inbox, self.outbox),
+                daemon=True,
+            )
+            for _ in range(processes)
+        ]
+
+        for process in self.processes:
+            process.start()
+
+        self.lock = Lock()
+        self.futures: Dict[int, Future] = {}
+        self.current_task_id = 0
+        self.closed = False
+        self.broken = False
+        self.stopped = False
+
+        self.collector = Thread(
+            name="Thread-minet-worker-processes", target=self.__collect, daemon=True
+        )
+        self.collector.start()
+
+    def __len__(self) -> int:
+        return len(self.processes)
+
+    def __fail_pending(self, error: BaseException) -> None:
+        with self.lock:
+            futures = list(self.futures.values())
+            self.futures.clear()
+
+        for future in futures:
+            future.set_exception(error)
+
+    def __collect(self) -> None:
+        while not self.stopped:
+            try:
+                message = self.outbox.get(timeout=1)
+            except Empty:
+                # NOTE: a process that died, e.g. because it was killed by the
+                # OOM killer, will never report its pending tasks
+                if not self.closed and not all(p.is_alive() for p in self.processes):
+                    self.broken = True
+                    self.__fail_pending(BrokenWorkerProcessPoolError())
+
+                continue
+
+            except (EOFError, OSError):
+                break
+
+            if message is None:
+                break
+
+            task_id, result, packed_error = message
+
+            with self.lock:
+                future = self.futures.pop(task_id, None)
+
+            if future is None:
+                continue
+
+            if packed_error is not None:
+                future.set_exception(unpack_error(packed_error))
+                continue
+
+            try:
+                future.set_result(pickle.loads(result))
+            except Exception as error:
+                future.set_exception(error)
+
+    def submit(self, payload: Any) -> Future:
+        future = Future()
+
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("cannot submit to a closed worker process pool")
+
+            if self.broken:
+                raise BrokenWorkerProcessPoolError
+
+            self.current_task_id += 1
+            task_id = self.current_task_id
+            self.futures[task_id] = future
+
+        self.inbox.put((task_id, payload))
+
+        return future
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self.lock:
+            if self.closed:
+                return
+
+            self.closed = True
+
+        # NOTE: the collector keeps consuming results while we wait for the
+        # processes, since they cannot exit before their results are flushed
+        if wait:
+            for _ in self.processes:
+                self.inbox.put(None)
+
+            for process in self.processes:
+                process.join()
+
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+        self.stopped = True
+        self.outbox.put(None)
+        self.collector.join()
+
+        self.__fail_pending(CancelledRequestError())
+
+        self.inbox.close()
+        self.outbox.close()
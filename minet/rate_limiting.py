@@ -2,7 +2,7 @@ from typing import Optional
 
 import time
 import functools
-from threading import Lock
+from threading import Lock, Condition
 
 
 class RateLimiter:
@@ -208,6 +208,86 @@ class ThreadsafeBurstyRateLimiterState:
         pass
 
 
+class AdaptiveConcurrencyLimiter:
+    """
+    Threadsafe limiter of the number of concurrent calls to some server, whose
+    limit adapts to the rate limit budget the server advertises, e.g. through
+    its "RateLimit-Remaining" & "RateLimit-Reset" headers.
+
+    The limit grows by one each time a call reports a comfortable budget and
+    is halved each time the budget runs low with respect to the current limit
+    (i.e. AIMD). When the budget is exhausted, no call can start until the
+    rate limit window is reset.
+
+    Args:
+        max_concurrency (int): Maximum number of concurrent calls.
+        min_concurrency (int): Minimum number of concurrent calls. Defaults
+            to 1.
+        low_budget_factor (float): The budget is considered low when lower
+            than the current limit times this factor. Defaults to 2.
+
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        low_budget_factor: float = 2.0,
+    ):
+        if min_concurrency < 1 or max_concurrency < min_concurrency:
+            raise TypeError("invalid concurrency bounds")
+
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.low_budget_factor = low_budget_factor
+
+        self.limit = max_concurrency
+        self.active = 0
+        self.blocked_until: Optional[float] = None
+
+        self.condition = Condition()
+
+    def acquire(self) -> None:
+        with self.condition:
+            while True:
+                if self.blocked_until is not None:
+                    delta = self.blocked_until - time.time()
+
+                    if delta > 0:
+                        self.condition.wait(delta)
+                        continue
+
+                    self.blocked_until = None
+
+                if self.active < self.limit:
+                    self.active += 1
+                    return
+
+                self.condition.wait()
+
+    def release(
+        self, remaining: Optional[int] = None, reset: Optional[float] = None
+    ) -> None:
+        """
+        Method releasing a slot, given the remaining budget reported by the
+        call, if any, and the timestamp at which the budget will be reset.
+        """
+        with self.condition:
+            self.active -= 1
+
+            if remaining is not None:
+                if remaining <= 0 or remaining < self.limit * self.low_budget_factor:
+                    self.limit = max(self.min_concurrency, self.limit // 2)
+                else:
+                    self.limit = min(self.max_concurrency, self.limit + 1)
+
+                # NOTE: a small margin is kept to absorb clock discrepancies
+                if remaining <= 0 and reset is not None:
+                    self.blocked_until = max(self.blocked_until or 0, reset + 0.1)
+
+            self.condition.notify_all()
+
+
 def rate_limited(max_per_period, period=1.0):
     state = RateLimiterState(max_per_period, period)
 
@@ -0,0 +1,213 @@
+# =============================================================================
+# Minet Resolve Cache
+# =============================================================================
+#
+# A persistent SQLite cache of url resolutions, so that redirections that
+# rarely change (e.g. shortened urls) don't need to be resolved again from
+# one run to the other.
+#
+from typing import Optional, Tuple
+
+import json
+import sqlite3
+from os.path import isfile
+from threading import Lock
+from contextlib import contextmanager
+from time import time
+
+from minet.types import Redirection, RedirectionStack
+from minet.exceptions import ResolveCacheInvalidError
+from minet.constants import DEFAULT_RESOLVE_CACHE_TTL
+
+RESOLVE_CACHE_TABLE_EXPECTED_RESULT = [
+    (0, "url", "TEXT", 1, None, 1),
+    (1, "flags", "INT", 1, None, 2),
+    (2, "mtime", "INT", 1, None, 0),
+    (3, "stack", "TEXT", 1, None, 0),
+]
+
+SQL_PRAGMAS = """
+PRAGMA journal_mode=wal;
+PRAGMA synchronous=normal;
+"""
+
+SQL_CREATE = """
+CREATE TABLE resolve_cache (
+  url TEXT NOT NULL,    -- start url
+  flags INT NOT NULL,   -- options used when resolving
+  mtime INT NOT NULL,   -- time of the resolution
+  stack TEXT NOT NULL,  -- json serialized redirection stack
+  PRIMARY KEY (url, flags)
+);
+"""
+
+SQL_INSERT = """
+INSERT OR REPLACE INTO resolve_cache (url, flags, mtime, stack) VALUES (?, ?, ?, ?);
+"""
+
+SQL_SELECT = """
+SELECT mtime, stack FROM resolve_cache WHERE url = ? AND flags = ? LIMIT 1;
+"""
+
+RESOLVE_FLAGS = [
+    "follow_refresh_header",
+    "follow_meta_refresh",
+    "follow_js_relocation",
+    "infer_redirection",
+    "canonicalize",
+]
+
+
+def get_resolve_flags(**options: bool) -> int:
+    """
+    Function returning an integer summing up the options given to resolve,
+    since they can change the resulting redirection stack.
+    """
+    flags = 0
+
+    for i, name in enumerate(RESOLVE_FLAGS):
+        if options.get(name, False):
+            flags |= 1 << i
+
+    return flags
+
+
+def serialize_stack(stack: RedirectionStack) -> str:
+    return json.dumps([(r.url, r.type, r.status) for r in stack], ensure_ascii=False)
+
+
+def deserialize_stack(data: str) -> "CachedRedirectionStack":
+    return CachedRedirectionStack(
+        Redirection(url, _type, status) for url, _type, status in json.loads(data)
+    )
+
+
+def is_cacheable(stack: RedirectionStack) -> bool:
+    if not stack:
+        return False
+
+    status = stack[-1].status
+
+    # NOTE: we don't want to keep transient failures
+    return status is None or (status < 500 and status != 429)
+
+
+class CachedRedirectionStack(RedirectionStack):
+    """
+    Redirection stack that was read from a ResolveCache instead of being
+    resolved through the network.
+    """
+
+    pass
+
+
+def is_cached_stack(stack) -> bool:
+    return isinstance(stack, CachedRedirectionStack)
+
+
+def is_resolve_cache(cursor: sqlite3.Cursor) -> bool:
+    cursor.execute('PRAGMA table_info("resolve_cache")')
+
+    return cursor.fetchall() == RESOLVE_CACHE_TABLE_EXPECTED_RESULT
+
+
+# NOTE: this class is threadsafe but does not allow for any concurrent access
+class ResolveCache:
+    lock: Lock
+    connection: sqlite3.Connection
+    ttl: Optional[float]
+    hits: int
+    misses: int
+
+    def __init__(
+        self,
+        filename: Optional[str] = None,
+        ttl: Optional[float] = DEFAULT_RESOLVE_CACHE_TTL,
+    ):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        already_exists = False
+
+        if filename is None:
+            filename = ":memory:"
+        else:
+            already_exists = isfile(filename)
+
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.lock = Lock()
+
+        if ttl is not None and ttl < 0:
+            raise TypeError("ttl should be >= 0")
+
+        if not already_exists:
+            self.connection.executescript(SQL_PRAGMAS)
+            self.connection.execute(SQL_CREATE)
+            self.connection.commit()
+        else:
+            try:
+                with self.transaction() as cursor:
+                    is_valid = is_resolve_cache(cursor)
+            except sqlite3.DatabaseError:
+                is_valid = False
+
+            if not is_valid:
+                raise ResolveCacheInvalidError
+
+    @contextmanager
+    def transaction(self):
+        cursor = None
+
+        try:
+            with self.lock, self.connection:
+                cursor = self.connection.cursor()
+                yield cursor
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def __len__(self) -> int:
+        with self.transaction() as cursor:
+            cursor.execute("SELECT count(*) FROM resolve_cache;")
+            return cursor.fetchone()[0]
+
+    def get(self, url: str, flags: int = 0) -> Optional[CachedRedirectionStack]:
+        with self.transaction() as cursor:
+            cursor.execute(SQL_SELECT, (url, flags))
+            row: Optional[Tuple[int, str]] = cursor.fetchone()
+
+            expired = (
+                row is not None and self.ttl is not None and time() - row[0] > self.ttl
+            )
+
+            if row is None or expired:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+
+        return deserialize_stack(row[1])
+
+    def set(
+        self,
+        url: str,
+        stack: RedirectionStack,
+        flags: int = 0,
+        mtime: Optional[int] = None,
+    ) -> bool:
+        if not is_cacheable(stack):
+            return False
+
+        mtime = int(time()) if mtime is None else mtime
+
+        with self.transaction() as cursor:
+            cursor.execute(SQL_INSERT, (url, flags, mtime, serialize_stack(stack)))
+
+        return True
+
+    def close(self):
+        self.connection.close()
+
+    def __del__(self):
+        self.close()
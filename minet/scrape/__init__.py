@@ -11,11 +11,13 @@ from minet.scrape.soup import (
     SelectionError,
     ExtractionError,
 )
+from minet.scrape.lxml_soup import LxmlSoup, LxmlTag
 from minet.scrape.regex import (
     extract_encodings_from_xml,
     extract_canonical_link,
     extract_javascript_relocation,
     extract_meta_refresh,
+    extract_links,
 )
 
 __all__ = [
@@ -26,8 +28,11 @@ __all__ = [
     "Tag",
     "SelectionError",
     "ExtractionError",
+    "LxmlSoup",
+    "LxmlTag",
     "extract_encodings_from_xml",
     "extract_canonical_link",
     "extract_javascript_relocation",
     "extract_meta_refresh",
+    "extract_links",
 ]
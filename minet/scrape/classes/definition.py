@@ -4,11 +4,17 @@ from bs4 import SoupStrainer
 
 from minet.types import AnyFileTarget
 from minet.fs import load_definition
-from minet.scrape.interpreter import interpret_scraper
+from minet.scrape.interpreter import interpret_scraper, precompile_scraper
 from minet.scrape.analysis import analyse, validate, ScraperAnalysisOutputType
 from minet.scrape.straining import strainer_from_css
-from minet.scrape.exceptions import InvalidScraperError
+from minet.scrape.compiler import compile_scraper, CompiledScraper
+from minet.scrape.exceptions import (
+    InvalidScraperError,
+    InvalidCSSSelectorError,
+    ScraperCompilationError,
+)
 from minet.scrape.utils import ensure_soup
+from minet.scrape.lxml_soup import ensure_lxml_soup
 from minet.scrape.types import AnyScrapableTarget
 from minet.scrape.classes.base import ScraperBase
 
@@ -27,14 +33,25 @@ def scrape(
 
 class DefinitionScraper(ScraperBase):
     definition: Dict
+    compiled_definition: Dict
+    compiled_scraper: Optional[CompiledScraper]
+    backend: str
     fieldnames: Optional[List[str]]
     plural: bool
     output_type: ScraperAnalysisOutputType
     strainer: Optional[SoupStrainer]
 
     def __init__(
-        self, definition: Union[Dict, AnyFileTarget], strain: Optional[str] = None
+        self,
+        definition: Union[Dict, AnyFileTarget],
+        strain: Optional[str] = None,
+        compiled: bool = True,
+        backend: str = "bs4",
     ):
+        # NOTE: only the compiler knows how to work with lxml soups
+        if backend == "lxml" and not compiled:
+            raise TypeError("lxml backend cannot be used without compilation")
+
         if not isinstance(definition, dict):
             definition = load_definition(definition)
 
@@ -46,6 +63,29 @@ class DefinitionScraper(ScraperBase):
 
         self.definition = definition
 
+        # NOTE: selectors and expressions are compiled once here instead of
+        # being parsed again for every element of every scraped page
+        self.compiled_definition = precompile_scraper(definition)
+
+        # NOTE: by default, the definition is compiled into a python function,
+        # and we only fall back to the interpreter when the compiler does not
+        # support some construct of the definition
+        self.compiled_scraper = None
+        self.backend = backend
+
+        if compiled:
+            try:
+                self.compiled_scraper = compile_scraper(definition, backend=backend)
+            except ScraperCompilationError:
+                if backend == "lxml":
+                    raise
+
+            # NOTE: some selectors supported by soupsieve are not by lxml
+            except InvalidCSSSelectorError as error:
+                raise InvalidScraperError(
+                    "scraper is invalid", validation_errors=[error]
+                )
+
         # Analysis of the definition
         analysis = analyse(definition)
 
@@ -61,4 +101,14 @@ class DefinitionScraper(ScraperBase):
             self.strainer = strainer_from_css(strain)
 
     def __call__(self, html: AnyScrapableTarget, context: Optional[Dict] = None):
-        return scrape(self.definition, html, context=context, strainer=self.strainer)
+        if self.compiled_scraper is None:
+            return scrape(
+                self.compiled_definition, html, context=context, strainer=self.strainer
+            )
+
+        if self.backend == "lxml":
+            soup = ensure_lxml_soup(html, strainer=self.strainer)
+        else:
+            soup = ensure_soup(html, strainer=self.strainer, engine="html.parser")
+
+        return self.compiled_scraper(soup, context=context)
@@ -20,6 +20,8 @@ from minet.scrape.classes.base import ScraperBase
 from minet.scrape.soup import WonderfulSoup
 from minet.scrape.straining import strainer_from_css
 from minet.scrape.utils import ensure_soup
+from minet.scrape.lxml_soup import LxmlSoup, ensure_lxml_soup
+from minet.scrape.constants import SCRAPER_BACKENDS
 from minet.scrape.types import AnyScrapableTarget
 
 
@@ -46,7 +48,8 @@ def infer_fieldnames_from_function_return_type(fn: Callable) -> Optional[List[st
 
 
 class FunctionScraper(ScraperBase):
-    fn: Union[str, Callable[[RowWrapper, WonderfulSoup], Any]]
+    fn: Union[str, Callable[[RowWrapper, Union[WonderfulSoup, LxmlSoup]], Any]]
+    backend: str
     fieldnames = None
     plural: bool
     tabular = True
@@ -55,9 +58,15 @@ class FunctionScraper(ScraperBase):
 
     def __init__(
         self,
-        fn: Union[str, Callable[[RowWrapper, WonderfulSoup], Any]],
+        fn: Union[str, Callable[[RowWrapper, Union[WonderfulSoup, LxmlSoup]], Any]],
         strain: Optional[str] = None,
+        backend: str = "bs4",
     ):
+        if backend not in SCRAPER_BACKENDS:
+            raise TypeError('unknown "%s" backend' % backend)
+
+        self.backend = backend
+
         # NOTE: closures cannot be pickled without using third-party library `dill`.
         self.fn = fn
         self.plural = inspect.isgeneratorfunction(fn)
@@ -71,7 +80,10 @@ class FunctionScraper(ScraperBase):
         assert context is not None
 
         row = context["row"]
-        soup = cast(WonderfulSoup, ensure_soup(html, strainer=self.strainer))
+        if self.backend == "lxml":
+            soup = ensure_lxml_soup(html, strainer=self.strainer)
+        else:
+            soup = cast(WonderfulSoup, ensure_soup(html, strainer=self.strainer))
 
         if isinstance(self.fn, str):
             return eval(self.fn, {"row": row, "soup": soup}, None)
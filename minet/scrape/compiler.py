@@ -2,181 +2,453 @@
 # Minet Scraper Compilation
 # =============================================================================
 #
-# Schemes related to scraper definition "compilation".
+# Schemes related to scraper definition "compilation", i.e. generating the
+# source of a python function performing the same work as the interpreter
+# for a given definition, without having to walk the definition at runtime.
 #
 import itertools
 import soupsieve
-from io import StringIO
-
-from minet.scrape.constants import EXTRACTOR_NAMES
-
-
-def escape_string_as_literal(string):
-    double_quotes = string.count('"')
-    single_quotes = string.count("'")
-
-    quote = '"' if single_quotes > double_quotes else "'"
-
-    return quote + string.replace(quote, "\\" + quote) + quote
-
-
-class CompilerContext(object):
-    def __init__(
-        self,
-        printer,
-        counter=None,
-        level=0,
-        var="root",
-        container="main_value",
-        parent=None,
-    ):
-        self.printer = printer
-        self.counter = counter if counter is not None else itertools.count(0)
-
-        self.level = level
-        self.identifier = next(self.counter)
-        self.container = container
-        self.var = var
-        self.parent = parent
-
-        self.container_type = "var"
-        self.container_key = None
-
-    def descend(self):
-        return CompilerContext(
-            printer=self.printer,
-            counter=self.counter,
-            level=self.level + 1,
-            var="element_%i" % self.identifier,
-            container="value_%i" % self.identifier,
-            parent=self,
-        )
+from bs4 import Tag
+from contextlib import contextmanager
+
+from minet.scrape.constants import KNOWN_KEYS, EXTRACTOR_NAMES, SCRAPER_BACKENDS
+from minet.scrape.utils import get_sel, get_iterator
+from minet.scrape.lxml_soup import (
+    LxmlTag,
+    compile_lxml_selector,
+    is_valid_lxml_iterator_eval_output,
+)
+from minet.scrape.exceptions import ScraperCompilationError, InvalidCSSSelectorError
+from minet.scrape.interpreter import (
+    DATA_TYPES,
+    CompiledExpression,
+    EvaluationScope,
+    eval_expression,
+    extract,
+    is_valid_iterator_eval_output,
+    merge_contexts,
+    nested_getter,
+)
+
+COMPILABLE_KEYS = set(KNOWN_KEYS + ["set_context"])
+
+# NOTE: lxml tags expose the extraction methods of MinetTag
+LXML_EXTRACTION_METHODS = {
+    "text": "get_text",
+    "display_text": "get_display_text",
+    "html": "get_html",
+    "inner_html": "get_inner_html",
+    "outer_html": "get_outer_html",
+}
+
+
+class CodeWriter(object):
+    def __init__(self, backend="bs4"):
+        self.backend = backend
+        self.lines = []
+        self.level = 0
+        self.counter = itertools.count(0)
+        self.constants = {}
+
+    def line(self, string):
+        self.lines.append(("    " * self.level) + string)
+
+    @contextmanager
+    def block(self, string):
+        self.line(string)
+        self.level += 1
+        yield
+        self.level -= 1
+
+    def var(self, prefix):
+        return "%s_%i" % (prefix, next(self.counter))
+
+    def constant(self, value):
+        name = self.var("CONSTANT")
+        self.constants[name] = value
+        return name
+
+    def selector(self, css, path):
+        if self.backend == "lxml":
+            try:
+                return self.constant(compile_lxml_selector(css))
+            except InvalidCSSSelectorError as e:
+                e.path = path
+                raise
+
+        return self.constant(soupsieve.compile(css))
+
+    def expression(self, expression):
+        if isinstance(expression, str):
+            # NOTE: expressions that cannot be compiled are kept as is so
+            # that they raise the same ScraperEvalError at runtime
+            try:
+                expression = CompiledExpression(expression)
+            except SyntaxError:
+                pass
+
+        return self.constant(expression)
+
+    def getvalue(self):
+        return "\n".join(self.lines) + "\n"
+
+
+def compile_eval(writer, expression, path, **kwargs):
+    args = ", ".join("%s=%s" % item for item in kwargs.items())
+
+    return "eval_expression(%s, %s, root=root, scope=scope, path=%s)" % (
+        writer.expression(expression),
+        args,
+        writer.constant(path),
+    )
+
+
+def compile_extraction(writer, element, extractor_name):
+    if writer.backend == "lxml":
+        return "%s.%s()" % (element, LXML_EXTRACTION_METHODS[extractor_name])
+
+    # NOTE: the most common extraction is inlined
+    if extractor_name == "text":
+        return "%s.get_text().strip()" % element
+
+    return "extract(%s, %r)" % (element, extractor_name)
+
+
+def compile_value(writer, node, element, elements, value, context, path):
+    if "fields" in node:
+        writer.line("%s = {}" % value)
+
+        for k, field_node in node["fields"].items():
+            compile_node(
+                writer,
+                field_node,
+                element,
+                "%s[%r]" % (value, k),
+                context,
+                path + ["fields", k],
+            )
 
-    def linger(self):
-        context = CompilerContext(
-            printer=self.printer,
-            counter=self.counter,
-            level=self.level,
-            var="element_%i" % self.identifier,
-            container="value_%i" % self.identifier,
-            parent=self,
-        )
+        return
 
-        return context
+    if "item" in node:
+        compile_node(writer, node["item"], element, value, context, path + ["item"])
+        return
 
-    def print(self, string, **kwargs):
-        self.printer(
-            string,
-            level=self.level,
-            parent=self.parent.identifier,
-            id=self.identifier,
-            next=self.identifier + 1,
-            **kwargs,
+    if "attr" in node:
+        writer.line("%s = %s.get(%r)" % (value, element, node["attr"]))
+    elif "extract" in node:
+        writer.line(
+            "%s = %s" % (value, compile_extraction(writer, element, node["extract"]))
+        )
+    elif "get_context" in node:
+        writer.line(
+            "%s = nested_getter(%s, %s)"
+            % (value, context, writer.constant(node["get_context"]))
+        )
+    elif "default" not in node:
+        writer.line("%s = %s" % (value, compile_extraction(writer, element, "text")))
+    else:
+        writer.line("%s = None" % value)
+
+    if "eval" in node:
+        writer.line(
+            "%s = %s"
+            % (
+                value,
+                compile_eval(
+                    writer,
+                    node["eval"],
+                    path + ["eval"],
+                    element=element,
+                    elements=elements,
+                    value=value,
+                    context=context,
+                    expect="DATA_TYPES",
+                    allow_none="True",
+                ),
+            )
         )
 
-    def yield_to_parent(self, expr, **kwargs):
-        if self.parent.container_type == "list":
-            self.print("value_{parent}.append(%s)" % expr, **kwargs)
-        elif self.parent.container_type == "dict":
-            self.print(
-                "value_{parent}[%s] = %s"
-                % (escape_string_as_literal(self.parent.container_key), expr),
-                **kwargs,
+
+def compile_plural_modifiers(
+    writer, node, element, elements, value, seen, context, path
+):
+    if "filter_eval" in node:
+        with writer.block(
+            "if not %s:"
+            % compile_eval(
+                writer,
+                node["filter_eval"],
+                path + ["filter_eval"],
+                element=element,
+                elements=elements,
+                value=value,
+                context=context,
+                expect="bool",
+                allow_none="True",
+            )
+        ):
+            writer.line("continue")
+
+    if "filter" in node:
+        filtering_clause = node["filter"]
+
+        if filtering_clause is True:
+            with writer.block("if not %s:" % value):
+                writer.line("continue")
+
+        elif isinstance(filtering_clause, str):
+            with writer.block(
+                "if not nested_getter(%s, %s):"
+                % (value, writer.constant(filtering_clause))
+            ):
+                writer.line("continue")
+
+    if "uniq" in node:
+        uniq_clause = node["uniq"]
+        k = value
+
+        if isinstance(uniq_clause, str):
+            k = writer.var("key")
+            writer.line(
+                "%s = nested_getter(%s, %s)" % (k, value, writer.constant(uniq_clause))
             )
+
+        if uniq_clause is True or isinstance(uniq_clause, str):
+            with writer.block("if %s in %s:" % (k, seen)):
+                writer.line("continue")
+
+        writer.line("%s.add(%s)" % (seen, k))
+
+
+def compile_node(writer, node, element, target, context, path):
+    # Tail call of item?
+    if isinstance(node, str):
+        if node in EXTRACTOR_NAMES:
+            writer.line("%s = %s" % (target, compile_extraction(writer, element, node)))
         else:
-            self.print("value_{parent} = %s" % expr, **kwargs)
+            writer.line("%s = %s.get(%r)" % (target, element, node))
 
+        return
 
-class FieldsNode(object):
-    def __init__(self, definition):
-        self.definition = definition
+    if not isinstance(node, dict):
+        raise ScraperCompilationError(
+            "cannot compile node of type %s" % type(node).__name__, path=path
+        )
+
+    for k in node:
+        if k not in COMPILABLE_KEYS:
+            raise ScraperCompilationError(
+                'cannot compile "%s" key' % k, path=path + [k]
+            )
 
-    def unwrap(self):
-        return self.definition
+    sel_key, sel = get_sel(node, with_key=True)
+    iterator_key, iterator = get_iterator(node, with_key=True)
 
+    # Local selection
+    has_selection = sel is not None or "sel_eval" in node
 
-def compile_scraper(definition, as_string=False):
-    output = StringIO()
+    if sel is not None:
+        selected_element = writer.var("element")
+        writer.line(
+            "%s = %s.select_one(%s)"
+            % (selected_element, writer.selector(sel, path + [sel_key]), element)
+        )
+        element = selected_element
+
+    elif "sel_eval" in node:
+        selected_element = writer.var("element")
+        writer.line(
+            "%s = %s"
+            % (
+                selected_element,
+                compile_eval(
+                    writer,
+                    node["sel_eval"],
+                    path + ["sel_eval"],
+                    element=element,
+                    elements="[]",
+                    context=context,
+                    expect="SEL_EVAL_TYPES",
+                    allow_none="True",
+                ),
+            )
+        )
+
+        with writer.block("if isinstance(%s, str):" % selected_element):
+            writer.line(
+                "%s = compile_selector(%s).select_one(%s)"
+                % (selected_element, selected_element, element)
+            )
 
-    def printer(string, level=0, **kwargs):
-        if kwargs:
-            string = string.format(**kwargs)
+        element = selected_element
 
-        # Note: from extraneous state above
-        if level:
-            string = ("  " * level) + string
+    if has_selection:
+        with writer.block("if %s is None:" % element):
+            writer.line("%s = None" % target)
 
-        print(string, file=output)
+        writer.line("else:")
+        writer.level += 1
 
-    scope = {"soupsieve": soupsieve}
+    # Iteration
+    elements = None
 
-    printer("def scrape(root, context={}):")
-    printer("  value_0 = None")
-    printer("  element_1 = root")
+    if iterator is not None:
+        elements = writer.var("elements")
+        writer.line(
+            "%s = %s.select(%s)"
+            % (elements, writer.selector(iterator, path + [iterator_key]), element)
+        )
 
-    root_context = CompilerContext(printer)
-    initial_context = root_context.descend()
+    elif "iterator_eval" in node:
+        elements = writer.var("elements")
+        writer.line(
+            "%s = %s"
+            % (
+                elements,
+                compile_eval(
+                    writer,
+                    node["iterator_eval"],
+                    path + ["iterator_eval"],
+                    element=element,
+                    elements="[]",
+                    context=context,
+                    check="is_valid_iterator_eval_output",
+                ),
+            )
+        )
 
-    def recurse(node, context):
-        # Default extraction
-        if node is None or (isinstance(node, str) and node in EXTRACTOR_NAMES):
-            context.yield_to_parent("element_{id}.get_text().strip()")
-            return
+        with writer.block("if isinstance(%s, str):" % elements):
+            writer.line(
+                "%s = compile_selector(%s).select(%s)" % (elements, elements, element)
+            )
 
-        # Attribute
-        if isinstance(node, str):
-            context.yield_to_parent(
-                "element_{id}.get({attr})", attr=escape_string_as_literal(node)
+    # Local context
+    if "set_context" in node:
+        local_context = writer.var("local_context")
+        writer.line("%s = {}" % local_context)
+
+        for k, field_node in node["set_context"].items():
+            compile_node(
+                writer,
+                field_node,
+                element,
+                "%s[%r]" % (local_context, k),
+                context,
+                path + ["set_context", k],
             )
-            return
 
-        # Fields
-        if isinstance(node, FieldsNode):
-            fields = node.unwrap()
-            context.container_type = "dict"
+        merged_context = writer.var("context")
+        writer.line(
+            "%s = merge_contexts(%s, %s)" % (merged_context, context, local_context)
+        )
+        context = merged_context
+
+    value = writer.var("value")
 
-            context.print("value_{id} = dict()")
+    if elements is None:
+        compile_value(writer, node, element, "[%s]" % element, value, context, path)
 
-            for k, spec in fields.items():
-                context.container_key = k
-                next_context = context.linger()
-                context.print(
-                    "element_{target} = element_{id}", target=next_context.identifier
-                )
-                recurse(spec, next_context)
+        if "default" in node:
+            with writer.block("if %s is None:" % value):
+                writer.line("%s = %s" % (value, writer.constant(node["default"])))
 
-            context.yield_to_parent("value_{id}")
+        writer.line("%s = %s" % (target, value))
 
-            return
+    else:
+        acc = writer.var("acc")
+        writer.line("%s = []" % acc)
 
-        # Iterating
-        if "iterator" in node:
-            context.container_type = "list"
+        seen = None
 
-            context.print(
-                "elements_{id} = soupsieve.select({selector}, element_{id})",
-                selector=escape_string_as_literal(node["iterator"]),
+        if "uniq" in node:
+            seen = writer.var("seen")
+            writer.line("%s = set()" % seen)
+
+        item_element = writer.var("element")
+
+        with writer.block("for %s in %s:" % (item_element, elements)):
+            compile_value(writer, node, item_element, elements, value, context, path)
+
+            if "default" in node:
+                with writer.block("if %s is None:" % value):
+                    writer.line("%s = %s" % (value, writer.constant(node["default"])))
+
+            compile_plural_modifiers(
+                writer, node, item_element, elements, value, seen, context, path
             )
-            context.print("value_{id} = []")
 
-            context.print("for element_{next} in elements_{id}:")
+            writer.line("%s.append(%s)" % (acc, value))
 
-            if "fields" in node:
-                recurse(FieldsNode(node["fields"]), context.descend())
-            else:
-                recurse(node.get("item"), context.descend())
+        writer.line("%s = %s" % (target, acc))
 
-            context.yield_to_parent("value_{id}")
+    if has_selection:
+        writer.level -= 1
 
-    recurse(definition, initial_context)
 
-    printer("  return value_0")
+class CompiledScraper(object):
+    __slots__ = ("definition", "backend", "source", "fn")
+
+    def __init__(self, definition, backend, source, fn):
+        self.definition = definition
+        self.backend = backend
+        self.source = source
+        self.fn = fn
+
+    def __call__(self, root, context=None):
+        return self.fn(root, context)
+
+    # NOTE: generated functions cannot be pickled, so we compile the
+    # definition again when the scraper is sent to another process
+    def __reduce__(self):
+        return (compile_scraper, (self.definition, False, self.backend))
+
+
+def compile_scraper(definition, as_string=False, backend="bs4"):
+    """
+    Generate a function equivalent to interpreting the given scraper
+    definition. Raises ScraperCompilationError if the definition contains
+    constructs that are not supported by the compiler.
+
+    The "bs4" backend generates a function working on BeautifulSoup trees,
+    while the "lxml" one generates a function working on LxmlSoup trees.
+    """
+    if backend not in SCRAPER_BACKENDS:
+        raise TypeError('unknown "%s" backend' % backend)
+
+    writer = CodeWriter(backend)
+
+    with writer.block("def scrape(root, context=None):"):
+        writer.line("scope = EvaluationScope()")
+        compile_node(writer, definition, "root", "result", "context", [])
+        writer.line("return result")
+
+    source = writer.getvalue()
 
     # Only return string
     if as_string:
-        return output.getvalue()
+        return source
 
     # Execute in scope to create function
-    exec(output.getvalue(), scope)
-
-    return scope["scrape"]
+    scope = {
+        "eval_expression": eval_expression,
+        "extract": extract,
+        "merge_contexts": merge_contexts,
+        "nested_getter": nested_getter,
+        "EvaluationScope": EvaluationScope,
+        "DATA_TYPES": DATA_TYPES,
+        **writer.constants,
+    }
+
+    if backend == "lxml":
+        scope["compile_selector"] = compile_lxml_selector
+        scope["is_valid_iterator_eval_output"] = is_valid_lxml_iterator_eval_output
+        scope["SEL_EVAL_TYPES"] = (LxmlTag, str)
+    else:
+        scope["compile_selector"] = soupsieve.compile
+        scope["is_valid_iterator_eval_output"] = is_valid_iterator_eval_output
+        scope["SEL_EVAL_TYPES"] = (Tag, str)
+
+    exec(compile(source, "<compiled scraper>", "exec"), scope)
+
+    return CompiledScraper(definition, backend, source, scope["scrape"])
@@ -10,6 +10,7 @@ ITERATOR_ALIASES = ["iterator", "$$"]
 PLURAL_MODIFIERS = ["filter", "filter_eval", "uniq"]
 BURROWING_KEYS = ITERATOR_ALIASES + ["item", "fields"]
 LEAF_KEYS = ["attr", "extract", "get_context", "eval", "default"]
+SCRAPER_BACKENDS = ["bs4", "lxml"]
 KNOWN_KEYS = (
     SELECT_ALIASES
     + PLURAL_MODIFIERS
@@ -90,3 +90,13 @@ class ScraperValidationInvalidExtractorError(ScraperRuntimeError):
 
 class InvalidCSSSelectorError(ScraperRuntimeError):
     pass
+
+
+class ScraperCompilationError(ScrapeError):
+    def __init__(self, msg=None, path=None):
+        super().__init__(msg)
+        self.path = path
+
+
+class CssselectNotInstalledError(ScrapeError):
+    pass
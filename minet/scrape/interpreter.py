@@ -14,7 +14,11 @@ from ebbe import getpath
 from functools import partial
 
 from minet.scrape.std import get_default_evaluation_context, get_display_text
-from minet.scrape.constants import EXTRACTOR_NAMES
+from minet.scrape.constants import (
+    EXTRACTOR_NAMES,
+    SELECT_ALIASES,
+    ITERATOR_ALIASES,
+)
 from minet.scrape.utils import get_sel, get_iterator
 from minet.scrape.exceptions import (
     ScraperEvalError,
@@ -78,6 +82,35 @@ class EvaluationScope(object):
 EVAL_CONTEXT = get_default_evaluation_context()
 
 
+class CompiledExpression(object):
+    __slots__ = ("source", "code", "fn")
+
+    def __init__(self, source: str):
+        self.source = source
+        self.code = None
+        self.fn = None
+
+        if "\n" in source:
+            # NOTE: the wrapper function is defined once, with EVAL_CONTEXT as
+            # its globals so that it sees the variables set before each call
+            wrapped_source = "def __run__():\n%s" % textwrap.indent(source, "  ")
+            scope = {}
+            exec(compile(wrapped_source, "<scraper>", "exec"), EVAL_CONTEXT, scope)
+            self.fn = scope["__run__"]
+        else:
+            self.code = compile(source, "<scraper>", "eval")
+
+    # NOTE: code objects cannot be pickled, so we recompile when the scraper
+    # is sent to another process
+    def __reduce__(self):
+        return (self.__class__, (self.source,))
+
+    def __repr__(self):
+        return "<{name} {source!r}>".format(
+            name=self.__class__.__name__, source=self.source
+        )
+
+
 # NOTE: this is not threadsafe, but it does not have to be
 def eval_expression(
     expression,
@@ -92,7 +125,27 @@ def eval_expression(
     check=None,
     allow_none=False,
 ):
-    if callable(expression):
+    if isinstance(expression, CompiledExpression):
+        compiled_expression = expression
+
+        EVAL_CONTEXT["element"] = element
+        EVAL_CONTEXT["elements"] = elements
+        EVAL_CONTEXT["value"] = value
+        EVAL_CONTEXT["context"] = context
+        EVAL_CONTEXT["root"] = root
+        EVAL_CONTEXT["scope"] = scope
+
+        # NOTE: errors must still report the expression's source
+        expression = expression.source
+
+        try:
+            if compiled_expression.fn is not None:
+                result = compiled_expression.fn()
+            else:
+                result = eval(compiled_expression.code, EVAL_CONTEXT, None)
+        except Exception as e:
+            raise ScraperEvalError(reason=e, path=path, expression=expression)
+    elif callable(expression):
         try:
             result = expression(
                 element=element,
@@ -147,6 +200,43 @@ def eval_expression(
     return result
 
 
+EXPRESSION_KEYS = ["eval", "sel_eval", "iterator_eval", "filter_eval"]
+
+
+def precompile_scraper(scraper):
+    """
+    Return a copy of the given scraper definition where css selectors and
+    python expressions have been compiled once and for all, so they don't
+    need to be parsed again for each element of each scraped page.
+    """
+    if not isinstance(scraper, dict):
+        return scraper
+
+    compiled = {}
+
+    for k, v in scraper.items():
+        if k in SELECT_ALIASES or k in ITERATOR_ALIASES:
+            v = soupsieve.compile(v)
+
+        elif k in EXPRESSION_KEYS and isinstance(v, str):
+            # NOTE: expressions that cannot be compiled are kept as is so
+            # that they raise the same ScraperEvalError at runtime
+            try:
+                v = CompiledExpression(v)
+            except SyntaxError:
+                pass
+
+        elif k == "item":
+            v = precompile_scraper(v)
+
+        elif k == "fields" or k == "set_context":
+            v = {field: precompile_scraper(spec) for field, spec in v.items()}
+
+        compiled[k] = v
+
+    return compiled
+
+
 def tabulate(element, headers_inference: Optional[str] = "th", headers=None, path=None):
     if element.name != "table":
         raise NotATableError(path=path)
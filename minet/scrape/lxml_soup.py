@@ -0,0 +1,562 @@
+# =============================================================================
+# Minet Lxml Soup
+# =============================================================================
+#
+# A faster alternative to WonderfulSoup, wrapping a lxml tree directly and
+# selecting through CSS selectors compiled to XPath, while exposing the same
+# API as MinetTag.
+#
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+    overload,
+)
+
+import re
+from functools import lru_cache
+from html import escape
+from threading import local
+from lxml import etree
+from lxml.html import HTMLParser, Element, HtmlElement
+from bs4 import SoupStrainer
+
+from minet.scrape.constants import BLOCK_ELEMENTS, CONTENT_BLOCK_ELEMENTS
+from minet.scrape.soup import SelectionError, TagScrapingMixin
+from minet.scrape.std import (
+    WHITESPACE_SQUEEZER_RE,
+    LINE_STRIPPER_RE,
+    PARAGRAPH_NORMALIZER_RE,
+    SPACE_SQUEEZER_RE,
+    unescape_cdata,
+)
+from minet.scrape.exceptions import CssselectNotInstalledError, InvalidCSSSelectorError
+
+CSSSELECT_SUPPORT = False
+
+try:
+    from cssselect import HTMLTranslator, SelectorError
+
+    CSSSELECT_SUPPORT = True
+except ImportError:
+    pass
+
+WHITESPACE_RE = re.compile(r"\s+")
+ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+
+# NOTE: the root of the soup is a container element, so that the whole
+# document can be selected using descendant axes only
+DOCUMENT_TAG = "minet-document"
+
+# NOTE: lxml parsers must not be used concurrently by several threads
+THREAD_LOCAL_DATA = local()
+TEXT_XPATH = etree.XPath(
+    "descendant::text()[not(parent::script or parent::style)]", smart_strings=False
+)
+
+T = TypeVar("T")
+
+
+class LxmlSelector(object):
+    """
+    CSS selector compiled to XPath, selecting the descendants of a LxmlTag.
+    """
+
+    __slots__ = ("css", "xpath", "first_xpath")
+
+    def __init__(self, css: str):
+        if not CSSSELECT_SUPPORT:
+            raise CssselectNotInstalledError
+
+        self.css = css
+
+        # NOTE: cssselect natively supports :contains()
+        normalized_css = css.replace(":-soup-contains(", ":contains(")
+
+        try:
+            xpath = HTMLTranslator().css_to_xpath(normalized_css, prefix="descendant::")
+        except SelectorError as e:
+            raise InvalidCSSSelectorError(reason=e, expression=css)
+
+        self.xpath = etree.XPath(xpath)
+        self.first_xpath = etree.XPath("(%s)[1]" % xpath)
+
+    def select(self, tag: "LxmlTag") -> List["LxmlTag"]:
+        return [LxmlTag(element) for element in self.xpath(tag.element)]
+
+    def select_one(self, tag: "LxmlTag") -> Optional["LxmlTag"]:
+        elements = self.first_xpath(tag.element)
+
+        if not elements:
+            return None
+
+        return LxmlTag(elements[0])
+
+    def __reduce__(self):
+        return (self.__class__, (self.css,))
+
+    def __repr__(self):
+        return "<{name} {css!r}>".format(name=self.__class__.__name__, css=self.css)
+
+
+@lru_cache(maxsize=512)
+def compile_lxml_selector(css: str) -> LxmlSelector:
+    return LxmlSelector(css)
+
+
+def match_attribute(value: Optional[str], pattern: Any) -> bool:
+    if pattern is True:
+        return value is not None
+
+    if pattern is None or pattern is False:
+        return value is None
+
+    if value is None:
+        return False
+
+    if isinstance(pattern, re.Pattern):
+        return pattern.search(value) is not None
+
+    if isinstance(pattern, (list, tuple, set)):
+        return value in pattern
+
+    return value == pattern
+
+
+def is_tag(element) -> bool:
+    # NOTE: comments and processing instructions have a non-str tag
+    return isinstance(element.tag, str)
+
+
+def is_block_element(element) -> bool:
+    return (
+        element.tag in BLOCK_ELEMENTS
+        or element.tag == "html"
+        or element.tag == DOCUMENT_TAG
+    )
+
+
+def get_block_parent(element):
+    while not is_block_element(element):
+        element = element.getparent()
+
+    return element
+
+
+def get_previous_sibling(element):
+    sibling = element.getprevious()
+
+    while sibling is not None and not is_tag(sibling):
+        sibling = sibling.getprevious()
+
+    return sibling
+
+
+def iter_descendants(element) -> Iterator[Union[HtmlElement, Tuple[str, HtmlElement]]]:
+    """
+    Iterate over the descendants of a lxml element in the same order as bs4,
+    where strings are nodes of their own. Strings are yielded as a
+    (string, parent) tuple.
+    """
+    events = ("start", "end", "comment", "pi")
+
+    for event, node in etree.iterwalk(element, events=events):
+        if event == "start":
+            if node is not element:
+                yield node
+
+            if node.text:
+                yield node.text, node
+
+            continue
+
+        # NOTE: like with bs4, comments are strings
+        if event != "end" and node.text:
+            yield node.text, node.getparent()
+
+        if node is not element and node.tail:
+            yield node.tail, node.getparent()
+
+
+def get_display_text(element) -> str:
+    """
+    Port of minet.scrape.std.get_display_text working on lxml elements.
+    """
+
+    def accumulator():
+        previous_block_parent = None
+        last_string = None
+
+        for descendant in iter_descendants(element):
+            if not isinstance(descendant, tuple):
+                if descendant.tag == "br":
+                    yield "\n"
+
+                elif descendant.tag == "hr":
+                    yield "\n\n"
+
+                elif descendant.tag in CONTENT_BLOCK_ELEMENTS:
+                    yield "\n"
+
+                else:
+                    # NOTE: an empty inline tag should not generate whitespace
+                    if not descendant.text and not len(descendant):
+                        continue
+
+                    sibling = get_previous_sibling(descendant)
+
+                    if sibling is not None:
+                        if sibling.tag in CONTENT_BLOCK_ELEMENTS:
+                            yield "\n"
+                        else:
+                            yield " "
+
+                continue
+
+            string, parent = descendant
+
+            if parent.tag == "pre":
+                yield "\n" + string
+                continue
+
+            string = WHITESPACE_SQUEEZER_RE.sub(" ", string.strip("\n"))
+
+            if not string:
+                continue
+
+            block_parent = get_block_parent(parent)
+
+            if block_parent is not previous_block_parent:
+                previous_block_parent = block_parent
+                yield "\n"
+
+            if last_string and last_string.endswith(" "):
+                string = string.lstrip()
+
+            string = unescape_cdata(string)
+
+            if string:
+                yield string
+
+            last_string = string
+
+    result = "".join(accumulator())
+    result = LINE_STRIPPER_RE.sub("\n", result)
+    result = PARAGRAPH_NORMALIZER_RE.sub("\n\n", result)
+    result = SPACE_SQUEEZER_RE.sub(" ", result)
+    result = result.strip()
+
+    return result
+
+
+class LxmlTag(TagScrapingMixin):
+    """
+    Thin wrapper over a lxml element exposing the same API as MinetTag.
+    """
+
+    __slots__ = ("element",)
+
+    def __init__(self, element: HtmlElement):
+        self.element = element
+
+    @property
+    def name(self) -> str:
+        return self.element.tag
+
+    @property
+    def attrs(self) -> Dict[str, str]:
+        return dict(self.element.attrib)
+
+    @property
+    def parent(self) -> Optional["LxmlTag"]:
+        parent = self.element.getparent()
+
+        if parent is None:
+            return None
+
+        return LxmlTag(parent)
+
+    def __eq__(self, other):
+        return isinstance(other, LxmlTag) and self.element is other.element
+
+    def __hash__(self):
+        return hash(self.element)
+
+    def __repr__(self):
+        return "<{name} {tag}>".format(
+            name=self.__class__.__name__, tag=self.element.tag
+        )
+
+    def __str__(self):
+        return etree.tostring(
+            self.element, encoding=str, method="html", with_tail=False
+        )
+
+    def force_select_one(self, css: str) -> "LxmlTag":
+        elem = self.select_one(css)
+
+        if elem is None:
+            raise SelectionError(css)
+
+        return elem
+
+    def select_one(self, css: str) -> Optional["LxmlTag"]:
+        return compile_lxml_selector(css).select_one(self)
+
+    def select(self, css: str) -> List["LxmlTag"]:
+        return compile_lxml_selector(css).select(self)
+
+    def __iter_matching(
+        self,
+        name: Optional[Union[str, List[str]]],
+        attrs: Dict[str, Any],
+        recursive: bool,
+        string,
+        kwargs,
+    ) -> Iterator["LxmlTag"]:
+        if string is not None:
+            raise NotImplementedError("lxml soups cannot find strings")
+
+        attrs = dict(attrs, **kwargs)
+
+        if "class_" in attrs:
+            attrs["class"] = attrs.pop("class_")
+
+        names = None
+
+        if name is not None:
+            names = {name} if isinstance(name, str) else set(name)
+
+        if recursive:
+            candidates = self.element.iterdescendants()
+        else:
+            candidates = self.element.iterchildren()
+
+        for element in candidates:
+            if not is_tag(element):
+                continue
+
+            if names is not None and element.tag not in names:
+                continue
+
+            if not all(
+                match_attribute(element.get(k), pattern) for k, pattern in attrs.items()
+            ):
+                continue
+
+            yield LxmlTag(element)
+
+    def find(
+        self,
+        name: Optional[Union[str, List[str]]] = None,
+        attrs={},
+        recursive: bool = True,
+        string=None,
+        **kwargs,
+    ) -> Optional["LxmlTag"]:
+        return next(self.__iter_matching(name, attrs, recursive, string, kwargs), None)
+
+    def force_find(
+        self,
+        name: Optional[Union[str, List[str]]] = None,
+        attrs={},
+        recursive: bool = True,
+        string=None,
+        **kwargs,
+    ) -> "LxmlTag":
+        elem = self.find(name, attrs, recursive, string, **kwargs)
+
+        if elem is None:
+            raise SelectionError
+
+        return elem
+
+    def find_all(
+        self,
+        name: Optional[Union[str, List[str]]] = None,
+        attrs={},
+        recursive: bool = True,
+        string=None,
+        limit: Optional[int] = None,
+        **kwargs,
+    ) -> List["LxmlTag"]:
+        output = []
+
+        for elem in self.__iter_matching(name, attrs, recursive, string, kwargs):
+            if limit is not None and len(output) >= limit:
+                break
+
+            output.append(elem)
+
+        return output
+
+    def get_text(self) -> str:
+        return "".join(TEXT_XPATH(self.element)).strip()
+
+    def get_display_text(self) -> str:
+        return get_display_text(self.element)
+
+    def get_html(self) -> str:
+        element = self.element
+
+        html = escape(element.text, quote=False) if element.text else ""
+        html += "".join(
+            etree.tostring(child, encoding=str, method="html") for child in element
+        )
+
+        return html.strip()
+
+    def get_inner_html(self) -> str:
+        return self.get_html()
+
+    def get_outer_html(self) -> str:
+        return str(self).strip()
+
+    def __getitem__(self, name: str) -> str:
+        return self.element.attrib[name]
+
+    @overload
+    def get(self, name: str, default: None = ...) -> Optional[str]: ...
+
+    @overload
+    def get(self, name: str, default: T = ...) -> Union[T, str]: ...
+
+    def get(self, name: str, default: Optional[T] = None) -> Optional[Union[T, str]]:
+        return self.element.get(name, default)
+
+    def get_list(self, name: str) -> List[str]:
+        value = self.element.get(name)
+
+        if not value:
+            return []
+
+        return WHITESPACE_RE.split(value.strip())
+
+
+def get_html_parser() -> HTMLParser:
+    parser = getattr(THREAD_LOCAL_DATA, "parser", None)
+
+    if parser is None:
+        parser = HTMLParser(encoding="utf-8")
+        THREAD_LOCAL_DATA.parser = parser
+
+    return parser
+
+
+def normalize_whitespace(root: HtmlElement) -> None:
+    """
+    Collapse whitespace-only strings into a single space or line break, as
+    bs4 does when building its trees, so that text extraction yields the
+    same results.
+    """
+    preserved = set()
+
+    for element in root.iter("pre", "textarea"):
+        preserved.update(element.iter())
+
+    for element in root.iter():
+        text = element.text
+
+        if text and element not in preserved and not text.strip(ASCII_SPACES):
+            element.text = "\n" if "\n" in text else " "
+
+        tail = element.tail
+
+        if (
+            tail
+            and element is not root
+            and element.getparent() not in preserved
+            and not tail.strip(ASCII_SPACES)
+        ):
+            element.tail = "\n" if "\n" in tail else " "
+
+
+def parse_html(markup: Union[str, bytes]) -> HtmlElement:
+    # NOTE: lxml refuses str markup containing an encoding declaration
+    if isinstance(markup, str):
+        markup = markup.encode("utf-8", errors="replace")
+
+    root = None
+
+    if markup.strip():
+        root = etree.fromstring(markup, get_html_parser())
+
+    if root is None:
+        return Element("html")
+
+    normalize_whitespace(root)
+
+    return root
+
+
+def strain(root: HtmlElement, strainer: SoupStrainer) -> List[HtmlElement]:
+    """
+    Return the topmost elements matched by the given strainer, like bs4 does
+    when given a SoupStrainer through `parse_only`.
+    """
+    matches = []
+    stack = [root]
+
+    while stack:
+        element = stack.pop()
+
+        if strainer.search_tag(element.tag, dict(element.attrib)):
+            matches.append(element)
+            continue
+
+        stack.extend(reversed([child for child in element if is_tag(child)]))
+
+    return matches
+
+
+class LxmlSoup(LxmlTag):
+    """
+    A lxml-based alternative to WonderfulSoup, which is a lot faster but
+    only exposes minet's own Tag API.
+    """
+
+    __slots__ = ()
+
+    def __init__(
+        self,
+        markup: Union[str, bytes],
+        parse_only: Optional[SoupStrainer] = None,
+    ) -> None:
+        root = parse_html(markup)
+        document = Element(DOCUMENT_TAG)
+
+        if parse_only is None:
+            document.append(root)
+        else:
+            for element in strain(root, parse_only):
+                element.tail = None
+                document.append(element)
+
+        super().__init__(document)
+
+    def __str__(self):
+        return self.get_html()
+
+    def get_outer_html(self) -> str:
+        return self.get_html()
+
+
+def ensure_lxml_soup(
+    html_or_soup: Union[str, bytes, LxmlSoup], strainer: Optional[SoupStrainer] = None
+) -> LxmlSoup:
+    if isinstance(html_or_soup, LxmlSoup):
+        return html_or_soup
+
+    return LxmlSoup(html_or_soup, parse_only=strainer)
+
+
+def is_valid_lxml_iterator_eval_output(value) -> bool:
+    if isinstance(value, str):
+        return True
+
+    return isinstance(value, list) and all(isinstance(tag, LxmlTag) for tag in value)
@@ -8,11 +8,15 @@
 # Those are also typically able to work on raw bytes so one does not need to
 # even decode the HTML.
 #
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterator, Set
 
 import re
+from html import unescape
 from itertools import chain
 from collections import defaultdict
+from ural import canonicalize_url, should_follow_href, is_url
+from ural.utils import urljoin
+from ural.patterns import PROTOCOL_RE, SCRIPT_TAG_BINARY_RE, URL_IN_HTML_BINARY_RE
 
 from minet.encodings import normalize_encoding
 from minet.headers import parse_http_refresh
@@ -109,3 +113,112 @@ def extract_meta_refresh(html_chunk: bytes):
         return None
 
     return parse_http_refresh(m.group(1))
+
+
+LINK_QUOTES = (None, b'"', b"'", None)
+
+
+def extract_links(
+    base_url: str,
+    html: bytes,
+    encoding: str = "utf-8",
+    canonicalize: bool = False,
+    unique: bool = False,
+    strip_fragment: bool = False,
+) -> Iterator[str]:
+    """
+    Function lazily yielding the urls of the links found in the given html
+    bytes, resolved against the given base url. It yields the same urls as
+    `ural.links_from_html`, but hrefs are tokenized without decoding the
+    body, fragment-only hrefs are dropped before being decoded and each
+    distinct href is resolved, validated & canonicalized only once, which
+    matters on link-heavy pages repeating the same links.
+    """
+    if canonicalize:
+        base_url = canonicalize_url(base_url, strip_fragment=strip_fragment)
+
+    resolved: Dict[bytes, Optional[str]] = {}
+    already_seen: Set[str] = set()
+
+    for match in URL_IN_HTML_BINARY_RE.finditer(SCRIPT_TAG_BINARY_RE.sub(b"", html)):
+        group = match.lastindex
+        href = match.group(group)
+
+        if href in resolved:
+            if unique:
+                continue
+
+            url = resolved[href]
+
+            if url is not None:
+                yield url
+
+            continue
+
+        quote = LINK_QUOTES[group]
+        stripped_href = (href if quote is None else href.strip(quote)).strip()
+
+        # NOTE: empty & fragment-only hrefs are basically self
+        if not stripped_href or stripped_href[0] == 35:  # "#"
+            url = None
+        else:
+            url = resolve_href(
+                base_url,
+                stripped_href,
+                encoding=encoding,
+                canonicalize=canonicalize,
+                strip_fragment=strip_fragment,
+            )
+
+        resolved[href] = url
+
+        if url is None:
+            continue
+
+        if unique:
+            if url in already_seen:
+                continue
+
+            already_seen.add(url)
+
+        yield url
+
+
+def resolve_href(
+    base_url: str,
+    href: bytes,
+    encoding: str = "utf-8",
+    canonicalize: bool = False,
+    strip_fragment: bool = False,
+) -> Optional[str]:
+    url = href.decode(encoding, errors="replace").strip()
+
+    if "&" in url:
+        url = unescape(url)
+
+    if not url:
+        return None
+
+    if not should_follow_href(url):
+        return None
+
+    # NOTE: urllib.parse.urljoin lowercases protocol
+    if not PROTOCOL_RE.match(url):
+        url = urljoin(base_url, url)
+
+    if not is_url(
+        url,
+        require_protocol=True,
+        tld_aware=True,
+        allow_spaces_in_path=True,
+        only_http_https=True,
+    ):
+        return None
+
+    if canonicalize:
+        url = canonicalize_url(url, strip_fragment=strip_fragment)
+
+    if url == base_url:
+        return None
+
+    return url
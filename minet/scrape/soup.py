@@ -45,7 +45,49 @@ def extract(elem: "MinetTag", target: Optional[str]) -> Optional[str]:
     return cast(Optional[str], elem.get(target))
 
 
-class MinetTag(Tag):
+class TagScrapingMixin(object):
+    """
+    Scraping utilities relying only on the select/select_one methods and the
+    extraction methods of the tag, so they can be shared by tag
+    implementations based on different parsers.
+    """
+
+    __slots__ = ()
+
+    def force_scrape_one(self, css: str, target: Optional[str] = None) -> str:
+        elem = self.select_one(css)
+
+        if elem is None:
+            raise SelectionError(css)
+
+        value = extract(elem, target)
+
+        if value is None:
+            raise ExtractionError(target)
+
+        return value
+
+    def scrape_one(self, css: str, target: Optional[str] = None) -> Optional[str]:
+        elem = self.select_one(css)
+
+        if elem is None:
+            return None
+
+        return extract(elem, target)
+
+    def scrape(self, css: str, target: Optional[str] = None) -> List[str]:
+        output = []
+
+        for elem in self.select(css):
+            value = extract(elem, target)
+
+            if value is not None:
+                output.append(value)
+
+        return output
+
+
+class MinetTag(TagScrapingMixin, Tag):
     def force_select_one(self, css: str, *args, **kwargs) -> "MinetTag":
         css = normalize_css(css)
 
@@ -106,38 +148,6 @@ class MinetTag(Tag):
             super().find_all(name, attrs, recursive, string, limit, **kwargs),
         )
 
-    def force_scrape_one(self, css: str, target: Optional[str] = None) -> str:
-        elem = self.select_one(css)
-
-        if elem is None:
-            raise SelectionError(css)
-
-        value = extract(elem, target)
-
-        if value is None:
-            raise ExtractionError(target)
-
-        return value
-
-    def scrape_one(self, css: str, target: Optional[str] = None) -> Optional[str]:
-        elem = self.select_one(css)
-
-        if elem is None:
-            return None
-
-        return extract(elem, target)
-
-    def scrape(self, css: str, target: Optional[str] = None) -> List[str]:
-        output = []
-
-        for elem in self.select(css):
-            value = extract(elem, target)
-
-            if value is not None:
-                output.append(value)
-
-        return output
-
     def get_text(self) -> str:
         return super().get_text().strip()
 
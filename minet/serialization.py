@@ -21,6 +21,7 @@ from minet.exceptions import (
     TrafilaturaError,
     FilenameFormattingError,
     FinalTimeoutError,
+    ResponseTooLargeError,
     CouldNotInferEncodingError,
     InvalidStatusError,
     #
@@ -31,6 +32,15 @@ from minet.exceptions import (
     PycurlReceiveError,
     PycurlSendError,
     #
+    HttpxError,
+    HttpxTimeoutError,
+    HttpxSSLError,
+    HttpxProtocolError,
+    HttpxHostResolutionError,
+    HttpxConnectionRefusedError,
+    HttpxReceiveError,
+    HttpxSendError,
+    #
     BrowserYetUnimplementedError,
     BrowserNameNotResolvedError,
     BrowserConnectionAbortedError,
@@ -107,6 +117,7 @@ ERROR_REPORTERS = {
     ConnectTimeoutError: "connect-timeout",
     ReadTimeoutError: "read-timeout",
     FinalTimeoutError: "timeout",
+    ResponseTooLargeError: "response-too-large",
     MaxRedirectsError: "max-redirects",
     InfiniteRedirectsError: "infinite-redirects",
     SelfRedirectError: "self-redirect",
@@ -126,6 +137,15 @@ ERROR_REPORTERS = {
     PycurlReceiveError: "receive-error",
     PycurlSendError: "send-error",
     #
+    HttpxError: "httpx-error",
+    HttpxTimeoutError: "timeout",
+    HttpxSSLError: "ssl",
+    HttpxProtocolError: "connection-error",
+    HttpxHostResolutionError: "unknown-host",
+    HttpxConnectionRefusedError: "connection-refused",
+    HttpxReceiveError: "receive-error",
+    HttpxSendError: "send-error",
+    #
     BrowserYetUnimplementedError: "unknown-browser-error",
     BrowserNameNotResolvedError: "unknown-host",
     BrowserConnectionAbortedError: "connection-aborted",
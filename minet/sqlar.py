@@ -1,10 +1,13 @@
-from typing import Optional, Iterator
+from typing import Optional, Iterator, Tuple, Dict, Literal
 
+import atexit
 import sqlite3
+import weakref
 import zlib
-from os import stat
+from os import stat, getpid
 from os.path import isfile
-from threading import Lock
+from queue import Queue, Empty
+from threading import Lock, Thread
 from pathlib import Path
 from contextlib import contextmanager
 from dataclasses import dataclass
@@ -12,11 +15,25 @@ from datetime import datetime
 
 from minet.exceptions import SQLArchiveInvalidError
 from minet.utils import iterate_over_sqlite_cursor
+from minet.constants import DEFAULT_SQLAR_BATCH_SIZE, DEFAULT_SQLAR_QUEUE_SIZE
+from minet.zstd import (
+    GroupedZstdCompressor,
+    ensure_zstd_support,
+    get_zstd_group,
+    is_zstd,
+    register_zstd_dictionary,
+    zstd_uncompress,
+)
 
 # Extraction using the sqlite3 command line:
 #   $ sqlite3 -Axvf archive.sqlar
 #   $ sqlite3 archive.sqlar ".ar -xv --directory archive"
 
+# NOTE: archives using zstd compression are not standard sqlar archives
+# anymore, and cannot be extracted by the sqlite3 command line. Their
+# dictionaries are stored in a side table so that the archive stays
+# self-contained.
+
 # References:
 #  - https://www.sqlite.org/sqlar/doc/trunk/README.md
 #  - https://www.sqlite.org/sqlar.html
@@ -54,6 +71,19 @@ SQL_INSERT = """
 INSERT OR REPLACE INTO sqlar (name, mode, mtime, sz, data) VALUES (?, ?, ?, ?, ?);
 """
 
+SQL_CREATE_ZSTD_DICTIONARIES = """
+CREATE TABLE IF NOT EXISTS sqlar_zstd_dictionaries (
+  id INT PRIMARY KEY,     -- id of the dictionary, as found in frame headers
+  data BLOB NOT NULL      -- raw dictionary
+);
+"""
+
+SQL_INSERT_ZSTD_DICTIONARY = """
+INSERT OR IGNORE INTO sqlar_zstd_dictionaries (id, data) VALUES (?, ?);
+"""
+
+SQLiteArchiveCompression = Literal["zlib", "zstd"]
+
 
 def sqlar_compress(data: bytes) -> bytes:
     compressed = zlib.compress(data, level=-1)
@@ -68,6 +98,10 @@ def sqlar_uncompress(data: bytes, size: int) -> bytes:
     if size == len(data):
         return data
 
+    # NOTE: zlib streams cannot start with zstd's magic number
+    if is_zstd(data):
+        return zstd_uncompress(data)
+
     return zlib.decompress(data)
 
 
@@ -77,6 +111,14 @@ def is_sqlar(cursor: sqlite3.Cursor) -> bool:
     return cursor.fetchall() == SQLAR_TABLE_EXPECTED_RESULT
 
 
+def has_zstd_dictionaries(cursor: sqlite3.Cursor) -> bool:
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlar_zstd_dictionaries';"
+    )
+
+    return cursor.fetchone() is not None
+
+
 def get_safe_path(name: str) -> str:
     return str(Path(name).as_posix())
 
@@ -112,16 +154,50 @@ class SQLiteArchiveRecord:
         return self.size > 0
 
 
-# NOTE: this class is threadsafe but does not allow for any concurrent access
+SQLiteArchiveRow = Tuple[str, int, int, int, bytes]
+
+
+# NOTE: this class is threadsafe. Files are compressed by the calling threads
+# and their rows are funnelled through a bounded queue to a dedicated writer
+# thread that inserts them by batches, in a single transaction.
 class SQLiteArchive:
     in_memory: bool
     lock: Lock
     connection: sqlite3.Connection
     default_mode: int
+    batch_size: int
+    queue: "Queue[Optional[SQLiteArchiveRow]]"
+    pending: Dict[str, SQLiteArchiveRow]
+    writer_thread: Optional[Thread]
+    writer_error: Optional[BaseException]
+    zstd_compressor: Optional[GroupedZstdCompressor]
+
+    def __init__(
+        self,
+        filename: Optional[str] = None,
+        batch_size: int = DEFAULT_SQLAR_BATCH_SIZE,
+        queue_size: int = DEFAULT_SQLAR_QUEUE_SIZE,
+        compression: SQLiteArchiveCompression = "zlib",
+    ):
+        if compression not in ("zlib", "zstd"):
+            raise TypeError('compression should be "zlib" or "zstd"')
+
+        if compression == "zstd":
+            ensure_zstd_support()
 
-    def __init__(self, filename: Optional[str] = None):
         self.in_memory = False
         self.default_mode = 0o664
+        self.closed = False
+        self.pid = getpid()
+
+        self.batch_size = batch_size
+        self.queue = Queue(maxsize=queue_size)
+        self.pending = {}
+        self.pending_lock = Lock()
+        self.enqueue_lock = Lock()
+        self.writer_lock = Lock()
+        self.writer_thread = None
+        self.writer_error = None
 
         already_exists = False
 
@@ -134,6 +210,9 @@ class SQLiteArchive:
         self.connection = sqlite3.connect(filename, check_same_thread=False)
         self.lock = Lock()
 
+        if batch_size < 1:
+            raise TypeError("batch_size should be >= 1")
+
         if not self.in_memory:
             self.default_mode = stat(filename).st_mode & 0o777
 
@@ -146,6 +225,26 @@ class SQLiteArchive:
                 if not is_sqlar(cursor):
                     raise SQLArchiveInvalidError
 
+                if has_zstd_dictionaries(cursor):
+                    ensure_zstd_support()
+
+                    cursor.execute("SELECT data FROM sqlar_zstd_dictionaries;")
+
+                    for (data,) in cursor.fetchall():
+                        register_zstd_dictionary(data)
+
+        self.zstd_compressor = None
+
+        if compression == "zstd":
+            with self.transaction() as cursor:
+                cursor.execute(SQL_CREATE_ZSTD_DICTIONARIES)
+
+            # NOTE: files are grouped by top-level folder, so that the folder
+            # strategy (e.g. hostname) decides which files share a dictionary
+            self.zstd_compressor = GroupedZstdCompressor(
+                on_dictionary=self.__write_zstd_dictionary
+            )
+
     @contextmanager
     def transaction(self):
         cursor = None
@@ -158,27 +257,157 @@ class SQLiteArchive:
             if cursor is not None:
                 cursor.close()
 
+    def __write_zstd_dictionary(self, group: str, dictionary) -> None:
+        with self.transaction() as cursor:
+            cursor.execute(
+                SQL_INSERT_ZSTD_DICTIONARY,
+                (dictionary.dict_id(), dictionary.as_bytes()),
+            )
+
+    def __compress(self, data: bytes, group: str) -> bytes:
+        if self.zstd_compressor is None:
+            return sqlar_compress(data)
+
+        compressed = self.zstd_compressor.compress(data, group=group)
+
+        if len(compressed) < len(data):
+            return compressed
+
+        return data
+
+    def __ensure_writer_thread(self) -> None:
+        if self.writer_thread is not None:
+            return
+
+        with self.writer_lock:
+            if self.writer_thread is not None:
+                return
+
+            # NOTE: the writer thread is daemonic so that it cannot prevent
+            # the process from exiting, which is why pending rows are flushed
+            # by an atexit hook holding a weak reference to the archive.
+            self.writer_thread = Thread(
+                target=self.__writer_loop,
+                name="SQLiteArchiveWriter",
+                daemon=True,
+            )
+            self.writer_thread.start()
+
+            ref = weakref.ref(self)
+            atexit.register(flush_archive_at_exit, ref)
+
+    def __writer_loop(self) -> None:
+        stopping = False
+
+        while not stopping:
+            row = self.queue.get()
+            batch = []
+
+            if row is None:
+                stopping = True
+            else:
+                batch.append(row)
+
+            # NOTE: draining whatever is already available, up to batch_size
+            while not stopping and len(batch) < self.batch_size:
+                try:
+                    row = self.queue.get_nowait()
+                except Empty:
+                    break
+
+                if row is None:
+                    stopping = True
+                else:
+                    batch.append(row)
+
+            try:
+                if batch and self.writer_error is None:
+                    with self.transaction() as cursor:
+                        cursor.executemany(SQL_INSERT, batch)
+
+            except BaseException as e:
+                self.writer_error = e
+
+            finally:
+                with self.pending_lock:
+                    for row in batch:
+                        # NOTE: the same name may have been written again since
+                        if self.pending.get(row[0]) is row:
+                            del self.pending[row[0]]
+
+                for _ in range(len(batch) + (1 if stopping else 0)):
+                    self.queue.task_done()
+
+    def __raise_writer_error(self) -> None:
+        if self.writer_error is not None:
+            raise self.writer_error
+
+    def flush(self) -> None:
+        """
+        Method blocking until every pending row has been committed to the
+        archive.
+        """
+        if self.writer_thread is not None:
+            self.queue.join()
+
+        self.__raise_writer_error()
+
     def __len__(self) -> int:
+        self.flush()
+
         with self.transaction() as cursor:
             cursor.execute("SELECT count(*) FROM sqlar;")
             return cursor.fetchone()[0]
 
-    def write(self, name: str, data: bytes, mtime: Optional[int] = None) -> None:
-        with self.transaction() as cursor:
-            safe_path = get_safe_path(name)
-            compressed_data = sqlar_compress(data)
-            mtime = int(datetime.utcnow().timestamp()) if mtime is None else mtime
+    def write(
+        self,
+        name: str,
+        data: bytes,
+        mtime: Optional[int] = None,
+        group: Optional[str] = None,
+    ) -> None:
+        if self.closed:
+            raise RuntimeError("archive is closed")
 
-            cursor.execute(
-                SQL_INSERT,
-                (safe_path, self.default_mode, mtime, len(data), compressed_data),
-            )
+        self.__raise_writer_error()
+
+        # NOTE: compressing in the calling thread, outside of any lock
+        safe_path = get_safe_path(name)
+        compressed_data = self.__compress(
+            data, get_zstd_group(safe_path) if group is None else group
+        )
+        mtime = int(datetime.utcnow().timestamp()) if mtime is None else mtime
+
+        row = (safe_path, self.default_mode, mtime, len(data), compressed_data)
+
+        self.__ensure_writer_thread()
+
+        # NOTE: rows are registered as pending & enqueued atomically, so that
+        # concurrent writes of the same name are committed in order, and so
+        # that no row can be enqueued after the archive started closing
+        with self.enqueue_lock:
+            if self.closed:
+                raise RuntimeError("archive is closed")
+
+            # NOTE: pending rows are kept around so that readers can see them
+            # before they are committed
+            with self.pending_lock:
+                self.pending[safe_path] = row
+
+            # NOTE: this blocks when the queue is full, hence back-pressure
+            self.queue.put(row)
 
     def read(self, name: str) -> SQLiteArchiveRecord:
+        safe_path = get_safe_path(name)
+
+        with self.pending_lock:
+            row = self.pending.get(safe_path)
+
+        if row is not None:
+            return SQLiteArchiveRecord(*row)
+
         with self.transaction() as cursor:
-            cursor.execute(
-                "SELECT * FROM sqlar WHERE name = ? LIMIT 1;", (get_safe_path(name),)
-            )
+            cursor.execute("SELECT * FROM sqlar WHERE name = ? LIMIT 1;", (safe_path,))
 
             row = cursor.fetchone()
 
@@ -187,7 +416,21 @@ class SQLiteArchive:
 
             return SQLiteArchiveRecord(*row)
 
+    def __contains__(self, name: str) -> bool:
+        safe_path = get_safe_path(name)
+
+        with self.pending_lock:
+            if safe_path in self.pending:
+                return True
+
+        with self.transaction() as cursor:
+            cursor.execute("SELECT 1 FROM sqlar WHERE name = ? LIMIT 1;", (safe_path,))
+
+            return cursor.fetchone() is not None
+
     def __iter__(self) -> Iterator[SQLiteArchiveRecord]:
+        self.flush()
+
         with self.transaction() as cursor:
             cursor.execute("SELECT * FROM sqlar;")
 
@@ -195,7 +438,37 @@ class SQLiteArchive:
                 yield SQLiteArchiveRecord(*row)
 
     def close(self):
+        with self.enqueue_lock:
+            if self.closed:
+                return
+
+            self.closed = True
+
+            # NOTE: a forked process must neither use nor close the
+            # connection it inherited from its parent
+            if getpid() != self.pid:
+                return
+
+            if self.writer_thread is not None:
+                self.queue.put(None)
+
+        if self.writer_thread is not None:
+            self.writer_thread.join()
+
         self.connection.close()
 
+        self.__raise_writer_error()
+
     def __del__(self):
-        self.close()
+        # NOTE: the archive might not have been fully initialized
+        if hasattr(self, "connection"):
+            self.close()
+
+
+def flush_archive_at_exit(ref: "weakref.ReferenceType[SQLiteArchive]") -> None:
+    archive = ref()
+
+    if archive is None:
+        return
+
+    archive.close()
@@ -0,0 +1,722 @@
+# =============================================================================
+# Minet WARC Utilities
+# =============================================================================
+#
+# Helpers able to write fetched responses as WARC records, in rotating,
+# append-only gzipped WARC files, along with a CDXJ index so that records
+# can be accessed randomly by url or by offset later on.
+#
+# Each record is written as its own gzip member, which means a record can be
+# decompressed in isolation, as long as we know its offset in the file.
+#
+# CDXJ lines are appended to an unsorted file while its WARC file is being
+# written, which is then sorted by SURT when the WARC file is closed, so
+# that it can be searched without being loaded in memory.
+#
+# References:
+#  - https://iipc.github.io/warc-specifications/specifications/warc-format/warc-1.0/
+#  - https://specs.webrecorder.net/cdxj/0.1.0/
+#  - https://github.com/internetarchive/surt
+#
+from typing import TYPE_CHECKING, Optional, Dict, Iterator, List, Tuple, BinaryIO
+
+import os
+import json
+import zlib
+import gzip
+from glob import iglob
+from uuid import uuid4
+from io import BytesIO
+from base64 import b32encode
+from hashlib import sha1
+from datetime import datetime
+from http import HTTPStatus
+from threading import Lock
+from dataclasses import dataclass
+from os.path import join
+from urllib.parse import urlsplit
+from urllib3._collections import HTTPHeaderDict
+
+from minet.__version__ import __version__
+from minet.exceptions import WARCInvalidRecordError
+from minet.constants import DEFAULT_WARC_MAX_SIZE, DEFAULT_WARC_PREFIX
+
+if TYPE_CHECKING:
+    from minet.web import Response
+
+CHUNK_SIZE = 2**16
+CRLF = b"\r\n"
+WARC_VERSION = b"WARC/1.0"
+WARC_DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+CDXJ_TIMESTAMP_FORMAT = "%Y%m%d%H%M%S"
+CDXJ_EXTENSION = ".cdxj"
+CDXJ_UNSORTED_EXTENSION = ".cdxj.unsorted"
+
+# NOTE: bodies are decoded by the time we get them, so we drop those headers
+# to keep the recorded http message consistent with its payload
+DROPPED_RESPONSE_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+
+
+def get_surt(url: str) -> str:
+    """
+    Function returning the SURT (Sort-friendly URI Reordering Transform) of
+    the given url, used as the key of CDXJ indices.
+    """
+    parsed = urlsplit(url.strip())
+
+    host = (parsed.hostname or "").lower().rstrip(".")
+
+    if host.startswith("www."):
+        host = host[4:]
+
+    surt = ",".join(reversed(host.split(".")))
+
+    if parsed.port is not None and parsed.port not in (80, 443):
+        surt += ":%i" % parsed.port
+
+    surt += ")" + (parsed.path or "/")
+
+    if parsed.query:
+        surt += "?" + "&".join(sorted(parsed.query.split("&")))
+
+    return surt.lower()
+
+
+def sort_cdxj(path: str, target: str) -> None:
+    """
+    Function sorting the lines of the given unsorted CDXJ file into the
+    target path, then deleting the unsorted file.
+    """
+    with open(path, "rb") as f:
+        lines = f.readlines()
+
+    # NOTE: sorting bytes, like `LC_ALL=C sort` does
+    lines.sort()
+
+    tmp_path = target + ".tmp"
+
+    with open(tmp_path, "wb") as f:
+        f.writelines(lines)
+
+    os.replace(tmp_path, target)
+    os.remove(path)
+
+
+def get_digest(h) -> str:
+    return "sha1:" + b32encode(h.digest()).decode()
+
+
+def serialize_warc_headers(headers: List[Tuple[str, str]]) -> bytes:
+    lines = [WARC_VERSION]
+
+    for name, value in headers:
+        lines.append(("%s: %s" % (name, value)).encode("utf-8"))
+
+    return CRLF.join(lines) + CRLF + CRLF
+
+
+def serialize_record(
+    headers: List[Tuple[str, str]],
+    block_head: bytes = b"",
+    payload: Optional[BinaryIO] = None,
+) -> bytes:
+    """
+    Function serializing a record as a standalone gzip member. The payload,
+    if any, is read by chunks twice: once to compute its digest, and once to
+    be compressed, so that spooled bodies are never fully loaded in memory.
+    """
+    block_hash = sha1(block_head)
+    payload_hash = sha1()
+    payload_size = 0
+
+    if payload is not None:
+        payload.seek(0)
+
+        for chunk in iter(lambda: payload.read(CHUNK_SIZE), b""):
+            block_hash.update(chunk)
+            payload_hash.update(chunk)
+            payload_size += len(chunk)
+
+    headers = list(headers)
+
+    if payload is not None:
+        headers.append(("WARC-Payload-Digest", get_digest(payload_hash)))
+
+    headers.append(("WARC-Block-Digest", get_digest(block_hash)))
+    headers.append(("Content-Length", str(len(block_head) + payload_size)))
+
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    parts = [
+        compressor.compress(serialize_warc_headers(headers)),
+        compressor.compress(block_head),
+    ]
+
+    if payload is not None:
+        payload.seek(0)
+
+        for chunk in iter(lambda: payload.read(CHUNK_SIZE), b""):
+            parts.append(compressor.compress(chunk))
+
+    parts.append(compressor.compress(CRLF + CRLF))
+    parts.append(compressor.flush())
+
+    return b"".join(parts)
+
+
+def get_record_id() -> str:
+    return "<urn:uuid:%s>" % uuid4()
+
+
+def serialize_http_response_head(response: "Response") -> bytes:
+    try:
+        reason = HTTPStatus(response.status).phrase
+    except ValueError:
+        reason = ""
+
+    lines = [("HTTP/1.1 %i %s" % (response.status, reason)).strip().encode()]
+
+    for name, value in response.headers.iteritems():
+        if name.lower() in DROPPED_RESPONSE_HEADERS:
+            continue
+
+        lines.append(("%s: %s" % (name, value)).encode("latin-1", errors="replace"))
+
+    lines.append(b"Content-Length: %i" % len(response))
+
+    return CRLF.join(lines) + CRLF + CRLF
+
+
+def serialize_http_request_head(url: str, method: str = "GET") -> bytes:
+    parsed = urlsplit(url)
+
+    target = parsed.path or "/"
+
+    if parsed.query:
+        target += "?" + parsed.query
+
+    # NOTE: the actual headers sent are not known at this point, so we only
+    # record what is needed to replay the request
+    lines = [
+        ("%s %s HTTP/1.1" % (method, target)).encode(),
+        ("Host: %s" % parsed.netloc).encode(),
+    ]
+
+    return CRLF.join(lines) + CRLF + CRLF
+
+
+@dataclass
+class WARCRecordLocation:
+    filename: str
+    offset: int
+    length: int
+
+    @property
+    def path(self) -> str:
+        return "%s#%i" % (self.filename, self.offset)
+
+
+class WARCWriter(object):
+    """
+    Threadsafe writer appending request & response records to gzipped WARC
+    files rotated by size, along with a CDXJ index file per WARC file.
+
+    Records are serialized & compressed by the calling threads, outside of
+    the lock, which is only held to append the resulting bytes.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        prefix: str = DEFAULT_WARC_PREFIX,
+        max_size: int = DEFAULT_WARC_MAX_SIZE,
+    ):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_size = max_size
+
+        self.lock = Lock()
+        self.closed = False
+        self.serial = 0
+        self.timestamp = datetime.utcnow().strftime(CDXJ_TIMESTAMP_FORMAT)
+
+        self.filename: Optional[str] = None
+        self.file: Optional[BinaryIO] = None
+        self.index_file = None
+        self.index_path: Optional[str] = None
+        self.offset = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __close_current_file(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+        if self.index_file is not None:
+            self.index_file.close()
+            self.index_file = None
+
+            assert self.index_path is not None
+
+            sort_cdxj(
+                self.index_path,
+                self.index_path[: -len(CDXJ_UNSORTED_EXTENSION)] + CDXJ_EXTENSION,
+            )
+
+    def __rotate(self) -> None:
+        self.__close_current_file()
+
+        # NOTE: the pid is part of the filename so that several processes
+        # can write in the same directory
+        while True:
+            self.filename = "%s-%s-%05i-%i.warc.gz" % (
+                self.prefix,
+                self.timestamp,
+                self.serial,
+                os.getpid(),
+            )
+            self.serial += 1
+
+            if not os.path.exists(join(self.directory, self.filename)):
+                break
+
+        self.file = open(join(self.directory, self.filename), "wb")
+        self.index_path = join(
+            self.directory, self.filename[: -len(".warc.gz")] + CDXJ_UNSORTED_EXTENSION
+        )
+        self.index_file = open(self.index_path, "w", encoding="utf-8")
+        self.offset = 0
+
+        info = (
+            "software: minet/%s\r\nformat: WARC File Format 1.0\r\n" % __version__
+        ).encode()
+
+        self.__append(
+            serialize_record(
+                [
+                    ("WARC-Type", "warcinfo"),
+                    ("WARC-Record-ID", get_record_id()),
+                    ("WARC-Date", datetime.utcnow().strftime(WARC_DATE_FORMAT)),
+                    ("WARC-Filename", self.filename),
+                    ("Content-Type", "application/warc-fields"),
+                ],
+                block_head=info,
+            )
+        )
+
+    def __append(self, data: bytes) -> int:
+        assert self.file is not None
+
+        offset = self.offset
+        self.file.write(data)
+        self.offset += len(data)
+
+        return offset
+
+    def write_response(
+        self, response: "Response", method: str = "GET"
+    ) -> WARCRecordLocation:
+        url = response.end_url
+        date = response.end_datetime.strftime(WARC_DATE_FORMAT)
+        timestamp = response.end_datetime.strftime(CDXJ_TIMESTAMP_FORMAT)
+
+        request_id = get_record_id()
+        response_id = get_record_id()
+
+        request_record = serialize_record(
+            [
+                ("WARC-Type", "request"),
+                ("WARC-Record-ID", request_id),
+                ("WARC-Date", date),
+                ("WARC-Target-URI", url),
+                ("WARC-Concurrent-To", response_id),
+                ("Content-Type", "application/http;msgtype=request"),
+            ],
+            block_head=serialize_http_request_head(url, method),
+        )
+
+        body = response.open_body()
+
+        response_record = serialize_record(
+            [
+                ("WARC-Type", "response"),
+                ("WARC-Record-ID", response_id),
+                ("WARC-Date", date),
+                ("WARC-Target-URI", url),
+                ("Content-Type", "application/http;msgtype=response"),
+            ],
+            block_head=serialize_http_response_head(response),
+            payload=body,
+        )
+
+        if response.is_spooled:
+            body.seek(0)
+
+        index_data = {
+            "url": url,
+            "mime": response.mimetype or "unk",
+            "status": str(response.status),
+            "length": str(len(response_record)),
+        }
+
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("writer is closed")
+
+            if self.file is None or self.offset >= self.max_size:
+                self.__rotate()
+
+            assert self.index_file is not None
+            assert self.filename is not None
+
+            self.__append(request_record)
+            offset = self.__append(response_record)
+
+            index_data["offset"] = str(offset)
+            index_data["filename"] = self.filename
+
+            self.index_file.write(
+                "%s %s %s\n"
+                % (get_surt(url), timestamp, json.dumps(index_data, ensure_ascii=False))
+            )
+
+            # NOTE: the record can also be found using the requested url,
+            # which is the one reported by minet, when it was redirected
+            if response.url != url:
+                index_data["url"] = response.url
+
+                self.index_file.write(
+                    "%s %s %s\n"
+                    % (
+                        get_surt(response.url),
+                        timestamp,
+                        json.dumps(index_data, ensure_ascii=False),
+                    )
+                )
+
+            # NOTE: flushing so that a crash cannot leave the index out of
+            # sync with the WARC file
+            self.file.flush()
+            self.index_file.flush()
+
+            return WARCRecordLocation(self.filename, offset, len(response_record))
+
+    def close(self) -> None:
+        with self.lock:
+            if self.closed:
+                return
+
+            self.closed = True
+            self.__close_current_file()
+
+    def __del__(self):
+        if hasattr(self, "lock"):
+            self.close()
+
+
+@dataclass
+class WARCRecord:
+    type: str
+    url: Optional[str]
+    headers: Dict[str, str]
+    http_status: Optional[int]
+    http_headers: Optional[HTTPHeaderDict]
+    body: bytes
+
+
+def read_gzip_member(f: BinaryIO) -> bytes:
+    decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    parts = []
+
+    while not decompressor.eof:
+        chunk = f.read(CHUNK_SIZE)
+
+        if not chunk:
+            raise WARCInvalidRecordError("truncated gzip member")
+
+        parts.append(decompressor.decompress(chunk))
+
+    return b"".join(parts)
+
+
+def parse_http_head(head: bytes) -> Tuple[int, HTTPHeaderDict]:
+    lines = head.decode("latin-1").split("\r\n")
+
+    try:
+        status = int(lines[0].split(" ", 2)[1])
+    except (IndexError, ValueError):
+        raise WARCInvalidRecordError("invalid http status line")
+
+    headers = HTTPHeaderDict()
+
+    for line in lines[1:]:
+        if not line:
+            continue
+
+        name, _, value = line.partition(":")
+        headers.add(name.strip(), value.strip())
+
+    return status, headers
+
+
+def parse_warc_record(f: BinaryIO) -> Optional[WARCRecord]:
+    version = f.readline()
+
+    if not version:
+        return None
+
+    if not version.startswith(b"WARC/"):
+        raise WARCInvalidRecordError("invalid WARC version line")
+
+    headers = {}
+
+    while True:
+        line = f.readline()
+
+        if not line:
+            raise WARCInvalidRecordError("truncated WARC headers")
+
+        line = line.rstrip(b"\r\n")
+
+        if not line:
+            break
+
+        name, _, value = line.decode("utf-8").partition(":")
+        headers[name.strip()] = value.strip()
+
+    try:
+        length = int(headers["Content-Length"])
+    except (KeyError, ValueError):
+        raise WARCInvalidRecordError("invalid Content-Length")
+
+    block = f.read(length)
+    f.read(4)
+
+    http_status = None
+    http_headers = None
+    body = block
+
+    if headers.get("Content-Type", "").startswith("application/http"):
+        head, _, body = block.partition(CRLF + CRLF)
+
+        if headers.get("WARC-Type") == "response":
+            http_status, http_headers = parse_http_head(head)
+
+    return WARCRecord(
+        type=headers.get("WARC-Type", ""),
+        url=headers.get("WARC-Target-URI"),
+        headers=headers,
+        http_status=http_status,
+        http_headers=http_headers,
+        body=body,
+    )
+
+
+def read_warc_record(path: str, offset: int = 0) -> WARCRecord:
+    """
+    Function reading a single WARC record from the given path, at the given
+    offset, without scanning the rest of the file.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+
+        if path.endswith(".gz"):
+            record = parse_warc_record(BytesIO(read_gzip_member(f)))
+        else:
+            record = parse_warc_record(f)
+
+    if record is None:
+        raise WARCInvalidRecordError("no record at offset %i" % offset)
+
+    return record
+
+
+def iter_warc_records(path: str) -> Iterator[WARCRecord]:
+    open_fn = gzip.open if path.endswith(".gz") else open
+
+    with open_fn(path, "rb") as f:
+        while True:
+            record = parse_warc_record(f)  # type: ignore
+
+            if record is None:
+                return
+
+            yield record
+
+
+def split_warc_path(path: str) -> Optional[Tuple[str, int]]:
+    """
+    Function splitting a "file.warc.gz#offset" path, as written in minet
+    reports, into its actual path & offset.
+    """
+    path, sep, offset = path.rpartition("#")
+
+    if not sep or not offset.isdigit():
+        return None
+
+    if not path.endswith(".warc.gz") and not path.endswith(".warc"):
+        return None
+
+    return path, int(offset)
+
+
+@dataclass
+class WARCIndexEntry:
+    url: str
+    timestamp: str
+    status: Optional[int]
+    mimetype: Optional[str]
+    filename: str
+    offset: int
+    length: int
+
+    @property
+    def path(self) -> str:
+        return "%s#%i" % (self.filename, self.offset)
+
+
+def parse_cdxj_line(line: str) -> WARCIndexEntry:
+    _, timestamp, data = line.split(" ", 2)
+    data = json.loads(data)
+
+    status = data.get("status")
+
+    return WARCIndexEntry(
+        url=data["url"],
+        timestamp=timestamp,
+        status=int(status) if status and status.isdigit() else None,
+        mimetype=data.get("mime"),
+        filename=data["filename"],
+        offset=int(data["offset"]),
+        length=int(data["length"]),
+    )
+
+
+def iter_cdxj(path: str) -> Iterator[WARCIndexEntry]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+
+            if not line:
+                continue
+
+            yield parse_cdxj_line(line)
+
+
+def bisect_cdxj(f: BinaryIO, key: bytes) -> int:
+    """
+    Function returning the offset of the first line of the given sorted CDXJ
+    file that is not lower than the given key, by performing a binary search
+    over the byte offsets of the file.
+    """
+
+    def first_line_from(position: int) -> Tuple[int, bytes]:
+        f.seek(max(0, position - 1))
+
+        # NOTE: skipping the end of the line we landed on
+        if position > 0:
+            f.readline()
+
+        start = f.tell()
+
+        return start, f.readline()
+
+    f.seek(0, os.SEEK_END)
+    lo = 0
+    hi = f.tell()
+
+    while lo < hi:
+        mid = (lo + hi) // 2
+        _, line = first_line_from(mid)
+
+        if not line or line >= key:
+            hi = mid
+        else:
+            lo = mid + 1
+
+    return first_line_from(lo)[0]
+
+
+class WARCIndex(object):
+    """
+    Index of the CDXJ files found in a directory, mapping urls to their
+    latest record.
+
+    Sorted CDXJ files are searched on disk, using a binary search. Only the
+    unsorted ones, left by writers that were interrupted or that are still
+    running, are loaded in memory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.paths = sorted(iglob(join(directory, "*" + CDXJ_EXTENSION)))
+        self.files: Dict[str, BinaryIO] = {}
+        self.unsorted_entries: Dict[str, WARCIndexEntry] = {}
+
+        for path in sorted(iglob(join(directory, "*" + CDXJ_UNSORTED_EXTENSION))):
+            for entry in iter_cdxj(path):
+                current = self.unsorted_entries.get(entry.url)
+
+                if current is None or entry.timestamp >= current.timestamp:
+                    self.unsorted_entries[entry.url] = entry
+
+    def __get_file(self, path: str) -> BinaryIO:
+        f = self.files.get(path)
+
+        if f is None:
+            f = open(path, "rb")
+            self.files[path] = f
+
+        return f
+
+    def __contains__(self, url: str) -> bool:
+        return self.get(url) is not None
+
+    def get(self, url: str) -> Optional[WARCIndexEntry]:
+        best = self.unsorted_entries.get(url)
+        key = (get_surt(url) + " ").encode("utf-8")
+
+        for path in self.paths:
+            f = self.__get_file(path)
+            f.seek(bisect_cdxj(f, key))
+
+            for line in f:
+                if not line.startswith(key):
+                    break
+
+                entry = parse_cdxj_line(line.decode("utf-8").strip())
+
+                # NOTE: different urls can have the same SURT
+                if entry.url != url:
+                    continue
+
+                if best is None or entry.timestamp >= best.timestamp:
+                    best = entry
+
+        return best
+
+    def read(self, url: str) -> WARCRecord:
+        entry = self.get(url)
+
+        if entry is None:
+            raise KeyError(url)
+
+        return read_warc_record(join(self.directory, entry.filename), entry.offset)
+
+    def close(self) -> None:
+        for f in self.files.values():
+            f.close()
+
+        self.files.clear()
+
+    def __del__(self):
+        if hasattr(self, "files"):
+            self.close()
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return any(
+            next(iglob(join(directory, "*" + extension)), None) is not None
+            for extension in (CDXJ_EXTENSION, CDXJ_UNSORTED_EXTENSION)
+        )
@@ -15,8 +15,13 @@ from typing import (
     Any,
     Dict,
     Container,
+    BinaryIO,
+    Iterator,
 )
 from minet.types import AnyTimeout, Redirection, RedirectionStack
+from minet.resolve_cache import ResolveCache, get_resolve_flags
+from minet.http_cache import HTTPCache, CacheStatus, merge_revalidated_headers
+from minet.dns_cache import DNSCache, reset_dns_timing, get_dns_timing
 
 import re
 import cgi
@@ -30,20 +35,26 @@ import json
 import mimetypes
 import functools
 import threading
+import socket
 from http.cookiejar import CookieJar
 from bs4 import SoupStrainer
 from datetime import datetime
 from timeit import default_timer as timer
 from io import BytesIO
+from tempfile import SpooledTemporaryFile
 from threading import Event
 from urllib.parse import urljoin, quote
 from urllib.request import Request
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.connection import create_connection
 from urllib3.util.ssl_ import create_urllib3_context
 from urllib3.util.request import ACCEPT_ENCODING
 from urllib3._collections import HTTPHeaderDict
 from ebbe import rcompose, noop, format_filesize, format_repr
 from tenacity import (
     Retrying,
+    AsyncRetrying,
     RetryCallState,
     retry_if_exception,
     stop_after_attempt,
@@ -53,12 +64,13 @@ from tenacity import (
 from tenacity.wait import wait_base
 
 from minet.scrape.regex import (
+    extract_links,
     extract_canonical_link,
     extract_javascript_relocation,
     extract_meta_refresh,
 )
 from minet.scrape.soup import suppress_xml_parsed_as_html_warnings, WonderfulSoup
-from minet.encodings import infer_encoding
+from minet.encodings import infer_encoding, detect_encoding
 from minet.loggers import sleepers_logger
 from minet.utils import is_binary_mimetype
 from minet.cookies import dict_to_cookie_string
@@ -74,10 +86,14 @@ from minet.exceptions import (
     SelfRedirectError,
     CancelledRequestError,
     FinalTimeoutError,
+    ResponseTooLargeError,
     PycurlNotInstalledError,
     PycurlError,
     PycurlProtocolError,
     PycurlTimeoutError,
+    HttpxError,
+    HttpxProtocolError,
+    HttpxTimeoutError,
     BrowserError,
     BrowserProtocolError,
     BrowserConnectionTimeoutError,
@@ -118,7 +134,9 @@ EXPECTED_WEB_ERRORS = (
     InvalidURLError,
     InvalidStatusError,
     FinalTimeoutError,
+    ResponseTooLargeError,
     PycurlError,
+    HttpxError,
     BrowserError,
 )
 
@@ -129,16 +147,210 @@ def looks_like_html(html_chunk: bytes) -> bool:
     return HTML_RE.match(html_chunk) is not None
 
 
+class ConnectionStats(object):
+    """
+    Threadsafe counters shared by the connection pools of an instrumented
+    pool manager, to be able to measure how well keep-alive connections
+    are reused.
+    """
+
+    __slots__ = ("__lock", "requests", "new_connections", "handshakes", "pools")
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.handshakes = 0
+        self.pools = 0
+
+    def record_request(self, new_connection: bool, secure: bool) -> None:
+        with self.__lock:
+            self.requests += 1
+
+            if new_connection:
+                self.new_connections += 1
+
+                if secure:
+                    self.handshakes += 1
+
+    def record_pool(self) -> None:
+        with self.__lock:
+            self.pools += 1
+
+    @property
+    def reused_connections(self) -> int:
+        return self.requests - self.new_connections
+
+    def __repr__(self) -> str:
+        return format_repr(
+            self,
+            ["requests", "reused_connections", "new_connections", "handshakes"],
+        )
+
+
+class DNSCachingConnectionMixin:
+    """
+    Mixin for urllib3 connections resolving their host through a DNSCache
+    instead of calling `getaddrinfo` each time a connection is opened.
+    """
+
+    dns_cache: Optional[DNSCache] = None
+
+    def _new_conn(self):
+        if self.dns_cache is None:
+            return super()._new_conn()  # type: ignore
+
+        host = self._dns_host  # type: ignore
+
+        try:
+            addresses = self.dns_cache.resolve(host)
+        except socket.gaierror as e:
+            raise urllib3_exceptions.NewConnectionError(
+                self, "Failed to establish a new connection: %s" % e
+            )
+
+        extra_kw = {}
+
+        if self.source_address:  # type: ignore
+            extra_kw["source_address"] = self.source_address  # type: ignore
+
+        if self.socket_options:  # type: ignore
+            extra_kw["socket_options"] = self.socket_options  # type: ignore
+
+        # NOTE: trying every address in turn, like urllib3 would
+        error = None
+
+        for address in addresses:
+            try:
+                return create_connection(
+                    (address, self.port),  # type: ignore
+                    self.timeout,  # type: ignore
+                    **extra_kw,
+                )
+            except socket.error as e:
+                error = e
+
+        if isinstance(error, socket.timeout):
+            raise urllib3_exceptions.ConnectTimeoutError(
+                self,
+                "Connection to %s timed out. (connect timeout=%s)"
+                % (self.host, self.timeout),  # type: ignore
+            )
+
+        raise urllib3_exceptions.NewConnectionError(
+            self, "Failed to establish a new connection: %s" % error
+        )
+
+
+class DNSCachingHTTPConnection(DNSCachingConnectionMixin, HTTPConnection):
+    pass
+
+
+class DNSCachingHTTPSConnection(DNSCachingConnectionMixin, HTTPSConnection):
+    pass
+
+
+class InstrumentedConnectionPoolMixin:
+    stats: Optional[ConnectionStats] = None
+    dns_cache: Optional[DNSCache] = None
+
+    def _new_conn(self):
+        conn = super()._new_conn()  # type: ignore
+        conn.dns_cache = self.dns_cache
+        return conn
+
+    def _make_request(self, conn, *args, **kwargs):
+        if self.stats is not None:
+            # NOTE: connections are lazily (re)connected by urllib3, so a
+            # connection without socket is about to be opened
+            self.stats.record_request(
+                new_connection=getattr(conn, "sock", None) is None,
+                secure=self.scheme == "https",  # type: ignore
+            )
+
+        return super()._make_request(conn, *args, **kwargs)  # type: ignore
+
+
+class InstrumentedHTTPConnectionPool(
+    InstrumentedConnectionPoolMixin, HTTPConnectionPool
+):
+    ConnectionCls = DNSCachingHTTPConnection
+
+
+class InstrumentedHTTPSConnectionPool(
+    InstrumentedConnectionPoolMixin, HTTPSConnectionPool
+):
+    ConnectionCls = DNSCachingHTTPSConnection
+
+
+class InstrumentedPoolManagerMixin:
+    """
+    Mixin for urllib3 pool managers keeping track of connection reuse
+    through a ConnectionStats instance.
+
+    Pools are kept in a LRU cache by urllib3 so that hot hosts stay pinned
+    while cold ones are evicted, in which case their connections are closed
+    right away instead of lingering until garbage collection.
+
+    If given a DNSCache, the connections of its pools will use it to resolve
+    their host.
+    """
+
+    stats: ConnectionStats
+    pools: Any
+    dns_cache: Optional[DNSCache]
+
+    def __init__(self, *args, dns_cache: Optional[DNSCache] = None, **kwargs):
+        super().__init__(*args, **kwargs)  # type: ignore
+        self.dns_cache = dns_cache
+        self.stats = ConnectionStats()
+        self.pool_classes_by_scheme = {
+            "http": InstrumentedHTTPConnectionPool,
+            "https": InstrumentedHTTPSConnectionPool,
+        }
+        self.pools.dispose_func = lambda pool: pool.close()
+
+    def _new_pool(self, *args, **kwargs):
+        pool = super()._new_pool(*args, **kwargs)  # type: ignore
+        pool.stats = self.stats
+        pool.dns_cache = self.dns_cache
+        self.stats.record_pool()
+        return pool
+
+    @property
+    def evictions(self) -> int:
+        return self.stats.pools - len(self.pools)
+
+
+class InstrumentedPoolManager(InstrumentedPoolManagerMixin, urllib3.PoolManager):
+    pass
+
+
+class InstrumentedProxyManager(InstrumentedPoolManagerMixin, urllib3.ProxyManager):
+    pass
+
+
+AnyInstrumentedPoolManager = Union[InstrumentedPoolManager, InstrumentedProxyManager]
+
+
 def create_pool_manager(
     proxy: Optional[str] = None,
     parallelism: int = 1,
     num_pools: int = 4,
     insecure: bool = False,
     spoof_tls_ciphers: bool = False,
+    instrumented: bool = False,
+    dns_cache: Optional[DNSCache] = None,
     **kwargs,
 ) -> urllib3.PoolManager:
     """
     Helper function returning a urllib3 pool manager with sane defaults.
+
+    If `instrumented` is True, the returned pool manager will keep track of
+    connection reuse statistics in its `stats` attribute.
+
+    If a `dns_cache` is given, the returned pool manager will be instrumented
+    and its connections will resolve hostnames through the cache.
     """
 
     manager_kwargs: Dict[str, Any] = {"timeout": DEFAULT_URLLIB3_TIMEOUT}
@@ -166,8 +378,17 @@ def create_pool_manager(
 
     if proxy is not None:
         proxy = ural.ensure_protocol(proxy)
+
+        if instrumented or dns_cache is not None:
+            return InstrumentedProxyManager(
+                proxy, dns_cache=dns_cache, **manager_kwargs
+            )
+
         return urllib3.ProxyManager(proxy, **manager_kwargs)
 
+    if instrumented or dns_cache is not None:
+        return InstrumentedPoolManager(dns_cache=dns_cache, **manager_kwargs)
+
     return urllib3.PoolManager(**manager_kwargs)
 
 
@@ -218,11 +439,12 @@ def pool_manager_aware_timeout_to_final_time(
 
 def stream_response_body(
     response: urllib3.HTTPResponse,
-    body: BytesIO,
+    body: BinaryIO,
     chunk_size: int = STREAMING_CHUNK_SIZE,
     cancel_event: Optional[Event] = None,
     final_time: Optional[float] = None,
     up_to: Optional[int] = None,
+    max_size: Optional[int] = None,
 ) -> bool:
     if cancel_event is not None and cancel_event.is_set():
         raise CancelledRequestError
@@ -238,6 +460,11 @@ def stream_response_body(
 
         body.write(data)
 
+        # NOTE: Content-Length cannot be trusted here since it may be missing
+        # or relate to the compressed body
+        if max_size is not None and body.tell() > max_size:
+            raise ResponseTooLargeError(max_size)
+
         if up_to is not None and body.tell() >= up_to:
             return False
 
@@ -264,6 +491,10 @@ class BufferedResponse(object):
     a "final" timeout correctly enforced to bypass python socket race condition
     issues on read loops and is also able to be cancelled if required.
 
+    If given a `spool_over` threshold, the body will be spilled to a
+    temporary file on disk as soon as it exceeds this many bytes, instead
+    of being fully buffered in memory.
+
     NOTE: this is the user's responsibility to close or unwrap the response
     after use. This will be done by __del__ in any case, but don't rely
     on it too much.
@@ -275,6 +506,8 @@ class BufferedResponse(object):
         "__body",
         "__cancel_event",
         "__final_time",
+        "__max_size",
+        "__spooled",
         "__finished",
         "__closed",
     )
@@ -285,17 +518,37 @@ class BufferedResponse(object):
         response: urllib3.HTTPResponse,
         cancel_event: Optional[Event],
         final_time: Optional[float] = None,
+        max_size: Optional[int] = None,
+        spool_over: Optional[int] = None,
     ):
         self.__method = method
         self.__inner = response
         self.__cancel_event = cancel_event
         self.__final_time = final_time
-        self.__body = BytesIO()
+        self.__max_size = max_size
+        self.__spooled = spool_over is not None
+        self.__body = (
+            BytesIO()
+            if spool_over is None
+            else SpooledTemporaryFile(max_size=spool_over, mode="w+b")
+        )
         self.__finished = False
         self.__closed = False
 
     def __len__(self) -> int:
-        return self.__body.getbuffer().nbytes
+        return self.__body.tell()
+
+    @property
+    def content_length(self) -> Optional[int]:
+        content_length = self.__inner.headers.get("content-length")
+
+        if content_length is None:
+            return None
+
+        try:
+            return int(content_length)
+        except ValueError:
+            return None
 
     def __stream(
         self, chunk_size: int = STREAMING_CHUNK_SIZE, up_to: Optional[int] = None
@@ -311,15 +564,20 @@ class BufferedResponse(object):
             chunk_size=chunk_size,
             cancel_event=self.__cancel_event,
             final_time=self.__final_time,
-            body=self.__body,
+            body=self.__body,  # type: ignore
             up_to=up_to,
+            max_size=self.__max_size,
         )
 
     def geturl(self) -> Optional[str]:
         return self.__inner.geturl()
 
     def getheader(self, name: str, default: Optional[str] = None) -> Optional[str]:
-        return self.__inner.getheader(name, default)
+        return self.__inner.headers.get(name, default)
+
+    @property
+    def headers(self) -> HTTPHeaderDict:
+        return self.__inner.headers
 
     @property
     def status(self) -> int:
@@ -327,7 +585,16 @@ class BufferedResponse(object):
 
     @property
     def body(self) -> bytes:
-        return self.__body.getvalue()
+        if not self.__spooled:
+            return self.__body.getvalue()  # type: ignore
+
+        position = self.__body.tell()
+        self.__body.seek(0)
+
+        try:
+            return self.__body.read()
+        finally:
+            self.__body.seek(position)
 
     def close(self) -> None:
         if self.__closed:
@@ -364,14 +631,20 @@ class BufferedResponse(object):
             # warnings.warn("BufferedResponse instance was not properly closed!")
             self.close()
 
-    def unwrap(self) -> Tuple[urllib3.HTTPResponse, bytes]:
+    def unwrap(self) -> Tuple[urllib3.HTTPResponse, Union[bytes, BinaryIO]]:
         self.close()
-        return self.__inner, self.__body.getvalue()
+
+        # NOTE: spooled bodies are handed over as is so they can be read
+        # lazily, without ever being loaded in memory as a whole
+        if self.__spooled:
+            return self.__inner, self.__body  # type: ignore
+
+        return self.__inner, self.__body.getvalue()  # type: ignore
 
     def read(self, chunk_size: int = STREAMING_CHUNK_SIZE) -> None:
         self.__stream(chunk_size=chunk_size)
 
-    def read_and_unwrap(self) -> Tuple[urllib3.HTTPResponse, bytes]:
+    def read_and_unwrap(self) -> Tuple[urllib3.HTTPResponse, Union[bytes, BinaryIO]]:
         self.read()
         return self.unwrap()
 
@@ -393,6 +666,8 @@ def atomic_request(
     body=None,
     cancel_event: Optional[Event] = None,
     final_time: Optional[float] = None,
+    max_body_size: Optional[int] = None,
+    spool_body_over: Optional[int] = None,
 ) -> BufferedResponse:
     """
     Generic request helpers using a urllib3 pool_manager to access some resource.
@@ -427,10 +702,138 @@ def atomic_request(
 
     response = pool_manager.request(method, url, **request_kwargs)
 
-    return BufferedResponse(
-        method, response, cancel_event=cancel_event, final_time=final_time
+    buffered_response = BufferedResponse(
+        method,
+        response,
+        cancel_event=cancel_event,
+        final_time=final_time,
+        max_size=max_body_size,
+        spool_over=spool_body_over,
     )
 
+    # NOTE: aborting early when the server is honest about the body size
+    if max_body_size is not None and method not in METHODS_WITHOUT_BODY:
+        content_length = buffered_response.content_length
+
+        if content_length is not None and content_length > max_body_size:
+            buffered_response.close()
+            raise ResponseTooLargeError(max_body_size)
+
+    return buffered_response
+
+
+def find_next_location(
+    redirection: Redirection,
+    status: int,
+    getheader: Callable[[str], Optional[str]],
+    prebuffer: Callable[[int], bytes],
+    follow_refresh_header: bool = True,
+    follow_meta_refresh: bool = False,
+    follow_js_relocation: bool = False,
+) -> Optional[str]:
+    """
+    Helper function finding the location a response redirects to, if any,
+    and recording how in the given redirection, whose type will be "hit" if
+    the response is actually the end of the line.
+
+    `prebuffer` must return at least the given amount of bytes of the
+    response's body, if available.
+    """
+
+    if status in REDIRECT_STATUSES:
+        redirection.type = "location-header"
+        return getheader("location")
+
+    location = None
+
+    if status < 400:
+        # Refresh header
+        if follow_refresh_header:
+            refresh = getheader("refresh")
+
+            if refresh is not None:
+                p = parse_http_refresh(refresh)
+
+                if p is not None:
+                    location = p[1]
+                    redirection.type = "refresh-header"
+
+        # Reading a small chunk of the html
+        body = b""
+
+        if location is None and (follow_meta_refresh or follow_js_relocation):
+            body = prebuffer(
+                CONTENT_PREBUFFER_UP_TO
+                if not follow_js_relocation
+                else LARGE_CONTENT_PREBUFFER_UP_TO
+            )
+
+        # Meta refresh
+        if location is None and follow_meta_refresh:
+            meta_refresh = extract_meta_refresh(body)
+
+            if meta_refresh is not None:
+                location = meta_refresh[1]
+                redirection.type = "meta-refresh"
+
+        # JavaScript relocation
+        if location is None and follow_js_relocation:
+            js_relocation = extract_javascript_relocation(body)
+
+            if js_relocation is not None:
+                location = js_relocation
+                redirection.type = "js-relocation"
+
+    # Found the end
+    if location is None:
+        redirection.type = "hit"
+
+    return location
+
+
+def find_canonical_url(url: str, prebuffer: Callable[[int], bytes]) -> Optional[str]:
+    canonical = extract_canonical_link(prebuffer(LARGE_CONTENT_PREBUFFER_UP_TO))
+
+    if canonical is None or canonical == url:
+        return None
+
+    try:
+        return urljoin(url, canonical)
+    except ValueError:
+        raise InvalidRedirectError("Canonical url is invalid")
+
+
+def resolve_next_url(url: str, location: Optional[str]) -> str:
+    # Invalid redirection
+    if not location:
+        raise InvalidRedirectError("Redirection is invalid")
+
+    # Location badly encoded?
+    # NOTE: we don't really have a way to consume headers as raw bytes
+    # which means we must rely on encoding duck-typing. I expect this
+    # to fail in a complicated manner in a distant future.
+    try:
+        if not location.isascii():
+            byte_location = location.encode("latin1")
+            encoding = infer_encoding(byte_location)
+
+            if (
+                encoding is not None
+                and encoding != "iso-8859-1"
+                and encoding != "latin1"
+                and encoding != "ascii"
+            ):
+                location = byte_location.decode(encoding)
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        raise BadlyEncodedLocationHeaderError("Location header has invalid encoding")
+
+    # Resolving next url
+    try:
+        return urljoin(url, location.strip())
+    except ValueError:
+        # NOTE: sometimes this will fail because the next location is invalid
+        raise InvalidRedirectError("Next location is an invalid url")
+
 
 def atomic_resolve(
     pool_manager: urllib3.PoolManager,
@@ -448,6 +851,8 @@ def atomic_resolve(
     body=None,
     canonicalize: bool = False,
     stateful: bool = False,
+    max_body_size: Optional[int] = None,
+    spool_body_over: Optional[int] = None,
 ) -> Tuple[RedirectionStack, BufferedResponse]:
     """
     Helper function attempting to resolve the given url.
@@ -511,113 +916,43 @@ def atomic_resolve(
                 timeout=timeout,
                 final_time=final_time,
                 cancel_event=cancel_event,
+                max_body_size=max_body_size,
+                spool_body_over=spool_body_over,
             )
 
             redirection.status = buffered_response.status
             url_stack[url] = redirection
 
             # Attempting to find next location
-            location = None
-
-            if buffered_response.status not in REDIRECT_STATUSES:
-                if buffered_response.status < 400:
-                    # Refresh header
-                    if follow_refresh_header:
-                        refresh = buffered_response.getheader("refresh")
-
-                        if refresh is not None:
-                            p = parse_http_refresh(refresh)
-
-                            if p is not None:
-                                location = p[1]
-                                redirection.type = "refresh-header"
-
-                    # Reading a small chunk of the html
-                    if location is None and (
-                        follow_meta_refresh or follow_js_relocation
-                    ):
-                        buffered_response.prebuffer_up_to(
-                            CONTENT_PREBUFFER_UP_TO
-                            if not follow_js_relocation
-                            else LARGE_CONTENT_PREBUFFER_UP_TO
-                        )
-
-                    # Meta refresh
-                    if location is None and follow_meta_refresh:
-                        meta_refresh = extract_meta_refresh(buffered_response.body)
-
-                        if meta_refresh is not None:
-                            location = meta_refresh[1]
-                            redirection.type = "meta-refresh"
-
-                    # JavaScript relocation
-                    if location is None and follow_js_relocation:
-                        js_relocation = extract_javascript_relocation(
-                            buffered_response.body
-                        )
-
-                        if js_relocation is not None:
-                            location = js_relocation
-                            redirection.type = "js-relocation"
-
-                # Found the end
-                if location is None:
-                    redirection.type = "hit"
+            def prebuffer(amount: int) -> bytes:
+                assert buffered_response is not None
+                buffered_response.prebuffer_up_to(amount)
+                return buffered_response.body
+
+            location = find_next_location(
+                redirection,
+                buffered_response.status,
+                buffered_response.getheader,
+                prebuffer,
+                follow_refresh_header=follow_refresh_header,
+                follow_meta_refresh=follow_meta_refresh,
+                follow_js_relocation=follow_js_relocation,
+            )
 
+            if redirection.type == "hit":
                 # Canonical url
-                if redirection.type == "hit":
-                    if canonicalize:
-                        buffered_response.prebuffer_up_to(LARGE_CONTENT_PREBUFFER_UP_TO)
-
-                        canonical = extract_canonical_link(buffered_response.body)
-
-                        if canonical is not None and canonical != url:
-                            try:
-                                canonical = urljoin(url, canonical)
-                            except ValueError:
-                                raise InvalidRedirectError("Canonical url is invalid")
+                if canonicalize:
+                    canonical = find_canonical_url(url, prebuffer)
 
-                            redirection = Redirection(canonical, "canonical")
-                            url_stack[canonical] = redirection
+                    if canonical is not None:
+                        redirection = Redirection(canonical, "canonical")
+                        url_stack[canonical] = redirection
 
-                    # Breaking free of the retry loop because we have a hit
-                    break
-
-            else:
-                redirection.type = "location-header"
-                location = buffered_response.getheader("location")
-
-            # Invalid redirection
-            if not location:
-                raise InvalidRedirectError("Redirection is invalid")
-
-            # Location badly encoded?
-            # NOTE: we don't really have a way to consume headers as raw bytes
-            # which means we must rely on encoding duck-typing. I expect this
-            # to fail in a complicated manner in a distant future.
-            try:
-                if not location.isascii():
-                    byte_location = location.encode("latin1")
-                    encoding = infer_encoding(byte_location)
-
-                    if (
-                        encoding is not None
-                        and encoding != "iso-8859-1"
-                        and encoding != "latin1"
-                        and encoding != "ascii"
-                    ):
-                        location = byte_location.decode(encoding)
-            except (UnicodeEncodeError, UnicodeDecodeError):
-                raise BadlyEncodedLocationHeaderError(
-                    "Location header has invalid encoding"
-                )
+                # Breaking free of the retry loop because we have a hit
+                break
 
             # Resolving next url
-            try:
-                next_url = urljoin(url, location.strip())
-            except ValueError:
-                # NOTE: sometimes this will fail because the next location is invalid
-                raise InvalidRedirectError("Next location is an invalid url")
+            next_url = resolve_next_url(url, location)
 
             # Self loop?
             if not stateful and next_url == url:
@@ -682,6 +1017,24 @@ def build_request_headers(
     return final_headers
 
 
+def prepare_request_body(
+    body: Optional[Union[str, bytes]] = None,
+    json_body: Optional[Any] = None,
+    urlencoded_body: Optional[Mapping[str, Union[str, int, float]]] = None,
+) -> Optional[bytes]:
+    if json_body is not None:
+        body = json.dumps(json_body, ensure_ascii=False).encode("utf-8")
+    elif urlencoded_body is not None:
+        body = "&".join(
+            "%s=%s" % (quote(str(k)), quote(str(v))) for k, v in urlencoded_body.items()
+        )
+
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+
+    return body
+
+
 class Response(object):
     """
     Class representing a finalized HTTP response.
@@ -694,6 +1047,10 @@ class Response(object):
 
     Note that it will lazily compute required items when asked for certain
     properties.
+
+    Its body can also be given as a binary file, e.g. a body spooled to disk
+    by `request`, in which case it will only be read when actually needed.
+    Use `open_body` to stream it without loading it in memory.
     """
 
     __slots__ = (
@@ -701,6 +1058,8 @@ class Response(object):
         "__status",
         "__stack",
         "__body",
+        "__body_file",
+        "__body_size",
         "__text",
         "__url",
         "__datetime_utc",
@@ -711,12 +1070,16 @@ class Response(object):
         "__has_guessed_extension",
         "__has_guessed_encoding",
         "__has_decoded_text",
+        "__cache_status",
+        "__dns_time",
     )
 
     __headers: HTTPHeaderDict
     __status: int
     __stack: Optional[RedirectionStack]
-    __body: bytes
+    __body: Optional[bytes]
+    __body_file: Optional[BinaryIO]
+    __body_size: int
     __text: Optional[str]
     __url: str
     __datetime_utc: datetime
@@ -728,6 +1091,8 @@ class Response(object):
     __has_guessed_extension: bool
     __has_guessed_encoding: bool
     __has_decoded_text: bool
+    __cache_status: Optional[CacheStatus]
+    __dns_time: Optional[float]
 
     def __init__(
         self,
@@ -735,14 +1100,25 @@ class Response(object):
         stack: Optional[RedirectionStack],
         headers: HTTPHeaderDict,
         status: int,
-        body: bytes,
+        body: Union[bytes, BinaryIO],
         known_encoding: Optional[str] = "utf-8",
+        cache_status: Optional[CacheStatus] = None,
+        dns_time: Optional[float] = None,
     ):
         self.__url = url
         self.__stack = stack
         self.__headers = headers
         self.__status = status
-        self.__body = body
+
+        if isinstance(body, bytes):
+            self.__body = body
+            self.__body_file = None
+            self.__body_size = len(body)
+        else:
+            self.__body = None
+            self.__body_file = body
+            self.__body_size = body.seek(0, 2)
+
         self.__text = None
         self.__datetime_utc = datetime.utcnow()
         self.__is_text = True
@@ -753,6 +1129,8 @@ class Response(object):
         self.__has_guessed_extension = False
         self.__has_guessed_encoding = known_encoding is not None
         self.__has_decoded_text = False
+        self.__cache_status = cache_status
+        self.__dns_time = dns_time
 
     def __guess_extension(self) -> None:
         if self.__has_guessed_extension:
@@ -777,7 +1155,7 @@ class Response(object):
                 if "," in mimetype:
                     mimetype = mimetype.split(",", 1)[0]
 
-        if mimetype is None and looks_like_html(self.__body):
+        if mimetype is None and looks_like_html(self.__head()):
             mimetype = "text/html"
 
         if mimetype is not None:
@@ -805,7 +1183,11 @@ class Response(object):
         if not self.__is_text:
             return
 
-        self.__encoding = infer_encoding(self.__body)
+        # NOTE: spooled bodies are probably large, so we only sniff their head
+        self.__encoding = detect_encoding(
+            self.__head() if self.__body is None else self.__body,
+            declared_encoding=self.encoding_from_headers,
+        )
 
         self.__has_guessed_encoding = True
 
@@ -819,7 +1201,7 @@ class Response(object):
         if not self.__is_text:
             raise TypeError("response is binary and cannot be decoded")
 
-        self.__text = self.__body.decode(self.__encoding or "utf-8", errors=errors)
+        self.__text = self.body.decode(self.__encoding or "utf-8", errors=errors)
         self.__has_decoded_text = True
 
     @property
@@ -859,6 +1241,14 @@ class Response(object):
     def end_datetime(self) -> datetime:
         return self.__datetime_utc
 
+    @property
+    def cache_status(self) -> Optional[CacheStatus]:
+        return self.__cache_status
+
+    @property
+    def dns_time(self) -> Optional[float]:
+        return self.__dns_time
+
     @property
     def ext(self) -> Optional[str]:
         self.__guess_extension()
@@ -885,7 +1275,7 @@ class Response(object):
 
     @property
     def is_html(self) -> bool:
-        return self.is_text and looks_like_html(self.__body)
+        return self.is_text and looks_like_html(self.__head())
 
     @property
     def encoding(self) -> Optional[str]:
@@ -907,16 +1297,46 @@ class Response(object):
 
     # TODO: add encoding_from_xml & possible_encodings when required
 
+    def __head(self) -> bytes:
+        if self.__body is not None:
+            return self.__body
+
+        assert self.__body_file is not None
+
+        self.__body_file.seek(0)
+        return self.__body_file.read(LARGE_CONTENT_PREBUFFER_UP_TO)
+
     @property
     def body(self) -> bytes:
+        if self.__body is None:
+            assert self.__body_file is not None
+
+            self.__body_file.seek(0)
+            self.__body = self.__body_file.read()
+
+            # NOTE: the body now lives in memory, so we can drop the file
+            self.__body_file.close()
+            self.__body_file = None
+
         return self.__body
 
+    @property
+    def is_spooled(self) -> bool:
+        return self.__body_file is not None
+
+    def open_body(self) -> BinaryIO:
+        if self.__body_file is None:
+            return BytesIO(self.body)
+
+        self.__body_file.seek(0)
+        return self.__body_file
+
     def __len__(self) -> int:
-        return len(self.__body)
+        return self.__body_size
 
     @property
     def human_size(self) -> str:
-        return format_filesize(len(self.__body))
+        return format_filesize(self.__body_size)
 
     def text(self) -> str:
         self.__decode()
@@ -934,21 +1354,24 @@ class Response(object):
         with suppress_xml_parsed_as_html_warnings(bypass=not ignore_xhtml_warning):
             return WonderfulSoup(self.text(), engine, parse_only=strainer)
 
-    def links(self, unique: bool = True, strip_fragment: bool = False) -> List[str]:
+    def iter_links(
+        self, unique: bool = True, strip_fragment: bool = False
+    ) -> Iterator[str]:
         if not self.is_html:
             raise TypeError("cannot extract links from non-html responses")
 
-        return list(
-            ural.links_from_html(
-                self.end_url,
-                self.body,
-                encoding=self.likely_encoding,
-                canonicalize=True,
-                unique=unique,
-                strip_fragment=strip_fragment,
-            )
+        return extract_links(
+            self.end_url,
+            self.body,
+            encoding=self.likely_encoding,
+            canonicalize=True,
+            unique=unique,
+            strip_fragment=strip_fragment,
         )
 
+    def links(self, unique: bool = True, strip_fragment: bool = False) -> List[str]:
+        return list(self.iter_links(unique=unique, strip_fragment=strip_fragment))
+
     def __repr__(self) -> str:
         attr: List[Union[str, Tuple[str, Union[str, bool]]]] = ["status", "url"]
 
@@ -987,6 +1410,9 @@ def request(
     stateful: bool = False,
     use_pycurl: bool = False,
     compressed: bool = False,
+    max_body_size: Optional[int] = None,
+    spool_body_over: Optional[int] = None,
+    cache: Optional[HTTPCache] = None,
 ) -> Response:
     # Pycurl and pool manager
     if use_pycurl:
@@ -995,6 +1421,9 @@ def request(
 
         if pool_manager is not None:
             raise TypeError("use_pycurl is not compatible with pool_manager")
+
+        if cache is not None:
+            raise TypeError("use_pycurl is not compatible with cache")
     elif pool_manager is None:
         pool_manager = DEFAULT_POOL_MANAGER
 
@@ -1008,18 +1437,36 @@ def request(
     )
 
     # Dealing with body
-    if json_body is not None:
-        body = json.dumps(json_body, ensure_ascii=False).encode("utf-8")
-    elif urlencoded_body is not None:
-        body = "&".join(
-            "%s=%s" % (quote(str(k)), quote(str(v))) for k, v in urlencoded_body.items()
-        )
-
-    if isinstance(body, str):
-        body = body.encode("utf-8")
+    body = prepare_request_body(body, json_body, urlencoded_body)
 
     stack: Optional[RedirectionStack] = None
 
+    # HTTP cache
+    # NOTE: only bodyless GET requests are cached
+    cache_entry = None
+
+    if cache is not None and (method != "GET" or body is not None):
+        cache = None
+
+    if cache is not None:
+        cache_entry = cache.get(url)
+
+        if cache_entry is not None:
+            if cache_entry.is_fresh:
+                cache.record("hit")
+
+                return Response(
+                    url,
+                    stack=cache_entry.stack,
+                    headers=cache_entry.headers,
+                    status=cache_entry.status,
+                    body=cache_entry.body,
+                    known_encoding=known_encoding,
+                    cache_status="hit",
+                )
+
+            final_headers.update(cache_entry.conditional_headers())
+
     if use_pycurl:
         if body is not None:
             raise NotImplementedError
@@ -1038,6 +1485,10 @@ def request(
         if raise_on_statuses is not None and pycurl_result.status in raise_on_statuses:
             raise InvalidStatusError(pycurl_result.status)
 
+        # NOTE: pycurl buffers the whole body, so we can only check afterwards
+        if max_body_size is not None and len(pycurl_result.body) > max_body_size:
+            raise ResponseTooLargeError(max_body_size)
+
         return Response(
             url,
             stack=pycurl_result.stack,
@@ -1049,6 +1500,12 @@ def request(
 
     assert pool_manager is not None
 
+    # NOTE: time spent in the DNS cache is attributed to this request
+    dns_cache = getattr(pool_manager, "dns_cache", None)
+
+    if dns_cache is not None:
+        reset_dns_timing()
+
     if not follow_redirects:
         buffered_response = atomic_request(
             pool_manager,
@@ -1058,6 +1515,8 @@ def request(
             body=body,
             timeout=timeout,
             cancel_event=cancel_event,
+            max_body_size=max_body_size,
+            spool_body_over=spool_body_over,
         )
     else:
         stack, buffered_response = atomic_resolve(
@@ -1075,6 +1534,36 @@ def request(
             timeout=timeout,
             cancel_event=cancel_event,
             stateful=stateful,
+            max_body_size=max_body_size,
+            spool_body_over=spool_body_over,
+        )
+
+    dns_time = get_dns_timing() if dns_cache is not None else None
+
+    # Response was not modified, we can serve it from the cache
+    if cache_entry is not None and buffered_response.status == 304:
+        assert cache is not None
+
+        headers = merge_revalidated_headers(
+            cache_entry.headers, buffered_response.headers
+        )
+        buffered_response.close()
+
+        if stack:
+            stack[-1].status = cache_entry.status
+
+        cache.touch(url, headers)
+        cache.record("revalidated")
+
+        return Response(
+            url,
+            stack=stack,
+            headers=headers,
+            status=cache_entry.status,
+            body=cache_entry.body,
+            known_encoding=known_encoding,
+            cache_status="revalidated",
+            dns_time=dns_time,
         )
 
     if raise_on_statuses is not None and buffered_response.status in raise_on_statuses:
@@ -1083,6 +1572,16 @@ def request(
 
     response, body = buffered_response.read_and_unwrap()
 
+    cache_status = None
+
+    if cache is not None:
+        cache_status = "miss"
+        cache.record("miss")
+
+        # NOTE: spooled bodies are too large to be cached
+        if isinstance(body, bytes):
+            cache.set(url, response.status, response.headers, body, stack=stack)
+
     return Response(
         url,
         stack=stack,
@@ -1090,6 +1589,8 @@ def request(
         status=response.status,
         body=body,
         known_encoding=known_encoding,
+        cache_status=cache_status,
+        dns_time=dns_time,
     )
 
 
@@ -1109,6 +1610,7 @@ def resolve(
     canonicalize: bool = False,
     cancel_event: Optional[Event] = None,
     raise_on_statuses: Optional[Container[int]] = None,
+    cache: Optional[ResolveCache] = None,
     stateful: bool = False,
 ) -> RedirectionStack:
     if method is None:
@@ -1121,23 +1623,41 @@ def resolve(
         headers=headers, cookie=cookie, spoof_ua=spoof_ua
     )
 
-    stack, buffered_response = atomic_resolve(
-        pool_manager,
-        url,
-        method,
-        headers=final_headers,
-        max_redirects=max_redirects,
-        follow_refresh_header=follow_refresh_header,
-        follow_meta_refresh=follow_meta_refresh,
-        follow_js_relocation=follow_js_relocation,
-        infer_redirection=infer_redirection,
-        timeout=timeout,
-        canonicalize=canonicalize,
-        cancel_event=cancel_event,
-        stateful=stateful,
-    )
+    # NOTE: the cache is consulted before hitting the network
+    cache_flags = 0
+    stack = None
+
+    if cache is not None:
+        cache_flags = get_resolve_flags(
+            follow_refresh_header=follow_refresh_header,
+            follow_meta_refresh=follow_meta_refresh,
+            follow_js_relocation=follow_js_relocation,
+            infer_redirection=infer_redirection,
+            canonicalize=canonicalize,
+        )
+        stack = cache.get(url, cache_flags)
+
+    if stack is None:
+        stack, buffered_response = atomic_resolve(
+            pool_manager,
+            url,
+            method,
+            headers=final_headers,
+            max_redirects=max_redirects,
+            follow_refresh_header=follow_refresh_header,
+            follow_meta_refresh=follow_meta_refresh,
+            follow_js_relocation=follow_js_relocation,
+            infer_redirection=infer_redirection,
+            timeout=timeout,
+            canonicalize=canonicalize,
+            cancel_event=cancel_event,
+            stateful=stateful,
+        )
 
-    buffered_response.close()
+        buffered_response.close()
+
+        if cache is not None:
+            cache.set(url, stack, cache_flags)
 
     if raise_on_statuses is not None and stack:
         last = stack[-1]
@@ -1239,6 +1759,7 @@ def create_request_retryer(
     predicate: Optional[Callable[[BaseException], bool]] = None,
     epilog: Optional[Callable[[RetryCallState], Optional[str]]] = None,
     cancel_event: Optional[Event] = None,
+    asynchronous: bool = False,
 ) -> Retrying:
     # By default we only retry network issues, such as Internet being cut off etc.
     retryable_exception_types = [
@@ -1252,6 +1773,8 @@ def create_request_retryer(
         ConnectionResetError,
         # pycurl errors
         PycurlProtocolError,
+        # httpx errors
+        HttpxProtocolError,
         # browser errors
         BrowserProtocolError,
     ]
@@ -1263,6 +1786,7 @@ def create_request_retryer(
                 FinalTimeoutError,
                 urllib3_exceptions.TimeoutError,
                 PycurlTimeoutError,
+                HttpxTimeoutError,
                 BrowserTimeoutError,
                 BrowserConnectionTimeoutError,
             ]
@@ -1319,12 +1843,18 @@ def create_request_retryer(
         if cancel_event.is_set():
             raise TypeError("cannot retry using an already set cancel_event")
 
-        retrying_kwargs["sleep"] = sleep_using_event(cancel_event)
         retrying_kwargs["stop"] |= stop_when_event_set(cancel_event)
         retrying_kwargs["retry"] &= retry_if_exception(
             lambda _: not cancel_event.is_set()
         )
 
+        # NOTE: asynchronous retryers must not block the event loop
+        if not asynchronous:
+            retrying_kwargs["sleep"] = sleep_using_event(cancel_event)
+
+    if asynchronous:
+        return AsyncRetrying(**retrying_kwargs)  # type: ignore
+
     return Retrying(**retrying_kwargs)
 
 
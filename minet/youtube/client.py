@@ -4,35 +4,54 @@
 #
 # A handy API client used by the CLI actions.
 #
-from typing import Deque, Tuple, Iterator, Iterable, Any, Optional, Callable
+from typing import (
+    Deque,
+    Tuple,
+    Iterator,
+    Iterable,
+    Any,
+    Optional,
+    Callable,
+    List,
+    Dict,
+)
 
-import time
-from ebbe import as_chunks
 from collections import deque
+from itertools import count
+from heapq import heappush, heappop
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor as FuturesThreadPoolExecutor,
+    wait,
+    FIRST_COMPLETED,
+)
 from ural import urls_from_text, add_query_argument, is_url
 from ebbe import getpath
 
 from minet.web import (
     create_pool_manager,
-    create_request_retryer,
     request,
-    retrying_method,
+    threadsafe_retrying_method,
+    ThreadsafeRequestRetryers,
 )
-from minet.loggers import sleepers_logger
+from minet.multiprocessing import imap_chunks_in_threads
 from minet.youtube.utils import (
     ensure_video_id,
     ensure_channel_id,
     get_channel_main_playlist_id,
-    seconds_to_midnight_pacific_time,
 )
 from minet.youtube.urls import YouTubeAPIURLFormatter
+from minet.youtube.quota import YouTubeAPIKeyScheduler, get_quota_cost
 from minet.youtube.constants import (
     YOUTUBE_API_MAX_VIDEOS_PER_CALL,
     YOUTUBE_API_MAX_CHANNELS_PER_CALL,
     YOUTUBE_API_DEFAULT_SEARCH_ORDER,
     YOUTUBE_API_SEARCH_ORDERS,
+    YOUTUBE_API_DEFAULT_DAILY_QUOTA,
+    YOUTUBE_API_DEFAULT_PER_KEY_PARALLELISM,
 )
 from minet.youtube.exceptions import (
+    YouTubeError,
     YouTubeDisabledCommentsError,
     YouTubeNotFoundError,
     YouTubeInvalidAPIKeyError,
@@ -43,7 +62,6 @@ from minet.youtube.exceptions import (
     YouTubeExclusiveMemberError,
     YouTubeUnknown403Error,
     YouTubeAccessNotConfiguredError,
-    YouTubeAPILimitReached,
 )
 from minet.youtube.types import (
     YouTubeVideo,
@@ -51,9 +69,21 @@ from minet.youtube.types import (
     YouTubeComment,
     YouTubePlaylistVideoSnippet,
     YouTubeChannel,
+    YouTubeCommentsBatch,
 )
 from minet.youtube.scraper import YouTubeScraper
 
+# NOTE: (is_reply, thread or comment id, url)
+YouTubeCommentsJob = Tuple[bool, str, str]
+
+# NOTE: errors only impacting the comments of a single video
+YOUTUBE_VIDEO_COMMENTS_ERRORS = (
+    YouTubeDisabledCommentsError,
+    YouTubeNotFoundError,
+    YouTubeExclusiveMemberError,
+    YouTubeUnknown403Error,
+)
+
 
 def get_channel_id(scraper: YouTubeScraper, channel_target: str) -> str:
     channel_id = ensure_channel_id(channel_target)
@@ -72,29 +102,73 @@ def get_channel_id(scraper: YouTubeScraper, channel_target: str) -> str:
     return channel_id
 
 
+class YouTubeVideoCommentsState:
+    __slots__ = ("item", "video_id", "pending", "error")
+
+    def __init__(self, item: Any, video_id: str):
+        self.item = item
+        self.video_id = video_id
+        self.pending = 0
+        self.error: Optional[YouTubeError] = None
+
+
 class YouTubeAPIClient(object):
-    def __init__(self, key, sleep: bool = True):
+    """
+    Client of the YouTube Data API. Calls are dispatched across the given keys
+    by a quota-aware scheduler and its methods can be called from multiple
+    threads. The `threads` argument is the maximum number of chunks of videos
+    or channels the `videos` & `channels` methods will fetch concurrently.
+    """
+
+    def __init__(
+        self,
+        key,
+        sleep: bool = True,
+        threads: int = 1,
+        per_key_parallelism: int = YOUTUBE_API_DEFAULT_PER_KEY_PARALLELISM,
+        daily_quota: int = YOUTUBE_API_DEFAULT_DAILY_QUOTA,
+        quota_path: Optional[str] = None,
+    ):
         if not isinstance(key, list):
             key = [key]
 
-        self.keys = {k: True for k in key}
-        self.current_key = key[0]
-        self.pool_manager = create_pool_manager()
+        if threads < 1:
+            raise TypeError("threads should be at least 1")
+
+        self.scheduler = YouTubeAPIKeyScheduler(
+            key,
+            per_key_parallelism=per_key_parallelism,
+            daily_quota=daily_quota,
+            quota_path=quota_path,
+            sleep=sleep,
+        )
+        self.threads = threads
+        self.pool_manager = create_pool_manager(
+            parallelism=max(threads, len(self.scheduler) * per_key_parallelism)
+        )
         self.scraper = YouTubeScraper()
         self.sleep = sleep
 
         # YouTube's API is known to crash sometimes...
-        self.retryer = create_request_retryer(
+        self.retryers = ThreadsafeRequestRetryers(
             retry_on_statuses=(503,),
             additional_exceptions=[YouTubePotentiallyTransientInvalidAPICallError],
         )
         self.url_formatter = YouTubeAPIURLFormatter()
 
-    @retrying_method()
+    @threadsafe_retrying_method()
     def request_json(self, url):
+        cost = get_quota_cost(url)
+
         while True:
-            final_url = add_query_argument(url, "key", self.current_key)
-            response = request(final_url, pool_manager=self.pool_manager)
+            key = self.scheduler.acquire(cost)
+
+            try:
+                final_url = add_query_argument(url, "key", key)
+                response = request(final_url, pool_manager=self.pool_manager)
+            finally:
+                self.scheduler.release(key)
+
             data = response.json()
 
             if response.status == 403:
@@ -113,26 +187,9 @@ class YouTubeAPIClient(object):
                         raise YouTubeExclusiveMemberError(url)
 
                     elif reason == "quotaExceeded":
-                        # Current key is exhausted, disabling it and switching to another if there is one
-                        if not self.rotate_key():
-                            if not self.sleep:
-                                raise YouTubeAPILimitReached
-
-                            # If all keys are exhausted, start waiting until tomorrow and reset keys
-                            sleep_time = seconds_to_midnight_pacific_time() + 10
-
-                            sleepers_logger.warn(
-                                "YouTube API limits reached for every key. Will now wait until midnight Pacific time!",
-                                extra={
-                                    "source": "YouTubeAPIClient",
-                                    "sleep_time": 1,
-                                },
-                            )
-
-                            time.sleep(sleep_time)
-
-                            self.reset_keys()
-
+                        # Current key is exhausted, the scheduler will switch
+                        # to another one or wait until tomorrow if none is left
+                        self.scheduler.exhaust(key)
                         continue
 
                 raise YouTubeUnknown403Error
@@ -158,35 +215,13 @@ class YouTubeAPIClient(object):
 
             return data
 
-    def rotate_key(self):
-        self.keys[self.current_key] = False
-
-        available_key = next(
-            (key for key, available in self.keys.items() if available), None
-        )
-
-        if available_key:
-            self.current_key = available_key
-            return True
-
-        self.current_key = None
-        return False
-
-    def reset_keys(self):
-        for key in self.keys:
-            if self.current_key is None:
-                self.current_key = key
-
-            self.keys[key] = True
-
     def channels(
         self,
         channels_target: Iterable[Any],
         key: Optional[Callable[[Any], str]] = None,
         raw: bool = False,
     ) -> Iterator[Tuple[Any, Optional[YouTubeChannel]]]:
-        # TODO: we could chunk per not None
-        for group in as_chunks(YOUTUBE_API_MAX_CHANNELS_PER_CALL, channels_target):
+        def work(group):
             group_data = []
 
             for item in group:
@@ -217,8 +252,16 @@ class YouTubeAPIClient(object):
 
                 indexed_result[channel_id] = item
 
-            for channel_id, item in group_data:
-                yield item, indexed_result.get(channel_id)
+            return [
+                (item, indexed_result.get(channel_id))
+                for channel_id, item in group_data
+            ]
+
+        # TODO: we could chunk per not None
+        for _, results in imap_chunks_in_threads(
+            self.threads, work, channels_target, YOUTUBE_API_MAX_CHANNELS_PER_CALL
+        ):
+            yield from results
 
     def channel(
         self, channel_target: str, raw: bool = False
@@ -236,8 +279,7 @@ class YouTubeAPIClient(object):
         key: Optional[Callable[[Any], str]] = None,
         raw: bool = False,
     ) -> Iterator[Tuple[Any, Optional[YouTubeVideo]]]:
-        # TODO: we could chunk per not None
-        for group in as_chunks(YOUTUBE_API_MAX_VIDEOS_PER_CALL, videos):
+        def work(group):
             group_data = []
 
             for item in group:
@@ -261,8 +303,15 @@ class YouTubeAPIClient(object):
 
                 indexed_result[video_id] = item
 
-            for video_id, item in group_data:
-                yield item, indexed_result.get(video_id)
+            return [
+                (item, indexed_result.get(video_id)) for video_id, item in group_data
+            ]
+
+        # TODO: we could chunk per not None
+        for _, results in imap_chunks_in_threads(
+            self.threads, work, videos, YOUTUBE_API_MAX_VIDEOS_PER_CALL
+        ):
+            yield from results
 
     def video(self, video_target: str, raw: bool = False) -> Optional[YouTubeVideo]:
         result = next(self.videos([video_target], raw=raw), None)
@@ -302,6 +351,67 @@ class YouTubeAPIClient(object):
 
         return generator()
 
+    def parse_comments_page(
+        self,
+        job: YouTubeCommentsJob,
+        video_id: str,
+        result,
+        raw: bool = False,
+        full_replies: bool = True,
+    ) -> Tuple[List[Any], List[YouTubeCommentsJob]]:
+        """
+        Method returning the comments found in the given page of comment
+        threads or replies, along with the jobs needed to fetch the next page
+        and the replies that were not all embedded in their thread.
+        """
+        is_reply, item_id, _ = job
+
+        comments = []
+        jobs = []
+
+        for item in result["items"]:
+            comment_id = item["id"]
+            replies = getpath(item, ["replies", "comments"], [])
+            total_reply_count = getpath(item, ["snippet", "totalReplyCount"], 0)
+
+            if not raw:
+                item = (
+                    YouTubeComment.from_parent_comment_payload(item)
+                    if not is_reply
+                    else YouTubeComment.from_reply_payload(item, video_id=video_id)
+                )
+
+            comments.append(item)
+
+            if is_reply:
+                continue
+
+            # Getting replies
+            if not full_replies or len(replies) >= total_reply_count:
+                for reply in replies:
+                    if not raw:
+                        reply = YouTubeComment.from_reply_payload(reply)
+
+                    comments.append(reply)
+            elif total_reply_count > 0:
+                replies_url = self.url_formatter.replies(comment_id)
+
+                jobs.append((True, comment_id, replies_url))
+
+        # Next page
+        token = result.get("nextPageToken")
+
+        if token is not None and len(result["items"]) != 0:
+            forge = (
+                self.url_formatter.replies if is_reply else self.url_formatter.comments
+            )
+
+            next_url = forge(item_id, token=token)
+
+            jobs.append((is_reply, item_id, next_url))
+
+        return comments, jobs
+
     def comments(
         self, video_target: str, raw: bool = False, full_replies: bool = True
     ) -> Iterator[YouTubeComment]:
@@ -313,61 +423,154 @@ class YouTubeAPIClient(object):
         def generator():
             starting_url = self.url_formatter.comments(video_id)
 
-            queue: Deque[Tuple[bool, str, str]] = deque(
-                [(False, video_id, starting_url)]
-            )
+            queue: Deque[YouTubeCommentsJob] = deque([(False, video_id, starting_url)])
 
             while len(queue) != 0:
-                is_reply, item_id, url = queue.popleft()
+                job = queue.popleft()
 
-                result = self.request_json(url)
+                result = self.request_json(job[2])
 
-                for item in result["items"]:
-                    comment_id = item["id"]
-                    replies = getpath(item, ["replies", "comments"], [])
-                    total_reply_count = getpath(item, ["snippet", "totalReplyCount"], 0)
+                comments, jobs = self.parse_comments_page(
+                    job, video_id, result, raw=raw, full_replies=full_replies
+                )
 
-                    if not raw:
-                        item = (
-                            YouTubeComment.from_parent_comment_payload(item)
-                            if not is_reply
-                            else YouTubeComment.from_reply_payload(
-                                item, video_id=video_id
-                            )
+                yield from comments
+                queue.extend(jobs)
+
+        return generator()
+
+    def comments_from_videos(
+        self,
+        videos: Iterable[Any],
+        key: Optional[Callable[[Any], str]] = None,
+        raw: bool = False,
+        full_replies: bool = True,
+    ) -> Iterator[YouTubeCommentsBatch]:
+        """
+        Method collecting the comments of many videos at once, by keeping a
+        global frontier of the comment thread & reply pages to fetch, that
+        are dispatched on the client's threads (and therefore across its keys
+        by the scheduler).
+
+        Comments are yielded as soon as their page arrives, in batches
+        tagged with the original item, and a last batch flagged as `done` is
+        yielded for each video once all of its pages, including reply pages,
+        have been fetched, or as soon as the video fails with an error
+        related to it (disabled comments, not found etc.).
+
+        Pages belonging to videos given earlier are fetched first, and only
+        a bounded number of videos are worked on at once, so that the
+        memory footprint remains constant and videos are completed roughly
+        in order.
+        """
+        videos_iterator = iter(videos)
+        max_active_videos = self.threads * 2
+
+        states: Dict[int, YouTubeVideoCommentsState] = {}
+        frontier: List[Tuple[int, int, YouTubeCommentsJob]] = []
+        futures: Dict[Future, Tuple[int, YouTubeCommentsJob]] = {}
+        indices = count()
+        tie_breaker = count()
+        exhausted = False
+
+        def push(index: int, job: YouTubeCommentsJob) -> None:
+            states[index].pending += 1
+            heappush(frontier, (index, next(tie_breaker), job))
+
+        def forget_job(index: int) -> YouTubeVideoCommentsState:
+            state = states[index]
+            state.pending -= 1
+
+            if state.pending == 0:
+                del states[index]
+
+            return state
+
+        # NOTE: quenouille's executor cannot be fed with jobs discovered along
+        # the way, hence the use of concurrent.futures here
+        with FuturesThreadPoolExecutor(self.threads) as executor:
+            while True:
+                # Feeding the frontier with new videos
+                while not exhausted and len(states) < max_active_videos:
+                    try:
+                        item = next(videos_iterator)
+                    except StopIteration:
+                        exhausted = True
+                        break
+
+                    target = key(item) if key is not None else item
+                    video_id = ensure_video_id(target)
+
+                    if video_id is None:
+                        yield YouTubeCommentsBatch(
+                            item,
+                            None,
+                            done=True,
+                            error=YouTubeInvalidVideoTargetError(),
                         )
+                        continue
 
-                    yield item
+                    index = next(indices)
+                    states[index] = YouTubeVideoCommentsState(item, video_id)
+                    push(
+                        index, (False, video_id, self.url_formatter.comments(video_id))
+                    )
+
+                # Dispatching the jobs of the oldest videos first
+                while frontier and len(futures) < self.threads:
+                    index, _, job = heappop(frontier)
 
-                    if is_reply:
+                    # NOTE: the video has already failed
+                    if states[index].error is not None:
+                        forget_job(index)
                         continue
 
-                    # Getting replies
-                    if not full_replies or len(replies) >= total_reply_count:
-                        for reply in replies:
-                            if not raw:
-                                reply = YouTubeComment.from_reply_payload(reply)
+                    futures[executor.submit(self.request_json, job[2])] = (index, job)
 
-                            yield reply
-                    elif total_reply_count > 0:
-                        replies_url = self.url_formatter.replies(comment_id)
+                if not futures:
+                    if exhausted and not frontier:
+                        break
 
-                        queue.append((True, comment_id, replies_url))
+                    continue
 
-                # Next page
-                token = result.get("nextPageToken")
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
 
-                if token is not None and len(result["items"]) != 0:
-                    forge = (
-                        self.url_formatter.replies
-                        if is_reply
-                        else self.url_formatter.comments
+                for future in done:
+                    index, job = futures.pop(future)
+                    state = states[index]
+
+                    if state.error is not None:
+                        forget_job(index)
+                        continue
+
+                    try:
+                        result = future.result()
+                    except YOUTUBE_VIDEO_COMMENTS_ERRORS as e:
+                        state.error = e
+                        forget_job(index)
+
+                        yield YouTubeCommentsBatch(
+                            state.item, state.video_id, done=True, error=e
+                        )
+                        continue
+
+                    comments, jobs = self.parse_comments_page(
+                        job, state.video_id, result, raw=raw, full_replies=full_replies
                     )
 
-                    next_url = forge(item_id, token=token)
+                    for next_job in jobs:
+                        push(index, next_job)
 
-                    queue.append((is_reply, item_id, next_url))
+                    # NOTE: a video is only done when all of its pages, including
+                    # the pages of its replies, have been fetched
+                    forget_job(index)
 
-        return generator()
+                    yield YouTubeCommentsBatch(
+                        state.item,
+                        state.video_id,
+                        comments=comments,
+                        done=state.pending == 0,
+                    )
 
     def channel_videos(
         self,
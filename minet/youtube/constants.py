@@ -10,6 +10,23 @@ YOUTUBE_API_MAX_VIDEOS_PER_CALL = 50
 YOUTUBE_API_MAX_CHANNELS_PER_CALL = 50
 YOUTUBE_API_MAX_COMMENTS_PER_CALL = 100
 
+# NOTE: quota units consumed by a call to each endpoint, as documented here:
+# https://developers.google.com/youtube/v3/determine_quota_cost
+YOUTUBE_API_QUOTA_COSTS = {
+    "search": 100,
+    "videos": 1,
+    "channels": 1,
+    "playlistItems": 1,
+    "commentThreads": 1,
+    "comments": 1,
+}
+YOUTUBE_API_DEFAULT_QUOTA_COST = 1
+YOUTUBE_API_DEFAULT_DAILY_QUOTA = 10_000
+YOUTUBE_API_DEFAULT_PER_KEY_PARALLELISM = 4
+YOUTUBE_API_DEFAULT_QUOTA_FILE = "~/.minet-youtube-quota.json"
+YOUTUBE_API_QUOTA_PERSIST_INTERVAL = 5
+YOUTUBE_API_QUOTA_PERSIST_CALLS = 100
+
 YOUTUBE_API_SEARCH_ORDERS = {
     "relevance",
     "date",
@@ -0,0 +1,326 @@
+# =============================================================================
+# Minet YouTube API Quota Scheduler
+# =============================================================================
+#
+# Threadsafe scheduler dispatching YouTube API calls across several API keys
+# while keeping track of the daily quota each key has consumed.
+#
+from typing import Optional, Iterable, Dict, List
+
+import os
+import json
+import atexit
+import weakref
+from time import monotonic
+from hashlib import sha256
+from threading import Condition, Lock
+from urllib.parse import urlsplit
+
+from minet.loggers import sleepers_logger
+from minet.youtube.utils import get_pacific_date, seconds_to_midnight_pacific_time
+from minet.youtube.constants import (
+    YOUTUBE_API_QUOTA_COSTS,
+    YOUTUBE_API_DEFAULT_QUOTA_COST,
+    YOUTUBE_API_DEFAULT_DAILY_QUOTA,
+    YOUTUBE_API_DEFAULT_PER_KEY_PARALLELISM,
+    YOUTUBE_API_QUOTA_PERSIST_INTERVAL,
+    YOUTUBE_API_QUOTA_PERSIST_CALLS,
+)
+from minet.youtube.exceptions import YouTubeAPILimitReached
+
+
+def get_quota_cost(url: str) -> int:
+    endpoint = urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]
+
+    return YOUTUBE_API_QUOTA_COSTS.get(endpoint, YOUTUBE_API_DEFAULT_QUOTA_COST)
+
+
+def hash_key(key: str) -> str:
+    # NOTE: we don't want to write the keys themselves on disk
+    return sha256(key.encode()).hexdigest()[:16]
+
+
+class YouTubeAPIKeyState:
+    __slots__ = ("key", "used", "active", "exhausted")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.used = 0
+        self.active = 0
+
+        # NOTE: only Google can tell us a key is actually exhausted
+        self.exhausted = False
+
+
+class YouTubeAPIKeyScheduler:
+    """
+    Threadsafe scheduler handing out the API key each call should use.
+
+    Each call reserves its quota cost on the chosen key beforehand, and a
+    key cannot run more than `per_key_parallelism` calls at once. Expensive
+    calls (e.g. search) are routed to the key having the most remaining
+    quota, while cheap ones are packed onto the key having the least
+    remaining quota still able to afford them, so that large budgets are
+    kept for expensive calls.
+
+    Since some keys are granted more than the default daily quota, our own
+    accounting is only an estimation: keys that should still be able to
+    afford a call are preferred, but a key is only deemed exhausted when
+    the API reports it as such.
+
+    Quota consumption is reset when the day changes in Pacific time, which
+    is when Google resets its quotas, and can be persisted in a JSON file so
+    that it is not lost between runs. The file is written every few calls
+    or seconds, and when the scheduler is closed or the process exits.
+
+    Args:
+        keys (iterable): API keys.
+        per_key_parallelism (int): Maximum number of concurrent calls per
+            key. Defaults to 4.
+        daily_quota (int): Number of quota units each key is expected to be
+            granted per day. Defaults to 10_000.
+        quota_path (str, optional): Path of the JSON file where quota
+            consumption should be persisted.
+        sleep (bool): Whether to wait until midnight Pacific time when every
+            key is exhausted instead of raising YouTubeAPILimitReached.
+            Defaults to True.
+
+    """
+
+    def __init__(
+        self,
+        keys: Iterable[str],
+        per_key_parallelism: int = YOUTUBE_API_DEFAULT_PER_KEY_PARALLELISM,
+        daily_quota: int = YOUTUBE_API_DEFAULT_DAILY_QUOTA,
+        quota_path: Optional[str] = None,
+        sleep: bool = True,
+    ):
+        if per_key_parallelism < 1:
+            raise TypeError("per_key_parallelism should be at least 1")
+
+        self.states: Dict[str, YouTubeAPIKeyState] = {
+            key: YouTubeAPIKeyState(key) for key in keys
+        }
+
+        if not self.states:
+            raise TypeError("at least one key is required")
+
+        self.per_key_parallelism = per_key_parallelism
+        self.daily_quota = daily_quota
+        self.quota_path = quota_path
+        self.sleep = sleep
+
+        self.day = get_pacific_date()
+        self.condition = Condition()
+
+        self.persist_lock = Lock()
+        self.calls_since_persist = 0
+        self.last_persist = monotonic()
+
+        self.load()
+
+        if self.quota_path is not None:
+            atexit.register(persist_scheduler_at_exit, weakref.ref(self))
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def remaining(self, key: str) -> int:
+        return max(0, self.daily_quota - self.states[key].used)
+
+    def load(self) -> None:
+        if self.quota_path is None:
+            return
+
+        try:
+            with open(self.quota_path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+
+        # NOTE: quotas have been reset since
+        if data.get("day") != self.day:
+            return
+
+        used = data.get("keys", {})
+        exhausted = set(data.get("exhausted", []))
+
+        for state in self.states.values():
+            h = hash_key(state.key)
+            state.used = used.get(h, 0)
+            state.exhausted = h in exhausted
+
+    def persist(self) -> None:
+        """
+        Method writing the quota consumption to the JSON file. The file is
+        written outside of the scheduler's lock, so that calls are not
+        blocked by the disk.
+        """
+        if self.quota_path is None:
+            return
+
+        # NOTE: snapshots are taken under the persist lock, so that an older
+        # snapshot cannot be written after a newer one
+        with self.persist_lock:
+            with self.condition:
+                day = self.day
+                used = {hash_key(s.key): s.used for s in self.states.values()}
+                exhausted = {
+                    hash_key(s.key) for s in self.states.values() if s.exhausted
+                }
+
+                self.calls_since_persist = 0
+                self.last_persist = monotonic()
+
+            data = {"day": day, "keys": {}, "exhausted": []}
+
+            # NOTE: keeping the keys we don't use in this run
+            try:
+                with open(self.quota_path) as f:
+                    previous = json.load(f)
+
+                if previous.get("day") == day:
+                    data["keys"].update(previous.get("keys", {}))
+                    exhausted.update(
+                        h for h in previous.get("exhausted", []) if h not in used
+                    )
+            except (FileNotFoundError, ValueError):
+                pass
+
+            data["keys"].update(used)
+            data["exhausted"] = sorted(exhausted)
+
+            tmp_path = self.quota_path + ".tmp"
+
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+
+            os.replace(tmp_path, self.quota_path)
+
+    def close(self) -> None:
+        self.persist()
+
+    def reset_if_new_day(self) -> None:
+        day = get_pacific_date()
+
+        if day == self.day:
+            return
+
+        self.day = day
+
+        for state in self.states.values():
+            state.used = 0
+            state.exhausted = False
+
+    def select(self, cost: int) -> Optional[YouTubeAPIKeyState]:
+        available = [state for state in self.states.values() if not state.exhausted]
+
+        # NOTE: keys that should still afford the cost are preferred, even if
+        # we need to wait for them, but we fall back on the other ones since
+        # they might have been granted more quota than we think
+        if any(self.remaining(state.key) >= cost for state in available):
+            available = [
+                state for state in available if self.remaining(state.key) >= cost
+            ]
+
+        candidates: List[YouTubeAPIKeyState] = [
+            state for state in available if state.active < self.per_key_parallelism
+        ]
+
+        if not candidates:
+            return None
+
+        if cost > YOUTUBE_API_DEFAULT_QUOTA_COST:
+            return max(candidates, key=lambda s: (self.remaining(s.key), -s.active))
+
+        return min(candidates, key=lambda s: (self.remaining(s.key), s.active))
+
+    def has_available_keys(self) -> bool:
+        return any(not state.exhausted for state in self.states.values())
+
+    def wait_for_reset(self) -> None:
+        if not self.sleep:
+            raise YouTubeAPILimitReached
+
+        sleep_time = seconds_to_midnight_pacific_time() + 10
+
+        sleepers_logger.warn(
+            "YouTube API limits reached for every key. Will now wait until midnight Pacific time!",
+            extra={
+                "source": "YouTubeAPIClient",
+                "sleep_time": sleep_time,
+            },
+        )
+
+        self.condition.wait(sleep_time)
+
+    def acquire(self, cost: int = YOUTUBE_API_DEFAULT_QUOTA_COST) -> str:
+        """
+        Method blocking until some key can afford the given cost and returning
+        it. The cost is reserved right away, since Google also counts calls
+        that end up failing.
+        """
+        with self.condition:
+            while True:
+                self.reset_if_new_day()
+
+                state = self.select(cost)
+
+                if state is not None:
+                    state.active += 1
+                    state.used += cost
+                    return state.key
+
+                if not self.has_available_keys():
+                    self.wait_for_reset()
+                    continue
+
+                self.condition.wait()
+
+    def release(self, key: str) -> None:
+        with self.condition:
+            self.states[key].active -= 1
+            self.calls_since_persist += 1
+            self.condition.notify_all()
+
+            should_persist = self.quota_path is not None and (
+                self.calls_since_persist >= YOUTUBE_API_QUOTA_PERSIST_CALLS
+                or monotonic() - self.last_persist >= YOUTUBE_API_QUOTA_PERSIST_INTERVAL
+            )
+
+        if should_persist:
+            self.persist()
+
+    def exhaust(self, key: str) -> None:
+        """
+        Method marking the given key as exhausted for today, when the API
+        reports it as such.
+        """
+        with self.condition:
+            state = self.states[key]
+            state.used = max(state.used, self.daily_quota)
+            state.exhausted = True
+            self.condition.notify_all()
+
+        self.persist()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.condition:
+            return {
+                "used": sum(state.used for state in self.states.values()),
+                "remaining": sum(self.remaining(key) for key in self.states),
+                "exhausted": sum(
+                    1 for state in self.states.values() if state.exhausted
+                ),
+            }
+
+
+def persist_scheduler_at_exit(
+    ref: "weakref.ReferenceType[YouTubeAPIKeyScheduler]",
+) -> None:
+    scheduler = ref()
+
+    if scheduler is None:
+        return
+
+    scheduler.close()
@@ -1,7 +1,7 @@
-from typing import Optional, List
+from typing import Optional, List, Any
 
 from casanova import TabularRecord
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from ebbe import getpath
 
 from minet.youtube.constants import YOUTUBE_API_CATEGORIES
@@ -174,6 +174,15 @@ class YouTubeComment(TabularRecord):
         )
 
 
+@dataclass
+class YouTubeCommentsBatch:
+    item: Any
+    video_id: Optional[str]
+    comments: List[Any] = field(default_factory=list)
+    done: bool = False
+    error: Optional[Exception] = None
+
+
 @dataclass
 class YouTubeChannel(TabularRecord):
     channel_id: str
@@ -26,6 +26,16 @@ def seconds_to_midnight_pacific_time() -> int:
     return (midnight_pacific - pacific_time).seconds
 
 
+def get_pacific_date() -> str:
+    """
+    Function returning the current date in Pacific time, i.e. the day the
+    YouTube API quotas are counted against.
+    """
+    now_utc = timezone("utc").localize(datetime.utcnow())
+
+    return now_utc.astimezone(timezone("US/Pacific")).strftime("%Y-%m-%d")
+
+
 def ensure_video_id(target):
     if is_youtube_video_id(target):
         return target
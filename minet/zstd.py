@@ -0,0 +1,317 @@
+# =============================================================================
+# Minet Zstd Utilities
+# =============================================================================
+#
+# Helpers related to zstd compression, relying on the optional `zstandard`
+# library.
+#
+# Small pages from a same website compress poorly in isolation, which is why
+# we train dictionaries on the first files of a group (a whole archive, or a
+# folder given by some folder strategy, e.g. a hostname) so that subsequent
+# files of the group can be compressed using them.
+#
+# The id of the dictionary is written in the header of each compressed frame,
+# which means we can find the relevant one when decompressing, as long as
+# the dictionaries have been registered beforehand.
+#
+# References:
+#  - https://facebook.github.io/zstd/#small-data
+#  - https://python-zstandard.readthedocs.io/en/latest/dictionaries.html
+#
+from typing import Optional, Dict, List, Callable, Union, Literal
+
+import os
+from os.path import join, dirname, isdir, abspath
+from threading import Lock, local
+from collections import OrderedDict
+
+from minet.exceptions import ZstdNotInstalledError, ZstdDictionaryNotFoundError
+from minet.constants import (
+    DEFAULT_ZSTD_LEVEL,
+    DEFAULT_ZSTD_DICTIONARY_SIZE,
+    DEFAULT_ZSTD_TRAINING_SAMPLES,
+    DEFAULT_ZSTD_TRAINING_SAMPLE_SIZE,
+    DEFAULT_ZSTD_MAX_TRAINING_GROUPS,
+    DEFAULT_ZSTD_MAX_TRAINING_BYTES,
+)
+
+ZSTD_SUPPORT = False
+
+try:
+    import zstandard
+
+    ZSTD_SUPPORT = True
+except ImportError:
+    pass
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZSTD_DICTIONARIES_DIRECTORY = ".zstd-dictionaries"
+
+# NOTE: dictionaries are registered process-wide, by id
+DICTIONARIES: Dict[int, "zstandard.ZstdCompressionDict"] = {}
+DICTIONARIES_LOCK = Lock()
+LOADED_DICTIONARIES_DIRECTORIES = set()
+
+THREAD_LOCAL = local()
+
+
+def ensure_zstd_support() -> None:
+    if not ZSTD_SUPPORT:
+        raise ZstdNotInstalledError
+
+
+def is_zstd(data: bytes) -> bool:
+    return data[:4] == ZSTD_MAGIC
+
+
+def register_zstd_dictionary(
+    data: Union[bytes, "zstandard.ZstdCompressionDict"],
+) -> "zstandard.ZstdCompressionDict":
+    ensure_zstd_support()
+
+    if isinstance(data, bytes):
+        data = zstandard.ZstdCompressionDict(data)
+
+    with DICTIONARIES_LOCK:
+        return DICTIONARIES.setdefault(data.dict_id(), data)
+
+
+def get_zstd_dictionary(dict_id: int) -> "zstandard.ZstdCompressionDict":
+    with DICTIONARIES_LOCK:
+        dictionary = DICTIONARIES.get(dict_id)
+
+    if dictionary is None:
+        raise ZstdDictionaryNotFoundError(dict_id)
+
+    return dictionary
+
+
+def write_zstd_dictionary(
+    directory: str, dictionary: "zstandard.ZstdCompressionDict"
+) -> None:
+    directory = join(directory, ZSTD_DICTIONARIES_DIRECTORY)
+    os.makedirs(directory, exist_ok=True)
+
+    path = join(directory, "%i.dict" % dictionary.dict_id())
+    tmp_path = path + ".tmp"
+
+    # NOTE: the file is renamed once complete, so that a crash cannot leave
+    # a truncated dictionary behind
+    with open(tmp_path, "wb") as f:
+        f.write(dictionary.as_bytes())
+
+    os.replace(tmp_path, path)
+
+
+def load_zstd_dictionaries_for_path(path: str) -> None:
+    """
+    Function registering the dictionaries found in the closest dictionaries
+    folder among the parents of the given path.
+    """
+    directory = dirname(abspath(path))
+
+    while True:
+        candidate = join(directory, ZSTD_DICTIONARIES_DIRECTORY)
+
+        if candidate in LOADED_DICTIONARIES_DIRECTORIES:
+            return
+
+        if isdir(candidate):
+            for name in os.listdir(candidate):
+                if not name.endswith(".dict"):
+                    continue
+
+                with open(join(candidate, name), "rb") as f:
+                    register_zstd_dictionary(f.read())
+
+            LOADED_DICTIONARIES_DIRECTORIES.add(candidate)
+            return
+
+        parent = dirname(directory)
+
+        if parent == directory:
+            return
+
+        directory = parent
+
+
+def get_thread_local_codecs() -> Dict:
+    codecs = getattr(THREAD_LOCAL, "codecs", None)
+
+    if codecs is None:
+        codecs = {}
+        THREAD_LOCAL.codecs = codecs
+
+    return codecs
+
+
+def zstd_uncompress(data: bytes) -> bytes:
+    ensure_zstd_support()
+
+    dict_id = zstandard.get_frame_parameters(data).dict_id
+
+    # NOTE: zstd (de)compressors are not threadsafe, hence the thread-local cache
+    codecs = get_thread_local_codecs()
+    key = ("d", dict_id)
+    decompressor = codecs.get(key)
+
+    if decompressor is None:
+        dictionary = get_zstd_dictionary(dict_id) if dict_id else None
+        decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+        codecs[key] = decompressor
+
+    return decompressor.decompress(data)
+
+
+def zstd_compress(
+    data: bytes,
+    dictionary: Optional["zstandard.ZstdCompressionDict"] = None,
+    level: int = DEFAULT_ZSTD_LEVEL,
+) -> bytes:
+    ensure_zstd_support()
+
+    codecs = get_thread_local_codecs()
+    key = ("c", dictionary.dict_id() if dictionary is not None else 0, level)
+    compressor = codecs.get(key)
+
+    if compressor is None:
+        compressor = zstandard.ZstdCompressor(level=level, dict_data=dictionary)
+        codecs[key] = compressor
+
+    return compressor.compress(data)
+
+
+def get_zstd_group(name: str) -> str:
+    """
+    Function returning the group of a file, i.e. its top-level folder, which
+    will usually be given by the folder strategy.
+    """
+    name = name.replace(os.sep, "/")
+
+    if "/" not in name:
+        return ""
+
+    return name.split("/", 1)[0]
+
+
+ZstdGroupState = Union[List[bytes], "zstandard.ZstdCompressionDict", Literal[False]]
+
+
+class GroupedZstdCompressor:
+    """
+    Threadsafe zstd compressor training a dictionary per group of files on
+    the first files of each group. Files compressed before a dictionary was
+    trained for their group are compressed without one.
+
+    Newly trained dictionaries are handed to `on_dictionary` so that they
+    can be persisted before any file is compressed using them.
+
+    Samples are truncated to `training_sample_size` bytes, and the groups
+    that were least recently fed are given up when the samples held in
+    memory exceed `max_training_bytes` in total.
+    """
+
+    def __init__(
+        self,
+        level: int = DEFAULT_ZSTD_LEVEL,
+        dictionary_size: int = DEFAULT_ZSTD_DICTIONARY_SIZE,
+        training_samples: int = DEFAULT_ZSTD_TRAINING_SAMPLES,
+        training_sample_size: int = DEFAULT_ZSTD_TRAINING_SAMPLE_SIZE,
+        max_training_groups: int = DEFAULT_ZSTD_MAX_TRAINING_GROUPS,
+        max_training_bytes: int = DEFAULT_ZSTD_MAX_TRAINING_BYTES,
+        on_dictionary: Optional[
+            Callable[[str, "zstandard.ZstdCompressionDict"], None]
+        ] = None,
+    ):
+        ensure_zstd_support()
+
+        self.level = level
+        self.dictionary_size = dictionary_size
+        self.training_samples = training_samples
+        self.training_sample_size = training_sample_size
+        self.max_training_groups = max_training_groups
+        self.max_training_bytes = max_training_bytes
+        self.on_dictionary = on_dictionary
+
+        self.lock = Lock()
+        self.groups: Dict[str, ZstdGroupState] = {}
+
+        # NOTE: groups still collecting samples, in LRU order, so that we
+        # don't keep samples of too many groups in memory
+        self.training: "OrderedDict[str, None]" = OrderedDict()
+        self.training_bytes = 0
+
+    def __give_up_training(self, group: str) -> None:
+        state = self.groups[group]
+
+        assert isinstance(state, list)
+
+        self.training_bytes -= sum(len(sample) for sample in state)
+        self.groups[group] = False
+
+    def __get_dictionary(
+        self, group: str, data: bytes
+    ) -> Optional["zstandard.ZstdCompressionDict"]:
+        with self.lock:
+            state = self.groups.get(group)
+
+            if state is False:
+                return None
+
+            if state is None:
+                state = []
+                self.groups[group] = state
+
+                if len(self.training) >= self.max_training_groups:
+                    evicted, _ = self.training.popitem(last=False)
+                    self.__give_up_training(evicted)
+
+            if not isinstance(state, list):
+                return state
+
+            self.training[group] = None
+            self.training.move_to_end(group)
+
+            sample = data[: self.training_sample_size]
+            state.append(sample)
+            self.training_bytes += len(sample)
+
+            while self.training_bytes > self.max_training_bytes:
+                evicted, _ = self.training.popitem(last=False)
+                self.__give_up_training(evicted)
+
+                if evicted == group:
+                    return None
+
+            if len(state) < self.training_samples:
+                return None
+
+            # NOTE: training is rare enough to be done while holding the lock
+            del self.training[group]
+            self.training_bytes -= sum(len(sample) for sample in state)
+
+            try:
+                dictionary = zstandard.train_dictionary(self.dictionary_size, state)
+            except zstandard.ZstdError:
+                self.groups[group] = False
+                return None
+
+            dictionary = register_zstd_dictionary(dictionary)
+
+            # NOTE: the dictionary must be persisted before being used by
+            # any thread, else files referencing it could be written first
+            if self.on_dictionary is not None:
+                try:
+                    self.on_dictionary(group, dictionary)
+                except Exception:
+                    self.groups[group] = False
+                    raise
+
+            self.groups[group] = dictionary
+
+        return dictionary
+
+    def compress(self, data: bytes, group: str = "") -> bytes:
+        dictionary = self.__get_dictionary(group, data)
+
+        return zstd_compress(data, dictionary=dictionary, level=self.level)
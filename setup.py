@@ -54,6 +54,9 @@ setup(
     ],
     extras_require={
         ":python_version<'3.11'": ["typing_extensions>=4.3"],
+        "async": ["httpx>=0.27"],
+        "lxml": ["cssselect>=1.2"],
+        "zstd": ["zstandard>=0.22"],
     },
     entry_points={"console_scripts": ["minet=minet.cli.__main__:main"]},
     zip_safe=True,
@@ -0,0 +1,281 @@
+# =============================================================================
+# Minet Bluesky Firehose Unit Tests
+# =============================================================================
+import json
+import casanova
+from hashlib import sha256
+from threading import Thread
+from os.path import join
+from glob import glob
+from pytest import raises
+from websockets.sync.server import serve
+
+import libipld
+
+from minet.bluesky.websocket_client import BlueskyWebSocketClient
+from minet.bluesky.exceptions import BlueskyFirehoseError
+from minet.bluesky.firehose import (
+    decode_frame,
+    read_cursor,
+    write_cursor,
+    BlueskyFirehoseConsumer,
+    FirehoseRecordWriter,
+    FirehoseBatchDecoder,
+)
+
+REPO = "did:plc:testtesttesttest"
+
+POST = {
+    "$type": "app.bsky.feed.post",
+    "text": "Hello world",
+    "langs": ["en", "fr"],
+    "createdAt": "2024-11-19T10:00:00.000Z",
+    "reply": {
+        "root": {"uri": "at://did:plc:other/app.bsky.feed.post/1", "cid": "x"},
+        "parent": {"uri": "at://did:plc:other/app.bsky.feed.post/2", "cid": "x"},
+    },
+}
+
+LIKE = {
+    "$type": "app.bsky.feed.like",
+    "subject": {"uri": "at://did:plc:other/app.bsky.feed.post/1", "cid": "x"},
+    "createdAt": "2024-11-19T10:00:01.000Z",
+}
+
+FOLLOW = {
+    "$type": "app.bsky.graph.follow",
+    "subject": "did:plc:other",
+    "createdAt": "2024-11-19T10:00:02.000Z",
+}
+
+
+def varint(n: int) -> bytes:
+    output = bytearray()
+
+    while n > 0x7F:
+        output.append((n & 0x7F) | 0x80)
+        n >>= 7
+
+    output.append(n)
+
+    return bytes(output)
+
+
+def get_cid(data: bytes) -> bytes:
+    return b"\x01\x71\x12\x20" + sha256(data).digest()
+
+
+def build_car(records):
+    blocks = []
+
+    for record in records:
+        data = libipld.encode_dag_cbor(record)
+        blocks.append((get_cid(data), data))
+
+    # NOTE: libipld cannot encode links, hence the handcrafted header
+    root = b"\x00" + blocks[0][0]
+    header = (
+        b"\xa2\x65roots\x81\xd8\x2a\x58"
+        + bytes([len(root)])
+        + root
+        + b"\x67version\x01"
+    )
+
+    car = varint(len(header)) + header
+
+    for cid, data in blocks:
+        car += varint(len(cid) + len(data)) + cid + data
+
+    return [cid for cid, _ in blocks], car
+
+
+def build_commit_frame(seq, records):
+    cids, car = build_car([record for _, record in records])
+
+    ops = [
+        {"action": "create", "path": path, "cid": cid}
+        for (path, _), cid in zip(records, cids)
+    ]
+
+    ops.append({"action": "delete", "path": "app.bsky.feed.post/deleted", "cid": None})
+
+    header = {"op": 1, "t": "#commit"}
+    body = {
+        "seq": seq,
+        "repo": REPO,
+        "rev": "rev",
+        "ops": ops,
+        "blocks": car,
+        "time": "2024-11-19T10:00:03.000Z",
+    }
+
+    return libipld.encode_dag_cbor(header) + libipld.encode_dag_cbor(body)
+
+
+def build_simple_frame(seq):
+    return libipld.encode_dag_cbor(
+        {"op": 1, "t": "#identity"}
+    ) + libipld.encode_dag_cbor(
+        {"seq": seq, "did": REPO, "time": "2024-11-19T10:00:03.000Z"}
+    )
+
+
+def build_error_frame(error):
+    return libipld.encode_dag_cbor({"op": -1}) + libipld.encode_dag_cbor(
+        {"error": error, "message": "test"}
+    )
+
+
+FRAME = build_commit_frame(
+    10,
+    [
+        ("app.bsky.feed.post/post", POST),
+        ("app.bsky.feed.like/like", LIKE),
+        ("app.bsky.graph.follow/follow", FOLLOW),
+    ],
+)
+
+
+class TestBlueskyFirehose:
+    def test_decode_frame(self):
+        event = decode_frame(FRAME)
+
+        assert event.type == "#commit"
+        assert event.seq == 10
+        assert event.timestamp == 1732010403
+        assert len(event.records) == 4
+
+        post, like, follow, deleted = event.records
+
+        assert post["uri"] == "at://%s/app.bsky.feed.post/post" % REPO
+        assert post["cid"].startswith("bafyrei")
+        assert post["text"] == "Hello world"
+        assert post["langs"] == ["en", "fr"]
+        assert post["reply_parent"] == "at://did:plc:other/app.bsky.feed.post/2"
+        assert post["reply_root"] == "at://did:plc:other/app.bsky.feed.post/1"
+        assert post["record"] == POST
+
+        assert like["collection"] == "app.bsky.feed.like"
+        assert like["subject"] == "at://did:plc:other/app.bsky.feed.post/1"
+
+        assert follow["rkey"] == "follow"
+        assert follow["subject"] == "did:plc:other"
+
+        assert deleted["action"] == "delete"
+        assert deleted["record"] is None
+
+        event = decode_frame(FRAME, collections={"app.bsky.feed.like"})
+        assert [r["rkey"] for r in event.records] == ["like"]
+
+        event = decode_frame(FRAME, collections=set())
+        assert event.seq == 10 and event.records == []
+
+        event = decode_frame(build_simple_frame(11))
+        assert event.type == "#identity" and event.seq == 11
+
+        event = decode_frame(build_error_frame("ConsumerTooSlow"))
+        assert event.type == "#error" and event.error == "ConsumerTooSlow"
+
+        events = FirehoseBatchDecoder()([b"\x00garbage", FRAME])
+        assert events[0].type == "#invalid"
+        assert events[1].seq == 10
+
+    def test_cursor(self, tmp_path):
+        path = str(tmp_path / "cursor")
+
+        assert read_cursor(path) is None
+
+        write_cursor(path, 45)
+        write_cursor(path, 46)
+
+        assert read_cursor(path) == 46
+
+    def test_record_writer(self, tmp_path):
+        records = decode_frame(FRAME).records
+
+        with FirehoseRecordWriter(str(tmp_path), max_size=1) as writer:
+            for record in records:
+                writer.writerow(record)
+
+        paths = sorted(glob(join(str(tmp_path), "*.ndjson")))
+
+        assert len(paths) == 4
+
+        with open(paths[0]) as f:
+            assert json.loads(f.read()) == records[0]
+
+        with FirehoseRecordWriter(str(tmp_path / "csv"), format="csv") as writer:
+            for record in records:
+                writer.writerow(record)
+
+        paths = glob(join(str(tmp_path / "csv"), "*.csv"))
+
+        assert len(paths) == 1
+
+        with casanova.reader(paths[0]) as reader:
+            headers = reader.headers
+            rows = list(reader)
+
+        assert len(rows) == 4
+        assert rows[0][headers.langs] == "en|fr"
+        assert rows[1][headers.subject] == "at://did:plc:other/app.bsky.feed.post/1"
+
+    def test_consumer(self):
+        received_cursors = []
+
+        def handler(socket):
+            query = socket.request.path.partition("?")[2]
+            cursor = int(query.split("=")[1]) if query else 0
+            received_cursors.append(cursor or None)
+
+            if len(received_cursors) == 1:
+                # NOTE: dropping the connection midway
+                for seq in range(1, 7):
+                    socket.send(build_simple_frame(seq))
+
+                return
+
+            if len(received_cursors) == 2:
+                # NOTE: replaying some events already seen
+                for seq in range(max(cursor - 2, 1), 13):
+                    socket.send(FRAME if seq == 10 else build_simple_frame(seq))
+
+                return
+
+            socket.send(build_error_frame("FutureCursor"))
+
+        with serve(handler, "127.0.0.1", 0) as server:
+            Thread(target=server.serve_forever, daemon=True).start()
+
+            client = BlueskyWebSocketClient(
+                "ws://127.0.0.1:%i/xrpc/" % server.socket.getsockname()[1]
+            )
+
+            for processes in (1, 2):
+                received_cursors.clear()
+
+                consumer = BlueskyFirehoseConsumer(
+                    collections=["app.bsky.feed.post"],
+                    processes=processes,
+                    reconnect_delay=0.01,
+                    client=client,
+                )
+
+                seqs = []
+                records = []
+
+                with raises(BlueskyFirehoseError):
+                    for event in consumer:
+                        seqs.append(event.seq)
+                        records.extend(event.records)
+
+                assert seqs == list(range(1, 13))
+                # NOTE: the reader may reconnect before the last events are
+                # yielded, hence the deduplication
+                assert received_cursors[0] is None
+                assert len(received_cursors) >= 3
+                assert [r["rkey"] for r in records] == ["post", "deleted"]
+                assert consumer.cursor == 12
+                assert consumer.reconnections >= 2
+
+            server.shutdown()
@@ -0,0 +1,131 @@
+# =============================================================================
+# Minet Bluesky HTTP Client Unit Tests
+# =============================================================================
+import json
+from time import time, sleep
+from base64 import urlsafe_b64encode
+from threading import Thread, Lock
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from minet.bluesky.urls import BlueskyHTTPAPIUrlFormatter
+from minet.bluesky.http_client import BlueskyHTTPClient
+
+
+def make_jwt(expiration: int) -> str:
+    payload = urlsafe_b64encode(json.dumps({"exp": expiration}).encode())
+
+    return "header.%s.signature" % payload.decode().rstrip("=")
+
+
+class State:
+    def __init__(self):
+        self.lock = Lock()
+        self.active = 0
+        self.peak = 0
+        self.refreshes = 0
+        self.remaining = 3000
+
+
+def create_handler(state: State):
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, data, headers={}):
+            body = json.dumps(data).encode()
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+
+            for k, v in headers.items():
+                self.send_header(k, v)
+
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            # NOTE: the first access token is about to expire
+            if self.path.endswith("createSession"):
+                expiration = int(time()) + 5
+            else:
+                with state.lock:
+                    state.refreshes += 1
+
+                expiration = int(time()) + 3600
+
+            self.send_json({"accessJwt": make_jwt(expiration), "refreshJwt": "refresh"})
+
+        def do_GET(self):
+            with state.lock:
+                state.active += 1
+                state.peak = max(state.peak, state.active)
+                state.remaining -= 1
+                remaining = state.remaining
+
+            sleep(0.02)
+
+            actors = parse_qs(urlsplit(self.path).query)["actors"]
+
+            # NOTE: shuffling & dropping some profiles
+            profiles = [
+                {"did": "did:plc:%s" % actor, "handle": actor}
+                for actor in reversed(actors)
+                if not actor.endswith("7")
+            ]
+
+            with state.lock:
+                state.active -= 1
+
+            self.send_json(
+                {"profiles": profiles},
+                headers={
+                    "RateLimit-Remaining": str(remaining),
+                    "RateLimit-Reset": str(int(time()) + 300),
+                },
+            )
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class TestBlueskyHTTPClient:
+    def test_profiles(self, monkeypatch):
+        state = State()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), create_handler(state))
+        Thread(target=server.serve_forever, daemon=True).start()
+
+        monkeypatch.setattr(
+            BlueskyHTTPAPIUrlFormatter,
+            "BASE_URL",
+            "http://127.0.0.1:%i/xrpc" % server.server_port,
+        )
+
+        try:
+            client = BlueskyHTTPClient("test", "test", threads=4)
+
+            actors = ["user%i" % i for i in range(250)]
+            profiles = list(client.profiles(actors, return_raw=True))
+
+            assert len(profiles) == len(actors)
+
+            for actor, profile in zip(actors, profiles):
+                if actor.endswith("7"):
+                    assert profile is None
+                else:
+                    assert profile["handle"] == actor
+
+            assert state.peak > 1
+            assert state.refreshes == 1
+            assert client.limiter.active == 0
+
+            # NOTE: a low budget throttles concurrency down
+            state.remaining = 12
+
+            profiles = list(client.profiles(actors, return_raw=True))
+
+            assert len(profiles) == len(actors)
+            assert client.limiter.limit <= 2
+        finally:
+            server.shutdown()
+            server.server_close()
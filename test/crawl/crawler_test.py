@@ -0,0 +1,126 @@
+import os
+import sys
+from threading import Thread, Lock
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pytest import mark
+
+from minet.crawl import Crawler, Spider, BasicSpider
+from minet.sqlar import SQLiteArchive
+
+PAGES = 40
+
+
+def create_handler(hits: Counter, lock: Lock):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with lock:
+                hits[self.path] += 1
+
+            n = int(self.path.rsplit("/", 1)[-1])
+
+            # NOTE: pages link to each other a lot, so that the same urls are
+            # found by different worker processes
+            links = "".join(
+                '<a href="/page/%i">link</a>' % ((n * k + 1) % PAGES)
+                for k in range(1, 5)
+            )
+            body = ("<html><body>%s</body></html>" % links).encode()
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class PageSpider(Spider):
+    def process(self, job, response):
+        path = "pages/%s.html" % job.url.rsplit("/", 1)[-1]
+        self.write(path, response.body)
+
+        return (path, os.getpid()), response.links()
+
+
+class TestCrawler:
+    def test_basic_spider(self):
+        hits = Counter()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), create_handler(hits, Lock()))
+        Thread(target=server.serve_forever, daemon=True).start()
+
+        base_url = "http://127.0.0.1:%i/page/" % server.server_port
+        spider = BasicSpider()
+
+        try:
+            with Crawler(
+                spider, visit_urls_only_once=True, max_depth=2, throttle=0
+            ) as crawler:
+                crawler.enqueue(base_url + "1")
+                results = list(crawler)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        # NOTE: 1 -> 2, 3, 4, 5 -> 6, 7, 9, 10, 11, 13, 16, 17, 21
+        assert len(results) == 1 + 4 + 9
+        assert all(result.data is not None for result in results)
+
+        for result in results:
+            links = list(spider.tabulate(result))
+
+            # NOTE: links are recorded even at max depth
+            assert len(links) > 0
+            assert [(link.from_url, link.to_url) for link in links] == [
+                (result.job.url, url)
+                for url in result.response.links(strip_fragment=True)
+            ]
+
+    @mark.skipif(sys.platform == "win32", reason="worker processes require fork")
+    def test_worker_processes(self, tmp_path):
+        hits = Counter()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), create_handler(hits, Lock()))
+        Thread(target=server.serve_forever, daemon=True).start()
+
+        url = "http://127.0.0.1:%i/page/0" % server.server_port
+        root = str(tmp_path / "files")
+
+        try:
+            with Crawler(
+                PageSpider(),
+                worker_processes=2,
+                max_workers=3,
+                visit_urls_only_once=True,
+                writer_root_directory=root,
+                sqlar=True,
+                domain_parallelism=4,
+                throttle=0,
+            ) as crawler:
+                crawler.enqueue(url)
+
+                results = [result.data for result in crawler]
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        paths = [path for path, _ in results]
+
+        assert len(paths) == PAGES
+        assert all(pid != os.getpid() for _, pid in results)
+        assert hits == Counter({"/page/%i" % n: 1 for n in range(PAGES)})
+
+        # NOTE: every worker process wrote to the same archive
+        archive = SQLiteArchive(root + ".sqlar")
+
+        try:
+            assert len(archive) == PAGES
+            assert sorted(record.name for record in archive) == sorted(paths)
+
+            for record in archive:
+                assert b"/page/" in record.uncompressed_data
+        finally:
+            archive.close()
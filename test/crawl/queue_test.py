@@ -1,6 +1,6 @@
 from typing import List
 
-from pytest import raises
+from pytest import raises, mark
 from queue import Empty
 
 from minet.crawl.types import CrawlJob
@@ -70,7 +70,8 @@ class TestCrawlerQueue:
 
         assert queue.worked_groups() == {}
 
-    def test_fifo_lifo_order(self):
+    @mark.parametrize("in_memory_scheduler", [False, True])
+    def test_fifo_lifo_order(self, in_memory_scheduler):
         job1 = CrawlJob("A", group="A")
         job2 = CrawlJob("B", group="B")
         job3 = CrawlJob("C", group="C")
@@ -79,21 +80,22 @@ class TestCrawlerQueue:
 
         jobs = [job1, job2, job3, job4, job5]
 
-        queue = CrawlerQueue()
+        queue = CrawlerQueue(in_memory_scheduler=in_memory_scheduler)
         queue.put_many(jobs)
 
         output = consume(queue)
 
         assert output == jobs
 
-        queue = CrawlerQueue(lifo=True)
+        queue = CrawlerQueue(lifo=True, in_memory_scheduler=in_memory_scheduler)
         queue.put_many(jobs)
 
         output = consume(queue)
 
         assert output == list(reversed(jobs))
 
-    def test_priority_order(self):
+    @mark.parametrize("in_memory_scheduler", [False, True])
+    def test_priority_order(self, in_memory_scheduler):
         job1 = CrawlJob("A", group="A", priority=2)
         job2 = CrawlJob("B", group="B", priority=4)
         job3 = CrawlJob("C", group="C", priority=0)
@@ -103,25 +105,31 @@ class TestCrawlerQueue:
 
         jobs = [job1, job2, job3, job4, job5, job6]
 
-        queue = CrawlerQueue()
+        queue = CrawlerQueue(in_memory_scheduler=in_memory_scheduler)
         queue.put_many(jobs)
 
         output = consume(queue)
 
         assert output == [job3, job5, job1, job2, job4, job6]
 
-        queue = CrawlerQueue(lifo=True)
+        queue = CrawlerQueue(lifo=True, in_memory_scheduler=in_memory_scheduler)
         queue.put_many(jobs)
 
         output = consume(queue)
         assert output == [job3, job5, job1, job2, job6, job4]
 
-    def test_resuming(self, tmp_path):
+    @mark.parametrize("in_memory_scheduler", [False, True])
+    def test_resuming(self, tmp_path, in_memory_scheduler):
         job1 = CrawlJob("A", group="A")
         job2 = CrawlJob("B", group="B")
         job3 = CrawlJob("C", group="C")
 
-        queue = CrawlerQueue(tmp_path, cleanup_interval=1, vacuum_interval=1)
+        queue = CrawlerQueue(
+            tmp_path,
+            cleanup_interval=1,
+            vacuum_interval=1,
+            in_memory_scheduler=in_memory_scheduler,
+        )
 
         queue.put(job1)
         queue.put(job2)
@@ -136,7 +144,11 @@ class TestCrawlerQueue:
         del queue
 
         queue = CrawlerQueue(
-            tmp_path, cleanup_interval=1, vacuum_interval=1, resume=True
+            tmp_path,
+            cleanup_interval=1,
+            vacuum_interval=1,
+            in_memory_scheduler=in_memory_scheduler,
+            resume=True,
         )
 
         assert len(queue) == 3
@@ -147,7 +159,11 @@ class TestCrawlerQueue:
         del queue
 
         queue = CrawlerQueue(
-            tmp_path, cleanup_interval=1, vacuum_interval=1, resume=True
+            tmp_path,
+            cleanup_interval=1,
+            vacuum_interval=1,
+            in_memory_scheduler=in_memory_scheduler,
+            resume=True,
         )
 
         assert queue.get_nowait() == job2
@@ -161,7 +177,11 @@ class TestCrawlerQueue:
         del queue
 
         queue = CrawlerQueue(
-            tmp_path, cleanup_interval=1, vacuum_interval=1, resume=True
+            tmp_path,
+            cleanup_interval=1,
+            vacuum_interval=1,
+            in_memory_scheduler=in_memory_scheduler,
+            resume=True,
         )
 
         assert len(queue) == 0
@@ -192,3 +212,114 @@ class TestCrawlerQueue:
         queue.task_done(job)
 
         assert len(queue.tasks) == 0
+
+    def test_in_memory_scheduler(self):
+        queue = CrawlerQueue(in_memory_scheduler=True, group_parallelism=2)
+
+        job1 = CrawlJob("A1", group="A")
+        job2 = CrawlJob("A2", group="A")
+        job3 = CrawlJob("A3", group="A")
+        job4 = CrawlJob("B1", group="B", priority=1)
+        job5 = CrawlJob("N1")
+
+        queue.put_many([job1, job2, job3, job4, job5])
+
+        assert len(queue) == 5
+
+        # NOTE: consuming would block here since group "A" is saturated
+        assert [queue.get_nowait() for _ in range(4)] == [job1, job2, job5, job4]
+        assert queue.worked_groups() == {"A": (2, 2), "B": (1, 2)}
+        assert len(queue) == 1
+
+        queue.release_group(job1)
+
+        assert queue.worked_groups() == {"A": (1, 2), "B": (1, 2)}
+        assert queue.get_nowait() == job3
+        assert len(queue) == 0
+
+        with raises(Empty):
+            queue.get_nowait()
+
+    def test_in_memory_scheduler_throttle(self):
+        queue = CrawlerQueue(in_memory_scheduler=True, throttle=0.05)
+
+        job1 = CrawlJob("A1", group="A")
+        job2 = CrawlJob("A2", group="A")
+        job3 = CrawlJob("B1", group="B")
+
+        queue.put_many([job1, job2, job3])
+
+        assert queue.get_nowait() == job1
+        assert queue.get_nowait() == job3
+
+        queue.release_group(job1)
+
+        assert queue.scheduler is not None
+        assert queue.scheduler.next_wake_up() is not None
+
+        # NOTE: this will block until throttle is over
+        assert queue.get_nowait() == job2
+
+    def test_in_memory_scheduler_dump_parity(self, tmp_path):
+        jobs = [CrawlJob(str(i), group=str(i % 3), priority=i % 2) for i in range(10)]
+
+        sql_queue = CrawlerQueue(tmp_path / "sql", group_parallelism=10)
+        memory_queue = CrawlerQueue(
+            tmp_path / "memory", group_parallelism=10, in_memory_scheduler=True
+        )
+
+        sql_queue.put_many(jobs)
+        memory_queue.put_many(jobs)
+
+        assert consume(sql_queue) == consume(memory_queue)
+        assert list(sql_queue.dump()) == list(memory_queue.dump())
+
+    @mark.parametrize("in_memory_scheduler", [False, True])
+    def test_batches(self, in_memory_scheduler):
+        queue = CrawlerQueue(
+            group_parallelism=2,
+            cleanup_interval=2,
+            in_memory_scheduler=in_memory_scheduler,
+        )
+
+        job1 = CrawlJob("A1", group="A")
+        job2 = CrawlJob("A2", group="A")
+        job3 = CrawlJob("A3", group="A")
+        job4 = CrawlJob("B1", group="B")
+
+        queue.put_many([job1, job2, job3, job4])
+
+        with raises(TypeError):
+            queue.get_many(0)
+
+        assert queue.get_many(3) == [job1, job2, job4]
+        assert queue.worked_groups() == {"A": (2, 2), "B": (1, 2)}
+
+        with raises(RuntimeError):
+            queue.task_done_many([job1, job3])
+
+        queue.release_group(job1)
+        queue.task_done_many([job1, job4])
+
+        assert len(queue.tasks) == 1
+
+        assert queue.get_many(3) == [job3]
+
+        queue.task_done_many([job2, job3])
+
+        assert len(queue.tasks) == 0
+
+        with raises(Empty):
+            queue.get_many(3)
+
+    def test_prefetch(self):
+        queue = CrawlerQueue(prefetch=2)
+
+        jobs = [CrawlJob(str(i), group=str(i)) for i in range(5)]
+        queue.put_many(jobs)
+
+        assert queue.get_nowait() == jobs[0]
+        assert len(queue.prefetched) == 1
+        assert len(queue) == 3
+
+        assert consume(queue) == jobs[1:]
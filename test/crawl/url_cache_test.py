@@ -1,5 +1,16 @@
+from pytest import raises
+
 from minet.crawl.types import CrawlJob
-from minet.crawl.url_cache import AtomicSet, SQLiteStringSet, URLCache
+from minet.crawl.exceptions import CrawlerURLCacheModeMismatchError
+from minet.crawl.url_cache import (
+    AtomicSet,
+    BloomFilter,
+    ScalableBloomFilter,
+    SQLiteStringSet,
+    SQLiteFingerprintSet,
+    URLCache,
+    fingerprint,
+)
 
 
 class TestUrlCache:
@@ -79,6 +90,92 @@ class TestUrlCache:
             [(0, "one"), (2, "eight")], key=lambda t: t[1]
         ) == [(2, "eight")]
 
+    def test_bloom_filter(self):
+        b = BloomFilter(100)
+
+        items = [fingerprint(str(i)) for i in range(100)]
+
+        for item in items:
+            b.add(item)
+
+        assert all(item in b for item in items)
+        assert sum(fingerprint(str(-i)) in b for i in range(1, 1001)) < 50
+
+    def test_scalable_bloom_filter(self):
+        b = ScalableBloomFilter(100)
+
+        items = [fingerprint(str(i)) for i in range(5000)]
+
+        assert sum(b.add(item) for item in items) < 250
+        assert len(b.filters) > 1
+        assert all(item in b for item in items)
+        assert sum(fingerprint(str(-i)) in b for i in range(1, 10001)) < 500
+
+    def test_sqlite_fingerprint_set(self, tmp_path):
+        p = tmp_path
+
+        s = SQLiteFingerprintSet(p, capacity=10)
+
+        assert len(s) == 0
+
+        assert s.add(1)
+        assert not s.add(1)
+
+        assert len(s) == 1
+
+        assert 1 in s
+        assert 2 not in s
+
+        # Testing persistence
+        del s
+
+        s = SQLiteFingerprintSet(p, capacity=10)
+
+        assert len(s) == 1
+        assert 1 in s
+
+        assert s.add_many([1, 2, 3, 2]) == 2
+        assert s.add_many([1, 2, 3]) == 0
+
+        assert set(s) == {1, 2, 3}
+
+        assert s.add_many_and_keep_new([1, 4, 4, 5, -6]) == [4, 5, -6]
+        assert s.add_many_and_keep_new([(0, 1), (2, 7)], key=lambda t: t[1]) == [(2, 7)]
+
+        # Chunked lookup
+        assert s.add_many(range(2000)) == 1994
+        assert len(s) == 2001
+
+    def test_compact_url_cache(self, tmp_path):
+        c = URLCache(tmp_path, compact=True)
+
+        assert c.persistent
+
+        new = c.register(
+            [CrawlJob(url="http://lemonde.fr"), CrawlJob(url="http://lemonde.fr/")]
+        )
+
+        assert [job.url for job in new] == ["http://lemonde.fr"]
+
+        assert c.register([CrawlJob(url="http://lemonde.fr")]) == []
+        assert len(c) == 1
+        assert "http://lemonde.fr" in c
+        assert "http://lefigaro.fr" not in c
+
+    def test_url_cache_mode(self, tmp_path):
+        URLCache(tmp_path, compact=True).close()
+
+        with raises(CrawlerURLCacheModeMismatchError):
+            URLCache(tmp_path, resume=True)
+
+        URLCache(tmp_path, compact=True, resume=True).close()
+
+        # NOTE: a new crawl may use another mode
+        URLCache(tmp_path).close()
+
+        with raises(CrawlerURLCacheModeMismatchError):
+            URLCache(tmp_path, compact=True, resume=True)
+
     def test_url_cache(self):
         c = URLCache()
 
@@ -104,6 +201,18 @@ class TestUrlCache:
         assert "two" in c
         assert "four" not in c
 
+    def test_register_many(self):
+        c = URLCache()
+
+        items = [("http://lemonde.fr", 1), ("http://lemonde.fr/", 2), ("one", 3)]
+
+        assert c.register_many(items, key=lambda item: item[0]) == [
+            ("http://lemonde.fr", 1),
+            ("one", 3),
+        ]
+        assert c.register_many(items, key=lambda item: item[0]) == []
+        assert c.register([CrawlJob(url="one")]) == []
+
     def test_normalized_url_cache(self):
         c = URLCache(normalized=True)
 
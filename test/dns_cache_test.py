@@ -0,0 +1,168 @@
+import socket
+from time import sleep
+from pytest import raises
+from threading import Thread
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib3.exceptions import NewConnectionError
+
+from minet.web import request, create_pool_manager
+from minet.executors import HTTPThreadPoolExecutor
+from minet.dns_cache import DNSCache, is_ip_address
+
+BODY = b"<html><body>Hello</body></html>"
+
+getaddrinfo = socket.getaddrinfo
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+class CountingResolver(object):
+    def __init__(self, delay=0):
+        self.calls = []
+        self.delay = delay
+
+    def __call__(self, host, *args, **kwargs):
+        # NOTE: urllib3 also calls getaddrinfo on the resolved addresses
+        if is_ip_address(host):
+            return getaddrinfo(host, *args, **kwargs)
+
+        self.calls.append(host)
+
+        if self.delay:
+            sleep(self.delay)
+
+        if host.startswith("unknown."):
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+
+        return getaddrinfo("127.0.0.1", *args, **kwargs)
+
+
+class TestDNSCache:
+    def test_is_ip_address(self):
+        assert is_ip_address("127.0.0.1")
+        assert is_ip_address("[::1]")
+        assert not is_ip_address("localhost")
+
+    def test_resolve(self, monkeypatch):
+        resolver = CountingResolver()
+        monkeypatch.setattr(socket, "getaddrinfo", resolver)
+
+        cache = DNSCache(max_size=2)
+
+        assert cache.resolve("test.com") == ["127.0.0.1"]
+        assert cache.resolve("test.com") == ["127.0.0.1"]
+        assert cache.resolve("127.0.0.1") == ["127.0.0.1"]
+        assert resolver.calls == ["test.com"]
+
+        # Errors are cached too
+        for _ in range(2):
+            with raises(socket.gaierror):
+                cache.resolve("unknown.test.com")
+
+        assert resolver.calls == ["test.com", "unknown.test.com"]
+        assert cache.get_stats()["errors"] == 1
+
+        # LRU eviction
+        cache.resolve("other.com")
+        assert len(cache) == 2
+        cache.resolve("test.com")
+        assert resolver.calls[-1] == "test.com"
+
+        # Expiration
+        cache = DNSCache(ttl=0)
+        cache.resolve("test.com")
+        cache.resolve("test.com")
+        assert cache.get_stats()["misses"] == 2
+
+    def test_single_flight(self, monkeypatch):
+        resolver = CountingResolver(delay=0.1)
+        monkeypatch.setattr(socket, "getaddrinfo", resolver)
+
+        cache = DNSCache()
+
+        threads = [Thread(target=cache.resolve, args=("test.com",)) for _ in range(5)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        assert resolver.calls == ["test.com"]
+        assert cache.get_stats()["hits"] == 4
+
+    def test_prefetch(self, monkeypatch):
+        resolver = CountingResolver()
+        monkeypatch.setattr(socket, "getaddrinfo", resolver)
+
+        cache = DNSCache()
+
+        cache.prefetch("https://test.com/page")
+        cache.prefetch("http://127.0.0.1/page")
+
+        for _ in range(50):
+            if len(cache) == 1:
+                break
+
+            sleep(0.01)
+
+        assert cache.resolve("test.com") == ["127.0.0.1"]
+        assert resolver.calls == ["test.com"]
+        assert cache.get_stats()["prefetched"] == 1
+
+    def test_request(self, monkeypatch):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        Thread(target=server.serve_forever, daemon=True).start()
+
+        resolver = CountingResolver()
+        monkeypatch.setattr(socket, "getaddrinfo", resolver)
+
+        port = server.server_port
+        urls = ["http://test%i.com:%i/page" % (i % 2, port) for i in range(6)]
+
+        try:
+            cache = DNSCache()
+            pool_manager = create_pool_manager(dns_cache=cache)
+
+            response = request(urls[0], pool_manager=pool_manager)
+
+            assert response.body == BODY
+            assert response.dns_time is not None
+            assert request(urls[0]).dns_time is None
+
+            with raises(NewConnectionError):
+                request(
+                    "http://unknown.test.com:%i" % port,
+                    pool_manager=pool_manager,
+                )
+
+            with HTTPThreadPoolExecutor(max_workers=2, dns_cache=cache) as executor:
+                results = list(executor.request(urls, dns_prefetch=True))
+
+                stats = executor.connection_stats()
+
+            assert all(result.response.body == BODY for result in results)
+            assert sorted(set(resolver.calls)) == [
+                "test0.com",
+                "test1.com",
+                "unknown.test.com",
+            ]
+            assert stats["dns_misses"] == 3
+
+            with HTTPThreadPoolExecutor(max_workers=2) as executor:
+                with raises(TypeError):
+                    list(executor.request(urls, dns_prefetch=True))
+        finally:
+            server.shutdown()
+            server.server_close()
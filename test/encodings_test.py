@@ -1,7 +1,14 @@
 # =============================================================================
 # Minet Encodings Unit Tests
 # =============================================================================
-from minet.encodings import is_supported_encoding, normalize_encoding
+from minet.encodings import (
+    is_supported_encoding,
+    normalize_encoding,
+    detect_encoding,
+    UTF8_BOM,
+    UTF16_LE_BOM,
+    UTF32_LE_BOM,
+)
 
 SUPPORT_TESTS = [
     ("utf8", True),
@@ -20,3 +27,44 @@ class TestEncodings(object):
     def test_is_supported_encoding(self):
         for value, result in SUPPORT_TESTS:
             assert is_supported_encoding(value) == result
+
+    def test_detect_encoding(self):
+        html = "<html><head><title>Café</title></head><body>Héhé</body></html>"
+
+        # Byte order marks
+        assert detect_encoding(UTF8_BOM + html.encode()) == "utf-8-sig"
+        assert detect_encoding(html.encode("utf-16")) == "utf-16"
+        assert detect_encoding(UTF16_LE_BOM + b"h\x00") == "utf-16"
+        assert detect_encoding(UTF32_LE_BOM + b"h\x00\x00\x00") == "utf-32"
+        assert (
+            detect_encoding(UTF8_BOM + html.encode(), declared_encoding="latin1")
+            == "utf-8-sig"
+        )
+
+        # Declared encodings
+        assert detect_encoding(html.encode(), declared_encoding="latin1") == "latin1"
+        assert detect_encoding(html.encode(), declared_encoding="utf-8859-1") == "utf-8"
+
+        # Sniffed encodings
+        latin1_html = html.replace(
+            "<head>", '<head><meta charset="ISO-8859-1">'
+        ).encode("latin1")
+        assert detect_encoding(latin1_html) == "iso-8859-1"
+        assert (
+            detect_encoding(b'<?xml version="1.0" encoding="windows-1252"?><rss></rss>')
+            == "windows-1252"
+        )
+        assert detect_encoding(b'<meta charset="utf-16"><p>test</p>') == "utf-8"
+
+        # Declarations after the sniffed chunk are not seen
+        late_html = b"<!--" + b" " * 5000 + b'--><meta charset="latin1">'
+        assert detect_encoding(late_html) == "utf-8"
+
+        # Fast paths
+        assert detect_encoding(b"<html>test</html>") == "utf-8"
+        assert detect_encoding(html.encode()) == "utf-8"
+        assert detect_encoding(html.encode()[:-18]) == "utf-8"
+
+        # Statistical detection
+        text = "Le cœur a ses raisons que la raison ne connaît point. " * 20
+        assert detect_encoding(text.encode("cp1252")) is not None
@@ -1,13 +1,333 @@
 # =============================================================================
 # Minet Fetch Unit Tests
 # =============================================================================
-from pytest import raises
+import socket
+from time import sleep
+from pytest import raises, mark
+from io import BytesIO
+from threading import Thread
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib3 import HTTPResponse
+from urllib3._collections import HTTPHeaderDict
 
-from minet.web import request
-from minet.exceptions import InvalidURLError
+from minet.web import request, create_pool_manager, BufferedResponse, Response
+from minet.fs import ThreadSafeFileWriter
+from minet.executors import HTTPThreadPoolExecutor, RequestCoalescer, HTTPWorkerPayload
+from minet.exceptions import InvalidURLError, ResponseTooLargeError
+from minet.async_executors import AsyncHTTPExecutor, HTTPX_SUPPORT
+
+requires_httpx = mark.skipif(not HTTPX_SUPPORT, reason="httpx is not installed")
+
+BODY = b"<html><body>" + b"hello " * 1000 + b"</body></html>"
+
+
+def buffered_response(body: bytes, **kwargs) -> BufferedResponse:
+    inner = HTTPResponse(
+        body=BytesIO(body),
+        headers={"Content-Type": "text/html"},
+        status=200,
+        preload_content=False,
+    )
+
+    return BufferedResponse("GET", inner, cancel_event=None, **kwargs)
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+class SlowFirstHandler(KeepAliveHandler):
+    def do_GET(self):
+        if self.path == "/slow":
+            sleep(0.5)
+
+        super().do_GET()
+
+
+class RedirectingHandler(KeepAliveHandler):
+    def do_GET(self):
+        if self.path.startswith("/short/"):
+            self.send_response(301)
+            self.send_header("Location", "/target")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        sleep(0.01)
+        super().do_GET()
+
+
+def coalesced_urls(server):
+    return ["http://localhost:%i/%i" % (server.server_port, i % 3) for i in range(12)]
+
+
+def run_coalescing(executor, urls):
+    return list(
+        executor.request(
+            urls, ordered=True, coalesce=True, domain_parallelism=4, throttle=0
+        )
+    )
 
 
 class TestFetch(object):
     def test_bad_protocol(self):
         with raises(InvalidURLError):
             request("ttps://lemonde.fr")
+
+    def test_max_body_size(self):
+        with raises(ResponseTooLargeError):
+            buffered_response(BODY, max_size=1024).read_and_unwrap()
+
+        _, body = buffered_response(BODY, max_size=len(BODY)).read_and_unwrap()
+
+        assert body == BODY
+
+    def test_spooled_body(self, tmp_path):
+        _, body = buffered_response(BODY, spool_over=1024).read_and_unwrap()
+
+        assert not isinstance(body, bytes)
+
+        response = Response(
+            "https://lemonde.fr",
+            stack=None,
+            headers=HTTPHeaderDict({"Content-Type": "text/html"}),
+            status=200,
+            body=body,
+        )
+
+        assert response.is_spooled
+        assert len(response) == len(BODY)
+        assert response.is_html
+
+        writer = ThreadSafeFileWriter(str(tmp_path))
+        path = writer.write("test.html", response.open_body())
+
+        with open(path, "rb") as f:
+            assert f.read() == BODY
+
+        assert response.body == BODY
+        assert not response.is_spooled
+
+        # NOTE: only the head of spooled bodies is sniffed
+        late_utf8_body = b"<html>" + b"a" * 65536 + "é</html>".encode()
+        _, body = buffered_response(late_utf8_body, spool_over=1024).read_and_unwrap()
+
+        response = Response(
+            "https://lemonde.fr",
+            stack=None,
+            headers=HTTPHeaderDict({"Content-Type": "text/html"}),
+            status=200,
+            body=body,
+            known_encoding=None,
+        )
+
+        assert response.is_spooled
+        assert response.encoding == "utf-8"
+        assert response.text().endswith("é</html>")
+
+    def test_connection_stats(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        Thread(target=server.serve_forever, daemon=True).start()
+
+        url = "http://localhost:%i/" % server.server_port
+
+        pool_manager = create_pool_manager(instrumented=True)
+
+        try:
+            for _ in range(3):
+                assert request(url, pool_manager=pool_manager).body == BODY
+
+            stats = pool_manager.stats  # type: ignore
+
+            assert stats.requests == 3
+            assert stats.new_connections == 1
+            assert stats.reused_connections == 2
+            assert stats.handshakes == 0
+            assert stats.pools == 1
+        finally:
+            pool_manager.clear()
+            server.shutdown()
+            server.server_close()
+
+    def test_redirected_connection_reuse(self, caplog):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), RedirectingHandler)
+        Thread(target=server.serve_forever, daemon=True).start()
+
+        urls = [
+            "http://localhost:%i/short/%i" % (server.server_port, i) for i in range(32)
+        ]
+
+        try:
+            # NOTE: every url has its own parallelism key, but redirections
+            # funnel every worker onto the same host
+            with HTTPThreadPoolExecutor(max_workers=8) as executor:
+                results = list(
+                    executor.request(
+                        urls, key=lambda url: url, domain_parallelism=1, throttle=0
+                    )
+                )
+                stats = executor.connection_stats()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert len(results) == 32
+        assert all(result.response.body == BODY for result in results)
+        assert stats["requests"] == 64
+        assert stats["new_connections"] <= 8
+        assert "Connection pool is full" not in caplog.text
+
+    @requires_httpx
+    def test_async_executor(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        Thread(target=server.serve_forever, daemon=True).start()
+
+        urls = ["http://localhost:%i/%i" % (server.server_port, i) for i in range(5)]
+        # NOTE: a port nobody listens to anymore
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            closed_port = sock.getsockname()[1]
+
+        urls.append("http://localhost:%i/unreachable" % closed_port)
+
+        try:
+            with AsyncHTTPExecutor(max_concurrency=3) as executor:
+                results = list(executor.request(urls, ordered=True, throttle=0))
+
+            assert [result.url for result in results] == urls
+
+            for result in results[:-1]:
+                assert result.error is None
+                assert result.response.body == BODY
+
+            assert results[-1].error_code == "connection-refused"
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    @requires_httpx
+    def test_async_executor_ordered_buffer(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), SlowFirstHandler)
+        Thread(target=server.serve_forever, daemon=True).start()
+
+        base_url = "http://localhost:%i/" % server.server_port
+        pulled = []
+
+        def urls():
+            yield base_url + "slow"
+
+            for i in range(50):
+                pulled.append(i)
+                yield base_url + str(i)
+
+        try:
+            with AsyncHTTPExecutor(max_concurrency=2) as executor:
+                results = executor.request(
+                    urls(),
+                    ordered=True,
+                    throttle=0,
+                    buffer_size=3,
+                    domain_parallelism=2,
+                )
+
+                assert next(results).url == base_url + "slow"
+
+                # NOTE: results waiting for the slow one hold their slot
+                assert len(pulled) <= 2 + 3
+
+                assert [result.url for result in results] == [
+                    base_url + str(i) for i in range(50)
+                ]
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_request_coalescer(self):
+        coalescer = RequestCoalescer(cache_size=2)
+        calls = []
+
+        def fn(url):
+            calls.append(url)
+            return url.upper()
+
+        payloads = [HTTPWorkerPayload(i, url) for i, url in enumerate("aabcba")]
+
+        assert [coalescer(p, fn, p.url) for p in payloads] == list("AABCBA")
+        assert calls == ["a", "b", "c", "a"]
+        assert [p.cached for p in payloads] == [
+            False,
+            True,
+            False,
+            False,
+            True,
+            False,
+        ]
+        assert coalescer.coalesced == 2
+        assert len(coalescer) == 2
+
+        # NOTE: the cache is also bounded by the size of its outputs
+        coalescer = RequestCoalescer(max_cache_bytes=10, get_size=len)
+        calls = []
+
+        def fn(url):
+            calls.append(url)
+            return url * 4
+
+        payloads = [
+            HTTPWorkerPayload(i, url)
+            for i, url in enumerate(["a", "b", "a", "cc", "dddd", "a", "dddd"])
+        ]
+
+        for p in payloads:
+            assert coalescer(p, fn, p.url) == p.url * 4
+
+        assert calls == ["a", "b", "cc", "dddd", "a", "dddd"]
+        assert coalescer.coalesced == 1
+        assert list(coalescer.cache) == ["a"]
+        assert coalescer.cache_bytes == 4
+
+    def test_coalescing(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        Thread(target=server.serve_forever, daemon=True).start()
+
+        urls = coalesced_urls(server)
+
+        try:
+            with HTTPThreadPoolExecutor(max_workers=4) as executor:
+                results = run_coalescing(executor, urls)
+                stats = executor.connection_stats()
+
+            assert [result.url for result in results] == urls
+            assert all(result.response.body == BODY for result in results)
+            assert stats["requests"] == 3
+            assert stats["coalesced"] == 9
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    @requires_httpx
+    def test_async_coalescing(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        Thread(target=server.serve_forever, daemon=True).start()
+
+        urls = coalesced_urls(server)
+
+        try:
+            with AsyncHTTPExecutor(max_concurrency=4) as executor:
+                results = run_coalescing(executor, urls)
+
+            assert [result.url for result in results] == urls
+            assert all(result.response.body == BODY for result in results)
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -1,6 +1,7 @@
 # =============================================================================
 # Minet FS Unit Tests
 # =============================================================================
+import io
 import os
 import pytest
 from casanova import Headers, RowWrapper
@@ -14,6 +15,7 @@ from minet.fs import (
     NormalizedHostnameFolderStrategy,
     FilenameBuilder,
     ThreadSafeFileWriter,
+    WrittenBlob,
 )
 from minet.exceptions import FilenameFormattingError
 
@@ -212,3 +214,26 @@ class TestFS(object):
         assert (
             writer.resolve("test/../test.html", relative=True) == "downloaded/test.html"
         )
+
+    def test_write_blob(self, tmp_path):
+        writer = ThreadSafeFileWriter(str(tmp_path))
+
+        blob = writer.write_blob(b"Hello", ext="html")
+        digest = "185f8db32271fe25f561a6fc938b2e264306ec304eda518007d1764826381969"
+
+        assert blob == WrittenBlob(
+            os.path.join("18", digest + ".html"), digest, deduplicated=False
+        )
+        assert (tmp_path / "18" / (digest + ".html")).read_bytes() == b"Hello"
+
+        assert writer.write_blob("Hello", ext=".html").deduplicated
+        assert not writer.write_blob(b"Hello").deduplicated
+        assert not writer.write_blob(io.BytesIO(b"Hello"), compress=True).deduplicated
+
+        # Blobs written by a previous run
+        assert ThreadSafeFileWriter(str(tmp_path)).write_blob(b"Hello").deduplicated
+
+        archive_writer = ThreadSafeFileWriter(str(tmp_path / "archive"), sqlar=True)
+
+        assert not archive_writer.write_blob(b"Hello").deduplicated
+        assert archive_writer.write_blob(b"Hello").deduplicated
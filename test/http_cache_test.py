@@ -0,0 +1,173 @@
+import sqlite3
+from pytest import raises
+from threading import Thread
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib3._collections import HTTPHeaderDict
+
+from minet.web import request
+from minet.fs import ThreadSafeFileWriter
+from minet.executors import HTTPThreadPoolExecutor
+from minet.exceptions import HTTPCacheInvalidError
+from minet.http_cache import (
+    HTTPCache,
+    get_expiration_time,
+    is_storable,
+    merge_revalidated_headers,
+)
+
+BODY = b"<html><body>Hello</body></html>"
+ETAG = '"v1"'
+
+
+class RevalidatingHandler(BaseHTTPRequestHandler):
+    hits = 0
+    not_modified = 0
+
+    def do_GET(self):
+        RevalidatingHandler.hits += 1
+
+        if self.path == "/fresh":
+            self.send_response(200)
+            self.send_header("Cache-Control", "max-age=3600")
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+            return
+
+        if self.headers.get("If-None-Match") == ETAG:
+            RevalidatingHandler.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHTTPCache:
+    def test_heuristics(self):
+        assert (
+            get_expiration_time(HTTPHeaderDict({"Cache-Control": "max-age=10"}), 0)
+            == 10
+        )
+        assert (
+            get_expiration_time(HTTPHeaderDict({"Cache-Control": "no-cache"}), 0)
+            is None
+        )
+        assert get_expiration_time(HTTPHeaderDict(), 0) is None
+
+        assert is_storable(200, HTTPHeaderDict({"ETag": ETAG}))
+        assert is_storable(200, HTTPHeaderDict({"Last-Modified": "Wed, 21 Oct 2015"}))
+        assert not is_storable(200, HTTPHeaderDict())
+        assert not is_storable(404, HTTPHeaderDict({"ETag": ETAG}))
+        assert not is_storable(
+            200, HTTPHeaderDict({"ETag": ETAG, "Cache-Control": "no-store"})
+        )
+
+        merged = merge_revalidated_headers(
+            HTTPHeaderDict({"ETag": '"old"', "Content-Type": "text/html"}),
+            HTTPHeaderDict({"ETag": '"new"', "Content-Length": "0"}),
+        )
+
+        assert dict(merged) == {"ETag": '"new"', "Content-Type": "text/html"}
+
+    def test_basics(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+
+        cache = HTTPCache(path)
+
+        assert len(cache) == 0
+        assert cache.get("http://test.com") is None
+
+        assert cache.set("http://test.com", 200, HTTPHeaderDict({"ETag": ETAG}), BODY)
+        assert not cache.set("http://test.com/nope", 200, HTTPHeaderDict(), BODY)
+
+        entry = cache.get("http://test.com")
+
+        assert entry is not None
+        assert entry.body == BODY
+        assert not entry.is_fresh
+        assert entry.conditional_headers() == {"If-None-Match": ETAG}
+
+        cache.close()
+
+        # Persistence
+        assert HTTPCache(path).get("http://test.com") is not None
+
+        # Invalid file
+        other_path = str(tmp_path / "other.db")
+
+        with sqlite3.connect(other_path) as connection:
+            connection.execute("CREATE TABLE test (id INT);")
+
+        with raises(HTTPCacheInvalidError):
+            HTTPCache(other_path)
+
+    def test_request(self, tmp_path):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), RevalidatingHandler)
+        Thread(target=server.serve_forever, daemon=True).start()
+
+        url = "http://localhost:%i/page" % server.server_port
+        fresh_url = "http://localhost:%i/fresh" % server.server_port
+        cache = HTTPCache()
+
+        try:
+            response = request(url, cache=cache)
+
+            assert response.cache_status == "miss"
+            assert response.body == BODY
+
+            response = request(url, cache=cache)
+
+            assert response.cache_status == "revalidated"
+            assert response.status == 200
+            assert response.body == BODY
+            assert response.headers["ETag"] == ETAG
+            assert response.headers["Content-Type"] == "text/html"
+            assert RevalidatingHandler.not_modified == 1
+
+            assert request(fresh_url, cache=cache).cache_status == "miss"
+
+            hits = RevalidatingHandler.hits
+            response = request(fresh_url, cache=cache)
+
+            assert response.cache_status == "hit"
+            assert response.body == BODY
+            assert RevalidatingHandler.hits == hits
+
+            # Non-GET requests are not cached
+            assert request(url, method="POST", cache=cache).cache_status is None
+
+            with HTTPThreadPoolExecutor(max_workers=2) as executor:
+                results = list(executor.request([url, fresh_url], cache=cache))
+
+            assert sorted(result.response.cache_status for result in results) == [
+                "hit",
+                "revalidated",
+            ]
+            assert cache.stats == {"hit": 2, "revalidated": 2, "miss": 2}
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_file_writer_exists(self, tmp_path):
+        writer = ThreadSafeFileWriter(str(tmp_path / "files"))
+
+        assert not writer.exists("test.html")
+        writer.write("test.html", BODY)
+        assert writer.exists("test.html")
+        assert not writer.exists("test.html", compress=True)
+
+        archive_writer = ThreadSafeFileWriter(str(tmp_path / "archive"), sqlar=True)
+
+        assert not archive_writer.exists("test.html")
+        archive_writer.write("test.html", BODY)
+        assert archive_writer.exists("test.html")
@@ -1,7 +1,35 @@
 # =============================================================================
 # Minet Multiprocessing Unit Tests
 # =============================================================================
-from minet.multiprocessing import half_cpus
+import os
+import sys
+from pytest import raises, mark
+from quenouille import ThreadPoolExecutor
+
+from minet.multiprocessing import (
+    half_cpus,
+    pack_error,
+    unpack_error,
+    LazyPool,
+    ThreadedWorkerProcessPool,
+    imap_chunks,
+    imap_chunks_in_threads,
+)
+from minet.exceptions import CookieGrabbingError, InvalidStatusError
+
+
+def init_worker_process():
+    def work(n: int):
+        if n < 0:
+            raise InvalidStatusError(n)
+
+        return n * 2, os.getpid()
+
+    return ThreadPoolExecutor(2), work
+
+
+def double(n: int) -> int:
+    return n * 2
 
 
 class TestMultiprocessing(object):
@@ -12,3 +40,93 @@ class TestMultiprocessing(object):
         assert half_cpus(3) == 2
         assert half_cpus(2) == 1
         assert half_cpus(1) == 1
+
+    def test_lazy_pool_buffer_size(self):
+        pulled = []
+
+        def tasks():
+            for n in range(20):
+                pulled.append(n)
+                yield n
+
+        with LazyPool(2) as pool:
+            results = pool.imap(double, tasks(), buffer_size=3)
+
+            assert next(results) == 0
+
+            # NOTE: the pool does not consume the tasks eagerly
+            assert len(pulled) <= 4
+            assert list(results) == [n * 2 for n in range(1, 20)]
+
+    def test_imap_chunks(self):
+        pulled = []
+
+        def rows():
+            for n in range(100):
+                pulled.append(n)
+                yield ("row%i" % n, n)
+
+        for processes in (1, 2):
+            pulled.clear()
+
+            with LazyPool(processes) as pool:
+                results = imap_chunks(
+                    pool,
+                    double,
+                    rows(),
+                    chunk_size=7,
+                    key=lambda row: row[1],
+                    buffer_size=2,
+                )
+
+                assert next(results) == (("row0", 0), 0)
+
+                # NOTE: only a few chunks are pulled in advance
+                assert len(pulled) <= 7 * 4
+
+                assert list(results) == [
+                    (("row%i" % n, n), n * 2) for n in range(1, 100)
+                ]
+
+    def test_imap_chunks_in_threads(self):
+        def work(chunk):
+            return sum(chunk)
+
+        for threads in (1, 4):
+            results = imap_chunks_in_threads(threads, work, range(50), chunk_size=5)
+
+            assert list(results) == [
+                (list(range(n, n + 5)), sum(range(n, n + 5))) for n in range(0, 50, 5)
+            ]
+
+        with raises(TypeError):
+            list(imap_chunks_in_threads(2, work, range(50), chunk_size=0))
+
+    def test_pack_error(self):
+        # NOTE: this error cannot be pickled as is because of its constructor
+        error = CookieGrabbingError("firefox", ValueError("test"))
+        unpacked = unpack_error(pack_error(error))
+
+        assert isinstance(unpacked, CookieGrabbingError)
+        assert unpacked.browser == "firefox"
+        assert isinstance(unpacked.reason, ValueError)
+        assert str(unpacked) == str(error)
+
+    @mark.skipif(sys.platform == "win32", reason="worker processes require fork")
+    def test_threaded_worker_process_pool(self):
+        pool = ThreadedWorkerProcessPool(2, init_worker_process)
+
+        try:
+            futures = [pool.submit(n) for n in range(10)]
+            results = [future.result() for future in futures]
+
+            assert [r for r, _ in results] == [n * 2 for n in range(10)]
+            assert all(pid != os.getpid() for _, pid in results)
+
+            with raises(InvalidStatusError):
+                pool.submit(-1).result()
+        finally:
+            pool.shutdown()
+
+        with raises(RuntimeError):
+            pool.submit(1)
@@ -0,0 +1,77 @@
+# =============================================================================
+# Minet Rate Limiting Unit Tests
+# =============================================================================
+from time import time, sleep
+from threading import Thread
+from pytest import raises
+
+from minet.rate_limiting import AdaptiveConcurrencyLimiter
+
+
+class TestRateLimiting:
+    def test_adaptive_concurrency_limiter(self):
+        with raises(TypeError):
+            AdaptiveConcurrencyLimiter(0)
+
+        limiter = AdaptiveConcurrencyLimiter(8)
+
+        assert limiter.limit == 8
+
+        # Low budget
+        limiter.acquire()
+        limiter.release(remaining=10)
+        assert limiter.limit == 4
+
+        limiter.acquire()
+        limiter.release(remaining=5)
+        assert limiter.limit == 2
+
+        # Comfortable budget
+        limiter.acquire()
+        limiter.release(remaining=1000)
+        assert limiter.limit == 3
+
+        # Unknown budget
+        limiter.acquire()
+        limiter.release()
+        assert limiter.limit == 3
+
+        for _ in range(10):
+            limiter.acquire()
+            limiter.release(remaining=1000)
+
+        assert limiter.limit == 8
+
+        # Exhausted budget
+        limiter.acquire()
+        limiter.release(remaining=0, reset=time() + 0.2)
+        assert limiter.limit == 4
+
+        start = time()
+        limiter.acquire()
+        assert time() - start >= 0.2
+        limiter.release()
+
+    def test_adaptive_concurrency_limiter_threads(self):
+        limiter = AdaptiveConcurrencyLimiter(2)
+        active = []
+        peak = [0]
+
+        def work():
+            limiter.acquire()
+            active.append(1)
+            peak[0] = max(peak[0], len(active))
+            sleep(0.02)
+            active.pop()
+            limiter.release(remaining=1000)
+
+        threads = [Thread(target=work) for _ in range(8)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        assert peak[0] == 2
+        assert limiter.active == 0
@@ -6,7 +6,9 @@ from minet.scrape import (
     extract_canonical_link,
     extract_javascript_relocation,
     extract_meta_refresh,
+    extract_links,
 )
+from ural import links_from_html
 from minet.scrape.regex import extract_href, JAVASCRIPT_LOCATION_RE
 
 HTML_CANONICAL_TESTS = b"""
@@ -123,6 +125,29 @@ META_REFRESH = rb"""
 """
 
 
+LINKS = """
+    <nav>
+        <a href="/">Home</a>
+        <a href="/about">About</a>
+        <a href='/contact?b=2&amp;a=1#form'>Contact</a>
+        <a href=#top>Top</a>
+        <a class="test" href=" https://www.lemonde.fr ">Le Monde</a>
+        <a href="javascript:void(0)">Nope</a>
+        <a href="mailto:test@test.com">Nope</a>
+        <a href="">Self</a>
+        <A HREF="Article.html">Article</A>
+        <a href="//cdn.test.com/caf%C3%A9">Protocol-relative</a>
+        <a href="https://nope.notatld/">Nope</a>
+    </nav>
+    <script>
+        var html = '<a href="/in-script">';
+    </script>
+    <a href="/about">About again</a>
+    <a href="https://www.lemonde.fr">Le Monde again</a>
+    <a href="/crème.html">Crème</a>
+"""
+
+
 class TestRegexScraper(object):
     def test_extract_encodings_from_xml(self):
         html = b"""
@@ -162,6 +187,30 @@ class TestRegexScraper(object):
 
         assert location is None
 
+    def test_extract_links(self):
+        base_url = "https://test.com/section/page.html"
+
+        for encoding in ("utf-8", "latin-1"):
+            html = LINKS.encode(encoding)
+
+            for kwargs in [
+                {},
+                {"unique": True},
+                {"canonicalize": True, "unique": True, "strip_fragment": True},
+            ]:
+                assert list(
+                    extract_links(base_url, html, encoding=encoding, **kwargs)
+                ) == list(links_from_html(base_url, html, encoding=encoding, **kwargs))
+
+        assert list(extract_links(base_url, LINKS.encode(), unique=True)) == [
+            "https://test.com/",
+            "https://test.com/about",
+            "https://test.com/contact?b=2&a=1#form",
+            "https://www.lemonde.fr",
+            "https://test.com/section/Article.html",
+            "https://test.com/crème.html",
+        ]
+
     def test_find_meta_refresh(self):
         meta_refresh = extract_meta_refresh(META_REFRESH)
 
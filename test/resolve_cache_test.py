@@ -0,0 +1,111 @@
+import sqlite3
+from pytest import raises
+from threading import Thread
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from minet.types import Redirection
+from minet.web import resolve
+from minet.executors import HTTPThreadPoolExecutor
+from minet.exceptions import ResolveCacheInvalidError
+from minet.resolve_cache import (
+    ResolveCache,
+    get_resolve_flags,
+    is_cached_stack,
+)
+
+STACK = [
+    Redirection("https://bit.ly/test", "location-header", 301),
+    Redirection("https://lemonde.fr", "hit", 200),
+]
+
+
+class RedirectingHandler(BaseHTTPRequestHandler):
+    hits = 0
+
+    def do_HEAD(self):
+        RedirectingHandler.hits += 1
+
+        if self.path == "/short":
+            self.send_response(301)
+            self.send_header("Location", "/long")
+        else:
+            self.send_response(200)
+
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestResolveCache:
+    def test_basics(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+
+        cache = ResolveCache(path)
+
+        assert len(cache) == 0
+        assert cache.get("https://bit.ly/test") is None
+
+        assert cache.set("https://bit.ly/test", STACK)
+        assert not cache.set("https://bit.ly/error", [Redirection("a", "hit", 503)])
+
+        stack = cache.get("https://bit.ly/test")
+
+        assert is_cached_stack(stack)
+        assert [(r.url, r.type, r.status) for r in stack] == [
+            (r.url, r.type, r.status) for r in STACK
+        ]
+        assert (
+            cache.get("https://bit.ly/test", get_resolve_flags(canonicalize=True))
+            is None
+        )
+        assert (cache.hits, cache.misses) == (1, 2)
+
+        cache.close()
+
+        # Persistence & ttl
+        assert ResolveCache(path).get("https://bit.ly/test") is not None
+
+        stale_cache = ResolveCache(path, ttl=60)
+        stale_cache.set("https://bit.ly/stale", STACK, mtime=0)
+
+        assert stale_cache.get("https://bit.ly/stale") is None
+
+        # Invalid file
+        other_path = str(tmp_path / "other.db")
+
+        with sqlite3.connect(other_path) as connection:
+            connection.execute("CREATE TABLE test (id INT);")
+
+        with raises(ResolveCacheInvalidError):
+            ResolveCache(other_path)
+
+    def test_resolve(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), RedirectingHandler)
+        Thread(target=server.serve_forever, daemon=True).start()
+
+        url = "http://localhost:%i/short" % server.server_port
+        cache = ResolveCache()
+
+        try:
+            stack = resolve(url, cache=cache)
+
+            assert not is_cached_stack(stack)
+            assert RedirectingHandler.hits == 2
+
+            cached_stack = resolve(url, cache=cache)
+
+            assert is_cached_stack(cached_stack)
+            assert [r.url for r in cached_stack] == [r.url for r in stack]
+            assert RedirectingHandler.hits == 2
+
+            with HTTPThreadPoolExecutor(max_workers=2) as executor:
+                results = list(executor.resolve([url] * 3, cache=cache))
+
+            assert all(result.stack[-1].url.endswith("/long") for result in results)
+            assert RedirectingHandler.hits == 2
+            assert cache.hits == 4
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,248 @@
+# =============================================================================
+# Minet Scraper Compiler Unit Tests
+# =============================================================================
+import pickle
+import pytest
+
+from minet.scrape.compiler import compile_scraper
+from minet.scrape.interpreter import interpret_scraper
+from minet.scrape.classes.definition import DefinitionScraper
+from minet.scrape.exceptions import (
+    ScraperRuntimeError,
+    ScraperCompilationError,
+    ScraperEvalError,
+    InvalidScraperError,
+    InvalidCSSSelectorError,
+)
+from minet.scrape.utils import ensure_soup
+from minet.scrape.lxml_soup import LxmlSoup, CSSSELECT_SUPPORT
+
+HTML = """
+    <div id="ok" class="container">
+        <h1 data-id="title">Title</h1>
+        <ul>
+            <li id="li1" class="item"><span class="first">One</span> <span class="second">1</span></li>
+            <li id="li2" class="item"><span class="first">Two</span> <span class="second">2</span></li>
+            <li id="li3" class="item"><span class="first">One</span> <span class="second">3</span></li>
+            <li class="item"><span class="first"></span> <a href="/test">link</a></li>
+        </ul>
+        <p>Hello <strong>world</strong></p>
+    </div>
+"""
+
+DEFINITIONS = [
+    {"iterator": "li"},
+    {"iterator": "li", "item": "id"},
+    {"$$": "li", "item": "outer_html"},
+    {"sel": "#ok", "item": "id"},
+    {"$": "#ok", "$$": "li", "item": {"attr": "id"}},
+    {"sel": "#missing", "item": "id"},
+    {"sel": "#missing", "iterator": "li"},
+    {"sel": "h1", "attr": "data-id"},
+    {"sel": "p", "extract": "display_text"},
+    {"sel": "p", "extract": "inner_html"},
+    {"iterator": "li", "item": {"eval": 'element.get("id", "") + "-ok"'}},
+    {"iterator": "li", "item": {"attr": "id", "eval": "value and value.upper()"}},
+    {"iterator": "li", "fields": {"id": "id", "text": "text"}},
+    {
+        "iterator": "li",
+        "fields": {
+            "label": {"sel": ".first"},
+            "number": {"sel": ".second"},
+            "href": {"sel": "a", "attr": "href"},
+            "nested": {"fields": {"id": "id", "html": {"extract": "inner_html"}}},
+        },
+    },
+    {
+        "iterator": "li",
+        "fields": {"value": "text", "constant": {"default": "Same"}},
+    },
+    {"iterator": "li", "item": {"attr": "class", "default": "no-class"}},
+    {"iterator": "li", "item": {"attr": "id", "default": "no-id"}},
+    {"sel": "#missing", "default": "absent"},
+    {"iterator": "li", "item": {"sel_eval": 'element.select_one("span")'}},
+    {"iterator": "li", "item": {"sel_eval": '"span.second"'}},
+    {
+        "iterator_eval": 'element.select("li") + element.select("span")',
+        "item": {"attr": "class"},
+    },
+    {"iterator_eval": '"li, span"', "item": {"attr": "class"}},
+    {"sel": "ul", "iterator": "li", "filter": True, "item": "id"},
+    {"iterator": "li", "filter_eval": "'2' not in value"},
+    {
+        "iterator": "li",
+        "filter": "id",
+        "fields": {"id": "id", "text": "text"},
+    },
+    {"iterator": "li .first", "uniq": True},
+    {"iterator": "li", "uniq": "label", "fields": {"label": {"sel": ".first"}}},
+    {"iterator": "li .first", "uniq": False},
+    {
+        "iterator": "li",
+        "item": {"eval": "x = scope.x or 0\nscope.x = x + 1\nreturn scope.x"},
+    },
+    {
+        "iterator": "li",
+        "fields": {"root_id": {"eval": 'root.select_one("#ok").get("id")'}},
+    },
+    {"sel": "li", "item": {"eval": "a = 45\nreturn a + 10"}},
+    {
+        "set_context": {"title": {"sel": "h1"}, "id": {"sel": "#ok", "attr": "id"}},
+        "iterator": "li",
+        "fields": {
+            "title": {"get_context": "title"},
+            "page": {"get_context": "page"},
+            "id": {"get_context": "id"},
+            "text": {"eval": "context['title'] + ' ' + value"},
+        },
+    },
+    {
+        "iterator": "li",
+        "set_context": {"label": {"sel": ".first"}},
+        "fields": {
+            "label": {"get_context": "label"},
+            "nested": {
+                "sel": ".second",
+                "set_context": {"label": {"default": "overridden"}},
+                "get_context": "label",
+            },
+            "after": {"get_context": "label"},
+        },
+    },
+    {"get_context": ["nested", "key"]},
+]
+
+
+def run_both(definition, html=HTML, context=None):
+    soup = ensure_soup(html, engine="html.parser")
+
+    interpreted = interpret_scraper(definition, soup, root=soup, context=context)
+    compiled = compile_scraper(definition)(soup, context=context)
+
+    return interpreted, compiled
+
+
+requires_cssselect = pytest.mark.skipif(
+    not CSSSELECT_SUPPORT, reason="cssselect is not installed"
+)
+
+
+class TestScraperCompiler:
+    @pytest.mark.parametrize("definition", DEFINITIONS)
+    def test_parity(self, definition):
+        context = {"page": 4, "nested": {"key": "value"}}
+
+        interpreted, compiled = run_both(definition, context=context)
+
+        assert compiled == interpreted
+
+    @pytest.mark.parametrize(
+        "definition",
+        [
+            {"iterator": "li", "item": {"eval": "item.split()"}},
+            {"iterator": "li", "fields": {"x": {"eval": "return 45"}}},
+            {"sel_eval": "45"},
+            {"iterator_eval": "None"},
+            {"iterator": "li", "filter_eval": "45"},
+            {"iterator": "li", "item": {"eval": "object()"}},
+        ],
+    )
+    def test_error_parity(self, definition):
+        soup = ensure_soup(HTML, engine="html.parser")
+
+        with pytest.raises(ScraperRuntimeError) as interpreted:
+            interpret_scraper(definition, soup, root=soup)
+
+        with pytest.raises(ScraperRuntimeError) as compiled:
+            compile_scraper(definition)(soup)
+
+        assert type(compiled.value) is type(interpreted.value)
+        assert compiled.value.path == interpreted.value.path
+        assert compiled.value.expression == interpreted.value.expression
+        assert type(compiled.value.reason) is type(interpreted.value.reason)
+
+    @requires_cssselect
+    @pytest.mark.parametrize("definition", DEFINITIONS)
+    def test_lxml_parity(self, definition):
+        context = {"page": 4, "nested": {"key": "value"}}
+
+        # NOTE: attributes are not serialized in the same order
+        if definition.get("item") == "outer_html":
+            return
+
+        interpreted, _ = run_both(definition, context=context)
+        compiled = compile_scraper(definition, backend="lxml")(
+            LxmlSoup(HTML), context=context
+        )
+
+        assert compiled == interpreted
+
+    def test_callable_eval(self):
+        def process(value, **kwargs):
+            return value.upper()
+
+        interpreted, compiled = run_both(
+            {"iterator": "li", "item": {"sel": ".first", "eval": process}}
+        )
+
+        assert compiled == interpreted == ["ONE", "TWO", "ONE", ""]
+
+        def hellraiser(**kwargs):
+            raise RuntimeError
+
+        with pytest.raises(ScraperEvalError) as info:
+            compile_scraper({"iterator": "li", "item": {"eval": hellraiser}})(
+                ensure_soup(HTML, engine="html.parser")
+            )
+
+        assert isinstance(info.value.reason, RuntimeError)
+        assert info.value.path == ["item", "eval"]
+
+    def test_as_string(self):
+        source = compile_scraper({"iterator": "li", "item": "id"}, as_string=True)
+
+        assert source.startswith("def scrape(root, context=None):")
+
+    def test_unsupported(self):
+        with pytest.raises(ScraperCompilationError) as info:
+            compile_scraper({"iterator": "table", "item": {"tabulate": True}})
+
+        assert info.value.path == ["item", "tabulate"]
+
+    def test_definition_scraper(self):
+        definition = {"iterator": "li", "fields": {"id": "id", "text": "text"}}
+
+        scraper = DefinitionScraper(definition)
+        interpreted_scraper = DefinitionScraper(definition, compiled=False)
+
+        assert scraper.compiled_scraper is not None
+        assert interpreted_scraper.compiled_scraper is None
+        assert scraper(HTML) == interpreted_scraper(HTML)
+
+        unpickled_scraper = pickle.loads(pickle.dumps(scraper))
+
+        assert unpickled_scraper.compiled_scraper is not None
+        assert unpickled_scraper(HTML) == scraper(HTML)
+
+    @requires_cssselect
+    def test_lxml_definition_scraper(self):
+        definition = {"iterator": "li", "fields": {"id": "id", "text": "text"}}
+
+        scraper = DefinitionScraper(definition, backend="lxml")
+        expected = DefinitionScraper(definition)(HTML)
+
+        assert scraper(HTML) == expected
+        assert pickle.loads(pickle.dumps(scraper))(HTML) == expected
+
+        strained_scraper = DefinitionScraper(definition, backend="lxml", strain="ul")
+
+        assert strained_scraper(HTML) == expected
+
+        with pytest.raises(TypeError):
+            DefinitionScraper(definition, backend="lxml", compiled=False)
+
+        with pytest.raises(InvalidScraperError) as info:
+            DefinitionScraper({"iterator": "li:defined"}, backend="lxml")
+
+        assert isinstance(info.value.validation_errors[0], InvalidCSSSelectorError)
+        assert info.value.validation_errors[0].path == ["iterator"]
@@ -3,7 +3,9 @@
 # =============================================================================
 from typing import Optional
 
+import pickle
 import pytest
+import soupsieve
 from bs4 import BeautifulSoup, Tag, SoupStrainer
 from textwrap import dedent
 
@@ -14,7 +16,11 @@ from minet.scrape.analysis import (
     analyse,
     ScraperAnalysis,
 )
-from minet.scrape.interpreter import tabulate
+from minet.scrape.interpreter import (
+    tabulate,
+    precompile_scraper,
+    CompiledExpression,
+)
 from minet.scrape.std import get_display_text
 from minet.scrape.straining import strainer_from_css
 from minet.scrape.exceptions import (
@@ -829,6 +835,54 @@ class TestDefinitionScraper:
 
         assert info.value.path == ["iterator_eval"]
 
+    def test_precompile_scraper(self):
+        definition = {
+            "iterator": "li",
+            "filter_eval": "value != 'TWO'",
+            "fields": {
+                "id": {"attr": "id", "eval": "value.upper()"},
+                "text": {"eval": "t = element.get_text()\nreturn t.upper()"},
+                "parent": {"sel_eval": "element.parent", "extract": "outer_html"},
+                "items": {"iterator_eval": "'li'", "extract": "text"},
+                "root_id": {"$": "#ok", "attr": "id"},
+            },
+        }
+
+        compiled_definition = precompile_scraper(definition)
+
+        assert isinstance(compiled_definition["iterator"], soupsieve.SoupSieve)
+        assert isinstance(compiled_definition["filter_eval"], CompiledExpression)
+        assert isinstance(
+            compiled_definition["fields"]["text"]["eval"], CompiledExpression
+        )
+        assert definition["iterator"] == "li"
+
+        for html in [BASIC_HTML, META_HTML, REPETITIVE_HTML]:
+            assert scrape(compiled_definition, html) == scrape(definition, html)
+
+        scraper = DefinitionScraper(definition)
+
+        assert scraper(META_HTML) == scrape(definition, META_HTML)
+        assert pickle.loads(pickle.dumps(scraper))(META_HTML) == scraper(META_HTML)
+
+        # Compiled expressions must raise the same errors
+        with pytest.raises(ScraperEvalError) as info:
+            scrape(
+                precompile_scraper(
+                    {"iterator": "li", "item": {"eval": "item.split()"}}
+                ),
+                BASIC_HTML,
+            )
+
+        assert isinstance(info.value.reason, NameError)
+        assert info.value.path == ["item", "eval"]
+        assert info.value.expression == "item.split()"
+
+        with pytest.raises(ScraperEvalError) as info:
+            scrape(precompile_scraper({"item": {"eval": "return 45"}}), BASIC_HTML)
+
+        assert isinstance(info.value.reason, SyntaxError)
+
     def test_straining(self):
         too_complex = [
             "ul > li",
@@ -1,6 +1,15 @@
 import pytest
+import pickle
 
 from minet.scrape.soup import WonderfulSoup, SelectionError, ExtractionError
+from minet.scrape.lxml_soup import (
+    LxmlSoup,
+    LxmlTag,
+    compile_lxml_selector,
+    CSSSELECT_SUPPORT,
+)
+from minet.scrape.straining import strainer_from_css
+from minet.scrape.exceptions import InvalidCSSSelectorError
 
 HTML = """
 <div>
@@ -16,6 +25,28 @@ LINKS = """
     </ul>
 """
 
+DOCUMENT = """
+    <html>
+        <head><title>Title</title><script>var a = 1;</script></head>
+        <body>
+            <div id="main" class="content main">
+                Some <strong>text</strong>, isn't it&nbsp;?<!-- comment -->
+                <h2>Heading</h2>
+                <p>First <em>paragraph</em>.</p><p>Second one<br>with a break</p>
+                <pre>Preformatted
+    text</pre>
+                <ul>
+                    <li class="item"><a href="one">One</a></li>
+                    <li class="item last"><a href="two">Two</a> <span></span></li>
+                </ul>
+                <hr>
+                <span>Inline</span><span>spans</span>
+            </div>
+            tail
+        </body>
+    </html>
+"""
+
 
 class TestWonderfulSoup:
     def test_select_one_strict(self):
@@ -67,3 +98,113 @@ class TestWonderfulSoup:
 
         with pytest.raises(KeyError):
             div["id"]
+
+
+@pytest.mark.skipif(not CSSSELECT_SUPPORT, reason="cssselect is not installed")
+class TestLxmlSoup:
+    def test_parity(self):
+        lxml_soup = LxmlSoup(DOCUMENT)
+        wonderful_soup = WonderfulSoup(DOCUMENT)
+
+        for css in ["div", "p", "ul", "li.last", "h2", "pre"]:
+            lxml_tag = lxml_soup.force_select_one(css)
+            wonderful_tag = wonderful_soup.force_select_one(css)
+
+            assert lxml_tag.get_text() == wonderful_tag.get_text()
+            assert lxml_tag.get_display_text() == wonderful_tag.get_display_text()
+
+            # NOTE: void elements are not serialized the same way
+            assert lxml_tag.get_html() == wonderful_tag.get_html().replace("/>", ">")
+
+        assert lxml_soup.get_text() == wonderful_soup.get_text()
+        assert lxml_soup.get_display_text() == wonderful_soup.get_display_text()
+
+        for css, target in [
+            ("li", None),
+            ("a", "href"),
+            ("li", "class"),
+            ("li > a", "text"),
+            ("li", "html"),
+            (":contains('Two')", None),
+        ]:
+            assert lxml_soup.scrape(css, target) == wonderful_soup.scrape(css, target)
+            assert lxml_soup.scrape_one(css, target) == wonderful_soup.scrape_one(
+                css, target
+            )
+
+    def test_select(self):
+        soup = LxmlSoup(LINKS)
+
+        assert isinstance(soup.select_one("h1"), LxmlTag)
+        assert soup.select_one("h1").name == "h1"
+        assert soup.select_one("html") is not None
+        assert soup.select_one("li") == soup.select("li")[0]
+        assert soup.select_one("li").select_one("li") is None
+        assert soup.select_one(':-soup-contains("2")').name == "html"
+        assert [a.get("href") for a in soup.select("ul a")] == ["one", "two"]
+
+        with pytest.raises(SelectionError):
+            soup.force_select_one("table")
+
+        with pytest.raises(InvalidCSSSelectorError):
+            soup.select("a[")
+
+    def test_find(self):
+        soup = LxmlSoup(DOCUMENT)
+
+        assert soup.force_find("li").get("class") == "item"
+        assert soup.force_find("li", class_="item last").get_text() == "Two"
+        assert soup.find(attrs={"id": "main"}).name == "div"
+        assert [tag.name for tag in soup.find_all(["h2", "hr"])] == ["h2", "hr"]
+        assert len(soup.find_all("a", href=True, limit=1)) == 1
+        assert soup.force_find("ul").find("a", recursive=False) is None
+        assert soup.find("table") is None
+
+        with pytest.raises(SelectionError):
+            soup.force_find("table")
+
+    def test_get(self):
+        soup = LxmlSoup('<div class=" a  b  ">Ok</div>')
+        div = soup.force_select_one("div")
+
+        assert div.get("class") == " a  b  "
+        assert div.get("id") is None
+        assert div.get_list("class") == ["a", "b"]
+        assert div.get_list("id") == []
+        assert div["class"] == " a  b  "
+
+        with pytest.raises(KeyError):
+            div["id"]
+
+    def test_get_html(self):
+        p = LxmlSoup(HTML).force_select_one("p")
+
+        assert p.get_html() == "wut?"
+        assert p.get_inner_html() == "wut?"
+        assert p.get_outer_html() == "<p>wut?</p>"
+
+    def test_straining(self):
+        strainer = strainer_from_css("li, h1")
+
+        lxml_soup = LxmlSoup(LINKS, parse_only=strainer)
+        wonderful_soup = WonderfulSoup(LINKS, parse_only=strainer)
+
+        assert lxml_soup.get_html() == wonderful_soup.get_html()
+        assert lxml_soup.select_one("ul") is None
+        assert lxml_soup.scrape("a", "href") == ["one", "two"]
+
+    def test_edge_cases(self):
+        assert LxmlSoup("").get_text() == ""
+        assert LxmlSoup("   ").select_one("p") is None
+        assert (
+            LxmlSoup('<?xml version="1.0" encoding="latin-1"?><p>été</p>').scrape_one(
+                "p"
+            )
+            == "été"
+        )
+        assert LxmlSoup(b"<p>bytes</p>").scrape_one("p") == "bytes"
+
+    def test_pickle(self):
+        selector = pickle.loads(pickle.dumps(compile_lxml_selector("li > a")))
+
+        assert selector.select_one(LxmlSoup(LINKS)).get("href") == "one"
@@ -1,4 +1,5 @@
 from pytest import raises
+from concurrent.futures import ThreadPoolExecutor
 
 from minet.sqlar import SQLiteArchive, SQLiteArchiveRecord, sqlar_compress
 
@@ -40,3 +41,67 @@ class TestSQLiteArchive:
         records = list(archive)
 
         assert [record.name for record in records] == ["test.txt", "test/other.txt"]
+
+    def test_group_commit(self, tmp_path):
+        path = str(tmp_path / "archive.sqlar")
+
+        archive = SQLiteArchive(path, batch_size=8, queue_size=4)
+
+        def work(i):
+            archive.write("%i.txt" % i, b"content %i" % i, mtime=i)
+
+            # NOTE: pending writes must be visible to readers
+            assert "%i.txt" % i in archive
+            assert archive.read("%i.txt" % i).uncompressed_data == b"content %i" % i
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(work, range(100)))
+
+        assert len(archive) == 100
+
+        archive.write("0.txt", b"overwritten")
+        archive.close()
+
+        archive = SQLiteArchive(path)
+
+        assert len(archive) == 100
+        assert archive.read("0.txt").uncompressed_data == b"overwritten"
+
+        archive.close()
+
+        with raises(RuntimeError):
+            archive.write("test.txt", b"closed")
+
+    def test_concurrent_close(self, tmp_path):
+        path = str(tmp_path / "archive.sqlar")
+
+        archive = SQLiteArchive(path, batch_size=4, queue_size=2)
+
+        def work(i):
+            if i == 50:
+                archive.close()
+                return None
+
+            try:
+                archive.write("%i.txt" % (i % 10), b"content %i" % i, mtime=i)
+            except RuntimeError:
+                return None
+
+            return i
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            written = [i for i in executor.map(work, range(100)) if i is not None]
+
+        # NOTE: every accepted write was committed
+        archive = SQLiteArchive(path)
+        records = {record.name: record.uncompressed_data for record in archive}
+
+        assert set(records) == {"%i.txt" % (i % 10) for i in written}
+
+        for name, data in records.items():
+            i = int(data.split(b" ")[1])
+
+            assert i in written
+            assert "%i.txt" % (i % 10) == name
+
+        archive.close()
@@ -0,0 +1,170 @@
+from os import listdir
+from os.path import join
+from tempfile import TemporaryFile
+from urllib3._collections import HTTPHeaderDict
+
+from minet.web import Response
+from minet.types import Redirection
+from minet.fs import read_potentially_gzipped_path
+from minet.warc import (
+    WARCWriter,
+    WARCIndex,
+    get_surt,
+    iter_warc_records,
+    read_warc_record,
+    split_warc_path,
+)
+
+
+def make_response(url, body, headers=None, stack=None):
+    return Response(
+        url,
+        stack,
+        HTTPHeaderDict(headers or {"Content-Type": "text/html; charset=utf-8"}),
+        200,
+        body,
+    )
+
+
+class TestWARC:
+    def test_surt(self):
+        assert (
+            get_surt("https://www.Example.com/Test?b=2&a=1")
+            == "com,example)/test?a=1&b=2"
+        )
+        assert get_surt("http://example.com:8080") == "com,example:8080)/"
+
+    def test_split_warc_path(self):
+        assert split_warc_path("dir/test.warc.gz#34") == ("dir/test.warc.gz", 34)
+        assert split_warc_path("dir/test.html") is None
+        assert split_warc_path("dir/test.html#34") is None
+
+    def test_writer(self, tmp_path):
+        directory = str(tmp_path / "warc")
+        writer = WARCWriter(directory, max_size=1024)
+
+        pages = {
+            "http://test.com/%i" % i: ("<html><title>%i</title></html>" % i).encode()
+            * 20
+            for i in range(10)
+        }
+
+        locations = {
+            url: writer.write_response(
+                make_response(
+                    url,
+                    body,
+                    {"Content-Type": "text/html", "Content-Encoding": "gzip"},
+                )
+            )
+            for url, body in pages.items()
+        }
+
+        # Spooled bodies
+        with TemporaryFile() as f:
+            f.write(b"<html>spooled</html>")
+            locations["http://test.com/spooled"] = writer.write_response(
+                make_response("http://test.com/spooled", f)
+            )
+            pages["http://test.com/spooled"] = b"<html>spooled</html>"
+
+        writer.close()
+
+        files = listdir(directory)
+
+        # Rotation
+        assert sum(name.endswith(".warc.gz") for name in files) > 1
+        assert sum(name.endswith(".cdxj") for name in files) > 1
+
+        # NOTE: indices are sorted once their WARC file is closed
+        assert not any(name.endswith(".unsorted") for name in files)
+
+        for url, location in locations.items():
+            record = read_warc_record(
+                join(directory, location.filename), location.offset
+            )
+
+            assert record.type == "response"
+            assert record.url == url
+            assert record.http_status == 200
+            assert record.body == pages[url]
+            assert record.http_headers is not None
+            assert "Content-Encoding" not in record.http_headers
+            assert record.http_headers["Content-Length"] == str(len(pages[url]))
+
+            assert (
+                read_potentially_gzipped_path(join(directory, location.path))
+                == pages[url].decode()
+            )
+
+        first_file = join(directory, locations["http://test.com/0"].filename)
+
+        assert [record.type for record in iter_warc_records(first_file)][:3] == [
+            "warcinfo",
+            "request",
+            "response",
+        ]
+
+        index = WARCIndex(directory)
+
+        assert all(url in index for url in pages)
+        assert (
+            index.get("http://test.com/3").path == locations["http://test.com/3"].path
+        )
+        assert index.read("http://test.com/3").body == pages["http://test.com/3"]
+        assert "http://test.com/nope" not in index
+
+    def test_index(self, tmp_path):
+        directory = str(tmp_path / "warc")
+        writer = WARCWriter(directory)
+
+        urls = ["http://test.com/%i" % i for i in reversed(range(50))]
+
+        for url in urls:
+            writer.write_response(make_response(url, url.encode()))
+
+        # NOTE: the same SURT, but another url
+        writer.write_response(make_response("http://www.test.com/7", b"www"))
+
+        # NOTE: a redirected response
+        redirected = writer.write_response(
+            make_response(
+                "http://short.url/test",
+                b"redirected",
+                stack=[
+                    Redirection("http://short.url/test", "location-header", 301),
+                    Redirection("http://test.com/final"),
+                ],
+            )
+        )
+
+        # NOTE: the index of the current file is not sorted yet
+        index = WARCIndex(directory)
+
+        assert index.read("http://test.com/7").body == b"http://test.com/7"
+
+        writer.close()
+
+        cdxj_files = [name for name in listdir(directory) if name.endswith(".cdxj")]
+
+        assert len(cdxj_files) == 1
+
+        with open(join(directory, cdxj_files[0]), "rb") as f:
+            lines = f.readlines()
+
+        assert len(lines) == 53
+        assert lines == sorted(lines)
+
+        index = WARCIndex(directory)
+
+        for url in urls:
+            assert index.read(url).body == url.encode()
+
+        assert index.read("http://www.test.com/7").body == b"www"
+        assert index.get("http://test.com/final").path == redirected.path
+        assert index.get("http://short.url/test").path == redirected.path
+        assert "http://test.com/50" not in index
+        assert "http://a.com/" not in index
+        assert "http://zzz.com/" not in index
+
+        index.close()
@@ -0,0 +1,188 @@
+# =============================================================================
+# Minet YouTube Comments Unit Tests
+# =============================================================================
+import json
+from time import sleep
+from threading import Thread
+from collections import defaultdict
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from minet.youtube.urls import YouTubeAPIURLFormatter
+from minet.youtube.client import YouTubeAPIClient
+from minet.youtube.exceptions import (
+    YouTubeDisabledCommentsError,
+    YouTubeInvalidVideoTargetError,
+)
+
+DISABLED_VIDEO = "disabled000"
+PAGE_SIZE = 4
+
+
+def snippet(text):
+    return {
+        "authorDisplayName": "author",
+        "authorChannelId": {"value": "channel"},
+        "textOriginal": text,
+        "likeCount": 0,
+        "publishedAt": "2024-11-19T10:00:00Z",
+        "updatedAt": "2024-11-19T10:00:00Z",
+    }
+
+
+def reply_payload(video_id, thread_id, i):
+    comment_id = "%s.reply%i" % (thread_id, i)
+
+    return {
+        "id": comment_id,
+        "snippet": {
+            **snippet(comment_id),
+            "videoId": video_id,
+            "parentId": thread_id,
+        },
+    }
+
+
+def thread_payload(video_id, i):
+    thread_id = "%s-thread%i" % (video_id, i)
+
+    # NOTE: some threads have more replies than what is embedded
+    reply_count = i % 4 * 3
+    replies = [
+        reply_payload(video_id, thread_id, j) for j in range(min(2, reply_count))
+    ]
+
+    return {
+        "id": thread_id,
+        "snippet": {
+            "videoId": video_id,
+            "totalReplyCount": reply_count,
+            "topLevelComment": {"snippet": snippet(thread_id)},
+        },
+        "replies": {"comments": replies},
+    }
+
+
+def paginate(items, query):
+    offset = int(query.get("pageToken", ["0"])[0])
+    data = {"items": items[offset : offset + PAGE_SIZE]}
+
+    if offset + PAGE_SIZE < len(items):
+        data["nextPageToken"] = str(offset + PAGE_SIZE)
+
+    return data
+
+
+class Handler(BaseHTTPRequestHandler):
+    def send_json(self, status, data):
+        body = json.dumps(data).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+
+        sleep(0.005)
+
+        if url.path.endswith("commentThreads"):
+            video_id = query["videoId"][0]
+
+            if video_id == DISABLED_VIDEO:
+                return self.send_json(
+                    403, {"error": {"errors": [{"reason": "commentsDisabled"}]}}
+                )
+
+            count = int(video_id[-2:])
+            threads = [thread_payload(video_id, i) for i in range(count)]
+
+            return self.send_json(200, paginate(threads, query))
+
+        thread_id = query["parentId"][0]
+        video_id = thread_id.split("-")[0]
+        count = int(thread_id.rsplit("thread", 1)[1]) % 4 * 3
+        replies = [reply_payload(video_id, thread_id, j) for j in range(count)]
+
+        self.send_json(200, paginate(replies, query))
+
+    def log_message(self, *args):
+        pass
+
+
+class TestYouTubeComments:
+    def test_comments_from_videos(self, monkeypatch):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        Thread(target=server.serve_forever, daemon=True).start()
+
+        monkeypatch.setattr(
+            YouTubeAPIURLFormatter,
+            "BASE_URL",
+            "http://127.0.0.1:%i/youtube/v3" % server.server_port,
+        )
+
+        videos = ["video%06i" % i for i in range(16)]
+        videos.insert(5, DISABLED_VIDEO)
+        videos.insert(10, "invalid")
+
+        try:
+            client = YouTubeAPIClient(["one", "two"], threads=1)
+
+            expected = {
+                video_id: [c.comment_id for c in client.comments(video_id)]
+                for video_id in videos
+                if video_id not in (DISABLED_VIDEO, "invalid")
+            }
+
+            assert len(expected["video000009"]) == 9 + 3 + 6 + 9 + 3 + 6 + 9
+
+            for threads in (1, 8):
+                client = YouTubeAPIClient(["one", "two"], threads=threads)
+
+                comments = defaultdict(list)
+                done = []
+                errors = {}
+
+                for batch in client.comments_from_videos(
+                    enumerate(videos), key=lambda item: item[1]
+                ):
+                    _, video = batch.item
+
+                    assert video not in done
+
+                    for comment in batch.comments:
+                        assert comment.video_id == video
+
+                    comments[video].extend(c.comment_id for c in batch.comments)
+
+                    if batch.error is not None:
+                        errors[video] = batch.error
+
+                    if batch.done:
+                        done.append(video)
+
+                assert sorted(done) == sorted(videos)
+                assert isinstance(errors[DISABLED_VIDEO], YouTubeDisabledCommentsError)
+                assert isinstance(errors["invalid"], YouTubeInvalidVideoTargetError)
+                assert len(errors) == 2
+
+                for video_id, comment_ids in expected.items():
+                    assert sorted(comments[video_id]) == sorted(comment_ids)
+
+                    # NOTE: parents always come before their replies
+                    seen = set()
+
+                    for comment_id in comments[video_id]:
+                        if ".reply" in comment_id:
+                            assert comment_id.split(".")[0] in seen
+
+                        seen.add(comment_id)
+
+                if threads == 1:
+                    assert {v: comments[v] for v in expected} == expected
+        finally:
+            server.shutdown()
+            server.server_close()
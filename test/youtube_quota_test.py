@@ -0,0 +1,241 @@
+# =============================================================================
+# Minet YouTube Quota Scheduler Unit Tests
+# =============================================================================
+import json
+from time import sleep
+from threading import Thread, Lock
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pytest import raises
+
+import minet.youtube.quota
+from minet.youtube.quota import YouTubeAPIKeyScheduler, get_quota_cost, hash_key
+from minet.youtube.urls import YouTubeAPIURLFormatter
+from minet.youtube.constants import YOUTUBE_API_QUOTA_PERSIST_CALLS
+from minet.youtube.client import YouTubeAPIClient
+from minet.youtube.exceptions import YouTubeAPILimitReached
+
+
+class State:
+    def __init__(self):
+        self.lock = Lock()
+        self.active = {}
+        self.peak = {}
+        self.calls = {}
+        self.exhausted = set()
+
+
+def create_handler(state: State):
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, status, data):
+            body = json.dumps(data).encode()
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            query = parse_qs(urlsplit(self.path).query)
+            key = query["key"][0]
+
+            if key in state.exhausted:
+                return self.send_json(
+                    403,
+                    {"error": {"errors": [{"reason": "quotaExceeded"}]}},
+                )
+
+            with state.lock:
+                state.calls[key] = state.calls.get(key, 0) + 1
+                state.active[key] = state.active.get(key, 0) + 1
+                state.peak[key] = max(state.peak.get(key, 0), state.active[key])
+
+            sleep(0.02)
+
+            with state.lock:
+                state.active[key] -= 1
+
+            ids = query["id"][0].split(",")
+
+            # NOTE: dropping some videos
+            items = [{"id": video_id} for video_id in ids if not video_id.endswith("7")]
+
+            self.send_json(200, {"items": items})
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class TestYouTubeQuota:
+    def test_get_quota_cost(self):
+        urls = YouTubeAPIURLFormatter()
+
+        assert get_quota_cost(urls.search("test")) == 100
+        assert get_quota_cost(urls.videos(["test"])) == 1
+        assert get_quota_cost(urls.comments("test")) == 1
+
+    def test_routing(self):
+        scheduler = YouTubeAPIKeyScheduler(
+            ["one", "two"], per_key_parallelism=2, daily_quota=1000
+        )
+
+        scheduler.states["one"].used = 500
+
+        # NOTE: expensive calls go where the budget is the largest
+        assert scheduler.acquire(100) == "two"
+        scheduler.release("two")
+
+        # NOTE: cheap calls are packed where the budget is the smallest
+        assert scheduler.acquire(1) == "one"
+        assert scheduler.acquire(1) == "one"
+
+        # NOTE: unless the key is busy
+        assert scheduler.acquire(1) == "two"
+
+        scheduler.release("one")
+        scheduler.release("one")
+        scheduler.release("two")
+
+        assert scheduler.remaining("one") == 498
+        assert scheduler.remaining("two") == 899
+
+        scheduler.exhaust("one")
+
+        assert scheduler.acquire(1) == "two"
+        scheduler.release("two")
+
+        assert scheduler.get_stats() == {
+            "used": 1102,
+            "remaining": 898,
+            "exhausted": 1,
+        }
+
+        scheduler = YouTubeAPIKeyScheduler(["one", "two"], daily_quota=150, sleep=False)
+
+        assert scheduler.acquire(100) == "one"
+        assert scheduler.acquire(100) == "two"
+        scheduler.release("one")
+        scheduler.release("two")
+
+        # NOTE: our accounting is an estimation, keys might have been granted
+        # more quota, so they are only deemed exhausted when Google says so
+        assert scheduler.acquire(100) == "one"
+        scheduler.release("one")
+
+        scheduler.exhaust("one")
+        scheduler.exhaust("two")
+
+        with raises(YouTubeAPILimitReached):
+            scheduler.acquire(1)
+
+    def test_persistence(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "quota.json")
+        day = "2024-11-19"
+
+        monkeypatch.setattr(minet.youtube.quota, "get_pacific_date", lambda: day)
+
+        scheduler = YouTubeAPIKeyScheduler(["one", "two"], quota_path=path)
+
+        scheduler.acquire(100)
+        scheduler.release(scheduler.acquire(1))
+
+        # NOTE: the file is not written after each call
+        with raises(FileNotFoundError):
+            open(path)
+
+        scheduler.close()
+
+        with open(path) as f:
+            data = json.load(f)
+
+        # NOTE: the keys themselves are not written on disk
+        assert data == {
+            "day": day,
+            "keys": {hash_key("one"): 101, hash_key("two"): 0},
+            "exhausted": [],
+        }
+
+        scheduler = YouTubeAPIKeyScheduler(["one", "three"], quota_path=path)
+
+        assert scheduler.states["one"].used == 101
+        assert scheduler.states["three"].used == 0
+
+        # NOTE: exhaustion is written right away
+        scheduler.exhaust("three")
+
+        with open(path) as f:
+            data = json.load(f)
+
+        assert len(data["keys"]) == 3
+        assert data["exhausted"] == [hash_key("three")]
+
+        assert (
+            YouTubeAPIKeyScheduler(["three"], quota_path=path).states["three"].exhausted
+        )
+
+        for _ in range(YOUTUBE_API_QUOTA_PERSIST_CALLS):
+            scheduler.release(scheduler.acquire(1))
+
+        with open(path) as f:
+            assert json.load(f)["keys"][hash_key("one")] == 201
+
+        # NOTE: quotas are reset at midnight Pacific time
+        day = "2024-11-20"
+
+        assert (
+            YouTubeAPIKeyScheduler(["one"], quota_path=path).remaining("one") == 10_000
+        )
+
+        scheduler.release(scheduler.acquire(100))
+
+        assert scheduler.states["one"].used + scheduler.states["three"].used == 100
+        assert not scheduler.states["three"].exhausted
+
+    def test_client(self, monkeypatch):
+        state = State()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), create_handler(state))
+        Thread(target=server.serve_forever, daemon=True).start()
+
+        monkeypatch.setattr(
+            YouTubeAPIURLFormatter,
+            "BASE_URL",
+            "http://127.0.0.1:%i/youtube/v3" % server.server_port,
+        )
+
+        try:
+            client = YouTubeAPIClient(
+                ["one", "two"], threads=8, per_key_parallelism=2, sleep=False
+            )
+
+            videos = ["video%06i" % i for i in range(1000)]
+            results = list(client.videos(videos, raw=True))
+
+            assert [item for item, _ in results] == videos
+
+            for video_id, video in results:
+                if video_id.endswith("7"):
+                    assert video is None
+                else:
+                    assert video["id"] == video_id
+
+            assert sum(state.calls.values()) == 20
+            assert max(state.peak.values()) <= 2
+            assert state.peak["one"] == state.peak["two"] == 2
+
+            # NOTE: the scheduler switches to the other key when Google
+            # reports one as exhausted
+            state.exhausted.add("one")
+
+            assert len(list(client.videos(videos, raw=True))) == 1000
+            assert client.scheduler.remaining("one") == 0
+
+            state.exhausted.add("two")
+
+            with raises(YouTubeAPILimitReached):
+                client.video("video000001", raw=True)
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,142 @@
+from random import Random
+from pytest import raises, mark
+
+import minet.zstd
+from minet.fs import ThreadSafeFileWriter, read_potentially_gzipped_path
+from minet.sqlar import SQLiteArchive
+from minet.exceptions import ZstdDictionaryNotFoundError
+from minet.zstd import (
+    GroupedZstdCompressor,
+    get_zstd_group,
+    is_zstd,
+    zstd_uncompress,
+    ZSTD_SUPPORT,
+)
+
+pytestmark = mark.skipif(not ZSTD_SUPPORT, reason="zstandard is not installed")
+
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing"]
+
+
+def make_pages(n, seed=12):
+    rng = Random(seed)
+
+    return [
+        (
+            '<html><head><title>Page %i</title><link rel="stylesheet" href="/static/main.css"></head>'
+            '<body><nav class="menu"><a href="/">Home</a><a href="/about">About</a></nav>'
+            '<article class="content">%s</article><footer class="footer">Some footer</footer>'
+            "</body></html>" % (i, " ".join(rng.choices(WORDS, k=30)))
+        ).encode()
+        for i in range(n)
+    ]
+
+
+def forget_dictionaries():
+    minet.zstd.DICTIONARIES.clear()
+    minet.zstd.LOADED_DICTIONARIES_DIRECTORIES.clear()
+    minet.zstd.THREAD_LOCAL.codecs = {}
+
+
+class TestZstd:
+    def test_grouped_compressor(self):
+        dictionaries = []
+
+        def on_dictionary(group, dictionary):
+            # NOTE: the dictionary is not used before being persisted
+            assert isinstance(compressor.groups[group], list)
+            dictionaries.append((group, dictionary))
+
+        compressor = GroupedZstdCompressor(
+            training_samples=50,
+            dictionary_size=4096,
+            on_dictionary=on_dictionary,
+        )
+
+        pages = make_pages(100)
+        compressed = [compressor.compress(page, group="test.com") for page in pages]
+
+        assert all(is_zstd(data) for data in compressed)
+        assert [zstd_uncompress(data) for data in compressed] == pages
+
+        assert len(dictionaries) == 1
+        assert dictionaries[0][0] == "test.com"
+
+        # Files compressed after training use the dictionary & are smaller
+        assert len(compressed[-1]) < len(compressed[0])
+
+        forget_dictionaries()
+
+        with raises(ZstdDictionaryNotFoundError):
+            zstd_uncompress(compressed[-1])
+
+        assert get_zstd_group("test.com/page.html") == "test.com"
+        assert get_zstd_group("page.html") == ""
+
+    def test_training_memory(self):
+        compressor = GroupedZstdCompressor(
+            training_samples=50,
+            training_sample_size=100,
+            max_training_bytes=2000,
+        )
+
+        pages = make_pages(10)
+
+        for group in ("one", "two", "three"):
+            for page in pages:
+                compressor.compress(page, group=group)
+
+        # NOTE: samples are truncated & the oldest group was given up
+        assert compressor.training_bytes == 2000
+        assert compressor.groups["one"] is False
+        assert len(compressor.groups["three"]) == 10
+        assert all(len(sample) == 100 for sample in compressor.groups["three"])
+
+    def test_sqlar(self, tmp_path):
+        path = str(tmp_path / "archive.sqlar")
+        pages = make_pages(150)
+
+        archive = SQLiteArchive(path, compression="zstd")
+
+        for i, page in enumerate(pages):
+            archive.write("test.com/%i.html" % i, page)
+
+        archive.close()
+
+        # Dictionaries are persisted in the archive itself
+        forget_dictionaries()
+
+        archive = SQLiteArchive(path)
+
+        assert is_zstd(archive.read("test.com/149.html").data)
+
+        for i, page in enumerate(pages):
+            assert archive.read("test.com/%i.html" % i).uncompressed_data == page
+
+        # Zlib & zstd files can coexist
+        archive.write("other.html", pages[0])
+        assert archive.read("other.html").uncompressed_data == pages[0]
+
+    def test_file_writer(self, tmp_path):
+        root = str(tmp_path / "files")
+        pages = make_pages(150)
+
+        writer = ThreadSafeFileWriter(root, compression="zstd")
+
+        paths = [
+            writer.write("test.com/%i.html.zst" % i, page, compress=True)
+            for i, page in enumerate(pages)
+        ]
+
+        assert writer.exists("test.com/0.html", compress=True)
+        assert all(path.endswith(".html.zst") for path in paths)
+        assert (tmp_path / "files" / ".zstd-dictionaries").is_dir()
+
+        forget_dictionaries()
+
+        for path, page in zip(paths, pages):
+            assert read_potentially_gzipped_path(path) == page.decode()
+
+        blob = writer.write_blob(pages[0], ext="html", compress=True)
+
+        assert blob.path.endswith(".html.zst")